@@ -0,0 +1,140 @@
+// SPDX-License-Identifier: GPL-3.0
+pragma solidity ^0.6.12;
+pragma experimental ABIEncoderV2;
+
+interface IKeep3rStrategy {
+    function harvestTrigger(uint256 callCost) external view returns (bool);
+
+    function tendTrigger(uint256 callCost) external view returns (bool);
+
+    function harvest() external;
+
+    function tend() external;
+}
+
+/********************
+ *
+ *   Harvests and tends several strategies in one transaction.
+ *   Set it as the keeper of every strategy it should work. Each strategy runs in its own try/catch,
+ *   so one revert does not stop the rest, and every strategy touched reports through Worked.
+ *
+ ********************* */
+
+contract BatchHarvester {
+    uint8 public constant NONE = 0;
+    uint8 public constant HARVEST = 1;
+    uint8 public constant TEND = 2;
+
+    // @notice one per strategy in a batch. reason is the revert data when success is false
+    event Worked(address indexed strategy, uint8 action, bool success, bytes reason);
+
+    address public governance;
+    mapping(address => bool) public keepers;
+
+    //we do not start a strategy with less gas than this left, so one long harvest cannot starve the rest silently
+    uint256 public minGasPerStrategy = 400000;
+
+    constructor() public {
+        governance = msg.sender;
+        keepers[msg.sender] = true;
+    }
+
+    function setGovernance(address _governance) external onlyGovernance {
+        governance = _governance;
+    }
+
+    function setKeeper(address _keeper, bool _allowed) external onlyGovernance {
+        keepers[_keeper] = _allowed;
+    }
+
+    function setMinGasPerStrategy(uint256 _minGasPerStrategy) external onlyGovernance {
+        minGasPerStrategy = _minGasPerStrategy;
+    }
+
+    //What work would do for each strategy: HARVEST, TEND or NONE. harvest takes priority, a reverting trigger counts as NONE
+    function workable(address[] calldata strategies, uint256[] calldata callCosts) external view returns (uint8[] memory actions) {
+        require(strategies.length == callCosts.length, "LENGTH");
+        actions = new uint8[](strategies.length);
+        for (uint256 i = 0; i < strategies.length; i++) {
+            actions[i] = _action(strategies[i], callCosts[i]);
+        }
+    }
+
+    //Harvest or tend every strategy whose trigger is true at callCost
+    function work(address[] calldata strategies, uint256[] calldata callCosts)
+        external
+        onlyKeepers
+        returns (uint8[] memory actions, bool[] memory success)
+    {
+        require(strategies.length == callCosts.length, "LENGTH");
+        actions = new uint8[](strategies.length);
+        success = new bool[](strategies.length);
+        for (uint256 i = 0; i < strategies.length; i++) {
+            actions[i] = _action(strategies[i], callCosts[i]);
+            if (actions[i] != NONE) {
+                success[i] = _run(strategies[i], actions[i]);
+            }
+        }
+    }
+
+    //Run actions the keeper already decided on off chain, skipping the triggers
+    function execute(address[] calldata strategies, uint8[] calldata actions) external onlyKeepers returns (bool[] memory success) {
+        require(strategies.length == actions.length, "LENGTH");
+        success = new bool[](strategies.length);
+        for (uint256 i = 0; i < strategies.length; i++) {
+            if (actions[i] != NONE) {
+                success[i] = _run(strategies[i], actions[i]);
+            }
+        }
+    }
+
+    function _action(address strategy, uint256 callCost) internal view returns (uint8) {
+        try IKeep3rStrategy(strategy).harvestTrigger(callCost) returns (bool harvest) {
+            if (harvest) {
+                return HARVEST;
+            }
+        } catch {
+            return NONE;
+        }
+        try IKeep3rStrategy(strategy).tendTrigger(callCost) returns (bool tend) {
+            return tend ? TEND : NONE;
+        } catch {
+            return NONE;
+        }
+    }
+
+    function _run(address strategy, uint8 action) internal returns (bool) {
+        if (gasleft() < minGasPerStrategy) {
+            emit Worked(strategy, action, false, "OUT_OF_GAS");
+            return false;
+        }
+
+        if (action == HARVEST) {
+            try IKeep3rStrategy(strategy).harvest() {} catch (bytes memory reason) {
+                emit Worked(strategy, action, false, reason);
+                return false;
+            }
+        } else if (action == TEND) {
+            try IKeep3rStrategy(strategy).tend() {} catch (bytes memory reason) {
+                emit Worked(strategy, action, false, reason);
+                return false;
+            }
+        } else {
+            emit Worked(strategy, action, false, "UNKNOWN_ACTION");
+            return false;
+        }
+
+        emit Worked(strategy, action, true, "");
+        return true;
+    }
+
+    modifier onlyGovernance() {
+        require(msg.sender == governance, "!governance");
+        _;
+    }
+
+    modifier onlyKeepers() {
+        require(keepers[msg.sender] || msg.sender == governance, "!keeper");
+        _;
+    }
+}
@@ -0,0 +1,104 @@
+// SPDX-License-Identifier: GPL-3.0
+pragma solidity ^0.6.12;
+pragma experimental ABIEncoderV2;
+
+import "@openzeppelin/contracts/math/SafeMath.sol";
+import "@openzeppelin/contracts/math/Math.sol";
+
+import "./Libraries/RoutePlanner.sol";
+
+interface IUnwindable {
+    function routeMarket(bool deficit, bool useBackup) external view returns (RoutePlanner.Market memory);
+
+    function collateralTarget() external view returns (uint256);
+}
+
+/********************
+ *
+ *   Tells how many transactions it takes to free an amount from a strategy, and what each one frees.
+ *   Every transaction is the _withdrawSome a harvest makes (no Aave backup) for what is still missing: the same route plan, capped by DyDx
+ *   liquidity and the deleverage pair limit, then a redeem that keeps the rest at the collateral target.
+ *   Interest accrued between transactions is ignored.
+ *
+ ********************* */
+
+contract DeleveragePlanner {
+    using SafeMath for uint256;
+
+    //Strategy._calculateDesiredPosition stops this far below the wire
+    uint256 private constant SAFETY_MARGIN = 1e5;
+
+    struct Transaction {
+        uint256 repaid; //borrow paid back by the flash loans and plain pairs
+        uint256 freed; //want redeemed to the strategy
+        uint256 deposits; //position after the transaction
+        uint256 borrows;
+    }
+
+    //amount 0 means everything. Stops early when the position is unwound or a transaction would change nothing
+    function plan(
+        address strategy,
+        uint256 amount,
+        uint256 maxTransactions
+    ) external view returns (Transaction[] memory transactions) {
+        RoutePlanner.Market memory market = IUnwindable(strategy).routeMarket(true, false);
+        uint256 target = IUnwindable(strategy).collateralTarget();
+        if (amount == 0) {
+            amount = market.lent.sub(market.borrowed);
+        }
+
+        Transaction[] memory taken = new Transaction[](maxTransactions);
+        uint256 count;
+        uint256 freed;
+        while (count < maxTransactions && freed < amount) {
+            Transaction memory t = _withdrawSome(market, amount - freed, target);
+            if (t.repaid == 0 && t.freed == 0) {
+                break;
+            }
+            freed = freed.add(t.freed);
+            taken[count++] = t;
+        }
+
+        transactions = new Transaction[](count);
+        for (uint256 i = 0; i < count; i++) {
+            transactions[i] = taken[i];
+        }
+    }
+
+    //Strategy._withdrawSome(wanted, false) on the position in market
+    function _withdrawSome(
+        RoutePlanner.Market memory market,
+        uint256 wanted,
+        uint256 target
+    ) internal pure returns (Transaction memory t) {
+        uint256 unwound = market.lent.sub(market.borrowed);
+        uint256 desired = unwound.sub(Math.min(wanted, unwound)).mul(target).div(uint256(1e18).sub(target));
+        if (desired > SAFETY_MARGIN) {
+            desired = desired - SAFETY_MARGIN;
+        }
+
+        if (desired < market.borrowed) {
+            RoutePlanner.Step[] memory steps = RoutePlanner.plan(market.borrowed - desired, true, market);
+            for (uint256 i = 0; i < steps.length; i++) {
+                uint256 redeemed = steps[i].amount.add(steps[i].fee);
+                market.lent = market.lent > redeemed ? market.lent - redeemed : 0;
+                market.borrowed = market.borrowed.sub(steps[i].amount);
+                t.repaid = t.repaid.add(steps[i].amount);
+            }
+        }
+
+        uint256 needed = target > 0 ? market.borrowed.mul(1e18).div(target) : 0;
+        uint256 redeemable = market.lent > needed ? market.lent - needed : 0;
+        t.freed = Math.min(redeemable, wanted);
+
+        //compound refuses (with an error code, not a revert) a redeem that would leave the borrow undercollateralised
+        uint256 backing = market.collateralFactor > 0 ? market.borrowed.mul(1e18).div(market.collateralFactor) : 0;
+        if (market.borrowed > 0 && market.lent < backing.add(t.freed)) {
+            t.freed = 0;
+        }
+        market.lent = market.lent - t.freed;
+
+        t.deposits = market.lent;
+        t.borrows = market.borrowed;
+    }
+}
@@ -136,5 +136,7 @@ interface CTokenI {
 
     function totalBorrows() external view returns (uint256);
 
+    function borrowIndex() external view returns (uint256);
+
     function totalSupply() external view returns (uint256);
 }
@@ -142,4 +142,14 @@ interface ComptrollerI {
         );
 
     function compSpeeds(address ctoken) external view returns (uint256);
+
+    function compAccrued(address holder) external view returns (uint256);
+
+    function compSupplyState(address ctoken) external view returns (uint224, uint32);
+
+    function compBorrowState(address ctoken) external view returns (uint224, uint32);
+
+    function compSupplierIndex(address ctoken, address supplier) external view returns (uint256);
+
+    function compBorrowerIndex(address ctoken, address borrower) external view returns (uint256);
 }
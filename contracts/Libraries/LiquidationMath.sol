@@ -0,0 +1,78 @@
+// SPDX-License-Identifier: GPL-3.0
+pragma solidity ^0.6.12;
+
+import "@openzeppelin/contracts/math/SafeMath.sol";
+import "@openzeppelin/contracts/math/Math.sol";
+
+/********************
+ *
+ *   Blocks until a compound position can be liquidated, with interest compounding every block.
+ *   Rates are per block and scaled by 1e18, like cToken.borrowRatePerBlock().
+ *
+ ********************* */
+
+library LiquidationMath {
+    using SafeMath for uint256;
+
+    uint256 internal constant RAY = 1e27;
+
+    //the search covers 2**HORIZON_BITS - 1 blocks (~2000 years). anything further is reported as never
+    uint256 internal constant HORIZON_BITS = 32;
+
+    //borrows / collateral can grow by at most this much before we stop telling the difference. keeps every product in 256 bits
+    uint256 internal constant MAX_THRESHOLD = 2**128;
+
+    //Smallest n where borrows*(1+borrowRate)^n >= collateralisedDeposit*(1+supplyRate)^n.
+    //Both sides compound each block, so only their ratio r = (1+borrowRate)/(1+supplyRate) matters and we want r^n >= collateralisedDeposit/borrows.
+    //Found by binary lifting over r^(2^i), which are built by repeated squaring: 2*HORIZON_BITS fixed point multiplications whatever the answer.
+    function blocksUntilLiquidation(
+        uint256 collateralisedDeposit,
+        uint256 borrows,
+        uint256 supplyRate,
+        uint256 borrowRate
+    ) internal pure returns (uint256) {
+        if (borrows == 0) {
+            return uint256(-1);
+        }
+        if (collateralisedDeposit <= borrows) {
+            return 0;
+        }
+
+        uint256 ratio = RAY.add(borrowRate.mul(1e9)).mul(RAY).div(RAY.add(supplyRate.mul(1e9)));
+        if (ratio <= RAY) {
+            return uint256(-1);
+        }
+
+        //capping is conservative: a position further than this from liquidation is reported as closer than it is
+        uint256 threshold = collateralisedDeposit.mul(RAY).div(borrows);
+        if (threshold > MAX_THRESHOLD) {
+            threshold = MAX_THRESHOLD;
+        }
+
+        //powers[i] = ratio^(2^i), capped at the threshold so growth * powers[i] below stays under 2**256.
+        //a capped power still takes growth (>= RAY) to the threshold, so the answer is the same
+        uint256[HORIZON_BITS] memory powers;
+        powers[0] = Math.min(ratio, threshold);
+        for (uint256 i = 1; i < HORIZON_BITS; i++) {
+            uint256 previous = powers[i - 1];
+            powers[i] = previous >= threshold ? threshold : Math.min(previous.mul(previous).div(RAY), threshold);
+        }
+
+        //largest number of blocks that still leaves us short of the threshold
+        uint256 growth = RAY;
+        uint256 blocks = 0;
+        for (uint256 i = HORIZON_BITS; i > 0; i--) {
+            uint256 next = growth.mul(powers[i - 1]).div(RAY);
+            if (next < threshold) {
+                growth = next;
+                //uint256 on the left: in 0.6 a bare 1 shifted by a variable is a uint8 and wraps past 2**7
+                blocks = blocks + (uint256(1) << (i - 1));
+            }
+        }
+
+        if (blocks == (uint256(1) << HORIZON_BITS) - 1) {
+            return uint256(-1);
+        }
+        return blocks + 1;
+    }
+}
@@ -0,0 +1,186 @@
+// SPDX-License-Identifier: GPL-3.0
+pragma solidity ^0.6.12;
+pragma experimental ABIEncoderV2;
+
+import "@openzeppelin/contracts/math/SafeMath.sol";
+import "@openzeppelin/contracts/math/Math.sol";
+
+/********************
+ *
+ *   Chooses how to move a leveraged compound position by a given amount: plain borrow/mint (or redeem/repay)
+ *   pairs, a DyDx flash loan, an Aave flash loan, or a mix. The plan that leaves the least undone wins, then the
+ *   cheapest in fees plus gas. Pure, so the strategy can show a plan from a view and follow the same plan.
+ *
+ ********************* */
+
+library RoutePlanner {
+    using SafeMath for uint256;
+
+    uint8 internal constant PLAIN = 0;
+    uint8 internal constant DYDX = 1;
+    uint8 internal constant AAVE = 2;
+    //a single plain pair, used in front of a flash loan that cannot cover everything
+    uint8 private constant PLAIN_ONCE = 3;
+    uint8 private constant END = 255;
+
+    //rough mainnet gas of each route, enough to rank them
+    uint256 internal constant PLAIN_BASE_GAS = 60000;
+    uint256 internal constant PLAIN_PAIR_GAS = 280000;
+    uint256 internal constant DYDX_GAS = 560000;
+    uint256 internal constant AAVE_GAS = 700000;
+
+    //dydx wants 2 wei back on top of the loan, aave v1 charges 0.09%
+    uint256 internal constant DYDX_FEE = 2;
+    uint256 internal constant AAVE_FEE_BPS = 9;
+
+    struct Market {
+        uint256 lent; //includes want we hold, every route mints it first when leveraging
+        uint256 borrowed;
+        uint256 collateralFactor;
+        uint256 maxPairs;
+        uint256 soloLiquidity; //0 when DyDx is off
+        uint256 aaveLiquidity; //0 when Aave is off or not allowed
+        uint256 wantPerMillionGas;
+    }
+
+    struct Step {
+        uint8 route;
+        uint256 amount;
+        uint256 pairs; //plain steps only
+        uint256 gas;
+        uint256 fee;
+        uint256 cost; //fee plus gas priced in want
+        uint256 residual; //what is left of the position change after this step
+    }
+
+    function plan(
+        uint256 position,
+        bool deficit,
+        Market memory market
+    ) internal pure returns (Step[] memory best) {
+        uint8[3][5] memory orders = [
+            [PLAIN, END, END],
+            [DYDX, PLAIN, END],
+            [PLAIN_ONCE, DYDX, END],
+            [AAVE, PLAIN, END],
+            [DYDX, AAVE, PLAIN]
+        ];
+
+        uint256 bestResidual = uint256(-1);
+        uint256 bestCost = uint256(-1);
+        for (uint256 i = 0; i < orders.length; i++) {
+            (Step[] memory steps, uint256 residual, uint256 cost) = _simulate(position, deficit, market, orders[i]);
+            if (residual < bestResidual || (residual == bestResidual && cost < bestCost)) {
+                best = steps;
+                bestResidual = residual;
+                bestCost = cost;
+            }
+        }
+    }
+
+    function _simulate(
+        uint256 position,
+        bool deficit,
+        Market memory market,
+        uint8[3] memory order
+    ) private pure returns (Step[] memory steps, uint256 residual, uint256 cost) {
+        //steps move lent and borrowed in this copy, never in the caller's
+        Market memory state = Market(
+            market.lent,
+            market.borrowed,
+            market.collateralFactor,
+            market.maxPairs,
+            market.soloLiquidity,
+            market.aaveLiquidity,
+            market.wantPerMillionGas
+        );
+
+        Step[] memory taken = new Step[](3);
+        uint256 count;
+        residual = position;
+        for (uint256 i = 0; i < 3 && order[i] != END && residual > 0; i++) {
+            Step memory step = _step(order[i], residual, deficit, state);
+            if (step.amount == 0) {
+                continue;
+            }
+            residual = residual.sub(step.amount);
+            step.residual = residual;
+            cost = cost.add(step.cost);
+            taken[count++] = step;
+        }
+
+        steps = new Step[](count);
+        for (uint256 i = 0; i < count; i++) {
+            steps[i] = taken[i];
+        }
+    }
+
+    function _step(
+        uint8 route,
+        uint256 wanted,
+        bool deficit,
+        Market memory state
+    ) private pure returns (Step memory step) {
+        if (route == DYDX || route == AAVE) {
+            step.route = route;
+            step.amount = Math.min(wanted, route == DYDX ? state.soloLiquidity : state.aaveLiquidity);
+            if (step.amount == 0) {
+                return step;
+            }
+            step.gas = route == DYDX ? DYDX_GAS : AAVE_GAS;
+            step.fee = route == DYDX ? DYDX_FEE : step.amount.mul(AAVE_FEE_BPS).div(10000);
+
+            if (deficit) {
+                //repay the loan, then redeem it plus the fee
+                uint256 redeemed = step.amount.add(step.fee);
+                state.lent = state.lent > redeemed ? state.lent - redeemed : 0;
+                state.borrowed = state.borrowed.sub(step.amount);
+            } else {
+                //mint the loan, then borrow it back plus the fee
+                state.lent = state.lent.add(step.amount);
+                state.borrowed = state.borrowed.add(step.amount).add(step.fee);
+            }
+        } else {
+            step.route = PLAIN;
+            (step.amount, step.pairs) = _plain(wanted, deficit, state, route == PLAIN ? state.maxPairs : 1);
+            if (step.amount == 0) {
+                return step;
+            }
+            step.gas = PLAIN_BASE_GAS.add(PLAIN_PAIR_GAS.mul(step.pairs));
+        }
+        step.cost = step.fee.add(step.gas.mul(state.wantPerMillionGas).div(1e6));
+    }
+
+    //Strategy._noFlashLoan in memory: each pair moves as much as the collateral factor allows
+    function _plain(
+        uint256 wanted,
+        bool deficit,
+        Market memory state,
+        uint256 maxPairs
+    ) private pure returns (uint256 amount, uint256 pairs) {
+        while (pairs < maxPairs && amount < wanted) {
+            uint256 room;
+            if (deficit) {
+                uint256 needed = state.collateralFactor == 0 ? 0 : state.borrowed.mul(1e18).div(state.collateralFactor);
+                room = state.lent > needed ? Math.min(state.lent - needed, state.borrowed) : 0;
+            } else {
+                uint256 limit = state.lent.mul(state.collateralFactor).div(1e18);
+                room = limit > state.borrowed ? limit - state.borrowed : 0;
+            }
+            room = Math.min(room, wanted - amount);
+            if (room == 0) {
+                break;
+            }
+
+            if (deficit) {
+                state.lent = state.lent.sub(room);
+                state.borrowed = state.borrowed.sub(room);
+            } else {
+                state.lent = state.lent.add(room);
+                state.borrowed = state.borrowed.add(room);
+            }
+            amount = amount.add(room);
+            pairs++;
+        }
+    }
+}
@@ -0,0 +1,42 @@
+// SPDX-License-Identifier: GPL-3.0
+pragma solidity ^0.6.12;
+
+import "@openzeppelin/contracts/math/SafeMath.sol";
+
+import "../Libraries/LiquidationMath.sol";
+
+/********************
+ *
+ *   Exposes LiquidationMath next to the linear estimate getblocksUntilLiquidation used before it,
+ *   so scripts/liquidation_model.py can compare both for gas and accuracy.
+ *
+ ********************* */
+
+contract LiquidationMathHarness {
+    using SafeMath for uint256;
+
+    function blocksUntilLiquidation(
+        uint256 collateralisedDeposit,
+        uint256 borrows,
+        uint256 supplyRate,
+        uint256 borrowRate
+    ) external pure returns (uint256) {
+        return LiquidationMath.blocksUntilLiquidation(collateralisedDeposit, borrows, supplyRate, borrowRate);
+    }
+
+    //((deposits*colateralThreshold - borrows) / (borrows*borrowrate - deposits*colateralThreshold*interestrate));
+    function linearBlocksUntilLiquidation(
+        uint256 collateralisedDeposit,
+        uint256 borrows,
+        uint256 supplyRate,
+        uint256 borrowRate
+    ) external pure returns (uint256) {
+        uint256 denom1 = borrows.mul(borrowRate);
+        uint256 denom2 = collateralisedDeposit.mul(supplyRate);
+
+        if (denom2 >= denom1) {
+            return uint256(-1);
+        }
+        return collateralisedDeposit.sub(borrows).mul(1e18).div(denom1 - denom2);
+    }
+}
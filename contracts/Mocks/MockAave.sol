@@ -0,0 +1,57 @@
+// SPDX-License-Identifier: GPL-3.0
+pragma solidity ^0.6.12;
+
+import "@openzeppelin/contracts/math/SafeMath.sol";
+import "@openzeppelin/contracts/token/ERC20/IERC20.sol";
+
+import "../Interfaces/Aave/IFlashLoanReceiver.sol";
+
+/********************
+ *
+ *   Aave v1 flash loans for a local chain.
+ *   The lending pool also plays the part of LendingPoolCore: it holds the
+ *   liquidity and expects the loan plus a 0.09% fee back before returning.
+ *
+ ********************* */
+
+contract MockAaveAddressesProvider {
+    address public getLendingPool;
+    address payable public getLendingPoolCore;
+
+    function setLendingPool(address _lendingPool, address payable _lendingPoolCore) external {
+        getLendingPool = _lendingPool;
+        getLendingPoolCore = _lendingPoolCore;
+    }
+}
+
+contract MockAaveLendingPool {
+    using SafeMath for uint256;
+
+    event FlashLoan(address indexed _target, address indexed _reserve, uint256 _amount, uint256 _totalFee);
+
+    uint256 public constant FLASHLOAN_FEE_TOTAL = 9; // in basis points
+
+    function flashLoan(
+        address _receiver,
+        address _reserve,
+        uint256 _amount,
+        bytes calldata _params
+    ) external {
+        uint256 availableLiquidityBefore = IERC20(_reserve).balanceOf(address(this));
+        require(availableLiquidityBefore >= _amount, "There is not enough liquidity available to borrow");
+
+        uint256 amountFee = _amount.mul(FLASHLOAN_FEE_TOTAL).div(10000);
+        require(amountFee > 0, "The requested amount is too small for a flashLoan.");
+
+        require(IERC20(_reserve).transfer(_receiver, _amount), "transfer failed");
+        IFlashLoanReceiver(_receiver).executeOperation(_reserve, _amount, amountFee, _params);
+
+        uint256 availableLiquidityAfter = IERC20(_reserve).balanceOf(address(this));
+        require(
+            availableLiquidityAfter == availableLiquidityBefore.add(amountFee),
+            "The actual balance of the protocol is inconsistent"
+        );
+
+        emit FlashLoan(_receiver, _reserve, _amount, amountFee);
+    }
+}
@@ -0,0 +1,334 @@
+// SPDX-License-Identifier: GPL-3.0
+pragma solidity ^0.6.12;
+
+import "@openzeppelin/contracts/math/SafeMath.sol";
+import "@openzeppelin/contracts/token/ERC20/IERC20.sol";
+
+import "../Interfaces/Compound/InterestRateModel.sol";
+import "./MockComptroller.sol";
+
+/********************
+ *
+ *   CErc20 lookalike with Compound's interest accrual and exchange rate maths.
+ *   Failures return Compound error codes instead of reverting, like the real thing.
+ *   Code is copied to the mainnet cToken addresses so state is set with initialize.
+ *
+ ********************* */
+
+contract MockCToken {
+    using SafeMath for uint256;
+
+    event AccrueInterest(uint256 cashPrior, uint256 interestAccumulated, uint256 borrowIndex, uint256 totalBorrows);
+    event Mint(address minter, uint256 mintAmount, uint256 mintTokens);
+    event Redeem(address redeemer, uint256 redeemAmount, uint256 redeemTokens);
+    event Borrow(address borrower, uint256 borrowAmount, uint256 accountBorrows, uint256 totalBorrows);
+    event RepayBorrow(address payer, address borrower, uint256 repayAmount, uint256 accountBorrows, uint256 totalBorrows);
+    event Transfer(address indexed from, address indexed to, uint256 amount);
+    event Approval(address indexed owner, address indexed spender, uint256 amount);
+
+    struct BorrowSnapshot {
+        uint256 principal;
+        uint256 interestIndex;
+    }
+
+    uint256 internal constant EXP = 1e18;
+    uint256 internal constant TOKEN_INSUFFICIENT_CASH = 14;
+    uint256 internal constant BALANCE_CALCULATION_FAILED = 9;
+
+    string public name;
+    string public symbol;
+    uint8 public constant decimals = 8;
+
+    address public underlying;
+    MockComptroller public comptroller;
+    InterestRateModel public interestRateModel;
+
+    uint256 public initialExchangeRateMantissa;
+    uint256 public reserveFactorMantissa;
+    uint256 public accrualBlockNumber;
+    uint256 public borrowIndex;
+    uint256 public totalBorrows;
+    uint256 public totalReserves;
+    uint256 public totalSupply;
+
+    mapping(address => uint256) public balanceOf;
+    mapping(address => mapping(address => uint256)) public allowance;
+    mapping(address => BorrowSnapshot) internal accountBorrows;
+
+    function initialize(
+        address _underlying,
+        address _comptroller,
+        address _interestRateModel,
+        uint256 _initialExchangeRateMantissa,
+        uint256 _reserveFactorMantissa,
+        string calldata _name,
+        string calldata _symbol
+    ) external {
+        require(borrowIndex == 0, "initialized");
+        underlying = _underlying;
+        comptroller = MockComptroller(_comptroller);
+        interestRateModel = InterestRateModel(_interestRateModel);
+        initialExchangeRateMantissa = _initialExchangeRateMantissa;
+        reserveFactorMantissa = _reserveFactorMantissa;
+        name = _name;
+        symbol = _symbol;
+
+        borrowIndex = EXP;
+        accrualBlockNumber = block.number;
+    }
+
+    function setInterestRateModel(address _interestRateModel) external {
+        accrueInterest();
+        interestRateModel = InterestRateModel(_interestRateModel);
+    }
+
+    function setReserveFactor(uint256 _reserveFactorMantissa) external {
+        accrueInterest();
+        reserveFactorMantissa = _reserveFactorMantissa;
+    }
+
+    /*
+     * Views
+     */
+    function getCash() public view returns (uint256) {
+        return IERC20(underlying).balanceOf(address(this));
+    }
+
+    function exchangeRateStored() public view returns (uint256) {
+        if (totalSupply == 0) {
+            return initialExchangeRateMantissa;
+        }
+        return getCash().add(totalBorrows).sub(totalReserves).mul(EXP).div(totalSupply);
+    }
+
+    function borrowBalanceStored(address account) public view returns (uint256) {
+        BorrowSnapshot memory snapshot = accountBorrows[account];
+        if (snapshot.principal == 0) {
+            return 0;
+        }
+        return snapshot.principal.mul(borrowIndex).div(snapshot.interestIndex);
+    }
+
+    function getAccountSnapshot(address account)
+        external
+        view
+        returns (
+            uint256,
+            uint256,
+            uint256,
+            uint256
+        )
+    {
+        return (0, balanceOf[account], borrowBalanceStored(account), exchangeRateStored());
+    }
+
+    function borrowRatePerBlock() public view returns (uint256) {
+        (, uint256 rate) = interestRateModel.getBorrowRate(getCash(), totalBorrows, totalReserves);
+        return rate;
+    }
+
+    function supplyRatePerBlock() external view returns (uint256) {
+        return interestRateModel.getSupplyRate(getCash(), totalBorrows, totalReserves, reserveFactorMantissa);
+    }
+
+    /*
+     * Interest accruing views
+     */
+    function accrueInterest() public returns (uint256) {
+        uint256 blockDelta = block.number.sub(accrualBlockNumber);
+        if (blockDelta == 0) {
+            return 0;
+        }
+
+        uint256 cashPrior = getCash();
+        uint256 simpleInterestFactor = borrowRatePerBlock().mul(blockDelta);
+        uint256 interestAccumulated = simpleInterestFactor.mul(totalBorrows).div(EXP);
+
+        totalBorrows = totalBorrows.add(interestAccumulated);
+        totalReserves = reserveFactorMantissa.mul(interestAccumulated).div(EXP).add(totalReserves);
+        borrowIndex = simpleInterestFactor.mul(borrowIndex).div(EXP).add(borrowIndex);
+        accrualBlockNumber = block.number;
+
+        emit AccrueInterest(cashPrior, interestAccumulated, borrowIndex, totalBorrows);
+        return 0;
+    }
+
+    function exchangeRateCurrent() external returns (uint256) {
+        accrueInterest();
+        return exchangeRateStored();
+    }
+
+    function balanceOfUnderlying(address owner) external returns (uint256) {
+        accrueInterest();
+        return exchangeRateStored().mul(balanceOf[owner]).div(EXP);
+    }
+
+    function borrowBalanceCurrent(address account) external returns (uint256) {
+        accrueInterest();
+        return borrowBalanceStored(account);
+    }
+
+    function totalBorrowsCurrent() external returns (uint256) {
+        accrueInterest();
+        return totalBorrows;
+    }
+
+    /*
+     * Market actions
+     */
+    function mint(uint256 mintAmount) external returns (uint256) {
+        accrueInterest();
+        uint256 allowed = comptroller.mintAllowed(address(this), msg.sender, mintAmount);
+        if (allowed != 0) {
+            return allowed;
+        }
+
+        uint256 exchangeRate = exchangeRateStored();
+        require(IERC20(underlying).transferFrom(msg.sender, address(this), mintAmount), "TOKEN_TRANSFER_IN_FAILED");
+
+        uint256 mintTokens = mintAmount.mul(EXP).div(exchangeRate);
+        totalSupply = totalSupply.add(mintTokens);
+        balanceOf[msg.sender] = balanceOf[msg.sender].add(mintTokens);
+
+        emit Mint(msg.sender, mintAmount, mintTokens);
+        emit Transfer(address(this), msg.sender, mintTokens);
+        return 0;
+    }
+
+    function redeem(uint256 redeemTokens) external returns (uint256) {
+        accrueInterest();
+        return _redeemFresh(msg.sender, redeemTokens, exchangeRateStored().mul(redeemTokens).div(EXP));
+    }
+
+    function redeemUnderlying(uint256 redeemAmount) external returns (uint256) {
+        accrueInterest();
+        return _redeemFresh(msg.sender, redeemAmount.mul(EXP).div(exchangeRateStored()), redeemAmount);
+    }
+
+    function borrow(uint256 borrowAmount) external returns (uint256) {
+        accrueInterest();
+        uint256 allowed = comptroller.borrowAllowed(address(this), msg.sender, borrowAmount);
+        if (allowed != 0) {
+            return allowed;
+        }
+        if (getCash() < borrowAmount) {
+            return TOKEN_INSUFFICIENT_CASH;
+        }
+
+        uint256 accountBorrowsNew = borrowBalanceStored(msg.sender).add(borrowAmount);
+        accountBorrows[msg.sender] = BorrowSnapshot({principal: accountBorrowsNew, interestIndex: borrowIndex});
+        totalBorrows = totalBorrows.add(borrowAmount);
+
+        require(IERC20(underlying).transfer(msg.sender, borrowAmount), "TOKEN_TRANSFER_OUT_FAILED");
+
+        emit Borrow(msg.sender, borrowAmount, accountBorrowsNew, totalBorrows);
+        return 0;
+    }
+
+    function repayBorrow(uint256 repayAmount) external returns (uint256) {
+        accrueInterest();
+        return _repayBorrowFresh(msg.sender, msg.sender, repayAmount);
+    }
+
+    function repayBorrowBehalf(address borrower, uint256 repayAmount) external returns (uint256) {
+        accrueInterest();
+        return _repayBorrowFresh(msg.sender, borrower, repayAmount);
+    }
+
+    /*
+     * cToken transfers
+     */
+    function approve(address spender, uint256 amount) external returns (bool) {
+        allowance[msg.sender][spender] = amount;
+        emit Approval(msg.sender, spender, amount);
+        return true;
+    }
+
+    function transfer(address dst, uint256 amount) external returns (bool) {
+        return _transferTokens(msg.sender, msg.sender, dst, amount);
+    }
+
+    function transferFrom(
+        address src,
+        address dst,
+        uint256 amount
+    ) external returns (bool) {
+        return _transferTokens(msg.sender, src, dst, amount);
+    }
+
+    /*
+     * Internal
+     */
+    function _redeemFresh(
+        address redeemer,
+        uint256 redeemTokens,
+        uint256 redeemAmount
+    ) internal returns (uint256) {
+        uint256 allowed = comptroller.redeemAllowed(address(this), redeemer, redeemTokens);
+        if (allowed != 0) {
+            return allowed;
+        }
+        if (redeemTokens > balanceOf[redeemer]) {
+            return BALANCE_CALCULATION_FAILED;
+        }
+        if (getCash() < redeemAmount) {
+            return TOKEN_INSUFFICIENT_CASH;
+        }
+
+        totalSupply = totalSupply.sub(redeemTokens);
+        balanceOf[redeemer] = balanceOf[redeemer].sub(redeemTokens);
+
+        require(IERC20(underlying).transfer(redeemer, redeemAmount), "TOKEN_TRANSFER_OUT_FAILED");
+
+        emit Transfer(redeemer, address(this), redeemTokens);
+        emit Redeem(redeemer, redeemAmount, redeemTokens);
+        return 0;
+    }
+
+    function _repayBorrowFresh(
+        address payer,
+        address borrower,
+        uint256 repayAmount
+    ) internal returns (uint256) {
+        uint256 allowed = comptroller.repayBorrowAllowed(address(this), payer, borrower, repayAmount);
+        if (allowed != 0) {
+            return allowed;
+        }
+
+        uint256 accountBorrowsPrev = borrowBalanceStored(borrower);
+        if (repayAmount == uint256(-1)) {
+            repayAmount = accountBorrowsPrev;
+        }
+
+        require(IERC20(underlying).transferFrom(payer, address(this), repayAmount), "TOKEN_TRANSFER_IN_FAILED");
+
+        uint256 accountBorrowsNew = accountBorrowsPrev.sub(repayAmount, "REPAY_BORROW_NEW_ACCOUNT_BORROW_BALANCE_CALCULATION_FAILED");
+        accountBorrows[borrower] = BorrowSnapshot({principal: accountBorrowsNew, interestIndex: borrowIndex});
+        totalBorrows = totalBorrows.sub(repayAmount, "REPAY_BORROW_NEW_TOTAL_BALANCE_CALCULATION_FAILED");
+
+        emit RepayBorrow(payer, borrower, repayAmount, accountBorrowsNew, totalBorrows);
+        return 0;
+    }
+
+    function _transferTokens(
+        address spender,
+        address src,
+        address dst,
+        uint256 tokens
+    ) internal returns (bool) {
+        if (comptroller.transferAllowed(address(this), src, dst, tokens) != 0) {
+            return false;
+        }
+        if (spender != src) {
+            uint256 allowed = allowance[src][spender];
+            if (allowed != uint256(-1)) {
+                allowance[src][spender] = allowed.sub(tokens, "transfer exceeds allowance");
+            }
+        }
+        balanceOf[src] = balanceOf[src].sub(tokens, "transfer exceeds balance");
+        balanceOf[dst] = balanceOf[dst].add(tokens);
+
+        emit Transfer(src, dst, tokens);
+        return true;
+    }
+}
@@ -0,0 +1,313 @@
+// SPDX-License-Identifier: GPL-3.0
+pragma solidity ^0.6.12;
+
+import "@openzeppelin/contracts/math/SafeMath.sol";
+import "@openzeppelin/contracts/token/ERC20/IERC20.sol";
+
+interface IMockCToken {
+    function totalSupply() external view returns (uint256);
+
+    function totalBorrows() external view returns (uint256);
+
+    function borrowIndex() external view returns (uint256);
+
+    function balanceOf(address owner) external view returns (uint256);
+
+    function borrowBalanceStored(address account) external view returns (uint256);
+
+    function getAccountSnapshot(address account)
+        external
+        view
+        returns (
+            uint256,
+            uint256,
+            uint256,
+            uint256
+        );
+}
+
+/********************
+ *
+ *   Comptroller with Compound's COMP distribution indices.
+ *   Liquidity is checked per market (collateral and debt in the same cToken),
+ *   which is all a single market strategy needs and avoids a price oracle.
+ *
+ ********************* */
+
+contract MockComptroller {
+    using SafeMath for uint256;
+
+    struct Market {
+        bool isListed;
+        uint256 collateralFactorMantissa;
+        bool isComped;
+    }
+
+    struct CompMarketState {
+        uint224 index;
+        uint32 block;
+    }
+
+    uint224 public constant compInitialIndex = 1e36;
+    uint256 internal constant DOUBLE = 1e36;
+    uint256 internal constant EXP = 1e18;
+    uint256 internal constant INSUFFICIENT_LIQUIDITY = 4;
+    uint256 internal constant MARKET_NOT_LISTED = 9;
+
+    address public comp;
+    address[] internal allMarkets;
+
+    mapping(address => Market) public markets;
+    mapping(address => uint256) public compSpeeds;
+    mapping(address => CompMarketState) public compSupplyState;
+    mapping(address => CompMarketState) public compBorrowState;
+    mapping(address => mapping(address => uint256)) public compSupplierIndex;
+    mapping(address => mapping(address => uint256)) public compBorrowerIndex;
+    mapping(address => uint256) public compAccrued;
+
+    function initialize(address _comp) external {
+        require(comp == address(0), "initialized");
+        comp = _comp;
+    }
+
+    function getCompAddress() external view returns (address) {
+        return comp;
+    }
+
+    function getAllMarkets() external view returns (address[] memory) {
+        return allMarkets;
+    }
+
+    /*
+     * Admin
+     */
+    function _supportMarket(address cToken, uint256 collateralFactorMantissa) external {
+        require(!markets[cToken].isListed, "listed");
+        markets[cToken] = Market({isListed: true, collateralFactorMantissa: collateralFactorMantissa, isComped: true});
+        allMarkets.push(cToken);
+
+        uint32 blockNumber = _safe32(block.number);
+        compSupplyState[cToken] = CompMarketState({index: compInitialIndex, block: blockNumber});
+        compBorrowState[cToken] = CompMarketState({index: compInitialIndex, block: blockNumber});
+    }
+
+    function _setCollateralFactor(address cToken, uint256 collateralFactorMantissa) external {
+        require(markets[cToken].isListed, "!listed");
+        markets[cToken].collateralFactorMantissa = collateralFactorMantissa;
+    }
+
+    function _setCompSpeed(address cToken, uint256 compSpeed) external {
+        require(markets[cToken].isListed, "!listed");
+        _updateCompSupplyIndex(cToken);
+        _updateCompBorrowIndex(cToken, IMockCToken(cToken).borrowIndex());
+        compSpeeds[cToken] = compSpeed;
+    }
+
+    /*
+     * Markets
+     */
+    function enterMarkets(address[] calldata cTokens) external pure returns (uint256[] memory results) {
+        results = new uint256[](cTokens.length);
+    }
+
+    function exitMarket(address) external pure returns (uint256) {
+        return 0;
+    }
+
+    /*
+     * Policy hooks, called by MockCToken after interest has accrued
+     */
+    function mintAllowed(
+        address cToken,
+        address minter,
+        uint256
+    ) external returns (uint256) {
+        if (!markets[cToken].isListed) return MARKET_NOT_LISTED;
+
+        _updateCompSupplyIndex(cToken);
+        _distributeSupplierComp(cToken, minter);
+        return 0;
+    }
+
+    function redeemAllowed(
+        address cToken,
+        address redeemer,
+        uint256 redeemTokens
+    ) public returns (uint256) {
+        if (!markets[cToken].isListed) return MARKET_NOT_LISTED;
+        if (_shortfall(cToken, redeemer, redeemTokens, 0)) return INSUFFICIENT_LIQUIDITY;
+
+        _updateCompSupplyIndex(cToken);
+        _distributeSupplierComp(cToken, redeemer);
+        return 0;
+    }
+
+    function borrowAllowed(
+        address cToken,
+        address borrower,
+        uint256 borrowAmount
+    ) external returns (uint256) {
+        if (!markets[cToken].isListed) return MARKET_NOT_LISTED;
+        if (_shortfall(cToken, borrower, 0, borrowAmount)) return INSUFFICIENT_LIQUIDITY;
+
+        uint256 borrowIndex = IMockCToken(cToken).borrowIndex();
+        _updateCompBorrowIndex(cToken, borrowIndex);
+        _distributeBorrowerComp(cToken, borrower, borrowIndex);
+        return 0;
+    }
+
+    function repayBorrowAllowed(
+        address cToken,
+        address,
+        address borrower,
+        uint256
+    ) external returns (uint256) {
+        if (!markets[cToken].isListed) return MARKET_NOT_LISTED;
+
+        uint256 borrowIndex = IMockCToken(cToken).borrowIndex();
+        _updateCompBorrowIndex(cToken, borrowIndex);
+        _distributeBorrowerComp(cToken, borrower, borrowIndex);
+        return 0;
+    }
+
+    function transferAllowed(
+        address cToken,
+        address src,
+        address dst,
+        uint256 transferTokens
+    ) external returns (uint256) {
+        uint256 allowed = redeemAllowed(cToken, src, transferTokens);
+        if (allowed != 0) return allowed;
+
+        _distributeSupplierComp(cToken, dst);
+        return 0;
+    }
+
+    /*
+     * COMP distribution
+     */
+    function claimComp(address holder) external {
+        _claimComp(holder, allMarkets);
+    }
+
+    function claimComp(address holder, address[] memory cTokens) public {
+        _claimComp(holder, cTokens);
+    }
+
+    function _claimComp(address holder, address[] memory cTokens) internal {
+        for (uint256 i = 0; i < cTokens.length; i++) {
+            address cToken = cTokens[i];
+            require(markets[cToken].isListed, "market must be listed");
+
+            uint256 borrowIndex = IMockCToken(cToken).borrowIndex();
+            _updateCompBorrowIndex(cToken, borrowIndex);
+            _distributeBorrowerComp(cToken, holder, borrowIndex);
+
+            _updateCompSupplyIndex(cToken);
+            _distributeSupplierComp(cToken, holder);
+        }
+        compAccrued[holder] = _grantComp(holder, compAccrued[holder]);
+    }
+
+    function _updateCompSupplyIndex(address cToken) internal {
+        CompMarketState storage supplyState = compSupplyState[cToken];
+        uint256 speed = compSpeeds[cToken];
+        uint256 deltaBlocks = block.number.sub(uint256(supplyState.block));
+        if (deltaBlocks > 0 && speed > 0) {
+            uint256 supplyTokens = IMockCToken(cToken).totalSupply();
+            uint256 accrued = deltaBlocks.mul(speed);
+            uint256 ratio = supplyTokens > 0 ? accrued.mul(DOUBLE).div(supplyTokens) : 0;
+            supplyState.index = _safe224(uint256(supplyState.index).add(ratio));
+            supplyState.block = _safe32(block.number);
+        } else if (deltaBlocks > 0) {
+            supplyState.block = _safe32(block.number);
+        }
+    }
+
+    function _updateCompBorrowIndex(address cToken, uint256 marketBorrowIndex) internal {
+        CompMarketState storage borrowState = compBorrowState[cToken];
+        uint256 speed = compSpeeds[cToken];
+        uint256 deltaBlocks = block.number.sub(uint256(borrowState.block));
+        if (deltaBlocks > 0 && speed > 0) {
+            uint256 borrowAmount = IMockCToken(cToken).totalBorrows().mul(EXP).div(marketBorrowIndex);
+            uint256 accrued = deltaBlocks.mul(speed);
+            uint256 ratio = borrowAmount > 0 ? accrued.mul(DOUBLE).div(borrowAmount) : 0;
+            borrowState.index = _safe224(uint256(borrowState.index).add(ratio));
+            borrowState.block = _safe32(block.number);
+        } else if (deltaBlocks > 0) {
+            borrowState.block = _safe32(block.number);
+        }
+    }
+
+    function _distributeSupplierComp(address cToken, address supplier) internal {
+        uint256 supplyIndex = compSupplyState[cToken].index;
+        uint256 supplierIndex = compSupplierIndex[cToken][supplier];
+        compSupplierIndex[cToken][supplier] = supplyIndex;
+
+        if (supplierIndex == 0 && supplyIndex > 0) {
+            supplierIndex = compInitialIndex;
+        }
+
+        uint256 deltaIndex = supplyIndex.sub(supplierIndex);
+        uint256 supplierDelta = IMockCToken(cToken).balanceOf(supplier).mul(deltaIndex).div(DOUBLE);
+        compAccrued[supplier] = compAccrued[supplier].add(supplierDelta);
+    }
+
+    function _distributeBorrowerComp(
+        address cToken,
+        address borrower,
+        uint256 marketBorrowIndex
+    ) internal {
+        uint256 borrowIndex = compBorrowState[cToken].index;
+        uint256 borrowerIndex = compBorrowerIndex[cToken][borrower];
+        compBorrowerIndex[cToken][borrower] = borrowIndex;
+
+        if (borrowerIndex > 0) {
+            uint256 deltaIndex = borrowIndex.sub(borrowerIndex);
+            uint256 borrowerAmount = IMockCToken(cToken).borrowBalanceStored(borrower).mul(EXP).div(marketBorrowIndex);
+            uint256 borrowerDelta = borrowerAmount.mul(deltaIndex).div(DOUBLE);
+            compAccrued[borrower] = compAccrued[borrower].add(borrowerDelta);
+        }
+    }
+
+    function _grantComp(address user, uint256 amount) internal returns (uint256) {
+        IERC20 _comp = IERC20(comp);
+        if (amount > 0 && amount <= _comp.balanceOf(address(this))) {
+            _comp.transfer(user, amount);
+            return 0;
+        }
+        return amount;
+    }
+
+    /*
+     * Liquidity
+     */
+    //true if the account would hold more debt than its collateral allows after the change
+    function _shortfall(
+        address cToken,
+        address account,
+        uint256 redeemTokens,
+        uint256 borrowAmount
+    ) internal view returns (bool) {
+        (, uint256 cTokenBalance, uint256 borrowBalance, uint256 exchangeRate) = IMockCToken(cToken).getAccountSnapshot(account);
+        uint256 borrowsAfter = borrowBalance.add(borrowAmount);
+        if (borrowsAfter == 0) {
+            return false;
+        }
+        if (redeemTokens > cTokenBalance) {
+            return true;
+        }
+        uint256 collateral = cTokenBalance.sub(redeemTokens).mul(exchangeRate).div(EXP);
+        return collateral.mul(markets[cToken].collateralFactorMantissa).div(EXP) < borrowsAfter;
+    }
+
+    function _safe224(uint256 n) internal pure returns (uint224) {
+        require(n < 2**224, "index exceeds 224 bits");
+        return uint224(n);
+    }
+
+    function _safe32(uint256 n) internal pure returns (uint32) {
+        require(n < 2**32, "block number exceeds 32 bits");
+        return uint32(n);
+    }
+}
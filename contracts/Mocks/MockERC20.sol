@@ -0,0 +1,84 @@
+// SPDX-License-Identifier: GPL-3.0
+pragma solidity ^0.6.12;
+
+import "@openzeppelin/contracts/math/SafeMath.sol";
+
+/********************
+ *
+ *   Mintable ERC20 used to stand in for DAI, USDC, WETH and COMP on a local chain.
+ *   Code is copied to the mainnet addresses so nothing relies on the constructor:
+ *   metadata is set with initialize.
+ *
+ ********************* */
+
+contract MockERC20 {
+    using SafeMath for uint256;
+
+    event Transfer(address indexed from, address indexed to, uint256 value);
+    event Approval(address indexed owner, address indexed spender, uint256 value);
+
+    string public name;
+    string public symbol;
+    uint8 public decimals;
+    uint256 public totalSupply;
+
+    mapping(address => uint256) public balanceOf;
+    mapping(address => mapping(address => uint256)) public allowance;
+
+    function initialize(
+        string calldata _name,
+        string calldata _symbol,
+        uint8 _decimals
+    ) external {
+        require(decimals == 0, "initialized");
+        name = _name;
+        symbol = _symbol;
+        decimals = _decimals;
+    }
+
+    function mint(address to, uint256 amount) external {
+        totalSupply = totalSupply.add(amount);
+        balanceOf[to] = balanceOf[to].add(amount);
+        emit Transfer(address(0), to, amount);
+    }
+
+    function burn(address from, uint256 amount) external {
+        balanceOf[from] = balanceOf[from].sub(amount, "burn exceeds balance");
+        totalSupply = totalSupply.sub(amount);
+        emit Transfer(from, address(0), amount);
+    }
+
+    function approve(address spender, uint256 amount) external returns (bool) {
+        allowance[msg.sender][spender] = amount;
+        emit Approval(msg.sender, spender, amount);
+        return true;
+    }
+
+    function transfer(address to, uint256 amount) external returns (bool) {
+        _transfer(msg.sender, to, amount);
+        return true;
+    }
+
+    function transferFrom(
+        address from,
+        address to,
+        uint256 amount
+    ) external returns (bool) {
+        uint256 allowed = allowance[from][msg.sender];
+        if (allowed != uint256(-1)) {
+            allowance[from][msg.sender] = allowed.sub(amount, "transfer exceeds allowance");
+        }
+        _transfer(from, to, amount);
+        return true;
+    }
+
+    function _transfer(
+        address from,
+        address to,
+        uint256 amount
+    ) internal {
+        balanceOf[from] = balanceOf[from].sub(amount, "transfer exceeds balance");
+        balanceOf[to] = balanceOf[to].add(amount);
+        emit Transfer(from, to, amount);
+    }
+}
@@ -0,0 +1,87 @@
+// SPDX-License-Identifier: GPL-3.0
+pragma solidity ^0.6.12;
+
+import "@openzeppelin/contracts/math/SafeMath.sol";
+
+import "../Interfaces/Compound/InterestRateModel.sol";
+
+/********************
+ *
+ *   Compound style jump rate model with settable parameters.
+ *   All rates are per block and scaled by 1e18.
+ *
+ ********************* */
+
+contract MockInterestRateModel is InterestRateModel {
+    using SafeMath for uint256;
+
+    uint256 public baseRatePerBlock;
+    uint256 public multiplierPerBlock;
+    uint256 public jumpMultiplierPerBlock;
+    uint256 public kink;
+
+    constructor(
+        uint256 _baseRatePerBlock,
+        uint256 _multiplierPerBlock,
+        uint256 _jumpMultiplierPerBlock,
+        uint256 _kink
+    ) public {
+        setParams(_baseRatePerBlock, _multiplierPerBlock, _jumpMultiplierPerBlock, _kink);
+    }
+
+    function setParams(
+        uint256 _baseRatePerBlock,
+        uint256 _multiplierPerBlock,
+        uint256 _jumpMultiplierPerBlock,
+        uint256 _kink
+    ) public {
+        baseRatePerBlock = _baseRatePerBlock;
+        multiplierPerBlock = _multiplierPerBlock;
+        jumpMultiplierPerBlock = _jumpMultiplierPerBlock;
+        kink = _kink;
+    }
+
+    function utilizationRate(
+        uint256 cash,
+        uint256 borrows,
+        uint256 reserves
+    ) public pure returns (uint256) {
+        if (borrows == 0) {
+            return 0;
+        }
+        return borrows.mul(1e18).div(cash.add(borrows).sub(reserves));
+    }
+
+    function getBorrowRate(
+        uint256 cash,
+        uint256 borrows,
+        uint256 reserves
+    ) external override view returns (uint256, uint256) {
+        return (0, _borrowRate(cash, borrows, reserves));
+    }
+
+    function getSupplyRate(
+        uint256 cash,
+        uint256 borrows,
+        uint256 reserves,
+        uint256 reserveFactorMantissa
+    ) external override view returns (uint256) {
+        uint256 rateToPool = _borrowRate(cash, borrows, reserves).mul(uint256(1e18).sub(reserveFactorMantissa)).div(1e18);
+        return utilizationRate(cash, borrows, reserves).mul(rateToPool).div(1e18);
+    }
+
+    function _borrowRate(
+        uint256 cash,
+        uint256 borrows,
+        uint256 reserves
+    ) internal view returns (uint256) {
+        uint256 util = utilizationRate(cash, borrows, reserves);
+
+        if (util <= kink) {
+            return util.mul(multiplierPerBlock).div(1e18).add(baseRatePerBlock);
+        }
+        uint256 normalRate = kink.mul(multiplierPerBlock).div(1e18).add(baseRatePerBlock);
+        uint256 excessUtil = util.sub(kink);
+        return excessUtil.mul(jumpMultiplierPerBlock).div(1e18).add(normalRate);
+    }
+}
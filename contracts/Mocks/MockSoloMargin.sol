@@ -0,0 +1,63 @@
+// SPDX-License-Identifier: GPL-3.0
+pragma solidity ^0.6.12;
+pragma experimental ABIEncoderV2;
+
+import "@openzeppelin/contracts/math/SafeMath.sol";
+import "@openzeppelin/contracts/token/ERC20/IERC20.sol";
+
+import "../Interfaces/DyDx/ISoloMargin.sol";
+import "../Interfaces/DyDx/ICallee.sol";
+
+/********************
+ *
+ *   Just enough of dYdX Solo for the withdraw / call / deposit flash loan.
+ *   Markets are a list of token addresses and operate() refuses to finish
+ *   unless Solo ends up holding at least what it started with.
+ *
+ ********************* */
+
+contract MockSoloMargin {
+    using SafeMath for uint256;
+
+    address[] internal marketTokens;
+
+    function addMarket(address token) external returns (uint256 marketId) {
+        marketId = marketTokens.length;
+        marketTokens.push(token);
+    }
+
+    function getNumMarkets() external view returns (uint256) {
+        return marketTokens.length;
+    }
+
+    function getMarketTokenAddress(uint256 marketId) external view returns (address) {
+        require(marketId < marketTokens.length, "market does not exist");
+        return marketTokens[marketId];
+    }
+
+    function operate(Account.Info[] memory accounts, Actions.ActionArgs[] memory actions) public {
+        uint256[] memory balancesBefore = new uint256[](marketTokens.length);
+        for (uint256 i = 0; i < marketTokens.length; i++) {
+            balancesBefore[i] = IERC20(marketTokens[i]).balanceOf(address(this));
+        }
+
+        for (uint256 i = 0; i < actions.length; i++) {
+            Actions.ActionArgs memory action = actions[i];
+            address token = marketTokens[action.primaryMarketId];
+
+            if (action.actionType == Actions.ActionType.Withdraw) {
+                require(IERC20(token).transfer(action.otherAddress, action.amount.value), "withdraw failed");
+            } else if (action.actionType == Actions.ActionType.Deposit) {
+                require(IERC20(token).transferFrom(action.otherAddress, address(this), action.amount.value), "deposit failed");
+            } else if (action.actionType == Actions.ActionType.Call) {
+                ICallee(action.otherAddress).callFunction(msg.sender, accounts[action.accountId], action.data);
+            } else {
+                revert("action not supported");
+            }
+        }
+
+        for (uint256 i = 0; i < marketTokens.length; i++) {
+            require(IERC20(marketTokens[i]).balanceOf(address(this)) >= balancesBefore[i], "Solo: not repaid");
+        }
+    }
+}
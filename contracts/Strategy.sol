@@ -14,11 +14,15 @@ import "@openzeppelin/contracts/token/ERC20/IERC20.sol";
 import "@openzeppelin/contracts/math/SafeMath.sol";
 import "@openzeppelin/contracts/math/Math.sol";
 import "@openzeppelin/contracts/utils/Address.sol";
+import "@openzeppelin/contracts/utils/SafeCast.sol";
 import "@openzeppelin/contracts/token/ERC20/SafeERC20.sol";
 
 import "./Interfaces/Compound/CErc20I.sol";
 import "./Interfaces/Compound/ComptrollerI.sol";
 
+import "./Libraries/LiquidationMath.sol";
+import "./Libraries/RoutePlanner.sol";
+
 interface IUni{
     function getAmountsOut(
         uint256 amountIn, 
@@ -32,6 +36,16 @@ interface IUni{
         address to,
         uint256 deadline
     ) external returns (uint256[] memory amounts);
+
+    function factory() external view returns (address);
+}
+
+interface IUniFactory {
+    function getPair(address tokenA, address tokenB) external view returns (address pair);
+}
+
+interface IUniPair {
+    function getReserves() external view returns (uint112 reserve0, uint112 reserve1, uint32 blockTimestampLast);
 }
 
 /********************
@@ -66,18 +80,64 @@ contract Strategy is BaseStrategy, DydxFlashloanBase, ICallee {
     address public constant uniswapRouter = address(0x7a250d5630B4cF539739dF2C5dAcb4c659F2488D);
     address public constant weth = address(0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2);
 
-    //Operating variables
-    uint256 public collateralTarget = 0.73 ether; // 73%
-    uint256 public blocksToLiquidationDangerZone = 46500; // 7 days =  60*60*24*7/13
-
-    uint256 public minWant = 0; //Only lend if we have enough want to be worth it. Can be set to non-zero
-    uint256 public minCompToSell = 0.1 ether; //used both as the threshold to sell but also as a trigger for harvest
+    //Operating variables, packed so harvest and the triggers read them from one slot. Read through the getters below
+    struct Config {
+        uint64 collateralTarget;
+        uint32 blocksToLiquidationDangerZone;
+        uint8 dyDxMarketId;
+        //To deactivate flash loan provider if needed
+        bool dyDxActive;
+        bool aaveActive;
+        //set only while we wait for aave to call executeOperation
+        bool awaitingFlash;
+        uint128 minCompToSell; //used both as the threshold to sell but also as a trigger for harvest
+        //second slot
+        uint128 minWant; //Only lend if we have enough want to be worth it. Can be set to non-zero
+        //a comp sale moves each pool on its path by at most this, in basis points. what is left is sold in later harvests
+        uint16 maxCompImpactBps;
+        //what a million gas costs in want. the route planner weighs gas against flash loan fees with it, fees alone while 0
+        uint96 wantPerMillionGas;
+    }
 
-    //To deactivate flash loan provider if needed
-    bool public DyDxActive = true;
-    bool public AaveActive = false;
+    Config internal config =
+        Config({
+            collateralTarget: 0.73 ether, // 73%
+            blocksToLiquidationDangerZone: 46500, // 7 days =  60*60*24*7/13
+            dyDxMarketId: 0,
+            dyDxActive: true,
+            aaveActive: false,
+            awaitingFlash: false,
+            minCompToSell: 0.1 ether,
+            minWant: 0,
+            maxCompImpactBps: 100,
+            wantPerMillionGas: 0
+        });
+
+    //gas price the constructor quotes wantPerMillionGas at, until a keeper or management sets it
+    uint256 private constant DEFAULT_GAS_PRICE = 50 gwei;
+
+    //comptroller.compInitialIndex, what a supplier index starts from
+    uint256 private constant COMP_INITIAL_INDEX = 1e36;
+
+    //everything harvestTrigger and tendTrigger decide on, gathered with one read of each input
+    struct TriggerState {
+        bool harvest;
+        bool tend;
+        uint256 deposits;
+        uint256 borrows;
+        uint256 claimableComp;
+        uint256 compBalance;
+        uint256 estimatedTotalAssets;
+        uint256 wantGasCost;
+        uint256 compGasCost;
+        uint256 debtOutstanding;
+        uint256 creditAvailable;
+        uint256 blocksUntilLiquidation;
+    }
 
-    uint256 public dyDxMarketId;
+    //most borrow/mint pairs in one harvest when not flash loaning, and redeem/repay pairs in one withdrawal
+    uint256 private constant MAX_LEVERAGE_STEPS = 10;
+    uint256 private constant MAX_DELEVERAGE_STEPS = 5;
 
     constructor(address _vault, address _cToken) public BaseStrategy(_vault) {
         cToken = CErc20I(address(_cToken));
@@ -92,6 +152,7 @@ contract Strategy is BaseStrategy, DydxFlashloanBase, ICallee {
         profitFactor = 100; // multiple before triggering harvest
 
         _setMarketIdFromTokenAddress();
+        _initWantPerMillionGas();
 
         addressesProvider = ILendingPoolAddressesProvider(AAVE_LENDING);
 
@@ -103,23 +164,90 @@ contract Strategy is BaseStrategy, DydxFlashloanBase, ICallee {
         return "StrategyGenericLevCompFarm";
     }
 
+    function collateralTarget() public view returns (uint256) {
+        return config.collateralTarget;
+    }
+
+    function blocksToLiquidationDangerZone() public view returns (uint256) {
+        return config.blocksToLiquidationDangerZone;
+    }
+
+    function minWant() public view returns (uint256) {
+        return config.minWant;
+    }
+
+    function minCompToSell() public view returns (uint256) {
+        return config.minCompToSell;
+    }
+
+    function maxCompImpactBps() public view returns (uint256) {
+        return config.maxCompImpactBps;
+    }
+
+    function DyDxActive() public view returns (bool) {
+        return config.dyDxActive;
+    }
+
+    function AaveActive() public view returns (bool) {
+        return config.aaveActive;
+    }
+
+    function dyDxMarketId() public view returns (uint256) {
+        return config.dyDxMarketId;
+    }
+
+    function wantPerMillionGas() public view returns (uint256) {
+        return config.wantPerMillionGas;
+    }
+
     /*
      * Control Functions
      */
     function setDyDx(bool _dydx) external management {
-        DyDxActive = _dydx;
+        config.dyDxActive = _dydx;
     }
 
     function setAave(bool _ave) external management {
-        AaveActive = _ave;
+        config.aaveActive = _ave;
     }
 
     function setMinCompToSell(uint256 _minCompToSell) external management {
-        minCompToSell = _minCompToSell;
+        config.minCompToSell = SafeCast.toUint128(_minCompToSell);
     }
 
     function setMinWant(uint256 _minWant) external management {
-        minWant = _minWant;
+        config.minWant = SafeCast.toUint128(_minWant);
+    }
+
+    //10000 sells everything in one swap with no minimum output, like before
+    function setMaxCompImpactBps(uint256 _maxCompImpactBps) external management {
+        require(_maxCompImpactBps > 0 && _maxCompImpactBps <= 10000, "!bps");
+        config.maxCompImpactBps = uint16(_maxCompImpactBps);
+    }
+
+    //the price of gas the route planner uses, in want per million gas. keepers refresh it off chain (scripts/keeper.py)
+    //so harvests and withdrawals neither pay for a uniswap quote nor depend on tx.gasprice
+    //never zero: priced at zero the planner ranks on fees alone and takes ten plain pairs over one flash loan
+    function setWantPerMillionGas(uint256 _wantPerMillionGas) external onlyKeepers {
+        require(_wantPerMillionGas > 0 && _wantPerMillionGas <= uint96(-1), "!wantPerMillionGas");
+        config.wantPerMillionGas = uint96(_wantPerMillionGas);
+    }
+
+    //a million gas at DEFAULT_GAS_PRICE, one for one when want is weth. without a weth/want pool to quote
+    //it stays unset until setWantPerMillionGas, so deployment never depends on uniswap liquidity
+    function _initWantPerMillionGas() internal {
+        uint256 gasInWeth = DEFAULT_GAS_PRICE.mul(1e6);
+        if (address(want) == weth) {
+            config.wantPerMillionGas = uint96(gasInWeth);
+            return;
+        }
+
+        address[] memory path = new address[](2);
+        path[0] = weth;
+        path[1] = address(want);
+        try IUni(uniswapRouter).getAmountsOut(gasInWeth, path) returns (uint256[] memory amounts) {
+            config.wantPerMillionGas = uint96(Math.min(amounts[1], uint96(-1)));
+        } catch {}
     }
 
     function updateMarketId() external management {
@@ -129,7 +257,7 @@ contract Strategy is BaseStrategy, DydxFlashloanBase, ICallee {
     function setCollateralTarget(uint256 _collateralTarget) external management {
         (, uint256 collateralFactorMantissa, ) = compound.markets(address(cToken));
         require(collateralFactorMantissa > _collateralTarget, "!dangerous collateral");
-        collateralTarget = _collateralTarget;
+        config.collateralTarget = SafeCast.toUint64(_collateralTarget);
     }
 
     /*
@@ -140,13 +268,17 @@ contract Strategy is BaseStrategy, DydxFlashloanBase, ICallee {
      * that this strategy is currently managing, denominated in terms of want tokens.
      */
     function estimatedTotalAssets() public override view returns (uint256) {
-        (uint256 deposits, uint256 borrows) = getCurrentPosition();
+        (uint256 deposits, uint256 borrows, uint256 ctokenBalance) = _accountSnapshot();
 
-        uint256 _claimableComp = predictCompAccrued();
+        uint256 _claimableComp = _predictCompAccrued(ctokenBalance, borrows);
         uint256 currentComp = IERC20(comp).balanceOf(address(this));
 
+        return _estimatedTotalAssets(deposits, borrows, _claimableComp.add(currentComp));
+    }
+
+    function _estimatedTotalAssets(uint256 deposits, uint256 borrows, uint256 compHeld) internal view returns (uint256) {
         // Use touch price. it doesnt matter if we are wrong as this is not used for decision making
-        uint256 estimatedWant =  priceCheck(comp, address(want),_claimableComp.add(currentComp));
+        uint256 estimatedWant =  priceCheck(comp, address(want), compHeld);
         uint256 conservativeWant = estimatedWant.mul(9).div(10); //10% pessimist
 
         return want.balanceOf(address(this)).add(deposits).add(conservativeWant).sub(borrows);
@@ -172,14 +304,7 @@ contract Strategy is BaseStrategy, DydxFlashloanBase, ICallee {
      * tendTrigger should be called with same gasCost as harvestTrigger
      */
     function tendTrigger(uint256 gasCost) public override view returns (bool) {
-        if (harvestTrigger(gasCost)) {
-            //harvest takes priority
-            return false;
-        }
-
-        if (getblocksUntilLiquidation() <= blocksToLiquidationDangerZone) {
-            return true;
-        }
+        return triggerState(gasCost).tend;
     }
 
     /*
@@ -190,43 +315,62 @@ contract Strategy is BaseStrategy, DydxFlashloanBase, ICallee {
      * NOTE: this call and `tendTrigger` should never return `true` at the same time.
      */
     function harvestTrigger(uint256 gasCost) public override view returns (bool) {
-        
+        return triggerState(gasCost).harvest;
+    }
+
+    /*
+     * Both trigger decisions and the inputs behind them in one call.
+     * The position, COMP accrual, prices and vault params are each read once,
+     * so keepers can poll this instead of harvestTrigger and tendTrigger.
+     */
+    function triggerState(uint256 gasCost) public view returns (TriggerState memory state) {
         StrategyParams memory params = vault.strategies(address(this));
 
+        uint256 ctokenBalance;
+        (state.deposits, state.borrows, ctokenBalance) = _accountSnapshot();
+        state.blocksUntilLiquidation = _blocksUntilLiquidation(state.deposits, state.borrows);
+
         // Should not trigger if strategy is not activated
-        if (params.activation == 0) return false;
+        if (params.activation != 0) {
+            state.wantGasCost = priceCheck(weth, address(want), gasCost);
+            state.compGasCost = priceCheck(weth, comp, gasCost);
 
+            state.claimableComp = _predictCompAccrued(ctokenBalance, state.borrows);
+            state.compBalance = IERC20(comp).balanceOf(address(this));
+            state.estimatedTotalAssets = _estimatedTotalAssets(state.deposits, state.borrows, state.claimableComp.add(state.compBalance));
 
-        uint256 wantGasCost = priceCheck(weth, address(want), gasCost);
-        uint256 compGasCost = priceCheck(weth, comp, gasCost);
+            state.debtOutstanding = vault.debtOutstanding();
+            state.creditAvailable = vault.creditAvailable();
 
-        // after enough comp has accrued we want the bot to run
-        uint256 _claimableComp = predictCompAccrued();
+            state.harvest = _harvestDecision(state, params);
+        }
 
-        if (_claimableComp > minCompToSell) {
+        //harvest takes priority
+        state.tend = !state.harvest && state.blocksUntilLiquidation <= config.blocksToLiquidationDangerZone;
+    }
+
+    function _harvestDecision(TriggerState memory state, StrategyParams memory params) internal view returns (bool) {
+        // after enough comp has accrued we want the bot to run
+        if (state.claimableComp > config.minCompToSell) {
             // check value of COMP in wei
-            if ( _claimableComp.add(IERC20(comp).balanceOf(address(this))) > compGasCost.mul(profitFactor)) {
+            if (state.claimableComp.add(state.compBalance) > state.compGasCost.mul(profitFactor)) {
                 return true;
             }
         }
 
-
         // Should trigger if hadn't been called in a while
         if (block.timestamp.sub(params.lastReport) >= maxReportDelay) return true;
 
         //check if vault wants lots of money back
         // dont return dust
-        uint256 outstanding = vault.debtOutstanding();
-        if (outstanding > profitFactor.mul(wantGasCost)) return true;
+        if (state.debtOutstanding > profitFactor.mul(state.wantGasCost)) return true;
 
         // Check for profits and losses
-        uint256 total = estimatedTotalAssets();
-
         uint256 profit = 0;
-        if (total > params.totalDebt) profit = total.sub(params.totalDebt); // We've earned a profit!
+        if (state.estimatedTotalAssets > params.totalDebt) profit = state.estimatedTotalAssets.sub(params.totalDebt); // We've earned a profit!
 
-        uint256 credit = vault.creditAvailable().add(profit);
-        return (profitFactor.mul(wantGasCost) < credit);
+        uint256 credit = state.creditAvailable.add(profit);
+        return (profitFactor.mul(state.wantGasCost) < credit);
     }
 
     //WARNING. manipulatable and simple routing. Only use for safe functions
@@ -256,77 +400,91 @@ contract Strategy is BaseStrategy, DydxFlashloanBase, ICallee {
      ******************/
 
     //Calculate how many blocks until we are in liquidation based on current interest rates
-    //WARNING does not include compounding so the estimate becomes more innacurate the further ahead we look
-    //equation. Compound doesn't include compounding for most blocks
-    //((deposits*colateralThreshold - borrows) / (borrows*borrowrate - deposits*colateralThreshold*interestrate));
+    //deposits and borrows both compound every block, see LiquidationMath
+    //returns uint256(-1) if we never get there at current rates
     function getblocksUntilLiquidation() public view returns (uint256) {
-        (, uint256 collateralFactorMantissa, ) = compound.markets(address(cToken));
-
         (uint256 deposits, uint256 borrows) = getCurrentPosition();
+        return _blocksUntilLiquidation(deposits, borrows);
+    }
+
+    function _blocksUntilLiquidation(uint256 deposits, uint256 borrows) internal view returns (uint256) {
+        (, uint256 collateralFactorMantissa, ) = compound.markets(address(cToken));
 
         uint256 borrrowRate = cToken.borrowRatePerBlock();
 
         uint256 supplyRate = cToken.supplyRatePerBlock();
 
-        uint256 collateralisedDeposit1 = deposits.mul(collateralFactorMantissa).div(1e18);
-        uint256 collateralisedDeposit = collateralisedDeposit1;
-
-        uint256 denom1 = borrows.mul(borrrowRate);
-        uint256 denom2 = collateralisedDeposit.mul(supplyRate);
+        uint256 collateralisedDeposit = deposits.mul(collateralFactorMantissa).div(1e18);
 
-        if (denom2 >= denom1) {
-            return uint256(-1);
-        } else {
-            uint256 numer = collateralisedDeposit.sub(borrows);
-            uint256 denom = denom1 - denom2;
-            //minus 1 for this block
-            return numer.mul(1e18).div(denom);
-        }
+        return LiquidationMath.blocksUntilLiquidation(collateralisedDeposit, borrows, supplyRate, borrrowRate);
     }
 
-    // This function makes a prediction on how much comp is accrued
-    // It is not 100% accurate as it uses current balances in Compound to predict into the past
+    // COMP we would get from claiming our market at this block: what the comptroller already holds for us
+    // plus what claimComp would distribute. Moves the comp indices forward to this block the way the comptroller
+    // does on claim (and Compound's lens does off chain), so it is exact without changing state
     function predictCompAccrued() public view returns (uint256) {
-        (uint256 deposits, uint256 borrows) = getCurrentPosition();
-        if (deposits == 0) {
-            return 0; // should be impossible to have 0 balance and positive comp accrued
-        }
+        (, uint256 borrows, uint256 ctokenBalance) = _accountSnapshot();
+        return _predictCompAccrued(ctokenBalance, borrows);
+    }
 
-        //comp speed is amount to borrow or deposit (so half the total distribution for want)
-        uint256 distributionPerBlock = compound.compSpeeds(address(cToken));
+    function _predictCompAccrued(uint256 ctokenBalance, uint256 borrows) internal view returns (uint256) {
+        uint256 speed = compound.compSpeeds(address(cToken));
 
-        uint256 totalBorrow = cToken.totalBorrows();
+        return compound.compAccrued(address(this)).add(_supplierComp(ctokenBalance, speed)).add(_borrowerComp(borrows, speed));
+    }
 
-        //total supply needs to be echanged to underlying using exchange rate
-        uint256 totalSupplyCtoken = cToken.totalSupply();
-        uint256 totalSupply = totalSupplyCtoken.mul(cToken.exchangeRateStored()).div(1e18);
+    //comptroller.distributeSupplierComp after updateCompSupplyIndex
+    function _supplierComp(uint256 ctokenBalance, uint256 speed) internal view returns (uint256) {
+        (uint224 index, uint32 lastBlock) = compound.compSupplyState(address(cToken));
+        uint256 supplyIndex = _compIndexNow(index, lastBlock, speed, cToken.totalSupply());
 
-        uint256 blockShareSupply = 0;
-        if(totalSupply > 0){
-            blockShareSupply = deposits.mul(distributionPerBlock).div(totalSupply);
+        uint256 supplierIndex = compound.compSupplierIndex(address(cToken), address(this));
+        if (supplierIndex == 0 && supplyIndex > 0) {
+            supplierIndex = COMP_INITIAL_INDEX;
         }
-        
-        uint256 blockShareBorrow = 0;
-        if(totalBorrow > 0){
-            blockShareBorrow = borrows.mul(distributionPerBlock).div(totalBorrow);
+
+        return ctokenBalance.mul(supplyIndex.sub(supplierIndex)).div(1e36);
+    }
+
+    //comptroller.distributeBorrowerComp after updateCompBorrowIndex. borrows are measured in units of the market borrow index
+    function _borrowerComp(uint256 borrows, uint256 speed) internal view returns (uint256) {
+        uint256 borrowerIndex = compound.compBorrowerIndex(address(cToken), address(this));
+        if (borrowerIndex == 0) {
+            return 0;
         }
-        
-        //how much we expect to earn per block
-        uint256 blockShare = blockShareSupply.add(blockShareBorrow);
 
-        //last time we ran harvest
-        uint256 lastReport = vault.strategies(address(this)).lastReport;
-        uint256 blocksSinceLast= (block.timestamp.sub(lastReport)).div(13); //roughly 13 seconds per block
+        uint256 marketBorrowIndex = cToken.borrowIndex();
+        (uint224 index, uint32 lastBlock) = compound.compBorrowState(address(cToken));
+        uint256 borrowIndex = _compIndexNow(index, lastBlock, speed, cToken.totalBorrows().mul(1e18).div(marketBorrowIndex));
 
-        return blocksSinceLast.mul(blockShare);
+        return borrows.mul(1e18).div(marketBorrowIndex).mul(borrowIndex.sub(borrowerIndex)).div(1e36);
+    }
+
+    //a comp market index moved forward from lastBlock to this block
+    function _compIndexNow(
+        uint224 index,
+        uint32 lastBlock,
+        uint256 speed,
+        uint256 marketSize
+    ) internal view returns (uint256) {
+        uint256 deltaBlocks = block.number.sub(lastBlock);
+        if (deltaBlocks == 0 || speed == 0 || marketSize == 0) {
+            return index;
+        }
+        return uint256(index).add(deltaBlocks.mul(speed).mul(1e36).div(marketSize));
     }
 
     //Returns the current position
     //WARNING - this returns just the balance at last time someone touched the cToken token. Does not accrue interst in between
     //cToken is very active so not normally an issue.
     function getCurrentPosition() public view returns (uint256 deposits, uint256 borrows) {
-        (, uint256 ctokenBalance, uint256 borrowBalance, uint256 exchangeRate) = cToken.getAccountSnapshot(address(this));
-        borrows = borrowBalance;
+        (deposits, borrows, ) = _accountSnapshot();
+    }
+
+    //getCurrentPosition plus the cToken balance behind the deposits
+    function _accountSnapshot() internal view returns (uint256 deposits, uint256 borrows, uint256 ctokenBalance) {
+        uint256 exchangeRate;
+        (, ctokenBalance, borrows, exchangeRate) = cToken.getAccountSnapshot(address(this));
 
         deposits = ctokenBalance.mul(exchangeRate).div(1e18);
     }
@@ -436,29 +594,10 @@ contract Strategy is BaseStrategy, DydxFlashloanBase, ICallee {
         
         //if we are below minimun want change it is not worth doing
         //need to be careful in case this pushes to liquidation
-        if (position > minWant) {
-            //if dydx is not active we just try our best with basic leverage
-            if (!DyDxActive) {
-                uint i = 0;
-                while(position > 0){
-                    position = position.sub(_noFlashLoan(position, deficit));
-                    if(i >= 6){
-                        break;
-                    }
-                    i++;
-                }
-            } else {
-                //if there is huge position to improve we want to do normal leverage. it is quicker
-                if (position > want.balanceOf(SOLO)) {
-                    position = position.sub(_noFlashLoan(position, deficit));
-                }
-
-                //flash loan to position
-                if(position > 0){
-                    doDyDxFlashLoan(deficit, position);
-                }
-
-            }
+        if (position > config.minWant) {
+            //plain leverage, a dydx flash loan or both, whichever gets closest to the target for the least gas
+            RoutePlanner.Market memory market = _routeMarket(deficit, false);
+            _executePlan(RoutePlanner.plan(position, deficit, market), position, deficit, market);
         }
     }
 
@@ -475,30 +614,9 @@ contract Strategy is BaseStrategy, DydxFlashloanBase, ICallee {
 
         //If there is no deficit we dont need to adjust position
         if (deficit) {
-            //we do a flash loan to give us a big gap. from here on out it is cheaper to use normal deleverage. Use Aave for extremely large loans
-            if (DyDxActive) {
-                position = position.sub(doDyDxFlashLoan(deficit, position));
-            }
-
-            // Will decrease number of interactions using aave as backup
-            // because of fee we only use in emergency
-            if (position > 0 && AaveActive && _useBackup) {
-                position = position.sub(doAaveFlashLoan(deficit, position));
-            }
-
-            uint8 i = 0;
-            //position will equal 0 unless we haven't been able to deleverage enough with flash loan
-            //if we are not in deficit we dont need to do flash loan
-            while (position > 0) {
-                position = position.sub(_noFlashLoan(position, true));
-                i++;
-
-                //A limit set so we don't run out of gas
-                if (i >= 5) {
-                    notAll = true;
-                    break;
-                }
-            }
+            //the planner picks between plain deleverage and flash loans. aave charges a fee so it is only offered as a backup
+            RoutePlanner.Market memory market = _routeMarket(true, _useBackup);
+            notAll = _executePlan(RoutePlanner.plan(position, true, market), position, true, market) < position;
         }
 
         //now withdraw
@@ -508,8 +626,9 @@ contract Strategy is BaseStrategy, DydxFlashloanBase, ICallee {
         (uint256 depositBalance, uint256 borrowBalance) = getCurrentPosition();
 
         uint256 AmountNeeded = 0;
-        if(collateralTarget > 0){
-            AmountNeeded = borrowBalance.mul(1e18).div(collateralTarget);
+        uint256 target = config.collateralTarget;
+        if(target > 0){
+            AmountNeeded = borrowBalance.mul(1e18).div(target);
         }
         uint256 redeemable = depositBalance.sub(AmountNeeded);
 
@@ -553,8 +672,9 @@ contract Strategy is BaseStrategy, DydxFlashloanBase, ICallee {
         }
 
         //(ds *c)/(1-c)
-        uint256 num = desiredSupply.mul(collateralTarget);
-        uint256 den = uint256(1e18).sub(collateralTarget);
+        uint256 target = config.collateralTarget;
+        uint256 num = desiredSupply.mul(target);
+        uint256 den = uint256(1e18).sub(target);
 
         uint256 desiredBorrow = num.div(den);
         if (desiredBorrow > 1e5) {
@@ -574,6 +694,67 @@ contract Strategy is BaseStrategy, DydxFlashloanBase, ICallee {
         }
     }
 
+    /*
+     * The plan adjustPosition (useBackup false) or _withdrawSome would follow to move the position by `position`:
+     * an ordered list of plain leverage and flash loan steps with their gas, fees and what is left after each.
+     * gas is priced at wantPerMillionGas, as in execution
+     */
+    function planRoutes(
+        uint256 position,
+        bool deficit,
+        bool useBackup
+    ) public view returns (RoutePlanner.Step[] memory) {
+        return RoutePlanner.plan(position, deficit, _routeMarket(deficit, useBackup));
+    }
+
+    //what the planner sees when moving the position now, for off chain and DeleveragePlanner simulations
+    function routeMarket(bool deficit, bool useBackup) external view returns (RoutePlanner.Market memory) {
+        return _routeMarket(deficit, useBackup);
+    }
+
+    function _routeMarket(bool deficit, bool useBackup) internal view returns (RoutePlanner.Market memory market) {
+        (market.lent, market.borrowed) = getCurrentPosition();
+        if (!deficit) {
+            market.lent = market.lent.add(want.balanceOf(address(this)));
+        }
+        (, market.collateralFactor, ) = compound.markets(address(cToken));
+        market.maxPairs = deficit ? MAX_DELEVERAGE_STEPS : MAX_LEVERAGE_STEPS;
+
+        Config storage _config = config;
+        if (_config.dyDxActive) {
+            market.soloLiquidity = want.balanceOf(SOLO);
+        }
+        //we do not want to do aave flash loans for leveraging up. Fee could put us into liquidation
+        if (_config.aaveActive && useBackup && deficit) {
+            market.aaveLiquidity = want.balanceOf(addressesProvider.getLendingPoolCore());
+        }
+        market.wantPerMillionGas = _config.wantPerMillionGas;
+    }
+
+    //the plan ignores mint rounding, so a closing plain step goes for everything still missing with the full pair budget
+    function _executePlan(
+        RoutePlanner.Step[] memory plan,
+        uint256 position,
+        bool deficit,
+        RoutePlanner.Market memory market
+    ) internal returns (uint256 done) {
+        //nothing to borrow or repay, but plain leverage still mints the want we hold
+        if (plan.length == 0) {
+            return _noFlashLoan(position, deficit, market.maxPairs, market.collateralFactor);
+        }
+        for (uint256 i = 0; i < plan.length; i++) {
+            if (plan[i].route == RoutePlanner.DYDX) {
+                done = done.add(doDyDxFlashLoan(deficit, plan[i].amount));
+            } else if (plan[i].route == RoutePlanner.AAVE) {
+                done = done.add(doAaveFlashLoan(deficit, plan[i].amount));
+            } else if (i == plan.length - 1) {
+                done = done.add(_noFlashLoan(position.sub(done), deficit, market.maxPairs, market.collateralFactor));
+            } else {
+                done = done.add(_noFlashLoan(plan[i].amount, deficit, plan[i].pairs, market.collateralFactor));
+            }
+        }
+    }
+
     /*
      * Liquidate as many assets as possible to `want`, irregardless of slippage,
      * up to `_amount`. Any excess should be re-invested here as well.
@@ -620,18 +801,56 @@ contract Strategy is BaseStrategy, DydxFlashloanBase, ICallee {
         compound.claimComp(address(this), tokens);
     }
 
-    //sell comp function
+    //sell comp function. sells what the pools take within maxCompImpactBps and keeps the rest for later harvests
     function _disposeOfComp() internal {
         uint256 _comp = IERC20(comp).balanceOf(address(this));
 
-        if (_comp > minCompToSell) {
+        if (_comp > config.minCompToSell) {
             address[] memory path = new address[](3);
             path[0] = comp;
             path[1] = weth;
             path[2] = address(want);
 
-            IUni(uniswapRouter).swapExactTokensForTokens(_comp, uint256(0), path, address(this), now);
+            uint256 amount = compSaleSize(_comp);
+            if (amount > 0) {
+                IUni(uniswapRouter).swapExactTokensForTokens(amount, minCompSaleOutput(amount), path, address(this), now);
+            }
+        }
+    }
+
+    //The most of _comp one swap can sell while moving the comp/weth and weth/want pools by no more than maxCompImpactBps each.
+    //selling x into a pool holding r of it pays r / (r + x) of the spot price before fees, so x <= r * bps / (10000 - bps)
+    function compSaleSize(uint256 _comp) public view returns (uint256 amount) {
+        uint256 bps = config.maxCompImpactBps;
+        if (bps >= 10000) {
+            return _comp;
+        }
+
+        (uint256 compReserve, uint256 wethReserve) = _uniReserves(comp, weth);
+        amount = Math.min(_comp, compReserve.mul(bps).div(10000 - bps));
+
+        //the weth the first hop pays out is what goes into the second pool
+        (uint256 wethIn, ) = _uniReserves(weth, address(want));
+        uint256 wethOut = amount.mul(wethReserve).div(compReserve.add(amount));
+        uint256 wethCap = wethIn.mul(bps).div(10000 - bps);
+        if (wethOut > wethCap) {
+            amount = amount.mul(wethCap).div(wethOut);
+        }
+    }
+
+    //What a sale of _amount must return at least: the marginal priceCheck quote for one comp, less the impact we allow on both pools
+    function minCompSaleOutput(uint256 _amount) public view returns (uint256) {
+        uint256 bps = config.maxCompImpactBps;
+        if (bps >= 5000 || _amount == 0) {
+            return 0;
         }
+        return priceCheck(comp, address(want), 1e18).mul(_amount).div(1e18).mul(10000 - 2 * bps).div(10000);
+    }
+
+    function _uniReserves(address tokenA, address tokenB) internal view returns (uint256 reserveA, uint256 reserveB) {
+        address pair = IUniFactory(IUni(uniswapRouter).factory()).getPair(tokenA, tokenB);
+        (uint256 reserve0, uint256 reserve1, ) = IUniPair(pair).getReserves();
+        (reserveA, reserveB) = tokenA < tokenB ? (reserve0, reserve1) : (reserve1, reserve0);
     }
 
     //lets leave
@@ -652,9 +871,20 @@ contract Strategy is BaseStrategy, DydxFlashloanBase, ICallee {
     }
 
     //Three functions covering normal leverage and deleverage situations
-    // max is the max amount we want to increase our borrowed balance
+    // max is the max amount we want to change our borrowed balance by
+    // steps is the most borrow/mint (or redeem/repay) pairs we are willing to pay gas for
+    // collateralFactorMantissa is compound's, as _routeMarket read it for the plan
     // returns the amount we actually did
-    function _noFlashLoan(uint256 max, bool deficit) internal returns (uint256 amount) {
+    //
+    // Each leverage step borrows up to the collateral factor and mints it back, so the room left to borrow
+    // shrinks by the collateral factor every step (a geometric series). The position is read once and carried
+    // forward in memory, and the loop stops as soon as max is reached, so we run the fewest pairs needed.
+    function _noFlashLoan(
+        uint256 max,
+        bool deficit,
+        uint256 steps,
+        uint256 collateralFactorMantissa
+    ) internal returns (uint256 amount) {
         //we can use non-state changing because this function is always called after _calculateDesiredPosition
         (uint256 lent, uint256 borrowed) = getCurrentPosition();
 
@@ -663,17 +893,44 @@ contract Strategy is BaseStrategy, DydxFlashloanBase, ICallee {
             return 0;
         }
 
-        (, uint256 collateralFactorMantissa, ) = compound.markets(address(cToken));
+        //mint rounds our cToken balance down by up to one unit of the exchange rate. we assume the worst in memory
+        uint256 mintDust = cToken.exchangeRateStored().div(1e18).add(1);
 
-        if (deficit) {
-            amount = _normalDeleverage(max, lent, borrowed, collateralFactorMantissa);
-        } else {
-            amount = _normalLeverage(max, lent, borrowed, collateralFactorMantissa);
+        if (!deficit) {
+            //all the want we hold is collateral before we borrow against it
+            uint256 wantBalance = want.balanceOf(address(this));
+            if (wantBalance > 0) {
+                cToken.mint(wantBalance);
+                lent = _lessDust(lent.add(wantBalance), mintDust);
+            }
+        }
+
+        for (uint256 i = 0; i < steps && amount < max; i++) {
+            uint256 step;
+            if (deficit) {
+                step = _normalDeleverage(max - amount, lent, borrowed, collateralFactorMantissa);
+                //redeemUnderlying burns no more cTokens than the amount is worth
+                lent = lent.sub(step);
+                borrowed = borrowed.sub(step);
+            } else {
+                step = _normalLeverage(max - amount, lent, borrowed, collateralFactorMantissa);
+                lent = _lessDust(lent.add(step), mintDust);
+                borrowed = borrowed.add(step);
+            }
+
+            if (step == 0) {
+                break;
+            }
+            amount = amount.add(step);
         }
 
         emit Leverage(max, amount, deficit, address(0));
     }
 
+    function _lessDust(uint256 amount, uint256 dust) internal pure returns (uint256) {
+        return amount > dust ? amount - dust : 0;
+    }
+
     //maxDeleverage is how much we want to reduce by
     function _normalDeleverage(
         uint256 maxDeleverage,
@@ -696,6 +953,9 @@ contract Strategy is BaseStrategy, DydxFlashloanBase, ICallee {
         if (deleveragedAmount >= maxDeleverage) {
             deleveragedAmount = maxDeleverage;
         }
+        if (deleveragedAmount == 0) {
+            return 0;
+        }
 
         cToken.redeemUnderlying(deleveragedAmount);
 
@@ -712,14 +972,21 @@ contract Strategy is BaseStrategy, DydxFlashloanBase, ICallee {
     ) internal returns (uint256 leveragedAmount) {
         uint256 theoreticalBorrow = lent.mul(collatRatio).div(1e18);
 
-        leveragedAmount = theoreticalBorrow.sub(borrowed);
+        //nothing left to borrow against (can happen after rounding down the minted balance in memory)
+        if (theoreticalBorrow <= borrowed) {
+            return 0;
+        }
+        leveragedAmount = theoreticalBorrow - borrowed;
 
         if (leveragedAmount >= maxLeverage) {
             leveragedAmount = maxLeverage;
         }
 
-        cToken.borrow(leveragedAmount);
-        cToken.mint(want.balanceOf(address(this)));
+        //stop rather than mint what we did not get if compound refuses the borrow
+        if (cToken.borrow(leveragedAmount) != 0) {
+            return 0;
+        }
+        cToken.mint(leveragedAmount);
     }
 
     //called by flash loan
@@ -782,12 +1049,13 @@ contract Strategy is BaseStrategy, DydxFlashloanBase, ICallee {
         // 3. Deposit back $
         Actions.ActionArgs[] memory operations = new Actions.ActionArgs[](3);
 
-        operations[0] = _getWithdrawAction(dyDxMarketId, amount);
+        uint256 marketId = config.dyDxMarketId;
+        operations[0] = _getWithdrawAction(marketId, amount);
         operations[1] = _getCallAction(
             // Encode custom data for callFunction
             data
         );
-        operations[2] = _getDepositAction(dyDxMarketId, repayAmount);
+        operations[2] = _getDepositAction(marketId, repayAmount);
 
         Account.Info[] memory accountInfos = new Account.Info[](1);
         accountInfos[0] = _getAccountInfo();
@@ -821,8 +1089,6 @@ contract Strategy is BaseStrategy, DydxFlashloanBase, ICallee {
        
     }
 
-    bool internal awaitingFlash = false;
-
     function doAaveFlashLoan(bool deficit, uint256 _flashBackUpAmount) internal returns (uint256 amount) {
         //we do not want to do aave flash loans for leveraging up. Fee could put us into liquidation
         if (!deficit) {
@@ -831,7 +1097,8 @@ contract Strategy is BaseStrategy, DydxFlashloanBase, ICallee {
 
         ILendingPool lendingPool = ILendingPool(addressesProvider.getLendingPool());
 
-        uint256 availableLiquidity = want.balanceOf(address(0x3dfd23A6c5E8BbcFc9581d2E864a68feb6a076d3));
+        //aave v1 keeps reserves in the lending pool core
+        uint256 availableLiquidity = want.balanceOf(addressesProvider.getLendingPoolCore());
 
         if (availableLiquidity < _flashBackUpAmount) {
             amount = availableLiquidity;
@@ -842,11 +1109,11 @@ contract Strategy is BaseStrategy, DydxFlashloanBase, ICallee {
         bytes memory data = abi.encode(deficit, amount);
 
         //anyone can call aave flash loan to us. (for some reason. grrr)
-        awaitingFlash = true;
+        config.awaitingFlash = true;
 
         lendingPool.flashLoan(address(this), address(want), amount, data);
 
-        awaitingFlash = false;
+        config.awaitingFlash = false;
 
         emit Leverage(_flashBackUpAmount, amount, deficit, AAVE_LENDING);
     }
@@ -860,7 +1127,7 @@ contract Strategy is BaseStrategy, DydxFlashloanBase, ICallee {
     ) external {
         (bool deficit, uint256 amount) = abi.decode(_params, (bool, uint256));
         require(msg.sender == addressesProvider.getLendingPool(), "NOT_AAVE");
-        require(awaitingFlash, "Malicious");
+        require(config.awaitingFlash, "Malicious");
 
         _loanLogic(deficit, amount, amount.add(_fee));
 
@@ -883,7 +1150,7 @@ contract Strategy is BaseStrategy, DydxFlashloanBase, ICallee {
             curToken = solo.getMarketTokenAddress(i);
 
             if (curToken == address(want)) {
-                dyDxMarketId = i;
+                config.dyDxMarketId = SafeCast.toUint8(i);
                 return;
             }
         }
@@ -0,0 +1,161 @@
+// SPDX-License-Identifier: GPL-3.0
+pragma solidity ^0.6.12;
+pragma experimental ABIEncoderV2;
+
+import {StrategyParams, VaultAPI} from "@yearnvaults/contracts/BaseStrategy.sol";
+
+import "@openzeppelin/contracts/math/SafeMath.sol";
+
+interface IERC20Lens {
+    function balanceOf(address account) external view returns (uint256);
+
+    function decimals() external view returns (uint8);
+}
+
+//Strategy.TriggerState
+struct TriggerState {
+    bool harvest;
+    bool tend;
+    uint256 deposits;
+    uint256 borrows;
+    uint256 claimableComp;
+    uint256 compBalance;
+    uint256 estimatedTotalAssets;
+    uint256 wantGasCost;
+    uint256 compGasCost;
+    uint256 debtOutstanding;
+    uint256 creditAvailable;
+    uint256 blocksUntilLiquidation;
+}
+
+interface ILensStrategy {
+    function name() external view returns (string memory);
+
+    function want() external view returns (address);
+
+    function vault() external view returns (address);
+
+    function comp() external view returns (address);
+
+    function emergencyExit() external view returns (bool);
+
+    function collateralTarget() external view returns (uint256);
+
+    function blocksToLiquidationDangerZone() external view returns (uint256);
+
+    function triggerState(uint256 gasCost) external view returns (TriggerState memory);
+
+    //the separate views, for strategies deployed before triggerState
+    function getCurrentPosition() external view returns (uint256 deposits, uint256 borrows);
+
+    function getblocksUntilLiquidation() external view returns (uint256);
+
+    function predictCompAccrued() external view returns (uint256);
+
+    function estimatedTotalAssets() external view returns (uint256);
+
+    function harvestTrigger(uint256 gasCost) external view returns (bool);
+
+    function tendTrigger(uint256 gasCost) external view returns (bool);
+}
+
+/********************
+ *
+ *   The dashboard state of many strategies in one eth_call.
+ *   Each strategy is read through triggerState, which reads its position, COMP accrual and vault params once,
+ *   and the rest (collateralisation, expected return, net balance lent) is worked out here from the same values
+ *   instead of calling the strategy's views that would read them again.
+ *   A strategy that reverts is returned with ok false and everything else zero.
+ *
+ ********************* */
+
+contract StrategyLens {
+    using SafeMath for uint256;
+
+    struct StrategyState {
+        address strategy;
+        bool ok;
+        string name;
+        address want;
+        address vault;
+        uint8 decimals;
+        uint256 wantBalance;
+        uint256 compBalance;
+        uint256 claimableComp; //predictCompAccrued
+        uint256 deposits;
+        uint256 borrows;
+        uint256 netBalanceLent;
+        uint256 storedCollateralisation;
+        uint256 collateralTarget;
+        uint256 estimatedTotalAssets;
+        uint256 expectedReturn;
+        uint256 blocksUntilLiquidation;
+        uint256 dangerZone;
+        bool harvestTrigger;
+        bool tendTrigger;
+        bool emergencyExit;
+        StrategyParams params;
+    }
+
+    function snapshot(address[] calldata strategies, uint256 gasCost) external view returns (StrategyState[] memory states) {
+        states = new StrategyState[](strategies.length);
+        for (uint256 i = 0; i < strategies.length; i++) {
+            states[i].strategy = strategies[i];
+            try this.read(strategies[i], gasCost) returns (StrategyState memory state) {
+                states[i] = state;
+            } catch {}
+        }
+    }
+
+    //external so snapshot can try/catch a strategy. not meant to be called on its own
+    function read(address strategy, uint256 gasCost) external view returns (StrategyState memory state) {
+        ILensStrategy s = ILensStrategy(strategy);
+        state.strategy = strategy;
+        state.name = s.name();
+        state.want = s.want();
+        state.vault = s.vault();
+        state.decimals = IERC20Lens(state.want).decimals();
+        state.wantBalance = IERC20Lens(state.want).balanceOf(strategy);
+        state.collateralTarget = s.collateralTarget();
+        state.dangerZone = s.blocksToLiquidationDangerZone();
+        state.emergencyExit = s.emergencyExit();
+        state.params = VaultAPI(state.vault).strategies(strategy);
+
+        //triggerState leaves the accrual fields empty before the strategy is activated
+        bool shared;
+        if (state.params.activation != 0) {
+            try s.triggerState(gasCost) returns (TriggerState memory t) {
+                state.deposits = t.deposits;
+                state.borrows = t.borrows;
+                state.claimableComp = t.claimableComp;
+                state.compBalance = t.compBalance;
+                state.estimatedTotalAssets = t.estimatedTotalAssets;
+                state.blocksUntilLiquidation = t.blocksUntilLiquidation;
+                state.harvestTrigger = t.harvest;
+                state.tendTrigger = t.tend;
+                shared = true;
+            } catch {}
+        }
+        if (!shared) {
+            (state.deposits, state.borrows) = s.getCurrentPosition();
+            state.claimableComp = s.predictCompAccrued();
+            state.compBalance = IERC20Lens(s.comp()).balanceOf(strategy);
+            state.estimatedTotalAssets = s.estimatedTotalAssets();
+            state.blocksUntilLiquidation = s.getblocksUntilLiquidation();
+            state.harvestTrigger = s.harvestTrigger(gasCost);
+            state.tendTrigger = s.tendTrigger(gasCost);
+        }
+
+        //Strategy.storedCollateralisation, netBalanceLent and expectedReturn on the values above
+        if (state.deposits > 0) {
+            state.storedCollateralisation = state.borrows.mul(1e18).div(state.deposits);
+        }
+        if (state.deposits > state.borrows) {
+            state.netBalanceLent = state.deposits - state.borrows;
+        }
+        if (state.estimatedTotalAssets > state.params.totalDebt) {
+            state.expectedReturn = state.estimatedTotalAssets - state.params.totalDebt;
+        }
+        state.ok = true;
+    }
+}
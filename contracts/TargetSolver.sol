@@ -0,0 +1,172 @@
+// SPDX-License-Identifier: GPL-3.0
+pragma solidity ^0.6.12;
+pragma experimental ABIEncoderV2;
+
+import "@openzeppelin/contracts/math/SafeMath.sol";
+import "@openzeppelin/contracts/math/SignedSafeMath.sol";
+
+import "./Interfaces/Compound/CTokenI.sol";
+import "./Interfaces/Compound/ComptrollerI.sol";
+import "./Interfaces/Compound/InterestRateModel.sol";
+
+interface ISolvedStrategy {
+    function cToken() external view returns (CTokenI);
+
+    function compound() external view returns (ComptrollerI);
+
+    function comp() external view returns (address);
+
+    function want() external view returns (address);
+
+    function getCurrentPosition() external view returns (uint256 deposits, uint256 borrows);
+
+    function priceCheck(
+        address start,
+        address end,
+        uint256 _amount
+    ) external view returns (uint256);
+}
+
+/********************
+ *
+ *   The collateral target with the best net yield, counting how our own position moves the market's rates.
+ *   Same model and search as scripts/target_solver.py: our equity and borrow are put back into the market
+ *   without us, the interest rate model prices the utilisation that makes, COMP is shared pro rata on each side.
+ *   A grid scan picks the bracket and golden-section search narrows it. Every evaluation is two rate model
+ *   calls, and there are at most MAX_EVALUATIONS, so the gas is bounded.
+ *
+ ********************* */
+
+contract TargetSolver {
+    using SafeMath for uint256;
+    using SignedSafeMath for int256;
+
+    uint256 public constant MAX_EVALUATIONS = 64;
+    // (sqrt(5) - 1) / 2
+    uint256 private constant INV_PHI = 618033988749894848;
+
+    //a cToken market without the strategy in it, and the strategy's equity
+    struct Pool {
+        InterestRateModel model;
+        uint256 cash;
+        uint256 borrows;
+        uint256 reserves;
+        uint256 reserveFactor;
+        uint256 collateralFactor;
+        uint256 compSpeed;
+        uint256 compPrice; //want for 1e18 comp
+        uint256 equity;
+    }
+
+    function readPool(address strategy) public view returns (Pool memory p) {
+        ISolvedStrategy s = ISolvedStrategy(strategy);
+        CTokenI cToken = s.cToken();
+        ComptrollerI comptroller = s.compound();
+        (uint256 deposits, uint256 borrowed) = s.getCurrentPosition();
+
+        p.equity = deposits > borrowed ? deposits - borrowed : 0;
+        p.model = cToken.interestRateModel();
+        uint256 cash = cToken.getCash();
+        p.cash = cash > p.equity ? cash - p.equity : 0;
+        p.borrows = cToken.totalBorrows().sub(borrowed);
+        p.reserves = cToken.totalReserves();
+        p.reserveFactor = cToken.reserveFactorMantissa();
+        (, p.collateralFactor, ) = comptroller.markets(address(cToken));
+        p.compSpeed = comptroller.compSpeeds(address(cToken));
+        p.compPrice = s.priceCheck(s.comp(), s.want(), 1e18);
+    }
+
+    //net yield per block on the equity, scaled by 1e18. negative when the borrow costs more than the position earns
+    function netRate(Pool memory p, uint256 target) public view returns (int256) {
+        uint256 deposits = p.equity.mul(1e18).div(uint256(1e18).sub(target));
+        uint256 borrowed = deposits.sub(p.equity);
+        uint256 cash = p.cash.add(p.equity);
+        uint256 borrows = p.borrows.add(borrowed);
+
+        uint256 supplyRate = p.model.getSupplyRate(cash, borrows, p.reserves, p.reserveFactor);
+        uint256 borrowRate = _borrowRate(p.model, cash, borrows, p.reserves);
+
+        uint256 compWant = p.compSpeed.mul(p.compPrice).div(1e18);
+        uint256 earned = deposits.mul(supplyRate).div(1e18).add(compWant.mul(deposits).div(cash.add(borrows).sub(p.reserves)));
+        if (borrows > 0) {
+            earned = earned.add(compWant.mul(borrowed).div(borrows));
+        }
+        uint256 paid = borrowed.mul(borrowRate).div(1e18);
+
+        return int256(earned).sub(int256(paid)).mul(1e18).div(int256(p.equity));
+    }
+
+    //best target up to collateralFactor - margin, in grid + iterations + 4 evaluations
+    function solve(
+        address strategy,
+        uint256 margin,
+        uint256 grid,
+        uint256 iterations
+    ) external view returns (uint256 target, int256 rate) {
+        require(grid > 0 && grid.add(iterations).add(4) <= MAX_EVALUATIONS, "!evaluations");
+        Pool memory p = readPool(strategy);
+        if (p.equity == 0) {
+            return (0, 0);
+        }
+        uint256 top = p.collateralFactor > margin ? p.collateralFactor - margin : 0;
+
+        uint256 best;
+        rate = netRate(p, 0);
+        for (uint256 i = 1; i <= grid; i++) {
+            int256 r = netRate(p, top.mul(i).div(grid));
+            if (r > rate) {
+                (best, rate) = (i, r);
+            }
+        }
+        target = top.mul(best).div(grid);
+
+        uint256 lo = best > 0 ? top.mul(best - 1).div(grid) : 0;
+        uint256 hi = best < grid ? top.mul(best + 1).div(grid) : top;
+        uint256 refined = _goldenSection(p, lo, hi, iterations);
+        int256 refinedRate = netRate(p, refined);
+        if (refinedRate > rate) {
+            (target, rate) = (refined, refinedRate);
+        }
+    }
+
+    function _goldenSection(
+        Pool memory p,
+        uint256 a,
+        uint256 b,
+        uint256 iterations
+    ) internal view returns (uint256) {
+        uint256 c = b.sub(b.sub(a).mul(INV_PHI).div(1e18));
+        uint256 d = a.add(b.sub(a).mul(INV_PHI).div(1e18));
+        int256 fc = netRate(p, c);
+        int256 fd = netRate(p, d);
+        for (uint256 i = 0; i < iterations; i++) {
+            if (fc >= fd) {
+                (b, d, fd) = (d, c, fc);
+                c = b.sub(b.sub(a).mul(INV_PHI).div(1e18));
+                fc = netRate(p, c);
+            } else {
+                (a, c, fc) = (c, d, fd);
+                d = a.add(b.sub(a).mul(INV_PHI).div(1e18));
+                fd = netRate(p, d);
+            }
+        }
+        return a.add(b).div(2);
+    }
+
+    //older models return (error, rate) like the interface, JumpRateModelV2 and the DAI model just the rate
+    function _borrowRate(
+        InterestRateModel model,
+        uint256 cash,
+        uint256 borrows,
+        uint256 reserves
+    ) internal view returns (uint256) {
+        (bool success, bytes memory data) =
+            address(model).staticcall(abi.encodeWithSignature("getBorrowRate(uint256,uint256,uint256)", cash, borrows, reserves));
+        require(success && data.length >= 32, "!rate model");
+        if (data.length >= 64) {
+            (, uint256 rate) = abi.decode(data, (uint256, uint256));
+            return rate;
+        }
+        return abi.decode(data, (uint256));
+    }
+}
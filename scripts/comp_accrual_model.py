@@ -0,0 +1,166 @@
+"""
+COMP accrual of a strategy, predicted for any block from one read of chain state.
+
+`predictCompAccrued` moves the comptroller's supply and borrow COMP indices
+forward to the current block and prices the strategy's cToken balance and
+borrow against its own stored indices, exactly as `claimComp` would. This
+module does the same arithmetic off chain for any future block, so keepers
+can read `AccrualState` once (one batched request, see scripts/snapshot.py)
+and then ask "how much COMP at block N" for as many N as they like.
+
+The prediction is exact as long as nobody touches the market in between:
+any mint, borrow or claim on the market moves its indices and market size.
+"""
+from dataclasses import dataclass
+from typing import Sequence, Union
+
+import numpy as np
+
+DOUBLE = 10 ** 36
+EXP_SCALE = 10 ** 18
+# comptroller.compInitialIndex
+COMP_INITIAL_INDEX = 10 ** 36
+COMPTROLLER = "0x3d9819210A31b4961b30EF54bE2aeD79B9c9Cd3B"
+
+# for scripts.snapshot.batch_call: name: (signature, output types)
+SIGNATURES = {
+    "cToken": ("cToken()", ["address"]),
+    "compSpeeds": ("compSpeeds(address)", ["uint256"]),
+    "compAccrued": ("compAccrued(address)", ["uint256"]),
+    "compSupplyState": ("compSupplyState(address)", ["uint224", "uint32"]),
+    "compBorrowState": ("compBorrowState(address)", ["uint224", "uint32"]),
+    "compSupplierIndex": ("compSupplierIndex(address,address)", ["uint256"]),
+    "compBorrowerIndex": ("compBorrowerIndex(address,address)", ["uint256"]),
+    "totalSupply": ("totalSupply()", ["uint256"]),
+    "totalBorrows": ("totalBorrows()", ["uint256"]),
+    "borrowIndex": ("borrowIndex()", ["uint256"]),
+    "getAccountSnapshot": ("getAccountSnapshot(address)", ["uint256"] * 4),
+}
+
+
+@dataclass(frozen=True)
+class AccrualState:
+    block: int
+    speed: int  # comptroller.compSpeeds(cToken)
+    comp_accrued: int  # comptroller.compAccrued(strategy)
+    supply_index: int
+    supply_block: int
+    total_supply: int  # cTokens
+    borrow_index: int
+    borrow_block: int
+    total_borrows: int
+    market_borrow_index: int  # cToken.borrowIndex()
+    supplier_index: int
+    borrower_index: int
+    ctoken_balance: int
+    borrow_balance: int  # borrowBalanceStored
+
+
+def _index_at(index: int, last_block: int, speed: int, market_size: int, block: int) -> int:
+    # Strategy._compIndexNow
+    delta = block - last_block
+    if delta <= 0 or speed == 0 or market_size == 0:
+        return index
+    return index + delta * speed * DOUBLE // market_size
+
+
+def _accrued_at(state: AccrualState, block: int) -> int:
+    supply_index = _index_at(state.supply_index, state.supply_block, state.speed, state.total_supply, block)
+    supplier_index = state.supplier_index
+    if supplier_index == 0 and supply_index > 0:
+        supplier_index = COMP_INITIAL_INDEX
+    accrued = state.comp_accrued + state.ctoken_balance * (supply_index - supplier_index) // DOUBLE
+
+    if state.borrower_index > 0:
+        market_size = state.total_borrows * EXP_SCALE // state.market_borrow_index
+        borrow_index = _index_at(state.borrow_index, state.borrow_block, state.speed, market_size, block)
+        borrower_amount = state.borrow_balance * EXP_SCALE // state.market_borrow_index
+        accrued += borrower_amount * (borrow_index - state.borrower_index) // DOUBLE
+    return accrued
+
+
+def predict_comp_accrued(state: AccrualState, block: Union[int, Sequence[int]] = None) -> Union[int, np.ndarray]:
+    """
+    COMP claimable at `block` (default: the block the state was read at).
+    A sequence of blocks gives an object array of predictions.
+    """
+    if block is None:
+        block = state.block
+    scalar = np.isscalar(block)
+    blocks = [int(block)] if scalar else [int(b) for b in block]
+    if any(b < state.block for b in blocks):
+        raise ValueError("can only predict from the block the state was read at onwards")
+
+    accrued = np.array([_accrued_at(state, b) for b in blocks], dtype=object)
+    return accrued[0] if scalar else accrued
+
+
+def blocks_until(state: AccrualState, amount: int, horizon: int = 10 ** 7) -> int:
+    """First block at which at least `amount` COMP is claimable, or -1 within `horizon` blocks."""
+    if predict_comp_accrued(state) >= amount:
+        return state.block
+    lo, hi = state.block, state.block + horizon
+    if predict_comp_accrued(state, hi) < amount:
+        return -1
+    while hi - lo > 1:
+        mid = (lo + hi) // 2
+        if predict_comp_accrued(state, mid) >= amount:
+            hi = mid
+        else:
+            lo = mid
+    return hi
+
+
+def read_state(strategy, ctoken=None, comptroller: str = COMPTROLLER, block: int = None) -> AccrualState:
+    """Everything `predict_comp_accrued` needs, read in one batch at `block`."""
+    from brownie import chain
+
+    from scripts.snapshot import _address, batch_call
+
+    block = chain.height if block is None else block
+    strategy = _address(strategy)
+    ctoken = _address(ctoken) or batch_call([(strategy, "cToken", ())], block, SIGNATURES)[0]
+
+    (
+        speed,
+        accrued,
+        supply_state,
+        borrow_state,
+        supplier_index,
+        borrower_index,
+        total_supply,
+        total_borrows,
+        market_borrow_index,
+        account,
+    ) = batch_call(
+        [
+            (comptroller, "compSpeeds", (ctoken,)),
+            (comptroller, "compAccrued", (strategy,)),
+            (comptroller, "compSupplyState", (ctoken,)),
+            (comptroller, "compBorrowState", (ctoken,)),
+            (comptroller, "compSupplierIndex", (ctoken, strategy)),
+            (comptroller, "compBorrowerIndex", (ctoken, strategy)),
+            (ctoken, "totalSupply", ()),
+            (ctoken, "totalBorrows", ()),
+            (ctoken, "borrowIndex", ()),
+            (ctoken, "getAccountSnapshot", (strategy,)),
+        ],
+        block,
+        SIGNATURES,
+    )
+    return AccrualState(
+        block=block,
+        speed=int(speed),
+        comp_accrued=int(accrued),
+        supply_index=int(supply_state[0]),
+        supply_block=int(supply_state[1]),
+        total_supply=int(total_supply),
+        borrow_index=int(borrow_state[0]),
+        borrow_block=int(borrow_state[1]),
+        total_borrows=int(total_borrows),
+        market_borrow_index=int(market_borrow_index),
+        supplier_index=int(supplier_index),
+        borrower_index=int(borrower_index),
+        ctoken_balance=int(account[1]),
+        borrow_balance=int(account[2]),
+    )
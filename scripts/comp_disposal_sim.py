@@ -0,0 +1,209 @@
+"""
+Replays COMP sales against historical Uniswap V2 reserves, to measure what
+sizing sales by price impact (Strategy.compSaleSize) earns over selling the
+whole balance in one swap.
+
+Every harvest in a replay accrues some COMP, then sells either the whole
+balance (maxCompImpactBps 10000, the old _disposeOfComp) or only what the
+pools take within `max_impact_bps`, carrying the rest to the next harvest.
+Pools are taken as they were at each harvest block: arbitrage is assumed to
+restore them between harvests, so earlier sales do not move later ones. COMP
+still held at the end is marked at the last harvest's spot price.
+
+    states = read_reserves(harvest_blocks, want=DAI)
+    compare(states, accrued=[300 * 10 ** 18] * len(states), max_impact_bps=100)
+
+`main` replays the harvests scripts/event_indexer.py recorded for a strategy.
+"""
+import argparse
+from dataclasses import dataclass, field
+from typing import List, NamedTuple, Sequence
+
+EXP_SCALE = 10 ** 18
+NO_LIMIT_BPS = 10000
+# Strategy defaults
+MAX_IMPACT_BPS = 100
+MIN_COMP_TO_SELL = 10 ** 17
+
+COMP = "0xc00e94Cb662C3520282E6f5717214004A7f26888"
+WETH = "0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2"
+DAI = "0x6B175474E89094C44Da98b954EedeAC495271d0F"
+UNISWAP_ROUTER = "0x7a250d5630B4cF539739dF2C5dAcb4c659F2488D"
+
+# for scripts.snapshot.batch_call: name: (signature, output types)
+SIGNATURES = {
+    "factory": ("factory()", ["address"]),
+    "getPair": ("getPair(address,address)", ["address"]),
+    "getReserves": ("getReserves()", ["uint112", "uint112", "uint32"]),
+}
+
+
+class PoolState(NamedTuple):
+    block: int
+    comp_reserve: int  # comp/weth pool
+    weth_reserve_a: int
+    weth_reserve_b: int  # weth/want pool
+    want_reserve: int
+
+
+class Sale(NamedTuple):
+    block: int
+    held: int
+    sold: int
+    received: int
+    min_output: int
+
+
+@dataclass
+class Replay:
+    max_impact_bps: int
+    sales: List[Sale] = field(default_factory=list)
+    received: int = 0
+    carried: int = 0  # comp still held after the last harvest
+    carried_value: int = 0  # ...at the last spot price
+
+    @property
+    def value(self) -> int:
+        return self.received + self.carried_value
+
+
+def amount_out(amount_in: int, reserve_in: int, reserve_out: int) -> int:
+    """UniswapV2Library.getAmountOut."""
+    amount_in_with_fee = amount_in * 997
+    return amount_in_with_fee * reserve_out // (reserve_in * 1000 + amount_in_with_fee)
+
+
+def swap(state: PoolState, amount: int) -> int:
+    """Want out of selling `amount` COMP through comp -> weth -> want."""
+    if amount == 0:
+        return 0
+    weth = amount_out(amount, state.comp_reserve, state.weth_reserve_a)
+    return amount_out(weth, state.weth_reserve_b, state.want_reserve)
+
+
+def spot_value(state: PoolState, amount: int) -> int:
+    """`amount` COMP at the pools' spot prices, before fees and impact."""
+    return amount * state.weth_reserve_a * state.want_reserve // (state.comp_reserve * state.weth_reserve_b)
+
+
+def sale_size(state: PoolState, held: int, max_impact_bps: int) -> int:
+    """Strategy.compSaleSize."""
+    if max_impact_bps >= NO_LIMIT_BPS:
+        return held
+    amount = min(held, state.comp_reserve * max_impact_bps // (NO_LIMIT_BPS - max_impact_bps))
+    weth_out = amount * state.weth_reserve_a // (state.comp_reserve + amount)
+    weth_cap = state.weth_reserve_b * max_impact_bps // (NO_LIMIT_BPS - max_impact_bps)
+    if weth_out > weth_cap:
+        amount = amount * weth_cap // weth_out
+    return amount
+
+
+def min_output(state: PoolState, amount: int, max_impact_bps: int) -> int:
+    """Strategy.minCompSaleOutput."""
+    if max_impact_bps >= NO_LIMIT_BPS // 2 or amount == 0:
+        return 0
+    return swap(state, EXP_SCALE) * amount // EXP_SCALE * (NO_LIMIT_BPS - 2 * max_impact_bps) // NO_LIMIT_BPS
+
+
+def replay(
+    states: Sequence[PoolState],
+    accrued: Sequence[int],
+    max_impact_bps: int = MAX_IMPACT_BPS,
+    min_comp_to_sell: int = MIN_COMP_TO_SELL,
+) -> Replay:
+    """Harvest at every state, after `accrued[i]` more COMP came in."""
+    result = Replay(max_impact_bps)
+    held = 0
+    for state, comp in zip(states, accrued):
+        held += comp
+        if held <= min_comp_to_sell:
+            continue
+        sold = sale_size(state, held, max_impact_bps)
+        if sold == 0:
+            continue
+        received = swap(state, sold)
+        minimum = min_output(state, sold, max_impact_bps)
+        if received < minimum:
+            # the strategy's swap would revert and the harvest with it: nothing is sold this time
+            continue
+        result.sales.append(Sale(state.block, held, sold, received, minimum))
+        result.received += received
+        held -= sold
+
+    result.carried = held
+    result.carried_value = spot_value(states[-1], held) if states and held else 0
+    return result
+
+
+def compare(
+    states: Sequence[PoolState],
+    accrued: Sequence[int],
+    max_impact_bps: int = MAX_IMPACT_BPS,
+    min_comp_to_sell: int = MIN_COMP_TO_SELL,
+) -> dict:
+    """The whole-balance replay against the sized one, and the improvement in want and in bps of the first."""
+    baseline = replay(states, accrued, NO_LIMIT_BPS, min_comp_to_sell)
+    sized = replay(states, accrued, max_impact_bps, min_comp_to_sell)
+    improvement = sized.value - baseline.value
+    return {
+        "baseline": baseline,
+        "sized": sized,
+        "improvement": improvement,
+        "improvement_bps": 10000 * improvement / baseline.value if baseline.value else 0.0,
+    }
+
+
+def read_reserves(blocks: Sequence[int], want: str, comp: str = COMP, weth: str = WETH) -> List[PoolState]:
+    """The comp/weth and weth/want reserves at each block, from an archive node."""
+    from brownie import chain
+
+    from scripts.snapshot import batch_call
+
+    (factory,) = batch_call([(UNISWAP_ROUTER, "factory", ())], chain.height, SIGNATURES)
+    pair_a, pair_b = batch_call([(factory, "getPair", (comp, weth)), (factory, "getPair", (weth, want))], chain.height, SIGNATURES)
+
+    states = []
+    for block in blocks:
+        (a0, a1, _), (b0, b1, _) = batch_call([(pair_a, "getReserves", ()), (pair_b, "getReserves", ())], block, SIGNATURES)
+        comp_reserve, weth_a = (a0, a1) if comp.lower() < weth.lower() else (a1, a0)
+        weth_b, want_reserve = (b0, b1) if weth.lower() < want.lower() else (b1, b0)
+        states.append(PoolState(block, int(comp_reserve), int(weth_a), int(weth_b), int(want_reserve)))
+    return states
+
+
+def format_comparison(result: dict, decimals: int = 18) -> str:
+    unit = 10 ** decimals
+    lines = [f"{'impact bps':>10} {'sales':>6} {'received':>16} {'carried comp':>14} {'value':>16}"]
+    for replayed in (result["baseline"], result["sized"]):
+        lines.append(
+            f"{replayed.max_impact_bps:>10} {len(replayed.sales):>6} {replayed.received / unit:>16.2f} "
+            f"{replayed.carried / EXP_SCALE:>14.4f} {replayed.value / unit:>16.2f}"
+        )
+    lines.append(f"improvement {result['improvement'] / unit:.2f} ({result['improvement_bps']:.2f} bps)")
+    return "\n".join(lines)
+
+
+def main(argv: Sequence[str] = None):
+    from scripts.event_indexer import DEFAULT_PATH, EventIndexer
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("strategy")
+    parser.add_argument("--want", default=DAI)
+    parser.add_argument("--decimals", type=int, default=18)
+    parser.add_argument("--comp-per-harvest", type=float, default=300.0, help="COMP accrued between harvests")
+    parser.add_argument("--max-impact-bps", type=int, default=MAX_IMPACT_BPS)
+    parser.add_argument("--db", default=str(DEFAULT_PATH))
+    args = parser.parse_args(argv)
+
+    indexer = EventIndexer(None, [(args.strategy, None)], args.db)
+    blocks = sorted({row[0] for row in indexer.reports_for(args.strategy)})
+    if not blocks:
+        parser.error("no harvests indexed for this strategy, run scripts/event_indexer.py first")
+
+    states = read_reserves(blocks, args.want)
+    accrued = [int(args.comp_per_harvest * EXP_SCALE)] * len(states)
+    print(format_comparison(compare(states, accrued, args.max_impact_bps), args.decimals))
+
+
+if __name__ == "__main__":
+    main()
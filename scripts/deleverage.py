@@ -0,0 +1,156 @@
+"""
+Multi-transaction unwinds, planned before they are sent.
+
+Freeing a large amount from a levered strategy can take several harvests:
+each `_withdrawSome` repays at most one DyDx loan's worth (capped by Solo's
+liquidity) plus MAX_DELEVERAGE_PAIRS plain redeem/repay pairs, then redeems
+only what keeps the rest at the collateral target. contracts/DeleveragePlanner.sol
+simulates those transactions on chain; `simulate_unwind` is the same model in
+Python, on a route_planner.Market:
+
+    planned = plan_unwind(strategy, planner)           # one Transaction per harvest
+    planned, txs = unwind(strategy, harvest_from(gov), planner)
+
+A harvest has no say in how much it withdraws: adjustPosition calls
+`_withdrawSome(debtOutstanding - wantBalance, false)`. So `unwind` (run with
+the strategy's debt ratio lowered) plans each transaction for what
+`harvest_shortfall` reads off the chain right before it, re-planning every
+time, and stops as soon as the shortfall is paid or there is nothing left to
+repay or redeem, so it never sends a harvest that does nothing.
+"""
+from dataclasses import replace
+from typing import Any, Callable, List, NamedTuple, Tuple
+
+from scripts.route_planner import EXP_SCALE, SAFETY_MARGIN, Market, plan
+
+MAX_TRANSACTIONS = 20
+
+
+class Transaction(NamedTuple):
+    repaid: int  # borrow paid back by the flash loans and plain pairs
+    freed: int  # want redeemed to the strategy
+    deposits: int  # position after the transaction
+    borrows: int
+
+
+def withdraw_some(market: Market, wanted: int, target: int) -> Transaction:
+    """Strategy._withdrawSome(wanted) on `market`, which it updates in place."""
+    unwound = market.lent - market.borrowed
+    desired = (unwound - min(wanted, unwound)) * target // (EXP_SCALE - target)
+    if desired > SAFETY_MARGIN:
+        desired -= SAFETY_MARGIN
+
+    repaid = 0
+    if desired < market.borrowed:
+        for step in plan(market.borrowed - desired, True, market):
+            market.lent = max(market.lent - step.amount - step.fee, 0)
+            market.borrowed -= step.amount
+            repaid += step.amount
+
+    needed = market.borrowed * EXP_SCALE // target if target > 0 else 0
+    freed = min(max(market.lent - needed, 0), wanted)
+    # compound refuses (with an error code, not a revert) a redeem that would leave the borrow undercollateralised
+    backing = market.borrowed * EXP_SCALE // market.collateral_factor if market.collateral_factor > 0 else 0
+    if market.borrowed > 0 and market.lent < backing + freed:
+        freed = 0
+    market.lent -= freed
+    return Transaction(repaid, freed, market.lent, market.borrowed)
+
+
+def simulate_unwind(market: Market, amount: int, target: int, max_transactions: int = MAX_TRANSACTIONS) -> List[Transaction]:
+    """DeleveragePlanner.plan: the transactions that free `amount` (0 for everything), in order."""
+    market = replace(market)
+    if amount == 0:
+        amount = market.lent - market.borrowed
+
+    transactions, freed = [], 0
+    while len(transactions) < max_transactions and freed < amount:
+        t = withdraw_some(market, amount - freed, target)
+        if t.repaid == 0 and t.freed == 0:
+            break
+        freed += t.freed
+        transactions.append(t)
+    return transactions
+
+
+def plan_unwind(strategy, planner=None, amount: int = 0, max_transactions: int = MAX_TRANSACTIONS) -> List[Transaction]:
+    """The unwind plan from the DeleveragePlanner contract, or from `simulate_unwind` on the live market without one."""
+    if planner is not None:
+        return [Transaction(*t) for t in planner.plan(strategy, amount, max_transactions)]
+
+    from brownie import chain
+
+    from scripts.route_planner import read_market
+    from scripts.snapshot import _address, batch_call
+
+    block = chain.height
+    (target,) = batch_call([(_address(strategy), "collateralTarget", ())], block)
+    market = read_market(strategy, True, False, block)
+    return simulate_unwind(market, amount, int(target), max_transactions)
+
+
+def can_migrate(strategy, planner=None) -> bool:
+    """Whether prepareMigration's single _withdrawSome repays the whole borrow, so it will not revert with DELEVERAGE_FIRST."""
+    planned = plan_unwind(strategy, planner, max_transactions=1)
+    return not planned or planned[0].borrows == 0
+
+
+def harvest_shortfall(strategy, block: int = None) -> int:
+    """What the next harvest's adjustPosition will ask _withdrawSome for: the vault's debtOutstanding less the want held."""
+    from brownie import chain
+
+    from scripts.route_planner import SIGNATURES
+    from scripts.snapshot import _address, batch_call
+
+    block = chain.height if block is None else block
+    strategy = _address(strategy)
+    want, vault = batch_call([(strategy, key, ()) for key in ("want", "vault")], block, SIGNATURES)
+    held, outstanding = batch_call(
+        [(want, "balanceOf", (strategy,)), (vault, "debtOutstanding", (strategy,))], block, SIGNATURES
+    )
+    return max(int(outstanding) - int(held), 0)
+
+
+def harvest_from(account) -> Callable[[Any], Any]:
+    """Send each unwind transaction as a harvest from `account`."""
+    return lambda strategy: strategy.harvest({"from": account})
+
+
+def unwind(
+    strategy,
+    send: Callable[[Any], Any],
+    planner=None,
+    max_transactions: int = MAX_TRANSACTIONS,
+    shortfall: Callable[[Any], int] = harvest_shortfall,
+) -> Tuple[List[Transaction], List[Any]]:
+    """
+    Send `send(strategy)` (a harvest with the debt ratio lowered, say) until
+    `shortfall(strategy)` is paid. Returns the plan made up front and the
+    transactions sent.
+    """
+    wanted = shortfall(strategy)
+    planned = plan_unwind(strategy, planner, wanted, max_transactions) if wanted else []
+    sent = []
+    while len(sent) < max_transactions:
+        # re-plan from the live position: the last harvest paid some debt back, and interest moves the rest a little
+        wanted = shortfall(strategy)
+        if wanted == 0 or not plan_unwind(strategy, planner, wanted, max_transactions - len(sent)):
+            break
+        sent.append(send(strategy))
+    return planned, sent
+
+
+def format_unwind(transactions: List[Transaction], decimals: int = 18) -> str:
+    unit = 10 ** decimals
+    lines = [f"{'tx':>3} {'repaid':>16} {'freed':>16} {'deposits':>16} {'borrows':>16}"]
+    for i, t in enumerate(transactions, 1):
+        lines.append(f"{i:>3} {t.repaid / unit:>16.4f} {t.freed / unit:>16.4f} {t.deposits / unit:>16.4f} {t.borrows / unit:>16.4f}")
+    return "\n".join(lines)
+
+
+def main():
+    from scripts.keeper import LIVE_STRATEGIES
+
+    for strategy, _ in LIVE_STRATEGIES:
+        print(strategy)
+        print(format_unwind(plan_unwind(strategy)))
@@ -0,0 +1,295 @@
+"""
+Incremental indexer for the strategies' `Leverage` events and their vaults'
+`StrategyReported` events, kept in SQLite.
+
+    python -m scripts.event_indexer index --rpc $RPC --from-block 11500000
+    python -m scripts.event_indexer volume
+
+Each pass asks for the logs of every configured strategy and vault in chunks
+of `chunk` blocks: one eth_getLogs per chunk, filtered by address and by the
+two topic hashes. Logs are decoded by hand from their 32 byte words, and each
+chunk is written in one transaction together with how far every address has
+been indexed. A crash therefore resumes after the last complete chunk. A
+chunk the node refuses (too many results) is split in half and retried.
+
+Amounts are stored as decimal strings, since uint256 does not fit in an
+SQLite integer; aggregate queries sum them as floats.
+"""
+import argparse
+import sqlite3
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+DEFAULT_PATH = Path.home() / ".cache" / "yearn-lev-comp" / "events.sqlite"
+DEFAULT_CHUNK = 5000
+# blocks behind the head we leave alone, so a reorg cannot leave stale rows behind
+CONFIRMATIONS = 12
+
+# keccak256 of the event signatures
+# Leverage(uint256,uint256,bool,address)
+LEVERAGE_TOPIC = "0x012a05dea1e4b56be6c250aaa3e6189a1f531f1fd201b35b2a74c56577000bf4"
+# StrategyReported(address,uint256,uint256,uint256,uint256,uint256,uint256,uint256), vault 0.3.0
+STRATEGY_REPORTED_TOPIC = "0x2fb611faf48b1d1b91edbba34cee10c6357adee410540e4a8f7a82b6b38673e4"
+
+ZERO_ADDRESS = "0x" + "0" * 40
+
+SCHEMA = """
+PRAGMA journal_mode=WAL;
+CREATE TABLE IF NOT EXISTS leverage (
+    block INTEGER NOT NULL,
+    log_index INTEGER NOT NULL,
+    tx TEXT NOT NULL,
+    strategy TEXT NOT NULL,
+    amount_requested TEXT NOT NULL,
+    amount_given TEXT NOT NULL,
+    deficit INTEGER NOT NULL,
+    flash_loan TEXT NOT NULL,
+    PRIMARY KEY (block, log_index)
+);
+CREATE INDEX IF NOT EXISTS leverage_strategy_block ON leverage(strategy, block);
+CREATE TABLE IF NOT EXISTS reports (
+    block INTEGER NOT NULL,
+    log_index INTEGER NOT NULL,
+    tx TEXT NOT NULL,
+    vault TEXT NOT NULL,
+    strategy TEXT NOT NULL,
+    gain TEXT NOT NULL,
+    loss TEXT NOT NULL,
+    total_gain TEXT NOT NULL,
+    total_loss TEXT NOT NULL,
+    total_debt TEXT NOT NULL,
+    debt_added TEXT NOT NULL,
+    debt_ratio INTEGER NOT NULL,
+    PRIMARY KEY (block, log_index)
+);
+CREATE INDEX IF NOT EXISTS reports_strategy_block ON reports(strategy, block);
+CREATE TABLE IF NOT EXISTS blocks (number INTEGER PRIMARY KEY, timestamp INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS progress (address TEXT PRIMARY KEY, block INTEGER NOT NULL);
+"""
+
+
+class RpcError(Exception):
+    pass
+
+
+def _words(data: str) -> List[int]:
+    data = data[2:] if data.startswith("0x") else data
+    return [int(data[i : i + 64], 16) for i in range(0, len(data), 64)]
+
+
+def _address_word(word: int) -> str:
+    return "0x" + format(word, "040x")[-40:]
+
+
+def decode_leverage(log: Dict) -> Tuple:
+    requested, given, deficit, lender = _words(log["data"])
+    return (
+        int(log["blockNumber"], 16),
+        int(log["logIndex"], 16),
+        log["transactionHash"],
+        log["address"].lower(),
+        str(requested),
+        str(given),
+        int(bool(deficit)),
+        _address_word(lender),
+    )
+
+
+def decode_strategy_reported(log: Dict) -> Tuple:
+    gain, loss, total_gain, total_loss, total_debt, debt_added, debt_ratio = _words(log["data"])
+    return (
+        int(log["blockNumber"], 16),
+        int(log["logIndex"], 16),
+        log["transactionHash"],
+        log["address"].lower(),
+        _address_word(int(log["topics"][1], 16)),
+        str(gain),
+        str(loss),
+        str(total_gain),
+        str(total_loss),
+        str(total_debt),
+        str(debt_added),
+        debt_ratio,
+    )
+
+
+class EventIndexer:
+    """
+    Indexes `strategies`, a list of (strategy, vault or None) pairs like
+    keeper.LIVE_STRATEGIES, through `rpc`: anything with a
+    `send(payload) -> responses` method for JSON-RPC batches, such as
+    rpc_cache.Upstream.
+    """
+
+    def __init__(
+        self,
+        rpc,
+        strategies: Sequence[Tuple[str, Optional[str]]],
+        path=DEFAULT_PATH,
+        chunk: int = DEFAULT_CHUNK,
+        confirmations: int = CONFIRMATIONS,
+    ):
+        self.rpc = rpc
+        self.strategies = sorted({str(s).lower() for s, _ in strategies})
+        self.vaults = sorted({str(v).lower() for _, v in strategies if v})
+        self.chunk = chunk
+        self.confirmations = confirmations
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.path))
+        self._db.executescript(SCHEMA)
+        self._id = 0
+
+    @property
+    def addresses(self) -> List[str]:
+        return self.strategies + self.vaults
+
+    def _call(self, method: str, *params):
+        return self._batch([(method, list(params))])[0]
+
+    def _batch(self, calls: Sequence[Tuple[str, list]]) -> List:
+        payload = []
+        for method, params in calls:
+            self._id += 1
+            payload.append({"jsonrpc": "2.0", "id": self._id, "method": method, "params": params})
+        responses = self.rpc.send(payload)
+        for response in responses:
+            if "error" in response:
+                raise RpcError(response["error"])
+        return [response["result"] for response in responses]
+
+    def head(self) -> int:
+        return int(self._call("eth_blockNumber"), 16)
+
+    def progress(self) -> Dict[str, int]:
+        """The last block indexed for each address."""
+        return dict(self._db.execute("SELECT address, block FROM progress").fetchall())
+
+    def last_indexed(self) -> Optional[int]:
+        """The block everything configured is indexed up to, or None before the first chunk."""
+        done = self.progress()
+        if any(a not in done for a in self.addresses):
+            return None
+        return min(done[a] for a in self.addresses)
+
+    def _logs(self, start: int, end: int) -> List[Dict]:
+        params = {
+            "fromBlock": hex(start),
+            "toBlock": hex(end),
+            "address": self.addresses,
+            "topics": [[LEVERAGE_TOPIC, STRATEGY_REPORTED_TOPIC]],
+        }
+        try:
+            return self._call("eth_getLogs", params)
+        except RpcError:
+            # most nodes cap the results of one query: split the range and try again
+            if start == end:
+                raise
+            middle = (start + end) // 2
+            return self._logs(start, middle) + self._logs(middle + 1, end)
+
+    def index_range(self, start: int, end: int) -> int:
+        """Index blocks start..end inclusive in one transaction. Returns how many events were written."""
+        logs = [log for log in self._logs(start, end) if not log.get("removed")]
+        leverage, reports = [], []
+        for log in logs:
+            topic = log["topics"][0].lower()
+            address = log["address"].lower()
+            if topic == LEVERAGE_TOPIC and address in self.strategies:
+                leverage.append(decode_leverage(log))
+            elif topic == STRATEGY_REPORTED_TOPIC and address in self.vaults:
+                report = decode_strategy_reported(log)
+                if report[4] in self.strategies:
+                    reports.append(report)
+
+        numbers = sorted({row[0] for row in leverage + reports})
+        blocks = self._batch([("eth_getBlockByNumber", [hex(n), False]) for n in numbers]) if numbers else []
+
+        with self._db:
+            # events already indexed (a chunk replayed for a newly added address) are left as they are
+            written = self._db.executemany("INSERT OR IGNORE INTO leverage VALUES (?, ?, ?, ?, ?, ?, ?, ?)", leverage).rowcount
+            written += self._db.executemany(
+                "INSERT OR IGNORE INTO reports VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", reports
+            ).rowcount
+            self._db.executemany(
+                "INSERT OR REPLACE INTO blocks VALUES (?, ?)", [(n, int(b["timestamp"], 16)) for n, b in zip(numbers, blocks)]
+            )
+            self._db.executemany(
+                "INSERT INTO progress VALUES (?, ?) ON CONFLICT(address) DO UPDATE SET block = MAX(block, excluded.block)",
+                [(a, end) for a in self.addresses],
+            )
+        return written
+
+    def run(self, from_block: int, to_block: int = None) -> int:
+        """
+        Index from where the last run stopped (or `from_block`, for addresses
+        never indexed) up to `to_block`, by default the head less
+        `confirmations`. Returns how many events were written.
+        """
+        if to_block is None:
+            to_block = self.head() - self.confirmations
+        done = self.progress()
+        start = min(done.get(a, from_block - 1) + 1 for a in self.addresses)
+
+        written = 0
+        while start <= to_block:
+            end = min(start + self.chunk - 1, to_block)
+            written += self.index_range(start, end)
+            start = end + 1
+        return written
+
+    def query(self, sql: str, params: Iterable = ()) -> List[Tuple]:
+        return self._db.execute(sql, tuple(params)).fetchall()
+
+    def flash_loan_volume(self, strategy: str = None) -> List[Tuple[str, str, str, float]]:
+        """(strategy, day, flash loan provider, volume in want wei) for every flash loan, by strategy and UTC day."""
+        sql = """
+            SELECT l.strategy, date(b.timestamp, 'unixepoch') AS day, l.flash_loan, SUM(CAST(l.amount_given AS REAL))
+            FROM leverage l JOIN blocks b ON b.number = l.block
+            WHERE l.flash_loan != ? {}
+            GROUP BY l.strategy, day, l.flash_loan
+            ORDER BY l.strategy, day, l.flash_loan
+        """
+        if strategy is None:
+            return self.query(sql.format(""), [ZERO_ADDRESS])
+        return self.query(sql.format("AND l.strategy = ?"), [ZERO_ADDRESS, str(strategy).lower()])
+
+    def reports_for(self, strategy: str) -> List[Tuple]:
+        """Every StrategyReported row for `strategy`, oldest first."""
+        return self.query("SELECT * FROM reports WHERE strategy = ? ORDER BY block, log_index", [str(strategy).lower()])
+
+    def close(self):
+        self._db.close()
+
+
+def main(argv: Sequence[str] = None):
+    from scripts.keeper import LIVE_STRATEGIES
+    from scripts.rpc_cache import Upstream
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("command", choices=["index", "volume"])
+    parser.add_argument("--rpc", help="node url")
+    parser.add_argument("--from-block", type=int, default=11000000)
+    parser.add_argument("--to-block", type=int)
+    parser.add_argument("--db", default=str(DEFAULT_PATH))
+    parser.add_argument("--chunk", type=int, default=DEFAULT_CHUNK)
+    parser.add_argument("--confirmations", type=int, default=CONFIRMATIONS)
+    args = parser.parse_args(argv)
+
+    if args.command == "index" and not args.rpc:
+        parser.error("index needs --rpc")
+    indexer = EventIndexer(
+        Upstream(args.rpc) if args.rpc else None, LIVE_STRATEGIES, args.db, args.chunk, args.confirmations
+    )
+
+    if args.command == "index":
+        written = indexer.run(args.from_block, args.to_block)
+        print(f"indexed {written} events, up to block {indexer.last_indexed()}")
+        return
+
+    for strategy, day, lender, volume in indexer.flash_loan_volume():
+        print(f"{strategy} {day} {lender} {volume:.6e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+Gas benchmark for the keeper facing paths of the strategy.
+
+`measure_sweep` deploys nothing itself: it takes a freshly deployed strategy
+and its vault (the test fixtures) and, for every flash loan mode, deposit size
+and collateral target, records `gas_used` for
+
+    harvest_lever   first harvest after a deposit, levering up
+    harvest_steady  harvest after BLOCKS_BETWEEN_HARVESTS blocks (claims and sells COMP)
+    tend            tend on the levered position
+    withdraw        vault withdrawal of half the deposit (liquidatePosition / _withdrawSome)
+    harvest_trigger estimated gas of harvestTrigger, and of tendTrigger, on the levered position
+    tend_trigger
+
+Every case starts from the same chain snapshot. Results are compared with the
+versioned JSON baseline in `benchmarks/gas_baseline.json`; a case regresses
+when it uses more than `threshold_pct` percent more gas than recorded, and
+fails as well when the baseline has no entry for it. The test skips while the
+baseline is still empty.
+
+Record a new baseline after an intended change with:
+    UPDATE_GAS_BASELINE=1 brownie test tests/DAI/test_gas_benchmark.py
+
+To compare two versions of the contracts, record a baseline file on each
+(GAS_BASELINE_PATH picks the file the test reads and writes) and print the
+change for every case:
+    git checkout <older>; GAS_BASELINE_PATH=before.json UPDATE_GAS_BASELINE=1 brownie test tests/DAI/test_gas_benchmark.py
+    git checkout <newer>; GAS_BASELINE_PATH=after.json UPDATE_GAS_BASELINE=1 brownie test tests/DAI/test_gas_benchmark.py
+    brownie run gas_benchmark main before.json after.json
+"""
+import json
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+BASELINE_VERSION = 1
+BASELINE_PATH = Path(__file__).resolve().parent.parent / "benchmarks" / "gas_baseline.json"
+DEFAULT_THRESHOLD_PCT = 5.0
+
+# (DyDxActive, AaveActive)
+FLASH_LOAN_MODES = {"dydx": (True, False), "aave": (False, True), "none": (False, False)}
+# in whole units of want
+DEPOSITS = [1000, 100000, 1000000]
+COLLATERAL_TARGETS = [0.5e18, 0.73e18]
+BLOCKS_BETWEEN_HARVESTS = 100
+# callCost passed to the triggers: a harvest at 50 gwei
+TRIGGER_CALL_COST = 1500000 * 50 * 10 ** 9
+
+
+@dataclass(frozen=True)
+class Regression:
+    case: str
+    baseline: Optional[int]  # None when the case was never recorded
+    measured: int
+
+    @property
+    def pct(self) -> float:
+        if self.baseline is None:
+            return float("inf")
+        return 100 * (self.measured - self.baseline) / self.baseline
+
+    def __str__(self) -> str:
+        if self.baseline is None:
+            return f"{self.case}: {self.measured} gas, not in the baseline (record it with UPDATE_GAS_BASELINE=1)"
+        return f"{self.case}: {self.baseline} -> {self.measured} gas (+{self.pct:.2f}%)"
+
+
+def case_id(path: str, mode: str, deposit: int, target: float) -> str:
+    return f"{path}/{mode}/{deposit}/{target / 1e18:.2f}"
+
+
+def measure_case(
+    chain, strategy, vault, want, whale, gov, mode: str, deposit: int, target: float, on_tx: Callable[[str, object], None] = None
+) -> Dict[str, int]:
+    """
+    Gas used by each path for one configuration. Leaves the chain as it found it.
+    `on_tx(case, tx)` sees every transaction measured, before the chain is reverted.
+    """
+    dydx, aave = FLASH_LOAN_MODES[mode]
+    sent = {}
+    amount = deposit * 10 ** want.decimals()
+    chain.snapshot()
+    try:
+        strategy.setDyDx(dydx, {"from": gov})
+        strategy.setAave(aave, {"from": gov})
+        strategy.setCollateralTarget(int(target), {"from": gov})
+
+        want.approve(vault, amount, {"from": whale})
+        vault.deposit(amount, {"from": whale})
+
+        sent["harvest_lever"] = strategy.harvest({"from": gov})
+        chain.mine(BLOCKS_BETWEEN_HARVESTS)
+        sent["harvest_steady"] = strategy.harvest({"from": gov})
+        gas = {
+            "harvest_trigger": strategy.harvestTrigger.estimate_gas(TRIGGER_CALL_COST),
+            "tend_trigger": strategy.tendTrigger.estimate_gas(TRIGGER_CALL_COST),
+        }
+        sent["tend"] = strategy.tend({"from": gov})
+        sent["withdraw"] = vault.withdraw(vault.balanceOf(whale) // 2, {"from": whale})
+
+        gas.update({path: tx.gas_used for path, tx in sent.items()})
+        if on_tx is not None:
+            for path, tx in sent.items():
+                on_tx(case_id(path, mode, deposit, target), tx)
+    finally:
+        chain.revert()
+
+    return {case_id(path, mode, deposit, target): used for path, used in gas.items()}
+
+
+def measure_sweep(
+    chain,
+    strategy,
+    vault,
+    want,
+    whale,
+    gov,
+    modes: Iterable[str] = FLASH_LOAN_MODES,
+    deposits: Iterable[int] = DEPOSITS,
+    targets: Iterable[float] = COLLATERAL_TARGETS,
+    on_tx: Callable[[str, object], None] = None,
+) -> Dict[str, int]:
+    results = {}
+    for mode in modes:
+        for deposit in deposits:
+            for target in targets:
+                results.update(measure_case(chain, strategy, vault, want, whale, gov, mode, deposit, target, on_tx))
+    return results
+
+
+def baseline_path() -> Path:
+    """GAS_BASELINE_PATH when set, else the versioned baseline."""
+    return Path(os.environ.get("GAS_BASELINE_PATH", BASELINE_PATH))
+
+
+def load_baseline(path: Path = BASELINE_PATH) -> Dict:
+    """The stored baseline, or an empty one when missing or written by another schema version."""
+    empty = {"version": BASELINE_VERSION, "threshold_pct": DEFAULT_THRESHOLD_PCT, "results": {}}
+    if not path.exists():
+        return empty
+    baseline = json.loads(path.read_text())
+    if baseline.get("version") != BASELINE_VERSION:
+        return empty
+    return baseline
+
+
+def save_baseline(results: Dict[str, int], path: Path = BASELINE_PATH, threshold_pct: float = None, **meta) -> Dict:
+    """Merge `results` into the baseline at `path` and write it back."""
+    baseline = load_baseline(path)
+    if threshold_pct is not None:
+        baseline["threshold_pct"] = threshold_pct
+    baseline.update(meta)
+    baseline["results"] = dict(sorted({**baseline["results"], **results}.items()))
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(baseline, indent=2) + "\n")
+    return baseline
+
+
+def compare(results: Dict[str, int], baseline: Dict) -> List[Regression]:
+    """
+    Cases that use more than the baseline's threshold above their recorded gas,
+    and cases the baseline has no entry for.
+    """
+    threshold = baseline.get("threshold_pct", DEFAULT_THRESHOLD_PCT)
+    recorded = baseline["results"]
+    return [
+        Regression(case, recorded.get(case), used)
+        for case, used in sorted(results.items())
+        if case not in recorded or used > recorded[case] * (1 + threshold / 100)
+    ]
+
+
+def format_table(results: Dict[str, int], baseline: Dict) -> str:
+    recorded = baseline["results"]
+    lines = [f"{'case':<40} {'baseline':>10} {'measured':>10} {'change':>9}"]
+    for case, used in sorted(results.items()):
+        before = recorded.get(case)
+        change = f"{100 * (used - before) / before:+.2f}%" if before else "new"
+        lines.append(f"{case:<40} {before or '-':>10} {used:>10} {change:>9}")
+    return "\n".join(lines)
+
+
+def main(before: str, after: str):
+    """Print the change in every case between two recorded baselines."""
+    print(format_table(load_baseline(Path(after))["results"], load_baseline(Path(before))))
@@ -0,0 +1,218 @@
+"""
+Gas price oracle with pluggable backends, a TTL cache and request coalescing.
+
+Backends are plain callables returning a gas price in wei:
+
+    FixedGasPrice     a constant, for tests
+    HttpGasPrice      a JSON endpoint such as gasnow
+    NodeGasPrice      the node itself, eth_feeHistory (base fee + priority fee
+                      percentile) or eth_gasPrice
+    FallbackGasPrice  the first of several backends that answers
+
+`GasOracle` wraps one backend. A price is reused for `ttl` seconds, and
+threads asking while a fetch is in flight wait for that fetch instead of
+starting their own, so a keeper pass over many strategies costs at most one
+lookup. `GasEstimateCache` does the same for `estimate_gas`, keyed by
+contract, function and a bucket of the position size.
+"""
+import statistics
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+import requests
+
+GWEI = 10 ** 9
+DEFAULT_TTL = 15
+GASNOW_URL = "https://www.gasnow.org/api/v3/gas/price"
+
+
+class GasPriceUnavailable(Exception):
+    pass
+
+
+class FixedGasPrice:
+    def __init__(self, price: int):
+        self.price = int(price)
+
+    def __call__(self) -> int:
+        return self.price
+
+
+class HttpGasPrice:
+    """Gas price read from a JSON endpoint at `path` (a sequence of keys)."""
+
+    def __init__(self, url: str = GASNOW_URL, path: Sequence[str] = ("data", "fast"), timeout: float = 5, scale: int = 1):
+        self.url = url
+        self.path = path
+        self.timeout = timeout
+        self.scale = scale
+        self.session = requests.Session()
+
+    def __call__(self) -> int:
+        try:
+            data = self.session.get(self.url, timeout=self.timeout).json()
+            for key in self.path:
+                data = data[key]
+            return int(data) * self.scale
+        except (requests.RequestException, ValueError, KeyError, TypeError) as e:
+            raise GasPriceUnavailable(f"{self.url}: {e!r}") from e
+
+
+class NodeGasPrice:
+    """
+    Gas price from the connected node. With `percentile` set it is the next
+    block's base fee plus that percentile of the recent priority fees
+    (eth_feeHistory), falling back to eth_gasPrice on nodes without it.
+    """
+
+    def __init__(self, percentile: Optional[float] = 60, blocks: int = 5, request: Callable = None):
+        self.percentile = percentile
+        self.blocks = blocks
+        self._request = request
+
+    def request(self, method: str, params: list) -> dict:
+        if self._request is not None:
+            return self._request(method, params)
+        from brownie import web3
+
+        return web3.provider.make_request(method, params)
+
+    def __call__(self) -> int:
+        if self.percentile is not None:
+            response = self.request("eth_feeHistory", [hex(self.blocks), "latest", [self.percentile]])
+            result = response.get("result")
+            if "error" not in response and result and result.get("reward"):
+                next_base_fee = int(result["baseFeePerGas"][-1], 16)
+                tips = [int(reward[0], 16) for reward in result["reward"]]
+                return next_base_fee + int(statistics.median(tips))
+
+        response = self.request("eth_gasPrice", [])
+        if "error" in response:
+            raise GasPriceUnavailable(f"eth_gasPrice: {response['error']}")
+        return int(response["result"], 16)
+
+
+class FallbackGasPrice:
+    def __init__(self, *backends: Callable[[], int]):
+        self.backends = backends
+
+    def __call__(self) -> int:
+        errors = []
+        for backend in self.backends:
+            try:
+                return backend()
+            except GasPriceUnavailable as e:
+                errors.append(str(e))
+        raise GasPriceUnavailable("; ".join(errors))
+
+
+class _Coalesced:
+    """TTL cache of one value per key where concurrent misses share a single fetch."""
+
+    def __init__(self, ttl: float, clock: Callable[[], float]):
+        self.ttl = ttl
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._values: Dict[object, Tuple[float, int]] = {}
+        self._in_flight: Dict[object, Future] = {}
+
+    def get(self, key, fetch: Callable[[], int]) -> int:
+        with self._lock:
+            cached = self._values.get(key)
+            if cached is not None and self.clock() - cached[0] < self.ttl:
+                return cached[1]
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = self._in_flight[key] = Future()
+
+        if not owner:
+            return future.result()
+
+        try:
+            value = fetch()
+        except BaseException as e:
+            with self._lock:
+                del self._in_flight[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            self._values[key] = (self.clock(), value)
+            del self._in_flight[key]
+        future.set_result(value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class GasOracle:
+    def __init__(self, backend: Callable[[], int], ttl: float = DEFAULT_TTL, clock: Callable[[], float] = time.monotonic):
+        self.backend = backend
+        self._cache = _Coalesced(ttl, clock)
+        self.fetches = 0
+
+    def gas_price(self) -> int:
+        return self._cache.get("gas_price", self._fetch)
+
+    def _fetch(self) -> int:
+        self.fetches += 1
+        return self.backend()
+
+    def gas_cost(self, gas: int) -> int:
+        """Cost in wei of `gas` units at the current price, what harvestTrigger(gasCost) expects."""
+        return int(gas) * self.gas_price()
+
+    def invalidate(self):
+        self._cache.clear()
+
+
+def size_bucket(size: int) -> int:
+    """Positions within a factor of two of each other share gas estimates."""
+    return int(size).bit_length()
+
+
+class GasEstimateCache:
+    """
+    `estimate_gas` results reused per (contract, function, position size bucket).
+    A failed estimate (e.g. the call would revert) returns `default`.
+    """
+
+    def __init__(self, ttl: float = 600, default: int = None, clock: Callable[[], float] = time.monotonic):
+        self.default = default
+        self._cache = _Coalesced(ttl, clock)
+
+    def estimate(self, fn, size: int, *args) -> int:
+        key = (str(getattr(fn, "_address", "")), getattr(fn, "_name", repr(fn)), size_bucket(size))
+        try:
+            return self._cache.get(key, lambda: int(fn.estimate_gas(*args)))
+        except Exception:
+            if self.default is None:
+                raise
+            return self.default
+
+
+_oracles: Dict[str, GasOracle] = {}
+_oracles_lock = threading.Lock()
+
+
+def default_oracle(confirmation_speed: str = "fast") -> GasOracle:
+    """
+    Shared oracle for the active network: gasnow with the node as fallback on
+    mainnet and its forks, 1 gwei anywhere else.
+    """
+    from brownie import network
+
+    live = "mainnet" in (network.show_active() or "")
+    key = f"{confirmation_speed}:{live}"
+    with _oracles_lock:
+        if key not in _oracles:
+            if live:
+                backend = FallbackGasPrice(HttpGasPrice(path=("data", confirmation_speed)), NodeGasPrice())
+            else:
+                backend = FixedGasPrice(GWEI)
+            _oracles[key] = GasOracle(backend)
+        return _oracles[key]
@@ -0,0 +1,141 @@
+"""
+Where a transaction's gas went, per internal function and external call.
+
+Brownie expands a transaction's debug trace with the project's compiled source
+maps: every step carries the function it executes (`fn`, "Strategy._claimComp"),
+its internal call depth (`jumpDepth`) and its external call depth (`depth`).
+`profile` walks those steps, keeps the stack of internal functions inside each
+external call, and charges every opcode to the stack it ran in. The gas a
+CALL forwards is charged to the callee's steps; the caller keeps only what the
+call itself cost (the 700 base, value transfer, cold account...).
+
+    profile = profile_transaction(tx)       # a TransactionReceipt or its hash
+    write_collapsed(profile, "harvest.folded")
+    print(format_profile(profile))
+
+The collapsed file has one "frame;frame;frame gas" line per stack, for
+flamegraph.pl or speedscope. Contracts without source show up under the
+name brownie gives them, or their address.
+
+`profile_sweep` profiles every transaction the gas benchmark sends
+(scripts/gas_benchmark.py), one collapsed file per case.
+
+Usage:
+    brownie run gas_profiler main <txid> --network <fork>
+"""
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Sequence, Tuple
+
+Stack = Tuple[str, ...]
+
+
+class Row(NamedTuple):
+    frame: str
+    self_gas: int  # spent in the frame's own opcodes
+    total_gas: int  # ...and in everything it called
+
+
+def _frame_name(step: dict) -> str:
+    name = step.get("fn") or step.get("contractName") or step.get("address") or "?"
+    # ";" separates frames in the collapsed format and " " ends the stack
+    return str(name).replace(";", ",").replace(" ", "_")
+
+
+def profile(steps: Sequence[dict]) -> Dict[Stack, int]:
+    """Gas charged to every stack of the trace, deepest frame last."""
+    gas = defaultdict(int)
+    stacks: Dict[int, List[str]] = {}
+    # per external call still running: (CALL step index, caller stack, gas charged to the callee so far)
+    calls: List[list] = []
+
+    for i, step in enumerate(steps):
+        depth = step["depth"]
+        for deeper in [d for d in stacks if d > depth]:
+            del stacks[deeper]
+
+        stacks[depth] = stacks.get(depth, [])[: step.get("jumpDepth", 0)] + [_frame_name(step)]
+        stack = tuple(name for d in sorted(stacks) for name in stacks[d])
+
+        following = steps[i + 1] if i + 1 < len(steps) else None
+        if following is not None and following["depth"] > depth:
+            calls.append([i, stack, 0])
+            continue
+        if following is not None and following["depth"] == depth:
+            cost = step["gas"] - following["gas"]
+        else:
+            # STOP, RETURN or REVERT out of this frame, or the last step
+            cost = step.get("gasCost", 0)
+        gas[stack] += cost
+        for call in calls:
+            call[2] += cost
+
+        if following is not None and following["depth"] < depth and calls:
+            start, caller, callee = calls.pop()
+            # what the CALL used beyond its callee's opcodes stays with the caller
+            overhead = steps[start]["gas"] - following["gas"] - callee
+            gas[caller] += overhead
+            for call in calls:
+                call[2] += overhead
+
+    return dict(gas)
+
+
+def profile_transaction(tx) -> Dict[Stack, int]:
+    """`profile` of a TransactionReceipt, or of the transaction with that hash on the connected chain."""
+    if isinstance(tx, str):
+        from brownie import chain
+
+        tx = chain.get_transaction(tx)
+    return profile(tx.trace)
+
+
+def rows(gas: Dict[Stack, int]) -> List[Row]:
+    """Self and inclusive gas of every frame, most expensive first. Recursion is counted once per stack."""
+    self_gas, total_gas = defaultdict(int), defaultdict(int)
+    for stack, used in gas.items():
+        self_gas[stack[-1]] += used
+        for frame in set(stack):
+            total_gas[frame] += used
+    table = [Row(frame, self_gas[frame], total) for frame, total in total_gas.items()]
+    return sorted(table, key=lambda r: (-r.total_gas, -r.self_gas, r.frame))
+
+
+def collapsed(gas: Dict[Stack, int]) -> List[str]:
+    return [f"{';'.join(stack)} {used}" for stack, used in sorted(gas.items()) if used > 0]
+
+
+def write_collapsed(gas: Dict[Stack, int], path) -> Path:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("\n".join(collapsed(gas)) + "\n")
+    return path
+
+
+def format_profile(gas: Dict[Stack, int], limit: int = 30) -> str:
+    total = sum(gas.values())
+    lines = [f"{'frame':<60} {'self':>10} {'total':>10} {'%':>7}"]
+    for row in rows(gas)[:limit]:
+        share = 100 * row.total_gas / total if total else 0.0
+        lines.append(f"{row.frame[:60]:<60} {row.self_gas:>10} {row.total_gas:>10} {share:>6.2f}%")
+    return "\n".join(lines)
+
+
+def profile_sweep(chain, strategy, vault, want, whale, gov, out_dir, **sweep) -> Dict[str, Path]:
+    """Run the gas benchmark sweep and write a collapsed profile of each transaction it sends, named after its case."""
+    from scripts.gas_benchmark import measure_sweep
+
+    out_dir = Path(out_dir)
+    written = {}
+
+    def on_tx(case: str, tx):
+        written[case] = write_collapsed(profile(tx.trace), out_dir / (case.replace("/", "_") + ".folded"))
+
+    measure_sweep(chain, strategy, vault, want, whale, gov, on_tx=on_tx, **sweep)
+    return written
+
+
+def main(txid: str, out: str = None):
+    gas = profile_transaction(txid)
+    print(format_profile(gas))
+    print(f"written to {write_collapsed(gas, out or f'{txid}.folded')}")
@@ -0,0 +1,206 @@
+"""
+harvestTrigger over whole grids of gas price, position size, COMP price and
+profitFactor at once, for choosing a strategy's trigger parameters.
+
+Between harvests of a steady position (no debt outstanding, no new credit)
+`_harvestDecision` fires at the first of:
+
+    comp     claimable COMP > minCompToSell, and claimable + held COMP is
+             worth more than profitFactor harvests' gas (compGasCost)
+    profit   estimatedTotalAssets - totalDebt, COMP counted at 90% of its
+             price, is worth more than profitFactor harvests' gas (wantGasCost)
+    delay    maxReportDelay has passed since the last report
+
+With COMP and interest accruing linearly, each of those is a number of
+blocks, so `break_even_surface` evaluates them on a broadcast numpy grid and
+returns, per cell, the harvest interval, which condition sets it, and the
+yield lost to gas: one harvest's gas cost per interval, as an APR of the
+position's equity.
+
+    rates = Rates(comp_per_block=2.5e-10, interest_apr=-0.01)   # per unit of equity
+    surface = break_even_surface([20, 50, 100], [1e5, 1e6, 1e7], [150, 300], [50, 100], rates)
+    surface.interval_blocks[i_gas, i_size, i_comp, i_pf]
+
+`harvest_decision` is the exact integer version of `_harvestDecision` on a
+`triggerState` read, and `harvest_trigger_at` asks the linear model the same
+question at one point; tests/DAI/test_harvest_trigger_model.py checks both
+against the strategy on a local chain.
+"""
+from dataclasses import dataclass
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+BLOCKS_PER_YEAR = 2102400
+SECONDS_PER_BLOCK = 13
+# keepers price a harvest at this much gas (the harvest() helper in tests/DAI/useful_methods.py)
+HARVEST_GAS = 1500000
+# _estimatedTotalAssets counts COMP at 90% of its price
+COMP_HAIRCUT = 0.9
+
+# Strategy defaults
+PROFIT_FACTOR = 100
+MIN_COMP_TO_SELL = 0.1
+MAX_REPORT_DELAY = 86400
+
+REASONS = ("comp", "profit", "delay")
+
+
+@dataclass(frozen=True)
+class Rates:
+    comp_per_block: float  # COMP accrued per block per unit of equity
+    interest_apr: float  # want earned (or, levered, paid) on supply less borrow, per unit of equity
+    weth_price: float = 2000.0  # want per ETH
+
+
+@dataclass(frozen=True)
+class Surface:
+    gas_prices: np.ndarray  # gwei
+    sizes: np.ndarray  # equity, whole want
+    comp_prices: np.ndarray  # want per COMP
+    profit_factors: np.ndarray
+    interval_blocks: np.ndarray  # gas x size x comp price x profit factor
+    reason: np.ndarray  # index into REASONS
+    gross_apr: np.ndarray
+    gas_apr: np.ndarray  # yield lost to gas
+
+    @property
+    def net_apr(self) -> np.ndarray:
+        return self.gross_apr - self.gas_apr
+
+    def rows(self) -> List[Dict]:
+        """One dict per cell, for printing or a DataFrame."""
+        rows = []
+        for index in np.ndindex(self.interval_blocks.shape):
+            g, s, c, p = index
+            rows.append(
+                {
+                    "gas_price": float(self.gas_prices[g]),
+                    "size": float(self.sizes[s]),
+                    "comp_price": float(self.comp_prices[c]),
+                    "profit_factor": int(self.profit_factors[p]),
+                    "interval_blocks": float(self.interval_blocks[index]),
+                    "reason": REASONS[self.reason[index]],
+                    "gas_apr": float(self.gas_apr[index]),
+                    "net_apr": float(self.net_apr[index]),
+                }
+            )
+        return rows
+
+
+def _grid(gas_prices, sizes, comp_prices, profit_factors):
+    return np.meshgrid(
+        np.asarray(gas_prices, dtype=float),
+        np.asarray(sizes, dtype=float),
+        np.asarray(comp_prices, dtype=float),
+        np.asarray(profit_factors, dtype=float),
+        indexing="ij",
+    )
+
+
+def _blocks_to(threshold, per_block):
+    # blocks until a linear accrual reaches threshold; never when nothing accrues
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(per_block > 0, threshold / per_block, np.inf)
+
+
+def break_even_surface(
+    gas_prices: Sequence[float],
+    sizes: Sequence[float],
+    comp_prices: Sequence[float],
+    profit_factors: Sequence[float],
+    rates: Rates,
+    min_comp_to_sell: float = MIN_COMP_TO_SELL,
+    max_report_delay: float = MAX_REPORT_DELAY,
+    harvest_gas: int = HARVEST_GAS,
+) -> Surface:
+    gas_price, size, comp_price, profit_factor = _grid(gas_prices, sizes, comp_prices, profit_factors)
+
+    gas_want = harvest_gas * gas_price * 1e-9 * rates.weth_price
+    comp_per_block = rates.comp_per_block * size
+    want_per_block = size * rates.interest_apr / BLOCKS_PER_YEAR + COMP_HAIRCUT * comp_per_block * comp_price
+
+    comp_blocks = np.maximum(
+        _blocks_to(min_comp_to_sell, comp_per_block),
+        _blocks_to(profit_factor * gas_want / comp_price, comp_per_block),
+    )
+    profit_blocks = _blocks_to(profit_factor * gas_want, want_per_block)
+    delay_blocks = np.full_like(comp_blocks, max_report_delay / SECONDS_PER_BLOCK)
+
+    stacked = np.stack([comp_blocks, profit_blocks, delay_blocks])
+    interval = stacked.min(axis=0)
+    reason = stacked.argmin(axis=0)
+
+    gross_apr = rates.interest_apr + rates.comp_per_block * BLOCKS_PER_YEAR * comp_price
+    gas_apr = gas_want * BLOCKS_PER_YEAR / interval / size
+    return Surface(
+        np.asarray(gas_prices, dtype=float),
+        np.asarray(sizes, dtype=float),
+        np.asarray(comp_prices, dtype=float),
+        np.asarray(profit_factors, dtype=float),
+        interval,
+        reason,
+        np.broadcast_to(gross_apr, interval.shape),
+        gas_apr,
+    )
+
+
+def harvest_trigger_at(
+    blocks: float,
+    gas_price: float,
+    size: float,
+    comp_price: float,
+    profit_factor: float,
+    rates: Rates,
+    min_comp_to_sell: float = MIN_COMP_TO_SELL,
+    max_report_delay: float = MAX_REPORT_DELAY,
+    harvest_gas: int = HARVEST_GAS,
+) -> bool:
+    """Whether the linear model triggers `blocks` after the last harvest."""
+    surface = break_even_surface([gas_price], [size], [comp_price], [profit_factor], rates, min_comp_to_sell, max_report_delay, harvest_gas)
+    return bool(blocks >= surface.interval_blocks.item())
+
+
+def harvest_decision(
+    state,
+    profit_factor: int,
+    min_comp_to_sell: int,
+    max_report_delay: int,
+    timestamp: int,
+    last_report: int,
+    total_debt: int,
+) -> bool:
+    """Strategy._harvestDecision, in integers, on a triggerState read (a scripts.snapshot.TriggerState)."""
+    claimable = state.claimable_comp
+    if claimable > min_comp_to_sell and claimable + state.comp_balance > state.comp_gas_cost * profit_factor:
+        return True
+    if timestamp - last_report >= max_report_delay:
+        return True
+    if state.debt_outstanding > profit_factor * state.want_gas_cost:
+        return True
+    profit = max(state.estimated_total_assets - total_debt, 0)
+    return profit_factor * state.want_gas_cost < state.credit_available + profit
+
+
+def format_surface(surface: Surface, profit_factor_index: int = 0, comp_price_index: int = 0) -> str:
+    """Harvest interval in hours and net APR for every gas price and size, at one COMP price and profitFactor."""
+    comp_price = surface.comp_prices[comp_price_index]
+    profit_factor = surface.profit_factors[profit_factor_index]
+    lines = [f"COMP at {comp_price:g}, profitFactor {profit_factor:g}: harvest interval (hours) / net APR"]
+    lines.append(f"{'gwei':>6} " + " ".join(f"{size:>18,.0f}" for size in surface.sizes))
+    for g, gas_price in enumerate(surface.gas_prices):
+        cells = []
+        for s in range(len(surface.sizes)):
+            index = (g, s, comp_price_index, profit_factor_index)
+            hours = surface.interval_blocks[index] * SECONDS_PER_BLOCK / 3600
+            cells.append(f"{hours:>7.1f} {REASONS[surface.reason[index]][0]} {surface.net_apr[index]:>7.2%}")
+        lines.append(f"{gas_price:>6g} " + " ".join(f"{cell:>18}" for cell in cells))
+    return "\n".join(lines)
+
+
+def main(comp_per_block: float = 2.5e-10, interest_apr: float = -0.01, weth_price: float = 2000.0):
+    rates = Rates(comp_per_block, interest_apr, weth_price)
+    surface = break_even_surface([20, 50, 100, 200], [1e5, 1e6, 1e7, 1e8], [100, 300], [50, 100, 200], rates)
+    for c in range(len(surface.comp_prices)):
+        for p in range(len(surface.profit_factors)):
+            print(format_surface(surface, p, c) + "\n")
@@ -0,0 +1,298 @@
+"""
+Keeper daemon for the strategies we operate.
+
+Each polling pass picks one block, snapshots every configured strategy at
+that block concurrently (one batched request per strategy, run on a thread
+pool from asyncio), and turns the trigger results into prioritised jobs:
+
+    0  strategy close to the liquidation danger zone: tend it (or harvest it
+       when harvest is what its triggers ask for), closest to liquidation first
+    1  harvest
+    2  tend
+
+Jobs are then sent one at a time in that order, since they share the keeper's
+nonce. A pass takes about as long as the slowest strategy, not the sum, and
+asks the gas oracle (scripts/gas_oracle.py) for a price once.
+
+Before a harvest or tend, `send` refreshes the strategy's wantPerMillionGas
+(the gas price its flash loan routing weighs gas at) when the oracle's price
+has moved more than GAS_PRICE_TOLERANCE away from it.
+
+With a BatchHarvester (contracts/BatchHarvester.sol) set as every strategy's
+keeper, `run_batched` instead packs the queue into as few transactions as fit
+under a gas limit (`build_batches`), so the strategies share one 21k base cost.
+The harvester cannot set wantPerMillionGas, so there `refresh_gas_price` is
+left to management.
+
+Usage:
+    brownie run keeper --network mainnet
+    brownie run keeper main_batched <harvester> --network mainnet
+"""
+import asyncio
+import heapq
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+# (strategy, vault) pairs from the live_* fixtures in tests/DAI/conftest.py
+LIVE_STRATEGIES = [
+    ("0x4031afd3B0F71Bace9181E554A9E680Ee4AbE7dF", "0x19D3364A399d251E894aC732651be8B0E4e85001"),  # dai 0.3.0
+    ("0x4D7d4485fD600c61d840ccbeC328BfD76A050F87", "0x5f18C75AbDAe578b483E5F43f12a39cF75b973a9"),  # usdc 0.3.0
+    ("0x2D1b8C783646e146312D317E550EF80EC1Cb08C3", "0x1b048bA60b02f36a7b48754f4edf7E1d9729eBc9"),  # dai2
+    ("0x5A9D49679319FCF3AcFe5559602Dbf31A221BaD6", "0xBFa4D8AA6d8a379aBFe7793399D3DdaCC5bBECBB"),  # dai3
+    ("0x001F751cdfee02e2F0714831bE2f8384db0F71a2", None),  # dai4
+    ("0x31576ac682ee0A15c48C4baC24c567f27CA1b7cD", "0xe2F6b9773BF3A015E2aA70741Bde1498bdB9425b"),  # usdc3
+    ("0xC10363fa66d9c12724e56f269D0438B26581b2eA", None),  # usdc4
+]
+
+PRIORITY_DANGER = 0
+PRIORITY_HARVEST = 1
+PRIORITY_TEND = 2
+
+# "close to" the danger zone: within this multiple of blocksToLiquidationDangerZone
+DANGER_MARGIN = 1.25
+# same gas assumption as the harvest() helper in tests/DAI/useful_methods.py
+HARVEST_GAS = 1500000
+TEND_GAS = 1000000
+POLL_INTERVAL = 60
+# keep batches well under the block gas limit so they still get included
+BATCH_GAS_LIMIT = 10000000
+# how far the stored wantPerMillionGas may drift from the quote before we pay to update it
+GAS_PRICE_TOLERANCE = 0.25
+
+# BatchHarvester.NONE / HARVEST / TEND
+ACTIONS = {"harvest": 1, "tend": 2}
+
+
+@dataclass(order=True)
+class Job:
+    priority: int
+    blocks_until_liquidation: int
+    sequence: int
+    action: str = field(compare=False)
+    strategy: str = field(compare=False)
+    snapshot: Any = field(compare=False, repr=False)
+
+
+def near_danger_zone(snapshot, margin: float = DANGER_MARGIN) -> bool:
+    if snapshot.blocks_until_liquidation is None or snapshot.danger_zone is None:
+        return False
+    return snapshot.blocks_until_liquidation <= snapshot.danger_zone * margin
+
+
+def plan_job(snapshot, sequence: int, margin: float = DANGER_MARGIN) -> Optional[Job]:
+    """The job a snapshot asks for, if any."""
+    if snapshot.harvest_trigger:
+        action, priority = "harvest", PRIORITY_HARVEST
+    elif snapshot.tend_trigger:
+        action, priority = "tend", PRIORITY_TEND
+    else:
+        return None
+
+    if near_danger_zone(snapshot, margin):
+        priority = PRIORITY_DANGER
+    urgency = snapshot.blocks_until_liquidation
+    urgency = 2 ** 256 - 1 if urgency is None else int(urgency)
+    return Job(priority, urgency, sequence, action, snapshot.address, snapshot)
+
+
+def job_gas(job: Job) -> int:
+    return HARVEST_GAS if job.action == "harvest" else TEND_GAS
+
+
+def build_batches(jobs: Sequence[Job], gas_limit: int = BATCH_GAS_LIMIT, gas: Callable[[Job], int] = job_gas) -> List[List[Job]]:
+    """
+    Pack jobs into as few batches as fit under `gas_limit` each, first fit in
+    priority order, so the most urgent jobs land in the first transaction.
+    A job too big for any batch goes out alone.
+    """
+    batches: List[List[Job]] = []
+    room: List[int] = []
+    for job in sorted(jobs):
+        needed = gas(job)
+        for i, left in enumerate(room):
+            if needed <= left:
+                batches[i].append(job)
+                room[i] -= needed
+                break
+        else:
+            batches.append([job])
+            room.append(max(gas_limit - needed, 0))
+    return batches
+
+
+def gas_price_stale(stored: int, quoted: int, tolerance: float = GAS_PRICE_TOLERANCE) -> bool:
+    """Whether a stored wantPerMillionGas is more than `tolerance` (relative) away from a fresh quote."""
+    if quoted <= 0:
+        return False
+    return abs(stored - quoted) > quoted * tolerance
+
+
+def refresh_gas_price(strategy, account, gas_price: int = None, tolerance: float = GAS_PRICE_TOLERANCE):
+    """setWantPerMillionGas to the oracle's gas price when the stored one is stale. The transaction, or None."""
+    from scripts.route_planner import quote_want_per_million_gas
+
+    if gas_price is None:
+        from scripts.gas_oracle import default_oracle
+
+        gas_price = default_oracle().gas_price()
+    quoted = quote_want_per_million_gas(strategy, gas_price)
+    if not gas_price_stale(strategy.wantPerMillionGas(), quoted, tolerance):
+        return None
+    return strategy.setWantPerMillionGas(quoted, {"from": account})
+
+
+def _harvest_gas_cost() -> int:
+    from scripts.gas_oracle import default_oracle
+
+    return default_oracle().gas_cost(HARVEST_GAS)
+
+
+def _chain_height() -> int:
+    from brownie import chain
+
+    return chain.height
+
+
+class Keeper:
+    def __init__(
+        self,
+        strategies: Sequence[Tuple[str, Optional[str]]],
+        gas_cost: Callable[[], int] = None,
+        snapshot: Callable = None,
+        block_number: Callable[[], int] = None,
+        max_workers: int = 16,
+        danger_margin: float = DANGER_MARGIN,
+    ):
+        if snapshot is None:
+            from scripts.snapshot import snapshot_strategy as snapshot
+        if block_number is None:
+            block_number = _chain_height
+        if gas_cost is None:
+            gas_cost = _harvest_gas_cost
+
+        self.strategies = [(str(s), v and str(v)) for s, v in strategies]
+        self.gas_cost = gas_cost
+        self.snapshot = snapshot
+        self.block_number = block_number
+        self.danger_margin = danger_margin
+        self.pool = ThreadPoolExecutor(max_workers=max_workers)
+        self.queue: List[Job] = []
+        self._sequence = itertools.count()
+
+    async def poll(self) -> List[Job]:
+        """Snapshot every strategy at one block and queue whatever they ask for."""
+        loop = asyncio.get_event_loop()
+        block, gas_cost = await asyncio.gather(
+            loop.run_in_executor(self.pool, self.block_number), loop.run_in_executor(self.pool, self.gas_cost)
+        )
+
+        snapshots = await asyncio.gather(
+            *(
+                loop.run_in_executor(self.pool, self._snapshot, strategy, vault, gas_cost, block)
+                for strategy, vault in self.strategies
+            ),
+            return_exceptions=True,
+        )
+
+        for (strategy, _), snapshot in zip(self.strategies, snapshots):
+            if isinstance(snapshot, Exception):
+                print(f"{strategy}: snapshot failed: {snapshot!r}")
+                continue
+            job = plan_job(snapshot, next(self._sequence), self.danger_margin)
+            if job is not None and all(queued.strategy != job.strategy for queued in self.queue):
+                heapq.heappush(self.queue, job)
+        return sorted(self.queue)
+
+    def _snapshot(self, strategy, vault, gas_cost, block):
+        return self.snapshot(strategy, vault=vault, gas_cost=gas_cost, block=block)
+
+    def pop(self) -> Optional[Job]:
+        return heapq.heappop(self.queue) if self.queue else None
+
+    async def run(self, execute: Callable[[Job], Any], interval: float = POLL_INTERVAL, passes: int = None):
+        """Poll and execute queued jobs, highest priority first, until `passes` run out."""
+        loop = asyncio.get_event_loop()
+        for _ in itertools.count() if passes is None else range(passes):
+            await self.poll()
+            while self.queue:
+                job = self.pop()
+                try:
+                    await loop.run_in_executor(self.pool, execute, job)
+                except Exception as e:
+                    print(f"{job.action} {job.strategy} failed: {e!r}")
+            await asyncio.sleep(interval)
+
+    async def run_batched(
+        self,
+        execute_batch: Callable[[List[Job]], Any],
+        gas_limit: int = BATCH_GAS_LIMIT,
+        interval: float = POLL_INTERVAL,
+        passes: int = None,
+    ):
+        """Like `run`, but sends the queue as batches built by `build_batches`."""
+        loop = asyncio.get_event_loop()
+        for _ in itertools.count() if passes is None else range(passes):
+            await self.poll()
+            jobs = [self.pop() for _ in range(len(self.queue))]
+            for batch in build_batches(jobs, gas_limit):
+                try:
+                    await loop.run_in_executor(self.pool, execute_batch, batch)
+                except Exception as e:
+                    print(f"batch of {len(batch)} failed: {e!r}")
+            await asyncio.sleep(interval)
+
+
+def send(account) -> Callable[[Job], Any]:
+    """Executor that sends the job's harvest or tend from `account`, after `refresh_gas_price`."""
+    from brownie import Strategy
+
+    def execute(job: Job):
+        print(f"{job.action} {job.strategy} (priority {job.priority})")
+        strategy = Strategy.at(job.strategy)
+        try:
+            refresh_gas_price(strategy, account)
+        except Exception as e:
+            # routing on a stale price is still better than not harvesting
+            print(f"{job.strategy}: gas price refresh failed: {e!r}")
+        return getattr(strategy, job.action)({"from": account})
+
+    return execute
+
+
+def send_batch(account, harvester) -> Callable[[List[Job]], List[bool]]:
+    """
+    Batch executor: runs the jobs through BatchHarvester.execute from `account`
+    and returns whether each one succeeded, from the Worked events.
+    """
+    from brownie import BatchHarvester
+
+    harvester = BatchHarvester.at(harvester)
+
+    def execute(batch: List[Job]) -> List[bool]:
+        strategies = [job.strategy for job in batch]
+        actions = [ACTIONS[job.action] for job in batch]
+        tx = harvester.execute(strategies, actions, {"from": account, "gas_limit": sum(map(job_gas, batch)) + 100000})
+        results = {}
+        for event in tx.events["Worked"] if "Worked" in tx.events else []:
+            results[str(event["strategy"])] = event["success"]
+            if not event["success"]:
+                print(f"{event['strategy']} failed: {bytes(event['reason'])!r}")
+        return [results.get(s, False) for s in strategies]
+
+    return execute
+
+
+def main():
+    from brownie import accounts
+
+    keeper = Keeper(LIVE_STRATEGIES)
+    asyncio.run(keeper.run(send(accounts.load("keeper"))))
+
+
+def main_batched(harvester: str):
+    from brownie import accounts
+
+    keeper = Keeper(LIVE_STRATEGIES)
+    asyncio.run(keeper.run_batched(send_batch(accounts.load("keeper"), harvester)))
@@ -0,0 +1,260 @@
+"""
+Offline, vectorised replica of the leverage maths in `contracts/Strategy.sol`.
+
+Every function works element-wise on equally shaped integer arrays so that
+thousands of positions can be evaluated in a single call. Values are held in
+numpy object arrays of python ints, which keeps the arithmetic bit-for-bit with
+the contract: divisions truncate like SafeMath `div` and a SafeMath revert is
+recorded in a `reverted` mask instead of aborting the whole batch.
+
+Positions are described the same way `getAccountSnapshot` describes them, as a
+cToken balance, a borrow balance and an exchange rate, so the cToken rounding
+of `mint` and `redeemUnderlying` is reproduced too. All calls are modelled as
+happening inside one block (no interest accrual between them), which is what
+happens inside a single `harvest()`.
+"""
+from typing import NamedTuple, Tuple
+
+import numpy as np
+
+EXP_SCALE = 10 ** 18
+# _calculateDesiredPosition stops this many wei short of the target borrow
+SAFETY_MARGIN = 10 ** 5
+# borrow/mint pairs a harvest runs without flash loans, and redeem/repay pairs a
+# harvest or withdrawal runs (Strategy._routeMarket's maxPairs)
+MAX_LEVERAGE_STEPS = 10
+MAX_DELEVERAGE_STEPS = 5
+
+
+def uint(values) -> np.ndarray:
+    """Convert scalars, lists or numeric arrays into an object array of python ints."""
+    arr = np.asarray(values, dtype=object)
+    return np.asarray(np.frompyfunc(int, 1, 1)(arr), dtype=object).reshape(arr.shape)
+
+
+def _sub(a, b, reverted: np.ndarray) -> np.ndarray:
+    # SafeMath.sub: rows that underflow revert and carry on as zero
+    bad = b > a
+    reverted |= bad.astype(bool)
+    return np.where(bad, 0, a - b).astype(object)
+
+
+def _div(a, b, reverted: np.ndarray) -> np.ndarray:
+    # SafeMath.div: truncating division that reverts on a zero denominator
+    bad = b == 0
+    reverted |= np.asarray(bad, dtype=bool)
+    return np.where(bad, 0, a // np.where(bad, 1, b)).astype(object)
+
+
+class Position(NamedTuple):
+    """Strategy position as seen by `cToken.getAccountSnapshot` plus the loose want balance."""
+
+    ctokens: np.ndarray
+    borrows: np.ndarray
+    want: np.ndarray
+    exchange_rate: np.ndarray
+
+    @classmethod
+    def from_snapshot(cls, ctokens, borrows, exchange_rate, want=0) -> "Position":
+        arrays = np.broadcast_arrays(uint(ctokens), uint(borrows), uint(want), uint(exchange_rate))
+        return cls(*(uint(a) for a in arrays))
+
+    @classmethod
+    def from_underlying(cls, deposits, borrows, want=0, exchange_rate=EXP_SCALE) -> "Position":
+        """Build a position from underlying deposits. Exact when the exchange rate is 1e18."""
+        deposits, rate = np.broadcast_arrays(uint(deposits), uint(exchange_rate))
+        ctokens = uint(deposits) * EXP_SCALE // uint(rate)
+        return cls.from_snapshot(ctokens, borrows, rate, want)
+
+    @property
+    def deposits(self) -> np.ndarray:
+        # getCurrentPosition: ctokenBalance.mul(exchangeRate).div(1e18)
+        return self.ctokens * self.exchange_rate // EXP_SCALE
+
+    def collateralisation(self) -> np.ndarray:
+        """storedCollateralisation(): borrows as a 1e18 fraction of deposits."""
+        deposits = self.deposits
+        safe = np.where(deposits == 0, 1, deposits)
+        return np.where(deposits == 0, 0, EXP_SCALE * self.borrows // safe).astype(object)
+
+
+def calculate_desired_position(deposits, borrows, balance, collateral_target, dep, reverted):
+    """_calculateDesiredPosition: how much to change the borrow balance and in which direction."""
+    deposits, borrows, balance, collateral_target = (uint(x) for x in (deposits, borrows, balance, collateral_target))
+    dep = np.broadcast_to(np.asarray(dep, dtype=bool), deposits.shape)
+
+    unwound_deposit = _sub(deposits, borrows, reverted)
+    capped = np.where(balance > unwound_deposit, unwound_deposit, balance).astype(object)
+    desired_supply = np.where(dep, unwound_deposit + balance, unwound_deposit - capped).astype(object)
+
+    num = desired_supply * collateral_target
+    den = _sub(uint(np.full(collateral_target.shape, EXP_SCALE, dtype=object)), collateral_target, reverted)
+    desired_borrow = _div(num, den, reverted)
+    desired_borrow = np.where(desired_borrow > SAFETY_MARGIN, desired_borrow - SAFETY_MARGIN, desired_borrow)
+
+    deficit = desired_borrow < borrows
+    position = np.where(deficit, borrows - desired_borrow, desired_borrow - borrows).astype(object)
+    return position, deficit.astype(bool)
+
+
+def normal_leverage(max_leverage, lent, borrowed, collat_ratio):
+    """_normalLeverage: the extra borrow that keeps us at the collateral factor, capped at max. Zero when over it."""
+    theoretical_borrow = uint(lent) * uint(collat_ratio) // EXP_SCALE
+    borrowed = uint(borrowed)
+    leveraged = np.where(theoretical_borrow > borrowed, theoretical_borrow - borrowed, 0).astype(object)
+    return np.where(leveraged >= max_leverage, max_leverage, leveraged).astype(object)
+
+
+def normal_deleverage(max_deleverage, lent, borrowed, collat_ratio, reverted):
+    """_normalDeleverage: how much can be redeemed and repaid in one step, capped at max."""
+    lent, borrowed, collat_ratio = uint(lent), uint(borrowed), uint(collat_ratio)
+    safe = np.where(collat_ratio == 0, 1, collat_ratio)
+    theoretical_lent = np.where(collat_ratio == 0, 0, borrowed * EXP_SCALE // safe).astype(object)
+    deleveraged = _sub(lent, theoretical_lent, reverted)
+    deleveraged = np.where(deleveraged >= borrowed, borrowed, deleveraged).astype(object)
+    return np.where(deleveraged >= max_deleverage, max_deleverage, deleveraged).astype(object)
+
+
+def _mint(position: Position, amount, active) -> Position:
+    # CToken.mintFresh: mintTokens = amount * 1e18 / exchangeRate (truncated)
+    minted = np.where(active, amount * EXP_SCALE // position.exchange_rate, 0).astype(object)
+    return position._replace(
+        ctokens=position.ctokens + minted, want=np.where(active, position.want - amount, position.want).astype(object)
+    )
+
+
+def _redeem_underlying(position: Position, amount, active) -> Position:
+    # CToken.redeemFresh: redeemTokens = amount * 1e18 / exchangeRate (truncated)
+    burnt = np.where(active, amount * EXP_SCALE // position.exchange_rate, 0).astype(object)
+    return position._replace(
+        ctokens=position.ctokens - burnt, want=np.where(active, position.want + amount, position.want).astype(object)
+    )
+
+
+def _less_dust(amount, dust) -> np.ndarray:
+    return np.where(amount > dust, amount - dust, 0).astype(object)
+
+
+def no_flash_loan(
+    position: Position, max_amount, deficit, collateral_factor, reverted, active=None, steps=1
+) -> Tuple[np.ndarray, np.ndarray, Position]:
+    """
+    _noFlashLoan on the rows selected by `active`: up to `steps` (scalar or per
+    row) borrow/mint (or redeem/repay) pairs planned on an in-memory copy of
+    the position.
+    Returns the amount moved, the pairs run and the new position. Compound is
+    assumed to accept every borrow; the contract stops at the first refusal.
+    """
+    shape = position.ctokens.shape
+    active = np.ones(shape, dtype=bool) if active is None else np.asarray(active, dtype=bool)
+    deficit = np.broadcast_to(np.asarray(deficit, dtype=bool), shape)
+    max_amount, collateral_factor = uint(max_amount), uint(collateral_factor)
+    steps = np.broadcast_to(np.asarray(steps, dtype=np.int64), shape)
+    lent, borrowed = position.deposits, position.borrows
+    # mint rounds the cToken balance down by up to one unit of the exchange rate
+    dust = position.exchange_rate // EXP_SCALE + 1
+
+    # nothing borrowed means nothing left to deleverage
+    moves = active & ~(deficit & (borrowed == 0))
+    down = moves & deficit
+    up = moves & ~deficit
+
+    # leverage: the whole want balance is minted before borrowing against it
+    minting = up & (position.want > 0)
+    lent = np.where(minting, _less_dust(lent + position.want, dust), lent).astype(object)
+    position = _mint(position, position.want, minting)
+
+    amount = np.zeros(shape, dtype=object)
+    pairs = np.zeros(shape, dtype=np.int64)
+    live = moves.copy()
+    for _ in range(int(steps.max(initial=0))):
+        live &= (amount < max_amount) & (pairs < steps)
+        if not live.any():
+            break
+        left = np.where(live, max_amount - amount, 0).astype(object)
+
+        lever = normal_leverage(left, lent, borrowed, collateral_factor)
+        scratch = np.zeros(shape, dtype=bool)
+        delever = normal_deleverage(left, lent, borrowed, collateral_factor, scratch)
+        reverted |= scratch & down & live
+        live &= ~reverted
+
+        step = np.where(live & up, lever, np.where(live & down, delever, 0)).astype(object)
+        live &= step > 0
+        rising, falling = live & up, live & down
+
+        # leverage: borrow then mint the same amount
+        position = position._replace(borrows=np.where(rising, position.borrows + step, position.borrows).astype(object))
+        position = _mint(position._replace(want=np.where(rising, position.want + step, position.want).astype(object)), step, rising)
+        lent = np.where(rising, _less_dust(lent + step, dust), lent).astype(object)
+
+        # deleverage: redeem then repay the same amount
+        position = _redeem_underlying(position, step, falling)
+        position = position._replace(
+            borrows=np.where(falling, position.borrows - step, position.borrows).astype(object),
+            want=np.where(falling, position.want - step, position.want).astype(object),
+        )
+        lent = np.where(falling, lent - step, lent).astype(object)
+
+        borrowed = np.where(rising, borrowed + step, np.where(falling, borrowed - step, borrowed)).astype(object)
+        amount = np.where(live, amount + step, amount).astype(object)
+        pairs += live
+
+    return amount, pairs, position
+
+
+class AdjustResult(NamedTuple):
+    position: Position
+    remaining: np.ndarray  # position change still wanted after the harvest
+    calls: np.ndarray  # number of _noFlashLoan calls (Leverage events), 0 or 1
+    steps: np.ndarray  # borrow/mint or redeem/repay pairs sent to the cToken
+    reverted: np.ndarray
+    withdrawing: np.ndarray  # rows that take the _withdrawSome branch instead
+
+
+def adjust_position(position: Position, collateral_factor, collateral_target, debt_outstanding=0, min_want=0) -> AdjustResult:
+    """
+    adjustPosition with flash loans disabled (`DyDxActive == false`). The
+    route planner then has only plain pairs to offer, up to
+    MAX_DELEVERAGE_STEPS of them when the position is over its target.
+    """
+    shape = position.ctokens.shape
+    collateral_factor = np.broadcast_to(uint(collateral_factor), shape)
+    collateral_target = np.broadcast_to(uint(collateral_target), shape)
+    debt_outstanding = np.broadcast_to(uint(debt_outstanding), shape)
+    min_want = np.broadcast_to(uint(min_want), shape)
+    reverted = np.zeros(shape, dtype=bool)
+
+    withdrawing = (position.want < debt_outstanding).astype(bool)
+    balance = np.where(withdrawing, 0, position.want - debt_outstanding).astype(object)
+    remaining, deficit = calculate_desired_position(
+        position.deposits, position.borrows, balance, collateral_target, True, reverted
+    )
+    active = ~withdrawing & (remaining > min_want) & ~reverted
+    remaining = np.where(withdrawing, 0, remaining).astype(object)
+
+    max_pairs = np.where(deficit, MAX_DELEVERAGE_STEPS, MAX_LEVERAGE_STEPS)
+    amount, steps, position = no_flash_loan(position, remaining, deficit, collateral_factor, reverted, active, max_pairs)
+    remaining = np.where(active, remaining - amount, remaining).astype(object)
+    calls = active.astype(np.int64)
+
+    return AdjustResult(position, remaining, calls, steps, reverted, withdrawing)
+
+
+def harvests_to_target(position: Position, collateral_factor, collateral_target, max_harvests=50, tolerance=1.001):
+    """
+    Number of back to back harvests (no interest, no new deposits) before the
+    collateralisation reaches `collateral_target / tolerance`, the condition
+    the `enormousrunningstrategy` fixture loops on. -1 when never reached.
+    """
+    shape = position.ctokens.shape
+    target = np.broadcast_to(uint(collateral_target), shape)
+    goal = np.array([t / tolerance for t in target.ravel()], dtype=float).reshape(shape)
+    needed = np.full(shape, -1, dtype=np.int64)
+    for harvest in range(1, max_harvests + 1):
+        position = adjust_position(position, collateral_factor, target).position
+        reached = (needed < 0) & (position.collateralisation().astype(float) >= goal)
+        needed[reached] = harvest
+        if (needed >= 0).all():
+            break
+    return needed, position
@@ -0,0 +1,199 @@
+"""
+Reference model of `getblocksUntilLiquidation` (contracts/Libraries/LiquidationMath.sol).
+
+Three estimates of the blocks left before borrows reach the collateralised
+deposit, all taking per-block rates scaled by 1e18:
+
+    blocks_until_liquidation   bit-for-bit replica of the on-chain solver
+                               (binary lifting over fixed point powers)
+    linear_blocks              the linear formula the strategy used before,
+                               which ignores compounding
+    exact_blocks               closed form ceil(ln(c/b) / ln(r)) in floats,
+                               the truth both are measured against
+
+`benchmark` sweeps realistic rate ranges and reports the prediction error of
+the solver and the linear formula, and `measure_gas` adds their gas cost
+when given a deployed `LiquidationMathHarness`.
+"""
+import itertools
+import math
+from dataclasses import dataclass
+from typing import Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+MAX_UINT = 2 ** 256 - 1
+RAY = 10 ** 27
+HORIZON_BITS = 32
+MAX_THRESHOLD = 2 ** 128
+BLOCKS_PER_YEAR = 2102400
+# Strategy.blocksToLiquidationDangerZone
+DANGER_ZONE = 46500
+
+# annual rates and collateralisations the strategies actually see
+BORROW_APRS = [0.02, 0.04, 0.08, 0.12, 0.2]
+SUPPLY_SHARES = [0.3, 0.6, 0.85]  # supply rate as a share of the borrow rate
+COLLATERALISATIONS = [0.6, 0.7, 0.73, 0.74, 0.749]  # borrows / deposits
+COLLATERAL_FACTOR = 0.75
+
+
+def blocks_until_liquidation(collateralised_deposit: int, borrows: int, supply_rate: int, borrow_rate: int) -> int:
+    """LiquidationMath.blocksUntilLiquidation, line by line."""
+    if borrows == 0:
+        return MAX_UINT
+    if collateralised_deposit <= borrows:
+        return 0
+
+    ratio = (RAY + borrow_rate * 10 ** 9) * RAY // (RAY + supply_rate * 10 ** 9)
+    if ratio <= RAY:
+        return MAX_UINT
+
+    threshold = min(collateralised_deposit * RAY // borrows, MAX_THRESHOLD)
+
+    # capped at the threshold like the contract, where growth * power has to fit in 256 bits
+    powers = [min(ratio, threshold)]
+    for _ in range(1, HORIZON_BITS):
+        previous = powers[-1]
+        powers.append(threshold if previous >= threshold else min(previous * previous // RAY, threshold))
+
+    growth, blocks = RAY, 0
+    for i in reversed(range(HORIZON_BITS)):
+        step = growth * powers[i] // RAY
+        if step < threshold:
+            growth, blocks = step, blocks + (1 << i)
+
+    if blocks == (1 << HORIZON_BITS) - 1:
+        return MAX_UINT
+    return blocks + 1
+
+
+def linear_blocks(collateralised_deposit: int, borrows: int, supply_rate: int, borrow_rate: int) -> int:
+    """The linear estimate getblocksUntilLiquidation returned before compounding was taken into account."""
+    denom1 = borrows * borrow_rate
+    denom2 = collateralised_deposit * supply_rate
+    if denom2 >= denom1:
+        return MAX_UINT
+    if collateralised_deposit < borrows:
+        raise ArithmeticError("SafeMath: subtraction overflow")
+    return (collateralised_deposit - borrows) * 10 ** 18 // (denom1 - denom2)
+
+
+def exact_blocks(collateralised_deposit, borrows, supply_rate, borrow_rate) -> np.ndarray:
+    """
+    Smallest n with borrows * (1 + b)^n >= collateralised_deposit * (1 + s)^n,
+    element-wise in floats. inf where the borrows never catch up.
+    """
+    c, b, s, r = (np.asarray(x, dtype=float) for x in (collateralised_deposit, borrows, supply_rate, borrow_rate))
+    growth = np.log1p(r / 1e18) - np.log1p(s / 1e18)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        n = np.ceil(np.log(c / b) / growth)
+    n = np.where((b == 0) | (growth <= 0), np.inf, n)
+    return np.where((b > 0) & (c <= b), 0, n)
+
+
+def per_block(apr: float) -> int:
+    return int(apr * 1e18) // BLOCKS_PER_YEAR
+
+
+@dataclass(frozen=True)
+class Case:
+    collateralisation: float
+    borrow_apr: float
+    supply_apr: float
+    collateral_factor: float = COLLATERAL_FACTOR
+    deposits: int = 10 ** 24
+
+    @property
+    def args(self) -> Tuple[int, int, int, int]:
+        """(collateralisedDeposit, borrows, supplyRate, borrowRate) as the contract sees them."""
+        collateralised = self.deposits * int(self.collateral_factor * 1e18) // 10 ** 18
+        borrows = int(self.deposits * self.collateralisation)
+        return collateralised, borrows, per_block(self.supply_apr), per_block(self.borrow_apr)
+
+
+def cases(
+    collateralisations: Iterable[float] = COLLATERALISATIONS,
+    borrow_aprs: Iterable[float] = BORROW_APRS,
+    supply_shares: Iterable[float] = SUPPLY_SHARES,
+) -> List[Case]:
+    return [
+        Case(collat, borrow, borrow * share)
+        for collat, borrow, share in itertools.product(collateralisations, borrow_aprs, supply_shares)
+    ]
+
+
+@dataclass(frozen=True)
+class Result:
+    case: Case
+    exact: float
+    solver: int
+    linear: int
+
+    def error(self, estimate: int) -> float:
+        """Relative error against the compounding answer, 0 when both say never."""
+        if math.isinf(self.exact):
+            return 0.0 if estimate == MAX_UINT else -1.0
+        if estimate == MAX_UINT:
+            return math.inf
+        return (estimate - self.exact) / max(self.exact, 1)
+
+    @property
+    def linear_error(self) -> float:
+        return self.error(self.linear)
+
+    @property
+    def solver_error(self) -> float:
+        return self.error(self.solver)
+
+
+def benchmark(sweep: Sequence[Case] = None) -> List[Result]:
+    sweep = cases() if sweep is None else sweep
+    args = [case.args for case in sweep]
+    exact = exact_blocks(*zip(*args))
+    return [
+        Result(case, float(truth), blocks_until_liquidation(*a), linear_blocks(*a))
+        for case, a, truth in zip(sweep, args, exact)
+    ]
+
+
+def measure_gas(harness, sweep: Sequence[Case] = None) -> List[Tuple[Case, int, int]]:
+    """(case, solver gas, linear gas) from a deployed LiquidationMathHarness."""
+    sweep = cases() if sweep is None else sweep
+    return [
+        (
+            case,
+            harness.blocksUntilLiquidation.estimate_gas(*case.args),
+            harness.linearBlocksUntilLiquidation.estimate_gas(*case.args),
+        )
+        for case in sweep
+    ]
+
+
+def format_table(results: Sequence[Result]) -> str:
+    lines = [f"{'collat':>7} {'borrow':>7} {'supply':>7} {'exact':>12} {'solver':>12} {'linear':>12} {'linear err':>11}"]
+    for r in results:
+        c = r.case
+
+        def show(n):
+            return "never" if n == MAX_UINT or math.isinf(n) else f"{int(n)}"
+
+        lines.append(
+            f"{c.collateralisation:>7.3f} {c.borrow_apr:>7.2%} {c.supply_apr:>7.2%} "
+            f"{show(r.exact):>12} {show(r.solver):>12} {show(r.linear):>12} {r.linear_error:>+11.2%}"
+        )
+    return "\n".join(lines)
+
+
+def main():
+    results = benchmark()
+    print(format_table(results))
+    near = [r for r in results if r.exact <= 10 * DANGER_ZONE]
+    if near:
+        worst = max(near, key=lambda r: abs(r.linear_error))
+        print(f"\nworst linear error within 10x the danger zone: {worst.linear_error:+.2%} ({worst.case})")
+
+    from brownie import LiquidationMathHarness, accounts
+
+    harness = LiquidationMathHarness.deploy({"from": accounts[0]})
+    gas = measure_gas(harness)
+    print(f"mean gas: solver {np.mean([g[1] for g in gas]):.0f}, linear {np.mean([g[2] for g in gas]):.0f}")
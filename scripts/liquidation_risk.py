@@ -0,0 +1,292 @@
+"""
+Monte Carlo liquidation risk of a leveraged Compound position, for choosing
+`collateralTarget` and `blocksToLiquidationDangerZone`.
+
+For a same-asset position only interest can push borrows over the
+collateralised deposit: borrows compound at the borrow rate, deposits at the
+supply rate. The rates come from the market's jump rate model
+(scripts/rate_model.py) applied to simulated utilisation paths:
+mean-reverting in logit space, with upward jumps for borrow demand spikes.
+COMP follows a geometric Brownian motion.
+
+On every path the strategy behaves as on chain:
+- the keeper polls `tendTrigger` every `poll_blocks`;
+- it tends back to the target once the compounding blocks-until-liquidation
+  (LiquidationMath) falls under the danger zone;
+- it harvests, re-levering to the target, every `harvest_blocks`.
+The keeper has random outages. A liquidation happens when the
+collateralisation crosses the collateral factor before the next tend. It
+costs the liquidation incentive on the repaid half of the borrow.
+
+Every (target, danger zone) pair sees the same market paths, so their
+differences are not sampling noise. `sweep` spreads the grid over a process
+pool, and `recommend` picks the highest-yield pair within a risk budget:
+
+    brownie run liquidation_risk --network mainnet
+"""
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from scripts.rate_model import Market
+
+BLOCKS_PER_YEAR = 2102400
+# Strategy defaults
+COLLATERAL_TARGET = 0.73
+DANGER_ZONE = 46500
+TARGETS = [0.6, 0.65, 0.68, 0.7, 0.72, 0.73, 0.74]
+DANGER_ZONES = [6500, 13000, 26000, 46500, 93000]
+LIQUIDATION_INCENTIVE = 0.08
+CLOSE_FACTOR = 0.5
+
+# for scripts.snapshot.batch_call: name: (signature, output types)
+SIGNATURES = {
+    "cToken": ("cToken()", ["address"]),
+    "uniswapRouter": ("uniswapRouter()", ["address"]),
+    "weth": ("weth()", ["address"]),
+    "comp": ("comp()", ["address"]),
+    "getAmountsOut": ("getAmountsOut(uint256,address[])", ["uint256[]"]),
+}
+
+
+@dataclass(frozen=True)
+class Position:
+    deposits: float  # whole want
+    borrows: float
+    collateral_factor: float
+
+    @property
+    def equity(self) -> float:
+        return self.deposits - self.borrows
+
+    @property
+    def collateralisation(self) -> float:
+        return self.borrows / self.deposits if self.deposits else 0.0
+
+
+@dataclass(frozen=True)
+class Dynamics:
+    reversion: float = 12.0  # per year, pull of logit utilisation back to today's
+    volatility: float = 1.5  # of logit utilisation, per sqrt(year)
+    jump_intensity: float = 6.0  # utilisation spikes per year
+    jump_size: float = 1.0  # mean spike, in logit units
+    comp_volatility: float = 1.0
+    comp_drift: float = 0.0
+
+
+@dataclass(frozen=True)
+class Keeper:
+    poll_blocks: int = 240  # how often tendTrigger is checked, also the simulation step
+    harvest_blocks: int = 6500 * 7
+    outages_per_year: float = 12.0
+    mean_outage_blocks: int = 6500
+    tend_cost: float = 0.0  # want spent on gas per tend
+
+
+@dataclass(frozen=True)
+class Outcome:
+    target: float
+    danger_zone: int
+    p_liquidation: float
+    apr: float  # mean over paths
+    apr_p05: float
+    tends_per_year: float
+
+
+def _logit(u):
+    return np.log(u / (1 - u))
+
+
+def market_paths(
+    market: Market, comp_price: float, dynamics: Dynamics, keeper: Keeper, paths: int, steps: int, seed: int
+) -> Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]]:
+    """Per step: borrow and supply rate per block, COMP price and whether the keeper is up, one entry per path."""
+    rng = np.random.default_rng(seed)
+    dt = keeper.poll_blocks / BLOCKS_PER_YEAR
+    mean = _logit(min(max(market.utilisation, 1e-4), 1 - 1e-4))
+    z = np.full(paths, mean)
+    log_price = np.full(paths, math.log(comp_price) if comp_price > 0 else -np.inf)
+    up = np.ones(paths, dtype=bool)
+    fail = keeper.outages_per_year * dt
+    recover = min(keeper.poll_blocks / keeper.mean_outage_blocks, 1.0)
+
+    for _ in range(steps):
+        jumps = rng.gamma(rng.poisson(dynamics.jump_intensity * dt, paths), dynamics.jump_size)
+        z += dynamics.reversion * (mean - z) * dt + dynamics.volatility * math.sqrt(dt) * rng.standard_normal(paths) + jumps
+        u = np.clip(1 / (1 + np.exp(-z)), 0.0, 0.9999)
+        log_price += (dynamics.comp_drift - dynamics.comp_volatility ** 2 / 2) * dt + (
+            dynamics.comp_volatility * math.sqrt(dt) * rng.standard_normal(paths)
+        )
+        draws = rng.random(paths)
+        up = np.where(up, draws >= fail, draws < recover)
+        yield market.model.borrow_rate(u), market.model.supply_rate(u), np.exp(log_price), up
+
+
+def blocks_until_liquidation(collateralisation, collateral_factor, borrow_rate, supply_rate) -> np.ndarray:
+    """Compounding blocks until borrows reach deposits * collateral factor, in floats (see LiquidationMath)."""
+    growth = np.log1p(borrow_rate) - np.log1p(supply_rate)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        n = np.log(collateral_factor / collateralisation) / growth
+    return np.where(growth > 0, np.maximum(n, 0), np.inf)
+
+
+def simulate(
+    position: Position,
+    market: Market,
+    comp_price: float,
+    targets: Sequence[float],
+    danger_zones: Sequence[int],
+    paths: int = 4000,
+    horizon_blocks: int = 6500 * 30,
+    dynamics: Dynamics = Dynamics(),
+    keeper: Keeper = Keeper(),
+    seed: int = 0,
+    start: Optional[float] = None,
+) -> List[Outcome]:
+    """
+    One Outcome per (target, danger zone) pair, all simulated together on the
+    same `paths` market paths. Every pair starts at its own target unless
+    `start` gives the collateralisation to begin from.
+    """
+    target = np.asarray(targets, dtype=float)[:, None]
+    danger = np.asarray(danger_zones, dtype=float)[:, None]
+    if target.shape != danger.shape:
+        raise ValueError("targets and danger_zones pair up one to one")
+    if (target >= position.collateral_factor).any():
+        raise ValueError("targets must be below the collateral factor")
+
+    cf, step = position.collateral_factor, keeper.poll_blocks
+    steps = max(horizon_blocks // step, 1)
+    grid = (len(target), paths)
+    c = np.broadcast_to(target if start is None else np.full_like(target, start), grid).copy()
+    wealth = np.ones(grid)
+    liquidated = np.zeros(grid, dtype=bool)
+    tends = np.zeros(grid)
+    since_harvest = np.zeros(paths)
+    tend_cost = keeper.tend_cost / position.equity if position.equity else 0.0
+
+    for borrow_rate, supply_rate, price, up in market_paths(market, comp_price, dynamics, keeper, paths, steps, seed):
+        grow_borrows, grow_deposits = (1 + borrow_rate) ** step, (1 + supply_rate) ** step
+
+        # return on equity over the step, with deposits and borrows per unit of equity
+        deposits = 1 / (1 - c)
+        borrows = deposits - 1
+        comp = step * price * (deposits * market.comp_supply_per_block + borrows * market.comp_borrow_per_block)
+        wealth *= 1 + deposits * (grow_deposits - 1) - borrows * (grow_borrows - 1) + comp
+        c = c * grow_borrows / grow_deposits
+
+        # liquidators repay CLOSE_FACTOR of the borrow and seize it plus the incentive in collateral
+        hit = c >= cf
+        if hit.any():
+            repaid = CLOSE_FACTOR * c
+            wealth = np.where(hit, wealth * (1 - LIQUIDATION_INCENTIVE * repaid / (1 - c)), wealth)
+            c = np.where(hit, (c - repaid) / (1 - repaid * (1 + LIQUIDATION_INCENTIVE)), c)
+            liquidated |= hit
+
+        since_harvest += step
+        harvest = up & (since_harvest >= keeper.harvest_blocks)
+        since_harvest[harvest] = 0
+        tend = up & ~harvest & (blocks_until_liquidation(c, cf, borrow_rate, supply_rate) <= danger)
+        c = np.where(harvest | tend, target, c)
+        wealth -= tend * tend_cost
+        tends += tend
+
+    years = steps * step / BLOCKS_PER_YEAR
+    aprs = (wealth - 1) / years
+    return [
+        Outcome(
+            target=float(t),
+            danger_zone=int(d),
+            p_liquidation=float(liquidated[i].mean()),
+            apr=float(aprs[i].mean()),
+            apr_p05=float(np.percentile(aprs[i], 5)),
+            tends_per_year=float(tends[i].mean() / years),
+        )
+        for i, (t, d) in enumerate(zip(target[:, 0], danger[:, 0]))
+    ]
+
+
+def _simulate_chunk(args) -> List[Outcome]:
+    grid, kwargs = args
+    targets, danger_zones = zip(*grid)
+    return simulate(targets=targets, danger_zones=danger_zones, **kwargs)
+
+
+def sweep(
+    position: Position,
+    market: Market,
+    comp_price: float,
+    targets: Sequence[float] = TARGETS,
+    danger_zones: Sequence[int] = DANGER_ZONES,
+    workers: int = None,
+    **kwargs,
+) -> List[Outcome]:
+    """
+    Every target against every danger zone, split over `workers` processes
+    (default: every core). All chunks use the same seed, so every pair sees the same paths.
+    """
+    grid = [(t, d) for t in targets if t < position.collateral_factor for d in danger_zones]
+    workers = min(workers or os.cpu_count() or 1, len(grid))
+    common = dict(position=position, market=market, comp_price=comp_price, **kwargs)
+    chunks = [(grid[i::workers], common) for i in range(workers)]
+
+    if workers == 1:
+        results = [_simulate_chunk(chunks[0])]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_simulate_chunk, chunks))
+    return sorted((o for chunk in results for o in chunk), key=lambda o: (o.target, o.danger_zone))
+
+
+def recommend(outcomes: Sequence[Outcome], risk_budget: float) -> Optional[Outcome]:
+    """Highest mean APR with liquidation probability within `risk_budget`; the larger danger zone on ties."""
+    safe = [o for o in outcomes if o.p_liquidation <= risk_budget]
+    if not safe:
+        return None
+    return max(safe, key=lambda o: (round(o.apr, 6), o.danger_zone))
+
+
+def from_strategy(strategy, block: int = None) -> Tuple[Position, Market, float]:
+    """Position, market and COMP price (in want) of a deployed strategy."""
+    from brownie import chain
+
+    from scripts.comp_accrual_model import COMPTROLLER
+    from scripts.rate_model import read_market
+    from scripts.snapshot import _address, batch_call
+
+    block = chain.height if block is None else block
+    strategy = _address(strategy)
+    (deposits, borrows), ctoken, want, router, weth, comp = batch_call(
+        [(strategy, key, ()) for key in ("getCurrentPosition", "cToken", "want", "uniswapRouter", "weth", "comp")], block, SIGNATURES
+    )
+    market = read_market(ctoken, COMPTROLLER, block)
+    decimals, amounts = batch_call(
+        [(want, "decimals", ()), (router, "getAmountsOut", (10 ** 18, [comp, weth, want]))], block, SIGNATURES
+    )
+    unit = 10 ** decimals
+    position = Position(deposits / unit, borrows / unit, market.collateral_factor)
+    return position, market, amounts[-1] / unit
+
+
+def format_table(outcomes: Sequence[Outcome]) -> str:
+    lines = [f"{'target':>7} {'danger':>7} {'p(liq)':>8} {'apr':>8} {'apr p5':>8} {'tends/yr':>9}"]
+    for o in outcomes:
+        lines.append(
+            f"{o.target:>7.3f} {o.danger_zone:>7} {o.p_liquidation:>8.2%} {o.apr:>8.2%} {o.apr_p05:>8.2%} {o.tends_per_year:>9.1f}"
+        )
+    return "\n".join(lines)
+
+
+def main(risk_budget: float = 0.001):
+    from scripts.keeper import LIVE_STRATEGIES
+
+    position, market, comp_price = from_strategy(LIVE_STRATEGIES[0][0])
+    print(f"position {position}, utilisation {market.utilisation:.2%}, COMP {comp_price:.2f}")
+    outcomes = sweep(position, market, comp_price, paths=10000)
+    print(format_table(outcomes))
+    best = recommend(outcomes, risk_budget)
+    print(f"\nbest within {risk_budget:.2%} liquidation risk: {best}")
@@ -0,0 +1,211 @@
+"""
+Local stand-ins for Compound, Uniswap, dYdX Solo and Aave.
+
+The strategy hard-codes its protocol addresses as constants, so instead of
+deploying mocks somewhere else and rewiring the strategy, the mocks are
+deployed normally and their runtime code is then copied ("etched") onto the
+mainnet addresses. Storage is not copied, which is why the mock contracts are
+configured through `initialize` / setter calls instead of constructors.
+
+Only dev networks that are not forks get the mock stack. On `mainnet-fork`
+`deploy_mock_stack` is never called and the tests talk to the real protocols,
+so both modes share one test suite.
+
+brownie's `module_isolation` resets to the chain as it was when brownie
+connected, which would throw the stack away. `deploy_mock_stack` ends with a
+`chain.snapshot()` of the deployed stack, and the conftests override
+`module_isolation` to `chain.revert()` to it. `fn_isolation` snapshots and
+reverts to the start of each test, which is that same state as long as no
+module or session fixture sends transactions.
+
+Usage:
+    brownie test --network hardhat
+    brownie run mock_stack --network hardhat
+"""
+from typing import Dict
+
+from brownie import (
+    MockAaveAddressesProvider,
+    MockAaveLendingPool,
+    MockComptroller,
+    MockCToken,
+    MockERC20,
+    MockInterestRateModel,
+    MockSoloMargin,
+    MockUniswapRouter,
+    MockUniswapPair,
+    Wei,
+    accounts,
+    chain,
+    network,
+    web3,
+)
+from brownie._config import CONFIG
+from brownie.network.account import Account
+
+MAINNET = {
+    "dai": "0x6B175474E89094C44Da98b954EedeAC495271d0F",
+    "usdc": "0xA0b86991c6218b36c1d19D4a2e9Eb0cE3606eB48",
+    "weth": "0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2",
+    "comp": "0xc00e94Cb662C3520282E6f5717214004A7f26888",
+    "cdai": "0x5d3a536E4D6DbD6114cc1Ead35777bAB948E3643",
+    "cusdc": "0x39AA39c021dfbaE8faC545936693aC917d5E7563",
+    "comptroller": "0x3d9819210A31b4961b30EF54bE2aeD79B9c9Cd3B",
+    "uniswap_router": "0x7a250d5630B4cF539739dF2C5dAcb4c659F2488D",
+    "solo": "0x1E0447b19BB6EcFdAe1e4AE1694b0C3659614e4e",
+    "aave_addresses_provider": "0x24a42fD28C976A61Df5D00D0599C34c4f90748c8",
+    "aave_lending_pool_core": "0x3dfd23A6c5E8BbcFc9581d2E864a68feb6a076d3",
+}
+
+# accounts the conftest fixtures impersonate as whales
+WHALES = [
+    "0x3f5CE5FBFe3E9af3971dD833D26bA9b5C936f0bE",
+    "0xf977814e90da44bfa03b6295a0616a897441acec",
+    "0xBE0eB53F46cd790Cd13851d5EFf43D12404d33E8",
+    "0x767Ecb395def19Ab8d1b2FCc89B3DDfBeD28fD6b",
+]
+
+TOKENS = {
+    "dai": ("Dai Stablecoin", "DAI", 18),
+    "usdc": ("USD Coin", "USDC", 6),
+    "weth": ("Wrapped Ether", "WETH", 18),
+    "comp": ("Compound", "COMP", 18),
+}
+
+# roughly mainnet: collateral factor 75%, 2% cToken exchange rate, jump rate model
+BLOCKS_PER_YEAR = 2102400
+COLLATERAL_FACTOR = Wei("0.75 ether")
+RESERVE_FACTOR = Wei("0.15 ether")
+COMP_SPEED = Wei("0.05 ether")
+RATE_MODEL = (
+    0,
+    Wei("0.05 ether") // BLOCKS_PER_YEAR,
+    Wei("1.09 ether") // BLOCKS_PER_YEAR,
+    Wei("0.8 ether"),
+)
+
+# whole units of each token
+MARKET_SUPPLY = 200_000_000
+MARKET_BORROW = 120_000_000
+WHALE_BALANCE = 50_000_000
+POOL_RESERVES = {
+    ("comp", "weth"): (100_000, 10_000),
+    ("weth", "dai"): (50_000, 100_000_000),
+    ("weth", "usdc"): (50_000, 100_000_000),
+}
+FLASH_LIQUIDITY = 300_000_000
+
+SET_CODE_METHODS = ("hardhat_setCode", "anvil_setCode", "evm_setAccountCode")
+
+
+def is_local() -> bool:
+    """True on a development network that is not forking mainnet."""
+    settings = CONFIG.networks.get(network.show_active(), {})
+    return "cmd" in settings and "fork" not in settings.get("cmd_settings", {})
+
+
+def etch(container, address: str, owner: Account, *args):
+    """Deploy `container` and copy its runtime code to `address`."""
+    template = container.deploy(*args, {"from": owner})
+    code = web3.eth.getCode(template.address).hex()
+
+    for method in SET_CODE_METHODS:
+        response = web3.provider.make_request(method, [address, code])
+        if "error" not in response:
+            return container.at(address)
+
+    raise RuntimeError(
+        f"{network.show_active()} cannot set account code. Run the local suite on hardhat, anvil or ganache >= 7."
+    )
+
+
+def _units(token, amount: int) -> int:
+    return amount * 10 ** token.decimals()
+
+
+def deploy_mock_stack(owner: Account = None) -> Dict[str, object]:
+    """Put the mock protocols in place on the connected dev chain and fund the whales."""
+    owner = owner or accounts[0]
+    stack = {}
+
+    for key, (name, symbol, decimals) in TOKENS.items():
+        token = etch(MockERC20, MAINNET[key], owner)
+        token.initialize(name, symbol, decimals, {"from": owner})
+        stack[key] = token
+    dai, usdc, weth, comp = (stack[k] for k in ("dai", "usdc", "weth", "comp"))
+
+    # Compound
+    rate_model = MockInterestRateModel.deploy(*RATE_MODEL, {"from": owner})
+    comptroller = etch(MockComptroller, MAINNET["comptroller"], owner)
+    comptroller.initialize(comp, {"from": owner})
+    comp.mint(comptroller, Wei("1000000 ether"), {"from": owner})
+    stack["comptroller"] = comptroller
+
+    lender = accounts[-1]
+    for key, underlying in (("cdai", dai), ("cusdc", usdc)):
+        ctoken = etch(MockCToken, MAINNET[key], owner)
+        # 0.02 underlying per cToken, scaled by 1e(18 - 8 + underlying decimals)
+        initial_rate = 2 * 10 ** (8 + underlying.decimals())
+        ctoken.initialize(
+            underlying,
+            comptroller,
+            rate_model,
+            initial_rate,
+            RESERVE_FACTOR,
+            f"Compound {underlying.symbol()}",
+            f"c{underlying.symbol()}",
+            {"from": owner},
+        )
+        comptroller._supportMarket(ctoken, COLLATERAL_FACTOR, {"from": owner})
+        comptroller._setCompSpeed(ctoken, COMP_SPEED, {"from": owner})
+
+        # someone else supplies and borrows so the market has utilisation and rates
+        underlying.mint(lender, _units(underlying, MARKET_SUPPLY), {"from": owner})
+        underlying.approve(ctoken, 2 ** 256 - 1, {"from": lender})
+        ctoken.mint(_units(underlying, MARKET_SUPPLY), {"from": lender})
+        ctoken.borrow(_units(underlying, MARKET_BORROW), {"from": lender})
+        stack[key] = ctoken
+
+    # Uniswap
+    router = etch(MockUniswapRouter, MAINNET["uniswap_router"], owner)
+    for (a, b), (reserve_a, reserve_b) in POOL_RESERVES.items():
+        token_a, token_b = stack[a], stack[b]
+        router.createPair(token_a, token_b, {"from": owner})
+        pair = MockUniswapPair.at(router.getPair(token_a, token_b))
+        token_a.mint(pair, _units(token_a, reserve_a), {"from": owner})
+        token_b.mint(pair, _units(token_b, reserve_b), {"from": owner})
+        pair.sync({"from": owner})
+    stack["uniswap_router"] = router
+
+    # dYdX, with mainnet market ids: 0 WETH, 1 SAI, 2 USDC, 3 DAI
+    solo = etch(MockSoloMargin, MAINNET["solo"], owner)
+    sai = MockERC20.deploy({"from": owner})
+    sai.initialize("Sai Stablecoin", "SAI", 18, {"from": owner})
+    for token in (weth, sai, usdc, dai):
+        solo.addMarket(token, {"from": owner})
+        token.mint(solo, _units(token, FLASH_LIQUIDITY), {"from": owner})
+    stack["solo"] = solo
+
+    # Aave v1: the lending pool sits at the core address the strategy checks liquidity on
+    provider = etch(MockAaveAddressesProvider, MAINNET["aave_addresses_provider"], owner)
+    pool = etch(MockAaveLendingPool, MAINNET["aave_lending_pool_core"], owner)
+    provider.setLendingPool(pool, pool, {"from": owner})
+    for token in (dai, usdc):
+        token.mint(pool, _units(token, FLASH_LIQUIDITY), {"from": owner})
+    stack["aave_lending_pool"] = pool
+
+    for whale in WHALES:
+        owner.transfer(whale, Wei("10 ether"))
+        for token in (dai, usdc, weth):
+            token.mint(whale, _units(token, WHALE_BALANCE), {"from": owner})
+
+    # the point the conftests' module_isolation goes back to, instead of brownie's reset to the bare chain
+    chain.snapshot()
+
+    return stack
+
+
+def main():
+    stack = deploy_mock_stack()
+    for key, contract in stack.items():
+        print(f"{key:>24}: {contract.address}")
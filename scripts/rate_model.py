@@ -0,0 +1,141 @@
+"""
+Compound's jump rate interest model, vectorised over utilisation.
+
+Mirrors JumpRateModelV2 (and contracts/Mocks/MockInterestRateModel.sol) in
+floats, per block, so simulations can turn thousands of utilisation paths
+into borrow and supply rates in one numpy expression:
+
+    model = read_rate_model(cdai)
+    model.borrow_rate(np.linspace(0, 1, 101))
+
+`supply_adjustment` absorbs whatever the market pays suppliers on top of
+the plain model, such as the DSR pass-through of DAIInterestRateModelV3. It
+is measured once, when the model is read.
+"""
+from dataclasses import dataclass, replace
+
+import numpy as np
+
+MANTISSA = 1e18
+
+# for scripts.snapshot.batch_call: name: (signature, output types)
+SIGNATURES = {
+    "interestRateModel": ("interestRateModel()", ["address"]),
+    "underlying": ("underlying()", ["address"]),
+    "reserveFactorMantissa": ("reserveFactorMantissa()", ["uint256"]),
+    "getCash": ("getCash()", ["uint256"]),
+    "totalBorrows": ("totalBorrows()", ["uint256"]),
+    "totalReserves": ("totalReserves()", ["uint256"]),
+    "supplyRatePerBlock": ("supplyRatePerBlock()", ["uint256"]),
+    "exchangeRateStored": ("exchangeRateStored()", ["uint256"]),
+    "totalSupply": ("totalSupply()", ["uint256"]),
+    "markets": ("markets(address)", ["bool", "uint256", "bool"]),
+    "compSpeeds": ("compSpeeds(address)", ["uint256"]),
+    "baseRatePerBlock": ("baseRatePerBlock()", ["uint256"]),
+    "multiplierPerBlock": ("multiplierPerBlock()", ["uint256"]),
+    "jumpMultiplierPerBlock": ("jumpMultiplierPerBlock()", ["uint256"]),
+    "kink": ("kink()", ["uint256"]),
+}
+
+
+@dataclass(frozen=True)
+class JumpRateModel:
+    base_rate: float  # per block
+    multiplier: float
+    jump_multiplier: float
+    kink: float
+    reserve_factor: float
+    supply_adjustment: float = 0.0
+
+    @staticmethod
+    def utilisation(cash, borrows, reserves=0):
+        cash, borrows, reserves = (np.asarray(x, dtype=float) for x in (cash, borrows, reserves))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(borrows > 0, borrows / (cash + borrows - reserves), 0.0)
+
+    def borrow_rate(self, utilisation):
+        u = np.asarray(utilisation, dtype=float)
+        normal = self.kink * self.multiplier + self.base_rate
+        return np.where(
+            u <= self.kink,
+            u * self.multiplier + self.base_rate,
+            normal + (u - self.kink) * self.jump_multiplier,
+        )
+
+    def supply_rate(self, utilisation):
+        u = np.asarray(utilisation, dtype=float)
+        return u * self.borrow_rate(u) * (1 - self.reserve_factor) + self.supply_adjustment
+
+
+@dataclass(frozen=True)
+class Market:
+    """A cToken market as the simulations need it."""
+
+    model: JumpRateModel
+    utilisation: float
+    collateral_factor: float
+    comp_supply_per_block: float  # COMP per block per whole want supplied
+    comp_borrow_per_block: float  # and per whole want borrowed
+    exchange_rate: float
+
+
+def read_rate_model(ctoken, block: int = None) -> JumpRateModel:
+    return read_market(ctoken, block=block).model
+
+
+def read_market(ctoken, comptroller: str = None, block: int = None) -> Market:
+    """Rate model, utilisation, collateral factor and COMP speed of `ctoken` in two batches."""
+    from brownie import chain
+
+    from scripts.comp_accrual_model import COMPTROLLER
+    from scripts.snapshot import _address, batch_call
+
+    block = chain.height if block is None else block
+    ctoken, comptroller = _address(ctoken), _address(comptroller) or COMPTROLLER
+
+    (model, underlying, reserve_factor, cash, borrows, reserves, supply_rate, exchange_rate, total_supply, market, speed) = batch_call(
+        [
+            (ctoken, "interestRateModel", ()),
+            (ctoken, "underlying", ()),
+            (ctoken, "reserveFactorMantissa", ()),
+            (ctoken, "getCash", ()),
+            (ctoken, "totalBorrows", ()),
+            (ctoken, "totalReserves", ()),
+            (ctoken, "supplyRatePerBlock", ()),
+            (ctoken, "exchangeRateStored", ()),
+            (ctoken, "totalSupply", ()),
+            (comptroller, "markets", (ctoken,)),
+            (comptroller, "compSpeeds", (ctoken,)),
+        ],
+        block,
+        SIGNATURES,
+    )
+    base, multiplier, jump, kink, decimals = batch_call(
+        [(model, key, ()) for key in ("baseRatePerBlock", "multiplierPerBlock", "jumpMultiplierPerBlock", "kink")]
+        + [(underlying, "decimals", ())],
+        block,
+        SIGNATURES,
+    )
+
+    plain = JumpRateModel(
+        base_rate=base / MANTISSA,
+        multiplier=multiplier / MANTISSA,
+        jump_multiplier=jump / MANTISSA,
+        kink=kink / MANTISSA,
+        reserve_factor=reserve_factor / MANTISSA,
+    )
+    utilisation = float(JumpRateModel.utilisation(cash, borrows, reserves))
+    adjustment = supply_rate / MANTISSA - float(plain.supply_rate(utilisation))
+    unit = 10 ** decimals
+    supplied = total_supply * exchange_rate / MANTISSA / unit
+    # compSpeeds is paid in full to suppliers and again in full to borrowers
+    comp = speed / 1e18
+
+    return Market(
+        model=replace(plain, supply_adjustment=adjustment),
+        utilisation=utilisation,
+        collateral_factor=market[1] / MANTISSA,
+        comp_supply_per_block=comp / supplied if supplied else 0.0,
+        comp_borrow_per_block=comp / (borrows / unit) if borrows else 0.0,
+        exchange_rate=exchange_rate / MANTISSA,
+    )
@@ -0,0 +1,273 @@
+"""
+Python replica of contracts/Libraries/RoutePlanner.sol, so keepers can see how
+the next harvest will move the position, and what it will cost, before they
+send it.
+
+`plan` chooses between the same candidate route orders as the contract, with
+the same integer arithmetic:
+- plain borrow/mint (or redeem/repay) pairs;
+- a DyDx flash loan, then plain pairs;
+- one plain pair, then DyDx;
+- Aave then plain, or DyDx, Aave then plain (deleveraging only).
+The winner leaves the least of the position change undone, then costs the
+least in fees plus gas, with gas priced at the strategy's stored
+wantPerMillionGas (`quote_want_per_million_gas` is what keepers set it to).
+`preview_harvest` reads a strategy, works out the position change
+adjustPosition will ask for, and plans it:
+
+    plan = preview_harvest(strategy)
+    total_gas(plan), total_cost(plan)
+"""
+from dataclasses import dataclass, replace
+from typing import List, NamedTuple, Sequence, Tuple
+
+EXP_SCALE = 10 ** 18
+SAFETY_MARGIN = 10 ** 5
+
+PLAIN, DYDX, AAVE = 0, 1, 2
+_PLAIN_ONCE, _END = 3, 255
+ROUTE_NAMES = {PLAIN: "plain", DYDX: "dydx", AAVE: "aave"}
+
+PLAIN_BASE_GAS = 60000
+PLAIN_PAIR_GAS = 280000
+DYDX_GAS = 560000
+AAVE_GAS = 700000
+DYDX_FEE = 2
+AAVE_FEE_BPS = 9
+
+# Strategy.MAX_LEVERAGE_STEPS / MAX_DELEVERAGE_STEPS
+MAX_LEVERAGE_PAIRS = 10
+MAX_DELEVERAGE_PAIRS = 5
+
+ORDERS = [
+    (PLAIN, _END, _END),
+    (DYDX, PLAIN, _END),
+    (_PLAIN_ONCE, DYDX, _END),
+    (AAVE, PLAIN, _END),
+    (DYDX, AAVE, PLAIN),
+]
+
+# for scripts.snapshot.batch_call: name: (signature, output types)
+SIGNATURES = {
+    "cToken": ("cToken()", ["address"]),
+    "DyDxActive": ("DyDxActive()", ["bool"]),
+    "AaveActive": ("AaveActive()", ["bool"]),
+    "addressesProvider": ("addressesProvider()", ["address"]),
+    "uniswapRouter": ("uniswapRouter()", ["address"]),
+    "weth": ("weth()", ["address"]),
+    "wantPerMillionGas": ("wantPerMillionGas()", ["uint256"]),
+    "vault": ("vault()", ["address"]),
+    "markets": ("markets(address)", ["bool", "uint256", "bool"]),
+    "getLendingPoolCore": ("getLendingPoolCore()", ["address"]),
+    "getAmountsOut": ("getAmountsOut(uint256,address[])", ["uint256[]"]),
+    "debtOutstanding": ("debtOutstanding(address)", ["uint256"]),
+}
+
+
+@dataclass
+class Market:
+    lent: int  # includes want held, when leveraging
+    borrowed: int
+    collateral_factor: int
+    max_pairs: int
+    solo_liquidity: int = 0
+    aave_liquidity: int = 0
+    want_per_million_gas: int = 0
+
+
+class Step(NamedTuple):
+    route: int
+    amount: int
+    pairs: int
+    gas: int
+    fee: int
+    cost: int
+    residual: int
+
+    @property
+    def name(self) -> str:
+        return ROUTE_NAMES[self.route]
+
+
+def _plain(wanted: int, deficit: bool, state: Market, max_pairs: int) -> Tuple[int, int]:
+    amount = pairs = 0
+    while pairs < max_pairs and amount < wanted:
+        if deficit:
+            needed = 0 if state.collateral_factor == 0 else state.borrowed * EXP_SCALE // state.collateral_factor
+            room = min(state.lent - needed, state.borrowed) if state.lent > needed else 0
+        else:
+            limit = state.lent * state.collateral_factor // EXP_SCALE
+            room = limit - state.borrowed if limit > state.borrowed else 0
+        room = min(room, wanted - amount)
+        if room == 0:
+            break
+        sign = -1 if deficit else 1
+        state.lent += sign * room
+        state.borrowed += sign * room
+        amount += room
+        pairs += 1
+    return amount, pairs
+
+
+def _step(route: int, wanted: int, deficit: bool, state: Market) -> Step:
+    if route in (DYDX, AAVE):
+        amount = min(wanted, state.solo_liquidity if route == DYDX else state.aave_liquidity)
+        if amount == 0:
+            return Step(route, 0, 0, 0, 0, 0, 0)
+        gas = DYDX_GAS if route == DYDX else AAVE_GAS
+        fee = DYDX_FEE if route == DYDX else amount * AAVE_FEE_BPS // 10000
+        pairs = 0
+        if deficit:
+            state.lent = max(state.lent - amount - fee, 0)
+            state.borrowed -= amount
+        else:
+            state.lent += amount
+            state.borrowed += amount + fee
+    else:
+        amount, pairs = _plain(wanted, deficit, state, state.max_pairs if route == PLAIN else 1)
+        route = PLAIN
+        if amount == 0:
+            return Step(route, 0, 0, 0, 0, 0, 0)
+        gas, fee = PLAIN_BASE_GAS + PLAIN_PAIR_GAS * pairs, 0
+    return Step(route, amount, pairs, gas, fee, fee + gas * state.want_per_million_gas // 10 ** 6, 0)
+
+
+def _simulate(position: int, deficit: bool, market: Market, order: Sequence[int]) -> Tuple[List[Step], int, int]:
+    state = replace(market)
+    steps, residual, cost = [], position, 0
+    for route in order:
+        if route == _END or residual == 0:
+            break
+        step = _step(route, residual, deficit, state)
+        if step.amount == 0:
+            continue
+        residual -= step.amount
+        cost += step.cost
+        steps.append(step._replace(residual=residual))
+    return steps, residual, cost
+
+
+def plan(position: int, deficit: bool, market: Market) -> List[Step]:
+    """RoutePlanner.plan: the steps to move the borrow by `position`, up when not `deficit`."""
+    best, best_key = [], None
+    for order in ORDERS:
+        steps, residual, cost = _simulate(position, deficit, market, order)
+        if best_key is None or (residual, cost) < best_key:
+            best, best_key = steps, (residual, cost)
+    return best
+
+
+def total_gas(steps: Sequence[Step]) -> int:
+    return sum(s.gas for s in steps)
+
+
+def total_cost(steps: Sequence[Step]) -> int:
+    return sum(s.cost for s in steps)
+
+
+def desired_position(deposits: int, borrows: int, balance: int, collateral_target: int, deposit: bool = True) -> Tuple[int, bool]:
+    """Strategy._calculateDesiredPosition: (position change, deficit)."""
+    unwound = deposits - borrows
+    supply = unwound + balance if deposit else unwound - min(balance, unwound)
+    desired = supply * collateral_target // (EXP_SCALE - collateral_target)
+    if desired > SAFETY_MARGIN:
+        desired -= SAFETY_MARGIN
+    if desired < borrows:
+        return borrows - desired, True
+    return desired - borrows, False
+
+
+def read_market(strategy, deficit: bool, use_backup: bool = False, block: int = None) -> Market:
+    """What Strategy._routeMarket reads, batched."""
+    from brownie import chain
+
+    from scripts.comp_accrual_model import COMPTROLLER
+    from scripts.mock_stack import MAINNET
+    from scripts.snapshot import _address, batch_call
+
+    block = chain.height if block is None else block
+    strategy = _address(strategy)
+    (lent, borrowed), ctoken, want, dydx, aave, provider, gas = batch_call(
+        [
+            (strategy, key, ())
+            for key in ("getCurrentPosition", "cToken", "want", "DyDxActive", "AaveActive", "addressesProvider", "wantPerMillionGas")
+        ],
+        block,
+        SIGNATURES,
+    )
+    calls = [
+        (want, "balanceOf", (strategy,)),
+        (COMPTROLLER, "markets", (ctoken,)),
+        (want, "balanceOf", (MAINNET["solo"],)),
+    ]
+    held, market, solo = batch_call(calls, block, SIGNATURES)
+
+    aave_liquidity = 0
+    if aave and use_backup and deficit:
+        (core,) = batch_call([(provider, "getLendingPoolCore", ())], block, SIGNATURES)
+        aave_liquidity = batch_call([(want, "balanceOf", (core,))], block)[0]
+
+    return Market(
+        lent=int(lent) + (0 if deficit else int(held)),
+        borrowed=int(borrowed),
+        collateral_factor=int(market[1]),
+        max_pairs=MAX_DELEVERAGE_PAIRS if deficit else MAX_LEVERAGE_PAIRS,
+        solo_liquidity=int(solo) if dydx else 0,
+        aave_liquidity=int(aave_liquidity),
+        want_per_million_gas=int(gas),
+    )
+
+
+def quote_want_per_million_gas(strategy, gas_price: int, block: int = None) -> int:
+    """A million gas at `gas_price` (wei) in the strategy's want, at the uniswap weth price. What setWantPerMillionGas takes."""
+    from brownie import chain
+
+    from scripts.snapshot import _address, batch_call
+
+    block = chain.height if block is None else block
+    strategy = _address(strategy)
+    want, router, weth = batch_call([(strategy, key, ()) for key in ("want", "uniswapRouter", "weth")], block, SIGNATURES)
+    (amounts,) = batch_call([(router, "getAmountsOut", (gas_price * 10 ** 6, [weth, want]))], block, SIGNATURES)
+    return int(amounts[-1])
+
+
+def preview_harvest(strategy, block: int = None) -> List[Step]:
+    """
+    The plan adjustPosition would follow if the strategy were harvested now,
+    ignoring the profit prepareReturn hands back to the vault first.
+    """
+    from brownie import chain
+
+    from scripts.snapshot import _address, batch_call
+
+    block = chain.height if block is None else block
+    strategy = _address(strategy)
+    (deposits, borrows), want, target, vault = batch_call(
+        [(strategy, key, ()) for key in ("getCurrentPosition", "want", "collateralTarget", "vault")], block, SIGNATURES
+    )
+    held, outstanding = batch_call(
+        [(want, "balanceOf", (strategy,)), (vault, "debtOutstanding", (strategy,))], block, SIGNATURES
+    )
+    if held < outstanding:
+        return []
+    position, deficit = desired_position(int(deposits), int(borrows), int(held - outstanding), int(target))
+    return plan(position, deficit, read_market(strategy, deficit, False, block))
+
+
+def format_plan(steps: Sequence[Step], decimals: int = 18) -> str:
+    unit = 10 ** decimals
+    lines = [f"{'route':>6} {'amount':>16} {'pairs':>6} {'gas':>9} {'fee':>12} {'cost':>12} {'residual':>16}"]
+    for s in steps:
+        lines.append(
+            f"{s.name:>6} {s.amount / unit:>16.4f} {s.pairs:>6} {s.gas:>9} {s.fee / unit:>12.6f} {s.cost / unit:>12.6f} {s.residual / unit:>16.4f}"
+        )
+    lines.append(f"total gas {total_gas(steps)}, cost {total_cost(steps) / unit:.6f}")
+    return "\n".join(lines)
+
+
+def main():
+    from scripts.keeper import LIVE_STRATEGIES
+
+    for strategy, _ in LIVE_STRATEGIES:
+        print(strategy)
+        print(format_plan(preview_harvest(strategy)))
@@ -0,0 +1,297 @@
+"""
+Declarative strategy scenarios: a list of steps in YAML or JSON, replayed on
+whatever chain brownie is connected to (the mock stack or a fork).
+
+    name: deposit_harvest_withdraw
+    steps:
+      - deposit: {amount: 100000, account: whale}   # whole units of want
+      - harvest
+      - wait: {blocks: 6500}
+      - harvest: {triggered: true}                    # the keeper's harvest, only if harvestTrigger says so
+      - withdraw: {fraction: 0.5, account: whale}
+      - emergency_exit
+      - harvest
+
+deposit, withdraw, wait and the triggered harvest and tend are the helpers in
+tests/DAI/useful_methods.py, which the test passes in as `Context.helpers`, so
+a scenario runs exactly what the hand-written tests run. A plain harvest or
+tend sends the transaction without asking the trigger. The other steps are
+emergency_exit, set_debt_ratio, set_collateral_target and a `call` of any
+strategy method. After every step `run` records the wall time, the gas of the
+transaction it sent, and a compact state record of the strategy and its vault.
+
+Results are written as indented JSON with sorted keys, one value per line, so
+two runs diff cleanly; `diff` lines them up step by step:
+
+    python -m scripts.scenario diff before.json after.json
+
+tests/DAI/test_scenarios.py replays every scenario in benchmarks/scenarios,
+and writes the results to $SCENARIO_RESULTS when it is set.
+"""
+import argparse
+import json
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence
+
+import yaml
+
+RESULTS_VERSION = 1
+SCENARIO_DIR = Path(__file__).resolve().parent.parent / "benchmarks" / "scenarios"
+
+
+class Step(NamedTuple):
+    action: str
+    args: Dict[str, Any]
+
+
+@dataclass
+class Context:
+    chain: Any
+    strategy: Any
+    vault: Any
+    want: Any
+    accounts: Dict[str, Any]  # name -> brownie Account, as scenarios refer to them
+    helpers: Any  # tests/DAI/useful_methods.py: deposit, withdraw, wait, harvest and tend
+    comp: Any = None
+
+    def account(self, args: Dict[str, Any], default: str = "gov"):
+        name = args.get("account", default)
+        if name not in self.accounts:
+            raise KeyError(f"scenario account {name!r} is not one of {sorted(self.accounts)}")
+        return self.accounts[name]
+
+    def units(self, amount) -> int:
+        return int(amount * 10 ** self.want.decimals())
+
+
+@dataclass
+class StepRecord:
+    index: int
+    action: str
+    args: Dict[str, Any]
+    gas: Optional[int]  # None when the step sent no transaction
+    seconds: float
+    state: Dict[str, int] = field(default_factory=dict)
+    error: Optional[str] = None
+
+
+def _last_tx(helper: Callable, *args):
+    """Call a useful_methods helper, which returns nothing, and return the transaction it sent, if any."""
+    from brownie import history
+
+    sent = len(history)
+    helper(*args)
+    return history[-1] if len(history) > sent else None
+
+
+def _deposit(ctx: Context, args):
+    from brownie import Wei
+
+    return _last_tx(ctx.helpers.deposit, Wei(ctx.units(args["amount"])), ctx.account(args, "whale"), ctx.want, ctx.vault)
+
+
+def _withdraw(ctx: Context, args):
+    # the helper takes the divisor of the account's shares
+    return _last_tx(ctx.helpers.withdraw, 1 / args.get("fraction", 1), ctx.account(args, "whale"), ctx.want, ctx.vault)
+
+
+def _wait(ctx: Context, args):
+    ctx.helpers.wait(args["blocks"], ctx.chain)
+
+
+def _harvest(ctx: Context, args):
+    if args.get("triggered"):
+        return _last_tx(ctx.helpers.harvest, ctx.strategy, ctx.account(args, "keeper"), ctx.vault)
+    return ctx.strategy.harvest({"from": ctx.account(args)})
+
+
+def _tend(ctx: Context, args):
+    if args.get("triggered"):
+        return _last_tx(ctx.helpers.tend, ctx.strategy, ctx.account(args, "keeper"))
+    return ctx.strategy.tend({"from": ctx.account(args)})
+
+
+def _emergency_exit(ctx: Context, args):
+    return ctx.strategy.setEmergencyExit({"from": ctx.account(args)})
+
+
+def _set_debt_ratio(ctx: Context, args):
+    return ctx.vault.updateStrategyDebtRatio(ctx.strategy, args["ratio"], {"from": ctx.account(args)})
+
+
+def _set_collateral_target(ctx: Context, args):
+    return ctx.strategy.setCollateralTarget(int(args["target"] * 1e18), {"from": ctx.account(args)})
+
+
+def _call(ctx: Context, args):
+    return getattr(ctx.strategy, args["method"])(*args.get("args", []), {"from": ctx.account(args)})
+
+
+ACTIONS: Dict[str, Callable[[Context, Dict[str, Any]], Any]] = {
+    "deposit": _deposit,
+    "withdraw": _withdraw,
+    "wait": _wait,
+    "harvest": _harvest,
+    "tend": _tend,
+    "emergency_exit": _emergency_exit,
+    "set_debt_ratio": _set_debt_ratio,
+    "set_collateral_target": _set_collateral_target,
+    "call": _call,
+}
+
+
+def parse_steps(raw: Sequence) -> List[Step]:
+    """Steps from their file form: an action name, or a one-key mapping of the action to its arguments."""
+    steps = []
+    for i, entry in enumerate(raw):
+        if isinstance(entry, str):
+            action, args = entry, {}
+        elif isinstance(entry, dict) and len(entry) == 1:
+            ((action, args),) = entry.items()
+            args = args or {}
+        else:
+            raise ValueError(f"step {i}: expected an action name or a one-key mapping, got {entry!r}")
+        if action not in ACTIONS:
+            raise ValueError(f"step {i}: unknown action {action!r}, expected one of {sorted(ACTIONS)}")
+        steps.append(Step(action, dict(args)))
+    return steps
+
+
+def load_scenario(path) -> Dict[str, Any]:
+    """A scenario file (.yaml, .yml or .json) as {"name", "steps"}, named after the file unless it names itself."""
+    path = Path(path)
+    text = path.read_text()
+    raw = json.loads(text) if path.suffix == ".json" else yaml.safe_load(text)
+    if isinstance(raw, list):
+        raw = {"steps": raw}
+    return {"name": raw.get("name", path.stem), "steps": parse_steps(raw.get("steps", []))}
+
+
+def capture_state(ctx: Context) -> Dict[str, int]:
+    deposits, borrows = ctx.strategy.getCurrentPosition()
+    state = {
+        "block": ctx.chain.height,
+        "deposits": deposits,
+        "borrows": borrows,
+        "want": ctx.want.balanceOf(ctx.strategy),
+        "estimated_total_assets": ctx.strategy.estimatedTotalAssets(),
+        "vault_total_assets": ctx.vault.totalAssets(),
+        "price_per_share": ctx.vault.pricePerShare(),
+    }
+    if ctx.comp is not None:
+        state["comp"] = ctx.comp.balanceOf(ctx.strategy)
+    return {key: int(value) for key, value in state.items()}
+
+
+def run(steps: Sequence[Step], ctx: Context, isolate: bool = True) -> List[StepRecord]:
+    """
+    Replay `steps` in order. A step that raises is recorded with its error and
+    ends the run. With `isolate` the chain is reverted afterwards.
+    """
+    records = []
+    if isolate:
+        ctx.chain.snapshot()
+    try:
+        for index, step in enumerate(steps):
+            start = time.perf_counter()
+            try:
+                tx = ACTIONS[step.action](ctx, step.args)
+                error = None
+            except Exception as e:
+                tx, error = None, f"{type(e).__name__}: {e}"
+            seconds = time.perf_counter() - start
+            gas = int(tx.gas_used) if tx is not None else None
+            records.append(StepRecord(index, step.action, step.args, gas, round(seconds, 3), capture_state(ctx), error))
+            if error is not None:
+                break
+    finally:
+        if isolate:
+            ctx.chain.revert()
+    return records
+
+
+def write_results(path, name: str, records: Sequence[StepRecord], **meta) -> Path:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    results = {"version": RESULTS_VERSION, "scenario": name, **meta, "steps": [asdict(r) for r in records]}
+    path.write_text(json.dumps(results, indent=2, sort_keys=True) + "\n")
+    return path
+
+
+def load_results(path) -> Dict[str, Any]:
+    results = json.loads(Path(path).read_text())
+    if results.get("version") != RESULTS_VERSION:
+        raise ValueError(f"{path}: results version {results.get('version')}, expected {RESULTS_VERSION}")
+    return results
+
+
+class Change(NamedTuple):
+    index: int
+    action: str
+    field: str  # "gas", "error", "action" or a state key
+    before: Any
+    after: Any
+
+    @property
+    def pct(self) -> Optional[float]:
+        if isinstance(self.before, int) and isinstance(self.after, int) and self.before:
+            return 100 * (self.after - self.before) / self.before
+        return None
+
+
+def diff(before: Dict[str, Any], after: Dict[str, Any], ignore: Sequence[str] = ("block",)) -> List[Change]:
+    """Every gas, error and state value that differs between two results of the same scenario, step by step."""
+    changes = []
+    a_steps, b_steps = before["steps"], after["steps"]
+    for index in range(max(len(a_steps), len(b_steps))):
+        a = a_steps[index] if index < len(a_steps) else {}
+        b = b_steps[index] if index < len(b_steps) else {}
+        action = b.get("action") or a.get("action")
+        if a.get("action") != b.get("action"):
+            changes.append(Change(index, action, "action", a.get("action"), b.get("action")))
+            continue
+        for key in ("gas", "error"):
+            if a.get(key) != b.get(key):
+                changes.append(Change(index, action, key, a.get(key), b.get(key)))
+        a_state, b_state = a.get("state", {}), b.get("state", {})
+        for key in sorted(set(a_state) | set(b_state)):
+            if key not in ignore and a_state.get(key) != b_state.get(key):
+                changes.append(Change(index, action, key, a_state.get(key), b_state.get(key)))
+    return changes
+
+
+def format_diff(changes: Sequence[Change]) -> str:
+    lines = [f"{'step':>4} {'action':<22} {'field':<24} {'before':>26} {'after':>26} {'change':>9}"]
+    for c in changes:
+        pct = f"{c.pct:+.2f}%" if c.pct is not None else ""
+        lines.append(f"{c.index:>4} {c.action:<22} {c.field:<24} {str(c.before):>26} {str(c.after):>26} {pct:>9}")
+    return "\n".join(lines)
+
+
+def format_records(records: Sequence[StepRecord]) -> str:
+    lines = [f"{'step':>4} {'action':<22} {'gas':>10} {'seconds':>8} {'deposits':>26} {'borrows':>26}"]
+    for r in records:
+        gas = r.gas if r.gas is not None else "-"
+        lines.append(f"{r.index:>4} {r.action:<22} {gas:>10} {r.seconds:>8.3f} {r.state.get('deposits', 0):>26} {r.state.get('borrows', 0):>26}")
+        if r.error:
+            lines.append(f"     {r.error}")
+    return "\n".join(lines)
+
+
+def main(argv: Sequence[str] = None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+    compare = sub.add_parser("diff", help="side by side changes between two results files")
+    compare.add_argument("before")
+    compare.add_argument("after")
+    compare.add_argument("--ignore", nargs="*", default=["block"], help="state fields left out")
+    args = parser.parse_args(argv)
+
+    changes = diff(load_results(args.before), load_results(args.after), args.ignore)
+    print(format_diff(changes) if changes else "no changes")
+
+
+if __name__ == "__main__":
+    main()
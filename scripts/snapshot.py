@@ -0,0 +1,431 @@
+"""
+Point-in-time snapshots of strategies and vaults read in one round trip.
+
+All the view calls behind a snapshot are sent as a single batched JSON-RPC
+request of `eth_call`s pinned to the same block number, so every value in a
+snapshot (and in every snapshot taken together) describes the same chain
+state. Providers that do not accept batches get the same calls one by one,
+still pinned to that block.
+
+Calls are encoded from plain signatures rather than through contract objects,
+so any strategy or vault address can be snapshotted without loading its ABI.
+A call that reverts (e.g. a strategy without `getCurrentPosition`) leaves its
+field as None instead of failing the whole snapshot.
+"""
+from dataclasses import dataclass
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from brownie import Wei, chain, web3
+from brownie.convert import to_address
+from eth_abi import decode_abi, encode_abi
+from eth_utils import function_signature_to_4byte_selector
+
+# 1m gas at 30 gwei, what the print helpers always asked the triggers about
+DEFAULT_GAS_COST = 1000000 * 30 * 10 ** 9
+
+# name: (signature, output types), for the strategy and vault snapshots. Other
+# readers pass their own to batch_call
+SIGNATURES = {
+    "name": ("name()", ["string"]),
+    "want": ("want()", ["address"]),
+    "token": ("token()", ["address"]),
+    "decimals": ("decimals()", ["uint8"]),
+    "balanceOf": ("balanceOf(address)", ["uint256"]),
+    "estimatedTotalAssets": ("estimatedTotalAssets()", ["uint256"]),
+    "getCurrentPosition": ("getCurrentPosition()", ["uint256", "uint256"]),
+    "storedCollateralisation": ("storedCollateralisation()", ["uint256"]),
+    "collateralTarget": ("collateralTarget()", ["uint256"]),
+    "expectedReturn": ("expectedReturn()", ["uint256"]),
+    "getblocksUntilLiquidation": ("getblocksUntilLiquidation()", ["uint256"]),
+    "blocksToLiquidationDangerZone": ("blocksToLiquidationDangerZone()", ["uint256"]),
+    "harvestTrigger": ("harvestTrigger(uint256)", ["bool"]),
+    "tendTrigger": ("tendTrigger(uint256)", ["bool"]),
+    "emergencyExit": ("emergencyExit()", ["bool"]),
+    # Strategy.TriggerState, a static struct so it decodes as its flattened fields
+    "triggerState": ("triggerState(uint256)", ["bool", "bool"] + ["uint256"] * 10),
+    # yearn-vaults 0.3.0 StrategyParams
+    "strategies": ("strategies(address)", ["uint256"] * 8),
+    "totalAssets": ("totalAssets()", ["uint256"]),
+    "totalDebt": ("totalDebt()", ["uint256"]),
+    "pricePerShare": ("pricePerShare()", ["uint256"]),
+}
+
+# contracts/StrategyLens.sol, StrategyState[]
+LENS_SIGNATURES = {
+    "snapshot": (
+        "snapshot(address[],uint256)",
+        [
+            "(address,bool,string,address,address,uint8,"
+            "uint256,uint256,uint256,uint256,uint256,uint256,uint256,uint256,uint256,uint256,uint256,uint256,"
+            "bool,bool,bool,(uint256,uint256,uint256,uint256,uint256,uint256,uint256,uint256))[]"
+        ],
+    ),
+}
+
+Signature = Tuple[str, List[str]]
+Call = Tuple[str, str, Tuple]  # (target address, signature name, args)
+
+# one keep-alive connection pool shared by every batch, and by the keeper's worker threads
+_session = requests.Session()
+_session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=32))
+_session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=32))
+
+
+class StrategyParams(NamedTuple):
+    """vault.strategies(strategy) for yearn-vaults 0.3.0"""
+
+    performance_fee: Wei
+    activation: Wei
+    debt_ratio: Wei
+    rate_limit: Wei
+    last_report: Wei
+    total_debt: Wei
+    total_gain: Wei
+    total_loss: Wei
+
+
+class TriggerState(NamedTuple):
+    """strategy.triggerState(gasCost): both trigger decisions and the inputs behind them"""
+
+    harvest: bool
+    tend: bool
+    deposits: Wei
+    borrows: Wei
+    claimable_comp: Wei
+    comp_balance: Wei
+    estimated_total_assets: Wei
+    want_gas_cost: Wei
+    comp_gas_cost: Wei
+    debt_outstanding: Wei
+    credit_available: Wei
+    blocks_until_liquidation: Wei
+
+
+@dataclass(frozen=True)
+class StrategySnapshot:
+    address: str
+    block: int
+    name: Optional[str]
+    want: Optional[str]
+    decimals: Optional[int]
+    want_balance: Optional[Wei]
+    comp_balance: Optional[Wei]
+    deposits: Optional[Wei]
+    borrows: Optional[Wei]
+    estimated_total_assets: Optional[Wei]
+    stored_collateralisation: Optional[Wei]
+    collateral_target: Optional[Wei]
+    expected_return: Optional[Wei]
+    blocks_until_liquidation: Optional[Wei]
+    danger_zone: Optional[Wei]
+    harvest_trigger: Optional[bool]
+    tend_trigger: Optional[bool]
+    emergency_exit: Optional[bool]
+    vault: Optional[str] = None
+    params: Optional[StrategyParams] = None
+    claimable_comp: Optional[Wei] = None  # only read by StrategyLens
+
+    @property
+    def collateralisation(self) -> float:
+        """borrows / deposits, computed off chain from the same snapshot."""
+        if not self.deposits:
+            return 0
+        return self.borrows / self.deposits
+
+    @property
+    def leverage(self) -> Optional[float]:
+        """None when fully borrowed against, where it is unbounded."""
+        if self.collateralisation >= 1:
+            return None
+        return 1 / (1 - self.collateralisation)
+
+    @property
+    def real_balance(self) -> Optional[Wei]:
+        if self.want_balance is None:
+            return None
+        return Wei(self.want_balance + (self.deposits or 0) - (self.borrows or 0))
+
+
+@dataclass(frozen=True)
+class VaultSnapshot:
+    address: str
+    block: int
+    name: Optional[str]
+    token: str
+    decimals: int
+    total_assets: Wei
+    total_debt: Wei
+    price_per_share: Optional[Wei]
+    loose_balance: Wei
+    strategies: Dict[str, StrategyParams]
+
+
+def _encode(signature: str, args: Sequence) -> str:
+    inputs = signature[signature.index("(") + 1 : -1]
+    types = inputs.split(",") if inputs else []
+    return "0x" + (function_signature_to_4byte_selector(signature) + encode_abi(types, list(args))).hex()
+
+
+def _decode(types: List[str], result: Optional[str]) -> Any:
+    if not result or result == "0x":
+        return None
+    values = [_format(t, v) for t, v in zip(types, decode_abi(types, bytes.fromhex(result[2:])))]
+    return values[0] if len(values) == 1 else tuple(values)
+
+
+def _format(abi_type: str, value) -> Any:
+    if abi_type.startswith("uint"):
+        return Wei(value)
+    if abi_type == "address":
+        return to_address(value)
+    return value
+
+
+def _send(payload: List[Dict]) -> List[Dict]:
+    uri = getattr(web3.provider, "endpoint_uri", None)
+    if uri and uri.startswith("http"):
+        try:
+            response = _session.post(uri, json=payload, timeout=60).json()
+            if isinstance(response, list):
+                by_id = {r.get("id"): r for r in response}
+                return [by_id.get(p["id"], {}) for p in payload]
+        except (requests.RequestException, ValueError):
+            pass
+    # provider does not take batches: same calls, same block, one at a time
+    return [web3.provider.make_request(p["method"], p["params"]) for p in payload]
+
+
+def batch_call(calls: Sequence[Call], block: int, signatures: Dict[str, Signature] = None) -> List[Any]:
+    """
+    Run `calls` as eth_calls at `block` in one batch. Reverted calls decode to None.
+    Call names are looked up in `signatures` first, then in SIGNATURES.
+    """
+    known = {**SIGNATURES, **(signatures or {})}
+    payload = [
+        {
+            "jsonrpc": "2.0",
+            "id": i,
+            "method": "eth_call",
+            "params": [{"to": to_address(target), "data": _encode(known[key][0], args)}, hex(block)],
+        }
+        for i, (target, key, args) in enumerate(calls)
+    ]
+    responses = _send(payload) if payload else []
+    return [
+        None if "error" in response else _decode(known[key][1], response.get("result"))
+        for (_, key, _), response in zip(calls, responses)
+    ]
+
+
+def _address(item) -> Optional[str]:
+    return None if item is None else to_address(str(getattr(item, "address", item)))
+
+
+def snapshot_strategies(
+    strategies: Sequence,
+    vault=None,
+    want=None,
+    comp=None,
+    gas_cost: int = DEFAULT_GAS_COST,
+    block: int = None,
+) -> List[StrategySnapshot]:
+    """
+    Snapshot many strategies in one batch. The vault fields are only filled
+    when `vault` is given. `want` defaults to what each strategy reports,
+    which costs one extra batch at the same block.
+    """
+    block = chain.height if block is None else block
+    strategies = [_address(s) for s in strategies]
+    comp = _address(comp)
+
+    vaults = [_address(vault)] * len(strategies)
+    wants = [_address(want)] * len(strategies)
+    if want is None:
+        wants = batch_call([(s, "want", ()) for s in strategies], block)
+
+    per_strategy = []
+    calls = []
+    for strategy, want_, vault_ in zip(strategies, wants, vaults):
+        own = [
+            (strategy, "name", ()),
+            # want is None when the strategy's want() call failed
+            (want_, "decimals", ()) if want_ else None,
+            (want_, "balanceOf", (strategy,)) if want_ else None,
+            (comp, "balanceOf", (strategy,)) if comp else None,
+            (strategy, "getCurrentPosition", ()),
+            (strategy, "estimatedTotalAssets", ()),
+            (strategy, "storedCollateralisation", ()),
+            (strategy, "collateralTarget", ()),
+            (strategy, "expectedReturn", ()),
+            (strategy, "getblocksUntilLiquidation", ()),
+            (strategy, "blocksToLiquidationDangerZone", ()),
+            (strategy, "harvestTrigger", (gas_cost,)),
+            (strategy, "tendTrigger", (gas_cost,)),
+            (strategy, "emergencyExit", ()),
+            (vault_, "strategies", (strategy,)) if vault_ else None,
+        ]
+        per_strategy.append(own)
+        calls += [c for c in own if c is not None]
+
+    results = iter(batch_call(calls, block))
+    snapshots = []
+    for strategy, want_, vault_, own in zip(strategies, wants, vaults, per_strategy):
+        (
+            name,
+            decimals,
+            want_balance,
+            comp_balance,
+            position,
+            estimated,
+            stored_collat,
+            target,
+            expected,
+            to_liquidation,
+            danger_zone,
+            harvest,
+            tend,
+            emergency,
+            params,
+        ) = [None if c is None else next(results) for c in own]
+        deposits, borrows = position if position else (None, None)
+
+        snapshots.append(
+            StrategySnapshot(
+                address=strategy,
+                block=block,
+                name=name,
+                want=want_,
+                decimals=decimals,
+                want_balance=want_balance,
+                comp_balance=comp_balance,
+                deposits=deposits,
+                borrows=borrows,
+                estimated_total_assets=estimated,
+                stored_collateralisation=stored_collat,
+                collateral_target=target,
+                expected_return=expected,
+                blocks_until_liquidation=to_liquidation,
+                danger_zone=danger_zone,
+                harvest_trigger=harvest,
+                tend_trigger=tend,
+                emergency_exit=emergency,
+                vault=vault_,
+                params=params and StrategyParams(*params),
+            )
+        )
+    return snapshots
+
+
+def lens_snapshots(lens, strategies: Sequence, gas_cost: int = DEFAULT_GAS_COST, block: int = None) -> List[Optional[StrategySnapshot]]:
+    """
+    `snapshot_strategies` through a deployed StrategyLens: one eth_call for the
+    whole fleet, vault params included. None for strategies the lens could not read.
+    """
+    block = chain.height if block is None else block
+    (states,) = batch_call([(_address(lens), "snapshot", ([_address(s) for s in strategies], gas_cost))], block, LENS_SIGNATURES)
+    if states is None:
+        raise ValueError(f"StrategyLens at {_address(lens)} reverted")
+    return [decode_lens_state(state, block) for state in states]
+
+
+def decode_lens_state(state: Sequence, block: int) -> Optional[StrategySnapshot]:
+    """A StrategyLens.StrategyState, as decoded from the ABI, as a StrategySnapshot."""
+    (
+        strategy,
+        ok,
+        name,
+        want,
+        vault,
+        decimals,
+        want_balance,
+        comp_balance,
+        claimable_comp,
+        deposits,
+        borrows,
+        _net_balance_lent,
+        stored_collat,
+        target,
+        estimated,
+        expected,
+        to_liquidation,
+        danger_zone,
+        harvest,
+        tend,
+        emergency,
+        params,
+    ) = state
+    if not ok:
+        return None
+    return StrategySnapshot(
+        address=to_address(strategy),
+        block=block,
+        name=name,
+        want=to_address(want),
+        decimals=decimals,
+        want_balance=Wei(want_balance),
+        comp_balance=Wei(comp_balance),
+        deposits=Wei(deposits),
+        borrows=Wei(borrows),
+        estimated_total_assets=Wei(estimated),
+        stored_collateralisation=Wei(stored_collat),
+        collateral_target=Wei(target),
+        expected_return=Wei(expected),
+        blocks_until_liquidation=Wei(to_liquidation),
+        danger_zone=Wei(danger_zone),
+        harvest_trigger=harvest,
+        tend_trigger=tend,
+        emergency_exit=emergency,
+        vault=to_address(vault),
+        params=StrategyParams(*(Wei(v) for v in params)),
+        claimable_comp=Wei(claimable_comp),
+    )
+
+
+def snapshot_strategy(strategy, vault=None, want=None, comp=None, gas_cost: int = DEFAULT_GAS_COST, block: int = None) -> StrategySnapshot:
+    return snapshot_strategies([strategy], vault, want, comp, gas_cost, block)[0]
+
+
+def trigger_states(strategies: Sequence, gas_cost: int = DEFAULT_GAS_COST, block: int = None) -> List[Optional[TriggerState]]:
+    """
+    `triggerState` of many strategies in one batch, the cheapest way for a keeper
+    to poll both triggers. None for strategies deployed before it existed.
+    """
+    block = chain.height if block is None else block
+    results = batch_call([(_address(s), "triggerState", (gas_cost,)) for s in strategies], block)
+    return [state and TriggerState(*state) for state in results]
+
+
+def snapshot_vault(vault, token=None, strategies: Sequence = (), block: int = None) -> VaultSnapshot:
+    """Snapshot a vault, plus its accounting for each of `strategies`."""
+    block = chain.height if block is None else block
+    vault = _address(vault)
+    token = _address(token) or batch_call([(vault, "token", ())], block)[0]
+    strategies = [_address(s) for s in strategies]
+
+    results = batch_call(
+        [
+            (vault, "name", ()),
+            (token, "decimals", ()),
+            (vault, "totalAssets", ()),
+            (vault, "totalDebt", ()),
+            (vault, "pricePerShare", ()),
+            (token, "balanceOf", (vault,)),
+        ]
+        + [(vault, "strategies", (s,)) for s in strategies],
+        block,
+    )
+    name, decimals, total_assets, total_debt, price_per_share, loose = results[:6]
+    return VaultSnapshot(
+        address=vault,
+        block=block,
+        name=name,
+        token=token,
+        decimals=decimals,
+        total_assets=total_assets,
+        total_debt=total_debt,
+        price_per_share=price_per_share,
+        loose_balance=loose,
+        strategies={s: params and StrategyParams(*params) for s, params in zip(strategies, results[6:])},
+    )
@@ -0,0 +1,137 @@
+"""
+Build expensive chain states once and load them on every later use.
+
+Fixtures like `largerunningstrategy` spend most of the DAI suite's time on
+deposits and harvest loops, redone for every test under `fn_isolation`. The
+pool builds such a state the first time it is asked for, keeps an
+`anvil_dumpState` of the result keyed by fixture name, parameters and the
+block it was built on, and afterwards loads that dump instead of building:
+
+    pool.use("largerunningstrategy", build, strategy.address)
+
+The key includes the block the state was built from, so a test whose own
+fixtures sent extra transactions first gets its own build rather than a
+state that silently drops them. Contracts deployed by the same accounts in
+the same order land on the same addresses after every `fn_isolation`
+revert, which is what makes the dump valid for the next test.
+
+A dump rather than an `evm_snapshot`: reverting to a snapshot discards every
+snapshot taken after it, on anvil as on ganache and hardhat, so the
+per-test revert of `fn_isolation` would throw a pooled snapshot away. A
+dump is plain data and survives any revert; loading it is undone by the
+next revert like any other change. Only anvil dumps state, so elsewhere the
+pool simply builds each time, as before.
+
+Under xdist (`PYTEST_XDIST_TESTRUNUID` set) the first worker to build a
+state also writes its dump under build/snapshot_pool/, and the other
+workers load that file onto their own chain instead of building.
+"""
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+POOL_PATH = Path(__file__).resolve().parent.parent / "build" / "snapshot_pool"
+
+
+def _brownie_request(method: str, params: list):
+    from brownie import web3
+
+    response = web3.provider.make_request(method, params)
+    if "error" in response:
+        raise ValueError(response["error"])
+    return response["result"]
+
+
+class SnapshotPool:
+    def __init__(
+        self,
+        request: Callable = _brownie_request,
+        path: Path = None,
+        run_id: str = None,
+    ):
+        self.request = request
+        self.run_id = run_id if run_id is not None else os.environ.get("PYTEST_XDIST_TESTRUNUID")
+        self.path = Path(path or POOL_PATH) / self.run_id if self.run_id else None
+        self.dumps: Dict[str, Dict] = {}
+        self.builds = 0
+        self.loads = 0
+        self._supported = None
+
+    @property
+    def supported(self) -> bool:
+        """Whether the node can dump and load its state (anvil)."""
+        if self._supported is None:
+            try:
+                self._supported = self.request("web3_clientVersion", []).lower().startswith("anvil")
+            except ValueError:
+                self._supported = False
+        return self._supported
+
+    def _height(self) -> int:
+        return int(self.request("eth_blockNumber", []), 16)
+
+    def key(self, name: str, params) -> str:
+        blob = json.dumps([name, [str(p) for p in params], self._height()])
+        return hashlib.sha256(blob.encode()).hexdigest()[:24]
+
+    def use(self, name: str, build: Callable[[], None], *params):
+        """Put the chain in the state `build` leaves it in, building only if no dump of it exists yet."""
+        if not self.supported:
+            self.builds += 1
+            build()
+            return
+
+        key = self.key(name, params)
+        dump = self.dumps.get(key) or self._read(key)
+        if dump is not None:
+            self._load(dump)
+            self.dumps[key] = dump
+            self.loads += 1
+            return
+
+        self.builds += 1
+        build()
+        block = self.request("eth_getBlockByNumber", ["latest", False])
+        self.dumps[key] = {
+            "state": self.request("anvil_dumpState", []),
+            "height": int(block["number"], 16),
+            "timestamp": int(block["timestamp"], 16),
+        }
+        self._write(key, self.dumps[key])
+
+    def _file(self, key: str) -> Optional[Path]:
+        return self.path / f"{key}.json" if self.path else None
+
+    def _write(self, key: str, dump: Dict):
+        file = self._file(key)
+        if file is None:
+            return
+        file.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            # the first worker to finish claims the key; the rest keep their own build
+            fd = os.open(str(file) + ".lock", os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return
+        os.close(fd)
+        tmp = file.with_suffix(".tmp")
+        tmp.write_text(json.dumps(dump))
+        tmp.replace(file)
+
+    def _read(self, key: str) -> Optional[Dict]:
+        file = self._file(key)
+        if file is None or not file.exists():
+            return None
+        return json.loads(file.read_text())
+
+    def _load(self, dump: Dict):
+        self.request("anvil_loadState", [dump["state"]])
+
+        # bring block number and time up to where the builder left them, compound checks both
+        block = self.request("eth_getBlockByNumber", ["latest", False])
+        missing = dump["height"] - int(block["number"], 16)
+        if missing > 0:
+            start = max(dump["timestamp"] - missing + 1, int(block["timestamp"], 16) + 1)
+            self.request("evm_setNextBlockTimestamp", [start])
+            self.request("anvil_mine", [hex(missing), "0x1"])
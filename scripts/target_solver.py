@@ -0,0 +1,231 @@
+"""
+The collateral target that maximises a strategy's net APR, given how its own
+borrow moves the market's rates.
+
+At target t an equity E supplies D = E / (1 - t) and borrows b = D t. Both
+are part of the cToken market, so the utilisation the interest rate model
+(scripts/rate_model.py) sees is
+
+    u(t) = (B + b) / (C + E + B + b - R)
+
+with C and B the market's cash and borrows without us, and R its reserves.
+Per block the position earns D * supply_rate(u) - b * borrow_rate(u), plus
+its share of compSpeeds on each side: D out of everything supplied and b out
+of everything borrowed. `net_apr` is that, per year, over E.
+
+More leverage earns more COMP but pushes the borrow rate up, past the kink
+steeply, so the optimum can sit anywhere below the collateral factor.
+`solve` scans a coarse grid for the best bracket (the kink can make the
+curve bimodal) and narrows it with golden-section search, never going above
+collateral factor - `margin`. contracts/TargetSolver.sol runs the same
+search on chain in a bounded number of rate model calls.
+
+    pool, equity = read_pool(strategy)
+    solve(pool, equity)                         # Solution(target=..., net_apr=...)
+    retune(strategy, gov, solver)               # setCollateralTarget when it moves enough
+"""
+import math
+from dataclasses import dataclass
+from typing import Callable, NamedTuple, Tuple
+
+import numpy as np
+
+from scripts import rate_model
+from scripts.rate_model import JumpRateModel
+
+BLOCKS_PER_YEAR = 2102400
+# how far under the collateral factor the target may go
+MARGIN = 0.02
+# contracts/TargetSolver.sol runs the same search, within its MAX_EVALUATIONS of 64
+GRID = 20
+ITERATIONS = 30
+INV_PHI = (math.sqrt(5) - 1) / 2
+
+# for scripts.snapshot.batch_call: the market reads are rate_model's
+SIGNATURES = {**rate_model.SIGNATURES, "cToken": ("cToken()", ["address"])}
+
+
+@dataclass(frozen=True)
+class Pool:
+    """A cToken market without our position in it, in whole want."""
+
+    model: JumpRateModel
+    cash: float
+    borrows: float
+    reserves: float
+    collateral_factor: float
+    comp_speed: float  # COMP per block, paid to each of the supply and borrow sides
+    comp_price: float  # want per COMP
+
+    @classmethod
+    def without(
+        cls, model, cash, borrows, reserves, deposits, borrowed, collateral_factor, comp_speed, comp_price
+    ) -> "Pool":
+        """The market as it would be if the strategy's deposits and borrows were not in it."""
+        return cls(model, cash - (deposits - borrowed), borrows - borrowed, reserves, collateral_factor, comp_speed, comp_price)
+
+
+class Solution(NamedTuple):
+    target: float
+    net_apr: float
+    utilisation: float
+    supply_apr: float  # of the market, at that utilisation
+    borrow_apr: float
+    comp_apr: float  # on equity
+
+
+def position(equity, target) -> Tuple[np.ndarray, np.ndarray]:
+    target = np.asarray(target, dtype=float)
+    deposits = equity / (1 - target)
+    return deposits, deposits - equity
+
+
+def breakdown(pool: Pool, equity: float, target):
+    """Utilisation, supply and borrow rates per block, and COMP APR on equity, at `target` (array or scalar)."""
+    deposits, borrowed = position(equity, target)
+    cash = pool.cash + equity
+    borrows = pool.borrows + borrowed
+    supplied = cash + borrows - pool.reserves
+
+    utilisation = JumpRateModel.utilisation(cash, borrows, pool.reserves)
+    supply_rate = pool.model.supply_rate(utilisation)
+    borrow_rate = pool.model.borrow_rate(utilisation)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        comp = pool.comp_speed * (deposits / supplied + np.where(borrows > 0, borrowed / borrows, 0.0))
+    comp_apr = comp * pool.comp_price * BLOCKS_PER_YEAR / equity
+    return utilisation, supply_rate, borrow_rate, comp_apr
+
+
+def net_apr(pool: Pool, equity: float, target):
+    deposits, borrowed = position(equity, target)
+    _, supply_rate, borrow_rate, comp_apr = breakdown(pool, equity, target)
+    interest = (deposits * supply_rate - borrowed * borrow_rate) * BLOCKS_PER_YEAR / equity
+    return interest + comp_apr
+
+
+def golden_section(f: Callable[[float], float], lo: float, hi: float, iterations: int = ITERATIONS) -> float:
+    """The argmax of `f` on [lo, hi], assuming it is unimodal there."""
+    a, b = lo, hi
+    c, d = b - INV_PHI * (b - a), a + INV_PHI * (b - a)
+    fc, fd = f(c), f(d)
+    for _ in range(iterations):
+        if fc >= fd:
+            b, d, fd = d, c, fc
+            c = b - INV_PHI * (b - a)
+            fc = f(c)
+        else:
+            a, c, fc = c, d, fd
+            d = a + INV_PHI * (b - a)
+            fd = f(d)
+    return (a + b) / 2
+
+
+def max_target(pool: Pool, margin: float = MARGIN) -> float:
+    return max(pool.collateral_factor - margin, 0.0)
+
+
+def solve(pool: Pool, equity: float, margin: float = MARGIN, grid: int = GRID, iterations: int = ITERATIONS) -> Solution:
+    """Best target in [0, collateral factor - margin]."""
+    top = max_target(pool, margin)
+    targets = np.linspace(0, top, grid + 1)
+    aprs = net_apr(pool, equity, targets)
+    best = int(np.argmax(aprs))
+
+    lo, hi = targets[max(best - 1, 0)], targets[min(best + 1, grid)]
+    target = golden_section(lambda t: float(net_apr(pool, equity, t)), lo, hi, iterations)
+    # golden-section only ever narrows the bracket; keep a grid end point if it is still better
+    if aprs[best] > net_apr(pool, equity, target):
+        target = float(targets[best])
+    return solution(pool, equity, target)
+
+
+def solution(pool: Pool, equity: float, target: float) -> Solution:
+    utilisation, supply_rate, borrow_rate, comp_apr = breakdown(pool, equity, target)
+    return Solution(
+        target=float(target),
+        net_apr=float(net_apr(pool, equity, target)),
+        utilisation=float(utilisation),
+        supply_apr=float(supply_rate) * BLOCKS_PER_YEAR,
+        borrow_apr=float(borrow_rate) * BLOCKS_PER_YEAR,
+        comp_apr=float(comp_apr),
+    )
+
+
+def read_pool(strategy, block: int = None) -> Tuple[Pool, float]:
+    """The market a deployed strategy lends in, without the strategy, and the strategy's equity."""
+    from brownie import chain
+
+    from scripts.comp_accrual_model import COMPTROLLER
+    from scripts.liquidation_risk import from_strategy
+    from scripts.snapshot import _address, batch_call
+
+    block = chain.height if block is None else block
+    strategy = _address(strategy)
+    own, market, comp_price = from_strategy(strategy, block)
+    (ctoken,) = batch_call([(strategy, "cToken", ())], block, SIGNATURES)
+    cash, borrows, reserves, want, speed = batch_call(
+        [
+            (ctoken, "getCash", ()),
+            (ctoken, "totalBorrows", ()),
+            (ctoken, "totalReserves", ()),
+            (ctoken, "underlying", ()),
+            (COMPTROLLER, "compSpeeds", (ctoken,)),
+        ],
+        block,
+        SIGNATURES,
+    )
+    (decimals,) = batch_call([(want, "decimals", ())], block)
+    unit = 10 ** decimals
+
+    pool = Pool.without(
+        market.model,
+        cash / unit,
+        borrows / unit,
+        reserves / unit,
+        own.deposits,
+        own.borrows,
+        collateral_factor=market.collateral_factor,
+        comp_speed=speed / 1e18,
+        comp_price=comp_price,
+    )
+    return pool, own.equity
+
+
+def solve_on_chain(solver, strategy, margin: float = MARGIN, grid: int = GRID, iterations: int = ITERATIONS) -> Tuple[float, float]:
+    """TargetSolver.solve: the best target and its net APR, as the contract finds them."""
+    target, rate = solver.solve(strategy, int(margin * 1e18), grid, iterations)
+    return target / 1e18, rate / 1e18 * BLOCKS_PER_YEAR
+
+
+def retune(strategy, account, solver=None, min_change: float = 0.01, margin: float = MARGIN):
+    """
+    setCollateralTarget to the solved target, from the TargetSolver contract
+    when given, if it is at least `min_change` away from the current one.
+    Returns the target and the transaction, None when nothing was sent.
+    """
+    if solver is not None:
+        target, _ = solve_on_chain(solver, strategy, margin)
+    else:
+        pool, equity = read_pool(strategy)
+        target = solve(pool, equity, margin).target
+    if abs(target - strategy.collateralTarget() / 1e18) < min_change:
+        return target, None
+    return target, strategy.setCollateralTarget(int(target * 1e18), {"from": account})
+
+
+def format_curve(pool: Pool, equity: float, margin: float = MARGIN, points: int = 11) -> str:
+    lines = [f"{'target':>7} {'util':>7} {'supply':>8} {'borrow':>8} {'comp':>8} {'net':>8}"]
+    for target in np.linspace(0, max_target(pool, margin), points):
+        s = solution(pool, equity, target)
+        lines.append(f"{s.target:>7.3f} {s.utilisation:>7.2%} {s.supply_apr:>8.2%} {s.borrow_apr:>8.2%} {s.comp_apr:>8.2%} {s.net_apr:>8.2%}")
+    return "\n".join(lines)
+
+
+def main():
+    from scripts.keeper import LIVE_STRATEGIES
+
+    for strategy, _ in LIVE_STRATEGIES:
+        pool, equity = read_pool(strategy)
+        print(strategy)
+        print(format_curve(pool, equity))
+        print(f"best: {solve(pool, equity)}\n")
@@ -0,0 +1,209 @@
+"""
+Append-only columnar history of a strategy and its vault, plus vectorised
+yield analytics over it.
+
+A store is a directory holding one raw little-endian file per column and a
+`meta.json` describing them. Appending writes to the end of each column
+file, reading memory-maps them, so months of per-block samples load
+instantly and are never re-derived from RPC:
+
+    recorder = Recorder("history/dai")
+    recorder.append(sample(strategy, vault, comp))
+    data = recorder.read()
+    rolling_apr(data["timestamp"], data["price_per_share"], window=7 * DAY)
+
+Rows are only complete once every column has them; a partially written row
+(e.g. the process died mid-append) is ignored on read and overwritten by the
+next append.
+
+The analytics take plain numpy arrays and use timestamps, not an assumed
+number of blocks per year.
+
+Usage:
+    brownie run timeseries --network mainnet
+"""
+import json
+from pathlib import Path
+from typing import Dict, Iterable, Mapping, NamedTuple
+
+import numpy as np
+
+STORE_VERSION = 1
+DAY = 86400
+SECONDS_PER_YEAR = 365 * DAY
+HISTORY_PATH = Path(__file__).resolve().parent.parent / "history"
+COMP = "0xc00e94Cb662C3520282E6f5717214004A7f26888"
+
+# name: dtype. uint256 values are stored as float64, plenty for analytics
+COLUMNS = {
+    "block": "<i8",
+    "timestamp": "<i8",
+    "price_per_share": "<f8",
+    "total_assets": "<f8",
+    "total_gain": "<f8",
+    "deposits": "<f8",
+    "borrows": "<f8",
+    "comp_balance": "<f8",
+    "collateralisation": "<f8",
+}
+
+
+class Sample(NamedTuple):
+    block: int
+    timestamp: int
+    price_per_share: float
+    total_assets: float
+    total_gain: float
+    deposits: float
+    borrows: float
+    comp_balance: float
+    collateralisation: float
+
+
+class Recorder:
+    def __init__(self, path, columns: Mapping[str, str] = None):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        meta_path = self.path / "meta.json"
+        if meta_path.exists():
+            meta = json.loads(meta_path.read_text())
+            if meta.get("version") != STORE_VERSION:
+                raise ValueError(f"{self.path} was written by store version {meta.get('version')}")
+            self.columns = meta["columns"]
+        else:
+            self.columns = dict(columns or COLUMNS)
+            meta_path.write_text(json.dumps({"version": STORE_VERSION, "columns": self.columns}, indent=2) + "\n")
+
+    def _file(self, name: str) -> Path:
+        return self.path / f"{name}.bin"
+
+    def __len__(self) -> int:
+        sizes = [
+            self._file(name).stat().st_size // np.dtype(dtype).itemsize if self._file(name).exists() else 0
+            for name, dtype in self.columns.items()
+        ]
+        return min(sizes)
+
+    def extend(self, rows: Mapping[str, Iterable]):
+        """Append many rows given as one array per column."""
+        arrays = {name: np.asarray(rows[name], dtype=dtype) for name, dtype in self.columns.items()}
+        if len({a.shape for a in arrays.values()}) != 1 or arrays["block"].ndim != 1:
+            raise ValueError("every column needs the same number of rows")
+
+        complete = len(self)
+        for name, dtype in self.columns.items():
+            with open(self._file(name), "ab") as f:
+                # drop the tail of a row that was only partly written
+                f.truncate(complete * np.dtype(dtype).itemsize)
+                f.write(arrays[name].tobytes())
+
+    def append(self, sample):
+        """Append one row, a Sample or a mapping of column values."""
+        values = sample._asdict() if hasattr(sample, "_asdict") else sample
+        self.extend({name: [values[name]] for name in self.columns})
+
+    def read(self) -> Dict[str, np.ndarray]:
+        """Read-only memory maps of every column, cut to the complete rows."""
+        rows = len(self)
+        data = {}
+        for name, dtype in self.columns.items():
+            if rows == 0:
+                data[name] = np.empty(0, dtype=dtype)
+            else:
+                data[name] = np.memmap(self._file(name), dtype=dtype, mode="r", shape=(rows,))
+        return data
+
+
+def sample(strategy, vault, comp=None, block: int = None) -> Sample:
+    """One row for `strategy` in `vault`, all read at the same block."""
+    from brownie import chain, web3
+
+    from scripts.snapshot import snapshot_strategy, snapshot_vault
+
+    block = chain.height if block is None else block
+    strat = snapshot_strategy(strategy, vault=vault, comp=comp, block=block)
+    vault_snap = snapshot_vault(vault, token=strat.want, strategies=[strategy], block=block)
+    return Sample(
+        block=block,
+        timestamp=web3.eth.getBlock(block)["timestamp"],
+        price_per_share=vault_snap.price_per_share,
+        total_assets=vault_snap.total_assets,
+        total_gain=strat.params.total_gain,
+        deposits=strat.deposits or 0,
+        borrows=strat.borrows or 0,
+        comp_balance=strat.comp_balance or 0,
+        collateralisation=strat.collateralisation,
+    )
+
+
+def apr(timestamps, values) -> float:
+    """Simple annualised growth of `values` from the first sample to the last."""
+    timestamps, values = np.asarray(timestamps), np.asarray(values, dtype=float)
+    if len(values) < 2 or timestamps[-1] <= timestamps[0] or values[0] == 0:
+        return 0.0
+    elapsed = timestamps[-1] - timestamps[0]
+    return float((values[-1] / values[0] - 1) * SECONDS_PER_YEAR / elapsed)
+
+
+def period_aprs(timestamps, values) -> np.ndarray:
+    """Annualised growth between each sample and the one before it (NaN for the first)."""
+    timestamps, values = np.asarray(timestamps), np.asarray(values, dtype=float)
+    out = np.full(len(values), np.nan)
+    elapsed = np.diff(timestamps).astype(float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out[1:] = np.where(elapsed > 0, (values[1:] / values[:-1] - 1) * SECONDS_PER_YEAR / elapsed, np.nan)
+    return out
+
+
+def rolling_apr(timestamps, values, window: float) -> np.ndarray:
+    """
+    Annualised growth over the trailing `window` seconds ending at each sample,
+    measured from the oldest sample inside the window. NaN where the window
+    holds a single sample.
+    """
+    timestamps, values = np.asarray(timestamps), np.asarray(values, dtype=float)
+    start = np.searchsorted(timestamps, timestamps - window, side="left")
+    elapsed = (timestamps - timestamps[start]).astype(float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(elapsed > 0, (values / values[start] - 1) * SECONDS_PER_YEAR / elapsed, np.nan)
+
+
+def drawdown(values) -> np.ndarray:
+    """Fractional drop of each sample below the running peak (0 at a new high, negative below it)."""
+    values = np.asarray(values, dtype=float)
+    peak = np.maximum.accumulate(values)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(peak > 0, values / peak - 1, 0.0)
+
+
+def max_drawdown(values) -> float:
+    values = np.asarray(values, dtype=float)
+    return float(drawdown(values).min()) if len(values) else 0.0
+
+
+def record(recorder: Recorder, strategy, vault, comp=COMP, blocks: Iterable[int] = None) -> int:
+    """
+    Append samples at `blocks` (default: the current block), skipping blocks
+    the store already has. Older blocks need an archive node. Returns rows added.
+    """
+    from brownie import chain
+
+    blocks = [chain.height] if blocks is None else list(blocks)
+    recorded = recorder.read()["block"]
+    last = int(recorded[-1]) if len(recorded) else -1
+    added = 0
+    for block in blocks:
+        if block > last:
+            recorder.append(sample(strategy, vault, comp, block))
+            last, added = block, added + 1
+    return added
+
+
+def main():
+    """Append the current block for every live strategy with a vault, one store each under history/."""
+    from scripts.keeper import LIVE_STRATEGIES
+
+    for strategy, vault in LIVE_STRATEGIES:
+        if vault is not None:
+            added = record(Recorder(HISTORY_PATH / strategy), strategy, vault)
+            print(f"{strategy}: {added} sample(s) recorded")
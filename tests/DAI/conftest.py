@@ -227,6 +227,21 @@ def comp(interface):
 def cdai(interface):
     yield interface.CErc20I('0x5d3a536e4d6dbd6114cc1ead35777bab948e3643')
 
+@pytest.fixture(scope="session", autouse=True)
+def mock_stack():
+    #on a plain dev network (not a fork) put local copies of compound, uniswap, dydx and aave at their mainnet addresses
+    from scripts.mock_stack import deploy_mock_stack, is_local
+
+    yield deploy_mock_stack() if is_local() else None
+
+@pytest.fixture(scope="module")
+def module_isolation(mock_stack, chain):
+    #brownie's resets to the chain from before the mock stack. go back to the stack deploy_mock_stack snapshotted instead
+    restore = chain.reset if mock_stack is None else chain.revert
+    restore()
+    yield
+    restore()
+
 #@pytest.fixture(autouse=True)
 #def isolation(fn_isolation):
 #    pass
@@ -283,38 +298,51 @@ def strategy(strategist,gov, keeper, vault,  Strategy, cdai):
 
     yield strategy
 
+@pytest.fixture(scope="session")
+def snapshot_pool():
+    #expensive states below are built once and loaded from an anvil state dump afterwards, see scripts/snapshot_pool.py
+    from scripts.snapshot_pool import SnapshotPool
+
+    yield SnapshotPool()
+
 @pytest.fixture()
-def largerunningstrategy(gov, strategy, dai, vault, whale):
+def largerunningstrategy(gov, strategy, dai, vault, whale, snapshot_pool):
 
-    amount = Wei('499000 ether')
-    dai.approve(vault, amount, {'from': whale})
-    vault.deposit(amount, {'from': whale})    
+    def build():
+        amount = Wei('499000 ether')
+        dai.approve(vault, amount, {'from': whale})
+        vault.deposit(amount, {'from': whale})    
 
-    strategy.harvest({'from': gov})
-    
-    #do it again with a smaller amount to replicate being this full for a while
-    amount = Wei('1000 ether')
-    dai.approve(vault, amount, {'from': whale})
-    vault.deposit(amount, {'from': whale})   
-    strategy.harvest({'from': gov})
+        strategy.harvest({'from': gov})
+        
+        #do it again with a smaller amount to replicate being this full for a while
+        amount = Wei('1000 ether')
+        dai.approve(vault, amount, {'from': whale})
+        vault.deposit(amount, {'from': whale})   
+        strategy.harvest({'from': gov})
+
+    snapshot_pool.use('largerunningstrategy', build, strategy.address, vault.address)
     
     yield strategy
 
 @pytest.fixture()
-def enormousrunningstrategy(gov, largerunningstrategy, dai, vault, whale):
-    dai.approve(vault, dai.balanceOf(whale), {'from': whale})
-    vault.deposit(dai.balanceOf(whale), {'from': whale})   
-   
-    collat = 0
+def enormousrunningstrategy(gov, largerunningstrategy, dai, vault, whale, snapshot_pool):
 
-    while collat < largerunningstrategy.collateralTarget() / 1.001e18:
-        
+    def build():
+        dai.approve(vault, dai.balanceOf(whale), {'from': whale})
+        vault.deposit(dai.balanceOf(whale), {'from': whale})   
+       
+        collat = 0
 
-        largerunningstrategy.harvest({'from': gov})
-        deposits, borrows = largerunningstrategy.getCurrentPosition()
-        collat = borrows / deposits
-        print(collat)
+        while collat < largerunningstrategy.collateralTarget() / 1.001e18:
+            
+
+            largerunningstrategy.harvest({'from': gov})
+            deposits, borrows = largerunningstrategy.getCurrentPosition()
+            collat = borrows / deposits
+            print(collat)
+
+    snapshot_pool.use('enormousrunningstrategy', build, largerunningstrategy.address, vault.address)
         
     
     yield largerunningstrategy
-
@@ -1,6 +1,7 @@
 from itertools import count
 from brownie import Wei, reverts
 from useful_methods import stateOfStrat, stateOfVault, deposit,wait, withdraw, harvest,assertCollateralRatio
+from scripts.timeseries import Recorder, apr, max_drawdown, sample
 import brownie
 
 
@@ -23,7 +24,7 @@ def test_sweep(web3,strategy, dai,cdai, gov, comp):
 
     
 
-def test_apr_dai(web3, chain, comp, vault, enormousrunningstrategy, whale, gov, dai, strategist):
+def test_apr_dai(web3, chain, comp, vault, enormousrunningstrategy, whale, gov, dai, strategist, tmp_path):
     enormousrunningstrategy.setProfitFactor(1, {"from": strategist} )
     assert(enormousrunningstrategy.profitFactor() == 1)
 
@@ -32,40 +33,36 @@ def test_apr_dai(web3, chain, comp, vault, enormousrunningstrategy, whale, gov,
     assert enormousrunningstrategy.minCompToSell() == 1
 
     startingBalance = vault.totalAssets()
+    assert startingBalance != 0
 
     stateOfStrat(enormousrunningstrategy, dai, comp)
     stateOfVault(vault, enormousrunningstrategy)
 
+    recorder = Recorder(tmp_path / 'dai')
+    recorder.append(sample(enormousrunningstrategy, vault, comp))
+
     for i in range(6):
         
         waitBlock = 25
         print(f'\n----wait {waitBlock} blocks----')
         wait(waitBlock, chain)
-        ppsBefore = vault.pricePerShare()
-        
-        harvest(enormousrunningstrategy, strategist, vault)
-        ppsAfter = vault.pricePerShare()
+        recorder.append(sample(enormousrunningstrategy, vault, comp))
 
-       
-        #stateOfStrat(enormousrunningstrategy, dai, comp)
-        #stateOfVault(vault, enormousrunningstrategy)
+        harvest(enormousrunningstrategy, strategist, vault)
+        recorder.append(sample(enormousrunningstrategy, vault, comp))
 
-        profit = (vault.totalAssets() - startingBalance).to('ether')
-        strState = vault.strategies(enormousrunningstrategy)
-        totalReturns = strState[6]
-        totaleth = totalReturns.to('ether')
+        history = recorder.read()
+        profit = (history['total_assets'][-1] - startingBalance) / 1e18
+        totaleth = history['total_gain'][-1] / 1e18
         print(f'Real Profit: {profit:.5f}')
-        difff= profit-totaleth
-        print(f'Diff: {difff}')
-
-        blocks_per_year = 2_300_000
-        assert startingBalance != 0
-        time =(i+1)*waitBlock
-        assert time != 0
-        ppsProfit = (ppsAfter - ppsBefore)/1e18/waitBlock*blocks_per_year
-        apr = (totalReturns/startingBalance) * (blocks_per_year / time)
-        print(f'implied apr assets: {apr:.8%}')
-        print(f'implied apr pps: {ppsProfit:.8%}')
+        print(f'Diff: {profit - totaleth}')
+
+        print(f"implied apr assets: {apr(history['timestamp'], history['total_assets']):.8%}")
+        print(f"implied apr pps: {apr(history['timestamp'][-2:], history['price_per_share'][-2:]):.8%}")
+
+    history = recorder.read()
+    assert len(history['block']) == 13
+    assert max_drawdown(history['price_per_share']) == 0
     vault.withdraw(vault.balanceOf(whale), {'from': whale})
 
 
@@ -0,0 +1,63 @@
+import brownie
+from brownie import Wei
+
+from scripts.keeper import ACTIONS, HARVEST_GAS
+from useful_methods import deposit
+
+
+def deploySecond(strategist, gov, vault, cdai, Strategy):
+    second = strategist.deploy(Strategy, vault, cdai)
+    vault.addStrategy(second, 500, 1_000_000 * 1e18, 1000, {"from": gov})
+    return second
+
+
+def test_batch_harvests_every_strategy(strategy, strategist, gov, keeper, vault, cdai, dai, whale, chain, Strategy, BatchHarvester):
+    second = deploySecond(strategist, gov, vault, cdai, Strategy)
+    harvester = gov.deploy(BatchHarvester)
+    harvester.setKeeper(keeper, True, {'from': gov})
+    strategy.setKeeper(harvester, {'from': strategist})
+    second.setKeeper(harvester, {'from': strategist})
+    deposit(Wei('10000 ether'), whale, dai, vault)
+
+    chain.mine(1)
+    before = chain.height
+    tx = harvester.execute([strategy, second], [ACTIONS['harvest']] * 2, {'from': keeper})
+
+    assert [(e['strategy'], e['success']) for e in tx.events['Worked']] == [(strategy, True), (second, True)]
+    assert tx.return_value == (True, True)
+    for s in (strategy, second):
+        assert vault.strategies(s)[4] >= chain[before].timestamp
+        assert s.estimatedTotalAssets() > 0
+
+
+def test_one_revert_does_not_block_the_rest(strategy, strategist, gov, keeper, vault, cdai, dai, whale, Strategy, BatchHarvester):
+    # the harvester is not the keeper of the second strategy, so its harvest reverts
+    second = deploySecond(strategist, gov, vault, cdai, Strategy)
+    harvester = gov.deploy(BatchHarvester)
+    strategy.setKeeper(harvester, {'from': strategist})
+    deposit(Wei('10000 ether'), whale, dai, vault)
+
+    tx = harvester.execute([second, strategy], [ACTIONS['harvest']] * 2, {'from': gov})
+
+    failed, worked = tx.events['Worked']
+    assert (failed['strategy'], failed['success']) == (second, False)
+    assert b'!authorized' in bytes(failed['reason'])
+    assert (worked['strategy'], worked['success']) == (strategy, True)
+    assert strategy.estimatedTotalAssets() > 0
+
+
+def test_work_follows_triggers(strategy, strategist, gov, keeper, vault, dai, whale, BatchHarvester):
+    harvester = gov.deploy(BatchHarvester)
+    harvester.setKeeper(keeper, True, {'from': gov})
+    strategy.setKeeper(harvester, {'from': strategist})
+    deposit(Wei('10000 ether'), whale, dai, vault)
+
+    gasCost = HARVEST_GAS * 30 * 10 ** 9
+    expected = harvester.workable([strategy], [gasCost])
+    tx = harvester.work([strategy], [gasCost], {'from': keeper})
+
+    assert tx.return_value[0] == expected
+    assert len(tx.events['Worked'] if 'Worked' in tx.events else []) == (0 if expected[0] == 0 else 1)
+
+    with brownie.reverts('!keeper'):
+        harvester.work([strategy], [gasCost], {'from': whale})
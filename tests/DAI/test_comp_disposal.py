@@ -0,0 +1,30 @@
+import brownie
+
+
+def test_small_sales_are_not_capped(strategy):
+    assert strategy.maxCompImpactBps() == 100
+    assert strategy.compSaleSize(1e18) == 1e18
+
+
+def test_large_sales_are_capped_and_bounded(strategy, gov):
+    huge = 10_000_000e18
+    amount = strategy.compSaleSize(huge)
+    assert 0 < amount < huge
+
+    # the minimum is below what the pools actually pay for the capped amount
+    quote = strategy.priceCheck(strategy.comp(), strategy.want(), amount)
+    minimum = strategy.minCompSaleOutput(amount)
+    assert 0 < minimum <= quote
+
+    strategy.setMaxCompImpactBps(10000, {'from': gov})
+    assert strategy.compSaleSize(huge) == huge
+    assert strategy.minCompSaleOutput(amount) == 0
+
+
+def test_impact_limit_is_checked(strategy, gov, whale):
+    with brownie.reverts('!bps'):
+        strategy.setMaxCompImpactBps(0, {'from': gov})
+    with brownie.reverts('!bps'):
+        strategy.setMaxCompImpactBps(10001, {'from': gov})
+    with brownie.reverts():
+        strategy.setMaxCompImpactBps(50, {'from': whale})
@@ -24,3 +24,18 @@ def test_comp_dis(web3, chain, comp, vault, largerunningstrategy, dai, gov):
 
   #  stateOfStrat(largerunningstrategy, dai)
   #  stateOfVault(vault, largerunningstrategy)
+
+
+def test_predict_comp_accrued_is_exact(chain, comp, cdai, largerunningstrategy, gov, interface):
+    from scripts.comp_accrual_model import predict_comp_accrued, read_state
+
+    wait(100, chain)
+    state = read_state(largerunningstrategy, cdai)
+    assert largerunningstrategy.predictCompAccrued() == predict_comp_accrued(state)
+
+    # the claim is mined in the next block, which the model predicts without another read
+    balanceBefore = comp.balanceOf(largerunningstrategy)
+    comptroller = interface.ComptrollerI(largerunningstrategy.compound())
+    tx = comptroller.claimComp['address,address[]'](largerunningstrategy, [cdai], {'from': gov})
+
+    assert comp.balanceOf(largerunningstrategy) - balanceBefore == predict_comp_accrued(state, tx.block_number)
@@ -0,0 +1,57 @@
+import brownie
+
+
+def packedConfig(strategy):
+    # Strategy.Config's first slot, lowest field first
+    return (
+        strategy.collateralTarget()
+        | strategy.blocksToLiquidationDangerZone() << 64
+        | strategy.dyDxMarketId() << 96
+        | strategy.DyDxActive() << 104
+        | strategy.AaveActive() << 112
+        | strategy.minCompToSell() << 128
+    )
+
+
+def configSlot(strategy, web3):
+    expected = packedConfig(strategy)
+    for slot in range(64):
+        if int.from_bytes(web3.eth.getStorageAt(strategy.address, slot), 'big') == expected:
+            return slot
+    return None
+
+
+def test_getters_keep_their_defaults(strategy):
+    assert strategy.collateralTarget() == 0.73e18
+    assert strategy.blocksToLiquidationDangerZone() == 46500
+    assert strategy.minWant() == 0
+    assert strategy.minCompToSell() == 0.1e18
+    assert strategy.DyDxActive()
+    assert not strategy.AaveActive()
+
+
+def test_hot_parameters_share_one_slot(strategy, gov, web3):
+    slot = configSlot(strategy, web3)
+    assert slot is not None
+
+    strategy.setCollateralTarget(0.6e18, {'from': gov})
+    strategy.setMinCompToSell(5e18, {'from': gov})
+    strategy.setDyDx(False, {'from': gov})
+    strategy.setAave(True, {'from': gov})
+    strategy.setMinWant(1e18, {'from': gov})
+
+    assert configSlot(strategy, web3) == slot
+    assert strategy.collateralTarget() == 0.6e18
+    assert strategy.minCompToSell() == 5e18
+    assert not strategy.DyDxActive()
+    assert strategy.AaveActive()
+    assert strategy.minWant() == 1e18
+
+
+def test_setters_reject_values_that_do_not_fit(strategy, gov):
+    with brownie.reverts("SafeCast: value doesn't fit in 128 bits"):
+        strategy.setMinCompToSell(2 ** 128, {'from': gov})
+    with brownie.reverts("SafeCast: value doesn't fit in 128 bits"):
+        strategy.setMinWant(2 ** 128, {'from': gov})
+    with brownie.reverts("!dangerous collateral"):
+        strategy.setCollateralTarget(2 ** 64, {'from': gov})
@@ -0,0 +1,28 @@
+from brownie import Wei, web3
+
+from scripts.event_indexer import LEVERAGE_TOPIC, STRATEGY_REPORTED_TOPIC, EventIndexer
+from scripts.rpc_cache import Upstream
+
+
+def test_topics_match_the_abis(Strategy, Vault):
+    assert Strategy.topics['Leverage'] == LEVERAGE_TOPIC
+    assert Vault.topics['StrategyReported'] == STRATEGY_REPORTED_TOPIC
+
+
+def test_indexes_the_local_chain(chain, strategy, vault, dai, whale, gov, tmp_path):
+    start = chain.height + 1
+    amount = Wei('100000 ether')
+    dai.approve(vault, amount, {'from': whale})
+    vault.deposit(amount, {'from': whale})
+    tx = strategy.harvest({'from': gov})
+    chain.mine(10)
+    strategy.harvest({'from': gov})
+
+    indexer = EventIndexer(Upstream(web3.provider.endpoint_uri), [(strategy.address, vault.address)], tmp_path / 'events.sqlite', chunk=5, confirmations=0)
+    indexer.run(from_block=start)
+
+    levers = indexer.query('SELECT block, amount_given, flash_loan FROM leverage WHERE strategy = ? ORDER BY block, log_index', [strategy.address.lower()])
+    expected = [(tx.block_number, str(e['amountGiven']), e['flashLoan'].lower()) for e in tx.events['Leverage']]
+    assert levers[:len(expected)] == expected
+    assert len(indexer.reports_for(strategy)) == 2
+    assert indexer.last_indexed() == chain.height
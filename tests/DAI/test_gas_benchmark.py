@@ -0,0 +1,24 @@
+import os
+
+import pytest
+from brownie import network
+from scripts.gas_benchmark import baseline_path, compare, format_table, load_baseline, measure_sweep, save_baseline
+
+
+def test_gas_benchmark(chain, strategy, vault, dai, whale, gov):
+    path = baseline_path()
+    baseline = load_baseline(path)
+    update = os.environ.get('UPDATE_GAS_BASELINE')
+    #nothing to compare against: every case would be missing from the baseline
+    if not update and not baseline['results']:
+        pytest.skip(f'no gas baseline recorded in {path}, record one with UPDATE_GAS_BASELINE=1')
+
+    results = measure_sweep(chain, strategy, vault, dai, whale, gov)
+    print('\n' + format_table(results, baseline))
+
+    if update:
+        save_baseline(results, path, network=network.show_active())
+        return
+
+    regressions = compare(results, baseline)
+    assert not regressions, 'gas regressions:\n' + '\n'.join(str(r) for r in regressions)
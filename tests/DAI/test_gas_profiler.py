@@ -0,0 +1,19 @@
+from brownie import Wei
+from useful_methods import deposit
+
+from scripts.gas_profiler import collapsed, profile, rows
+
+
+def test_harvest_profile_accounts_for_all_execution_gas(chain, strategy, vault, dai, whale, gov):
+    deposit(Wei('100000 ether'), whale, dai, vault)
+    strategy.harvest({'from': gov})
+    chain.mine(100)
+    tx = strategy.harvest({'from': gov})
+
+    gas = profile(tx.trace)
+    assert sum(gas.values()) == tx.trace[0]['gas'] - tx.trace[-1]['gas'] + tx.trace[-1]['gasCost']
+
+    frames = {r.frame for r in rows(gas)}
+    assert {'Strategy._claimComp', 'Strategy._disposeOfComp'} <= frames
+    # every stack starts at the harvest entry point
+    assert {line.split(';')[0].split(' ')[0].split('.')[-1] for line in collapsed(gas)} == {'harvest'}
@@ -0,0 +1,67 @@
+from brownie import Wei
+from useful_methods import deposit
+
+from scripts.harvest_trigger_model import BLOCKS_PER_YEAR, HARVEST_GAS, Rates, break_even_surface, harvest_decision, harvest_trigger_at
+from scripts.snapshot import TriggerState
+
+GAS_PRICES = [1, 5, 20, 50, 100, 300, 1000]  # gwei
+
+
+def leveredStrategy(chain, strategy, vault, dai, whale, gov):
+    deposit(Wei('1000000 ether'), whale, dai, vault)
+    strategy.harvest({'from': gov})
+    chain.mine(10)
+    strategy.harvest({'from': gov})
+
+
+def test_harvest_decision_matches_trigger_state(chain, strategy, vault, dai, whale, gov):
+    leveredStrategy(chain, strategy, vault, dai, whale, gov)
+    chain.mine(500)
+
+    params = vault.strategies(strategy).dict()
+    for gwei in GAS_PRICES:
+        state = TriggerState(*strategy.triggerState(HARVEST_GAS * gwei * 1e9))
+        decided = harvest_decision(
+            state,
+            strategy.profitFactor(),
+            strategy.minCompToSell(),
+            strategy.maxReportDelay(),
+            chain[-1].timestamp,
+            params['lastReport'],
+            params['totalDebt'],
+        )
+        assert decided == state.harvest
+
+
+def test_linear_model_agrees_away_from_the_boundary(chain, strategy, vault, dai, comp, weth, whale, gov):
+    leveredStrategy(chain, strategy, vault, dai, whale, gov)
+    harvested = chain.height
+
+    blocks = 200
+    deposits, borrows = strategy.getCurrentPosition()
+    accrued = strategy.predictCompAccrued()
+    chain.mine(blocks)
+    deposits_after, borrows_after = strategy.getCurrentPosition()
+
+    equity = (deposits - borrows) / 1e18
+    interest = ((deposits_after - borrows_after) - (deposits - borrows)) / 1e18
+    rates = Rates(
+        comp_per_block=(strategy.predictCompAccrued() - accrued) / 1e18 / blocks / equity,
+        interest_apr=interest / blocks * BLOCKS_PER_YEAR / equity,
+        weth_price=strategy.priceCheck(weth, dai, 1e18) / 1e18,
+    )
+    comp_price = strategy.priceCheck(comp, dai, 1e18) / 1e18
+    profit_factor = strategy.profitFactor()
+    limits = (strategy.minCompToSell() / 1e18, strategy.maxReportDelay())
+
+    surface = break_even_surface(GAS_PRICES, [equity], [comp_price], [profit_factor], rates, *limits)
+    elapsed = chain.height - harvested
+
+    compared = 0
+    for gwei, interval in zip(GAS_PRICES, surface.interval_blocks[:, 0, 0, 0]):
+        if 0.8 < elapsed / interval < 1.25:
+            continue
+        modelled = harvest_trigger_at(elapsed, gwei, equity, comp_price, profit_factor, rates, *limits)
+        assert strategy.harvestTrigger(HARVEST_GAS * gwei * 1e9) == modelled, f'{gwei} gwei: model harvests every {interval:.0f} blocks'
+        compared += 1
+    assert compared > 0
@@ -0,0 +1,30 @@
+import asyncio
+
+from scripts.keeper import HARVEST_GAS, Keeper, send
+
+
+def test_keeper_matches_triggers(chain, largerunningstrategy, vault, gov):
+    gasCost = HARVEST_GAS * 30 * 10 ** 9
+    keeper = Keeper([(largerunningstrategy.address, vault.address)], gas_cost=lambda: gasCost)
+
+    chain.mine(100)
+    jobs = asyncio.run(keeper.poll())
+
+    harvest = largerunningstrategy.harvestTrigger(gasCost)
+    tend = largerunningstrategy.tendTrigger(gasCost)
+    assert [j.action for j in jobs] == (['harvest'] if harvest else ['tend'] if tend else [])
+    for job in jobs:
+        assert job.snapshot.block == chain.height
+
+
+def test_keeper_runs_queued_jobs(chain, largerunningstrategy, vault, gov):
+    # a zero gas cost makes any profit worth a harvest
+    keeper = Keeper([(largerunningstrategy.address, vault.address)], gas_cost=lambda: 0)
+    chain.sleep(86400)
+    chain.mine(1)
+
+    before = chain.height
+    asyncio.run(keeper.run(send(gov), interval=0, passes=1))
+
+    assert not keeper.queue
+    assert vault.strategies(largerunningstrategy)[4] >= chain[before].timestamp
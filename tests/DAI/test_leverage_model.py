@@ -0,0 +1,111 @@
+import pytest
+from brownie import Wei
+from useful_methods import deposit
+
+from scripts.leverage_model import EXP_SCALE, Position, adjust_position
+from scripts.mock_stack import COLLATERAL_FACTOR, MAINNET, RESERVE_FACTOR, is_local
+
+
+@pytest.fixture(autouse=True)
+def local_only():
+    if not is_local():
+        pytest.skip("needs a market without interest, only the mock stack has one")
+
+
+@pytest.fixture
+def comptroller(MockComptroller):
+    yield MockComptroller.at(MAINNET['comptroller'])
+
+
+@pytest.fixture
+def flatmarket(MockCToken, MockInterestRateModel, comptroller, dai, whale, gov):
+    #no interest and one want per cToken: the position only moves inside the harvest, and the exchange rate
+    #the model holds constant stays constant. a dai market at 0.02 drifts by mint rounding from one mint to the next
+    model = MockInterestRateModel.deploy(0, 0, 0, Wei('0.8 ether'), {'from': gov})
+    market = MockCToken.deploy({'from': gov})
+    market.initialize(dai, comptroller, model, EXP_SCALE, RESERVE_FACTOR, 'Compound Dai flat', 'cDAIf', {'from': gov})
+    comptroller._supportMarket(market, COLLATERAL_FACTOR, {'from': gov})
+
+    #someone else's supply, so the market has cash beyond ours
+    amount = Wei('1000000 ether')
+    dai.approve(market, amount, {'from': whale})
+    market.mint(amount, {'from': whale})
+    yield market
+
+
+@pytest.fixture
+def flatstrategy(Strategy, strategist, keeper, vault, flatmarket, gov):
+    strategy = strategist.deploy(Strategy, vault, flatmarket)
+    strategy.setKeeper(keeper)
+    vault.addStrategy(strategy, 9_500, 1_000_000 * 1e18, 1000, {'from': gov})
+
+    #the model is adjustPosition without flash loans
+    strategy.setDyDx(False, {'from': gov})
+    strategy.setAave(False, {'from': gov})
+    yield strategy
+
+
+def harvestAgainstModel(strategy, market, comptroller, vault, dai, gov):
+    _, ctokens, borrows, rate = market.getAccountSnapshot(strategy)
+    held = dai.balanceOf(strategy)
+    target = strategy.collateralTarget()
+    minWant = strategy.minWant()
+    _, collateralFactor, _ = comptroller.markets(market)
+
+    tx = strategy.harvest({'from': gov})
+
+    #adjustPosition runs on what we held plus what report moved between the vault and us
+    for event in tx.events['Transfer']:
+        if event.address != dai.address:
+            continue
+        src, dst, amount = event.values()
+        if src == vault.address and dst == strategy.address:
+            held += amount
+        elif src == strategy.address and dst == vault.address:
+            held -= amount
+    debtOutstanding = vault.debtOutstanding(strategy)
+
+    result = adjust_position(Position.from_snapshot([ctokens], [borrows], [rate], [held]), collateralFactor, target, debtOutstanding, minWant)
+    assert not result.reverted[0]
+    assert not result.withdrawing[0]
+
+    _, ctokensAfter, borrowsAfter, _ = market.getAccountSnapshot(strategy)
+    assert result.position.ctokens[0] == ctokensAfter
+    assert result.position.borrows[0] == borrowsAfter
+    assert result.position.want[0] == dai.balanceOf(strategy)
+    assert tx.events.count('Leverage') == result.calls[0]
+    return result
+
+
+@pytest.mark.parametrize('amount', [Wei('1000 ether'), Wei('100000 ether')])
+def test_model_levers_like_harvest(flatstrategy, flatmarket, comptroller, vault, dai, whale, gov, amount):
+    deposit(amount, whale, dai, vault)
+    first = harvestAgainstModel(flatstrategy, flatmarket, comptroller, vault, dai, gov)
+    assert first.steps[0] > 1
+
+    #more want on top of a levered position
+    deposit(Wei(amount // 3), whale, dai, vault)
+    harvestAgainstModel(flatstrategy, flatmarket, comptroller, vault, dai, gov)
+
+
+def test_model_delevers_like_harvest(flatstrategy, flatmarket, comptroller, vault, dai, whale, gov):
+    deposit(Wei('100000 ether'), whale, dai, vault)
+    harvestAgainstModel(flatstrategy, flatmarket, comptroller, vault, dai, gov)
+
+    #over the new target, so the harvest repays in at most MAX_DELEVERAGE_STEPS pairs
+    flatstrategy.setCollateralTarget(Wei('0.3 ether'), {'from': gov})
+    result = harvestAgainstModel(flatstrategy, flatmarket, comptroller, vault, dai, gov)
+    assert result.steps[0] > 0
+
+    #and again from wherever that left it
+    harvestAgainstModel(flatstrategy, flatmarket, comptroller, vault, dai, gov)
+
+
+def test_model_skips_below_min_want(flatstrategy, flatmarket, comptroller, vault, dai, whale, gov):
+    deposit(Wei('100000 ether'), whale, dai, vault)
+    harvestAgainstModel(flatstrategy, flatmarket, comptroller, vault, dai, gov)
+
+    flatstrategy.setMinWant(Wei('1000000 ether'), {'from': gov})
+    deposit(Wei('1000 ether'), whale, dai, vault)
+    result = harvestAgainstModel(flatstrategy, flatmarket, comptroller, vault, dai, gov)
+    assert result.calls[0] == 0
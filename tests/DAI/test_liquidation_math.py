@@ -0,0 +1,25 @@
+from scripts.liquidation_model import blocks_until_liquidation, cases, linear_blocks, measure_gas
+
+
+def test_harness_matches_model(LiquidationMathHarness, accounts):
+    harness = LiquidationMathHarness.deploy({'from': accounts[0]})
+
+    for case in cases():
+        assert harness.blocksUntilLiquidation(*case.args) == blocks_until_liquidation(*case.args)
+        assert harness.linearBlocksUntilLiquidation(*case.args) == linear_blocks(*case.args)
+
+    gas = measure_gas(harness)
+    solver = sum(g[1] for g in gas) / len(gas)
+    linear = sum(g[2] for g in gas) / len(gas)
+    print(f'mean gas: solver {solver:.0f}, linear {linear:.0f}')
+    # a keeper view: cheap next to the ~15 external calls around it
+    assert solver < 60000
+
+
+def test_strategy_uses_solver(largerunningstrategy, cdai, interface):
+    deposits, borrows = largerunningstrategy.getCurrentPosition()
+    collateral_factor = interface.ComptrollerI(largerunningstrategy.compound()).markets(cdai)[1]
+    collateralised = deposits * collateral_factor // 10 ** 18
+
+    expected = blocks_until_liquidation(collateralised, borrows, cdai.supplyRatePerBlock(), cdai.borrowRatePerBlock())
+    assert largerunningstrategy.getblocksUntilLiquidation() == expected
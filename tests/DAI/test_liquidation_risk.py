@@ -0,0 +1,26 @@
+import pytest
+
+
+def test_rate_model_matches_market(cdai):
+    from scripts.rate_model import read_market
+
+    market = read_market(cdai)
+    borrowRate = market.model.borrow_rate(market.utilisation)
+    supplyRate = market.model.supply_rate(market.utilisation)
+
+    assert borrowRate == pytest.approx(cdai.borrowRatePerBlock() / 1e18, rel=1e-9)
+    assert supplyRate == pytest.approx(cdai.supplyRatePerBlock() / 1e18, rel=1e-9)
+    assert 0 < market.collateral_factor < 1
+
+
+def test_current_settings_within_risk_budget(largerunningstrategy):
+    from scripts.liquidation_risk import from_strategy, simulate
+
+    position, market, compPrice = from_strategy(largerunningstrategy)
+    assert position.collateralisation == pytest.approx(largerunningstrategy.collateralTarget() / 1e18, abs=0.01)
+
+    target = largerunningstrategy.collateralTarget() / 1e18
+    dangerZone = largerunningstrategy.blocksToLiquidationDangerZone()
+    outcome = simulate(position, market, compPrice, [target], [dangerZone], paths=500, start=position.collateralisation)[0]
+    print(outcome)
+    assert outcome.p_liquidation < 0.01
@@ -4,6 +4,7 @@ import eth_abi
 from brownie.convert import to_bytes
 from useful_methods import genericStateOfStrat,wait, withdraw, stateOfVault,stateOfStrat,genericStateOfVault, deposit, tend, sleep, harvest
 import random
+from scripts.timeseries import Recorder, apr, sample
 import brownie
 
 def test_snapshot_both(live_vault_dai_030, live_strategy_dai_030,live_vault_usdc_030, live_strategy_usdc_030, Contract, whale, web3,live_gov, accounts, chain, cdai, comp, dai, usdc, currency, samdev):
@@ -102,7 +103,7 @@ def test_deposit_live_usdc(live_vault_usdc_030, live_strategy_usdc_030, Contract
     genericStateOfStrat(strategy,usdc, vault )
 
 
-def test_live_apr_usdc(live_vault_usdc_030, live_strategy_usdc_030, Contract, whale, web3,live_gov, accounts, chain, cdai, comp, usdc, currency, samdev):
+def test_live_apr_usdc(live_vault_usdc_030, live_strategy_usdc_030, Contract, whale, web3,live_gov, accounts, chain, cdai, comp, usdc, currency, samdev, tmp_path):
     strategist = samdev
     strategy = live_strategy_usdc_030
     vault = live_vault_usdc_030
@@ -110,41 +111,33 @@ def test_live_apr_usdc(live_vault_usdc_030, live_strategy_usdc_030, Contract, wh
 
     strategy.harvest({'from': strategist})
     startingBalance = vault.totalAssets()
+    assert startingBalance != 0
+
+    recorder = Recorder(tmp_path / 'usdc')
+    recorder.append(sample(strategy, vault, comp))
 
     for i in range(6):
         
         waitBlock = 500
         print(f'\n----wait {waitBlock} blocks----')
         wait(waitBlock, chain)
-        ppsBefore = vault.pricePerShare()
-        print(ppsBefore/1e6)
-        
+        recorder.append(sample(strategy, vault, comp))
         
         strategy.harvest({'from': strategist})
+        recorder.append(sample(strategy, vault, comp))
 
         #stateOfStrat(strategy, usdc, comp)
         #genericStateOfVault(vault, usdc)
 
-        ppsAfter = vault.pricePerShare()
-        print(ppsAfter/1e6)
- 
+        history = recorder.read()
+        print(history['price_per_share'][-2] / 1e6)
+        print(history['price_per_share'][-1] / 1e6)
 
-        profit = (vault.totalAssets() - startingBalance) /1e6
-        strState = vault.strategies(strategy)
-        totalReturns = strState[6]
-        totaleth = totalReturns / 1e6
+        profit = (history['total_assets'][-1] - startingBalance) / 1e6
         print(f'Real Profit: {profit:.5f}')
-        difff= profit-totaleth
-       # print(f'Diff: {difff}')
 
-        blocks_per_year = 2_300_000
-        assert startingBalance != 0
-        time =(i+1)*waitBlock
-        assert time != 0
-        ppsProfit = (ppsAfter-ppsBefore) / ppsBefore/waitBlock*blocks_per_year
-        apr = (profit/(startingBalance/1e6)) * (blocks_per_year / time)
-        print(f'implied apr assets: {apr:.8%}')
-        print(f'implied apr pps: {ppsProfit:.8%}')
+        print(f"implied apr assets: {apr(history['timestamp'], history['total_assets']):.8%}")
+        print(f"implied apr pps: {apr(history['timestamp'][-2:], history['price_per_share'][-2:]):.8%}")
 
 def test_live_apr_dai(live_vault_dai_030, live_strategy_dai_030, Contract, whale, web3,live_gov, accounts, chain, cdai, comp, usdc, currency, samdev):
     strategist = samdev
@@ -0,0 +1,29 @@
+import pytest
+from brownie import Wei
+from useful_methods import deposit
+
+from scripts.mock_stack import is_local
+
+
+@pytest.fixture(autouse=True)
+def local_only():
+    if not is_local():
+        pytest.skip("mock stack is only deployed on a local dev network")
+
+
+def test_mock_stack_leverages(chain, comp, vault, strategy, dai, whale, gov):
+    assert strategy.dyDxMarketId() == 3
+
+    deposit(Wei('100000 ether'), whale, dai, vault)
+    strategy.harvest({'from': gov})
+
+    deposits, borrows = strategy.getCurrentPosition()
+    assert borrows > 0
+    assert borrows * 1e18 / deposits > strategy.collateralTarget() * 0.99
+
+    chain.mine(1000)
+    assert strategy.predictCompAccrued() > 0
+
+    #comp is claimed and sold through the mock uniswap pools
+    strategy.harvest({'from': gov})
+    assert comp.balanceOf(strategy) <= strategy.minCompToSell()
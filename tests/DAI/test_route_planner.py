@@ -0,0 +1,80 @@
+import brownie
+from brownie import Wei
+import pytest
+
+SOLO = '0x1E0447b19BB6EcFdAe1e4AE1694b0C3659614e4e'
+ZERO_ADDRESS = '0x0000000000000000000000000000000000000000'
+
+
+@pytest.mark.parametrize('deficit,useBackup', [(False, False), (True, False), (True, True)])
+def test_plan_matches_model(largerunningstrategy, gov, deficit, useBackup):
+    from scripts.route_planner import plan, read_market
+
+    largerunningstrategy.setAave(True, {'from': gov})
+    deposits, borrows = largerunningstrategy.getCurrentPosition()
+    position = borrows // 2
+
+    onChain = largerunningstrategy.planRoutes(position, deficit, useBackup)
+    model = plan(position, deficit, read_market(largerunningstrategy, deficit, useBackup))
+    assert [tuple(step) for step in onChain] == [tuple(step) for step in model]
+    assert model[-1].residual < position
+
+
+def test_harvest_takes_cheapest_route(strategy, vault, dai, whale, gov):
+    amount = Wei('100000 ether')
+    dai.approve(vault, amount * 2, {'from': whale})
+    vault.deposit(amount, {'from': whale})
+
+    #a dydx loan costs less gas than the nine plain pairs a fresh deposit needs. the gas price the tx pays does not matter
+    tx = strategy.harvest({'from': gov, 'gas_price': 0})
+    assert [e['flashLoan'] for e in tx.events['Leverage']] == [SOLO]
+
+    #gas next to free, so the 2 wei dydx fee decides
+    strategy.setWantPerMillionGas(1, {'from': gov})
+    vault.deposit(amount, {'from': whale})
+    tx = strategy.harvest({'from': gov, 'gas_price': Wei('50 gwei')})
+    assert [e['flashLoan'] for e in tx.events['Leverage']] == [ZERO_ADDRESS]
+    assert strategy.storedCollateralisation() == pytest.approx(strategy.collateralTarget(), rel=1e-3)
+
+
+def test_set_want_per_million_gas(strategy, keeper, gov, rando):
+    from scripts.keeper import refresh_gas_price
+    from scripts.route_planner import quote_want_per_million_gas
+
+    #the constructor quoted it at 50 gwei
+    assert strategy.wantPerMillionGas() == quote_want_per_million_gas(strategy, Wei('50 gwei'))
+
+    with brownie.reverts('!wantPerMillionGas'):
+        strategy.setWantPerMillionGas(0, {'from': gov})
+    with brownie.reverts('!authorized'):
+        strategy.setWantPerMillionGas(1, {'from': rando})
+
+    assert refresh_gas_price(strategy, keeper, Wei('55 gwei')) is None
+    refresh_gas_price(strategy, keeper, Wei('100 gwei'))
+    assert strategy.wantPerMillionGas() == quote_want_per_million_gas(strategy, Wei('100 gwei'))
+
+
+def test_deploys_without_a_weth_pool(Strategy, Vault, MockERC20, MockCToken, MockComptroller, MockInterestRateModel, MockSoloMargin, strategist, gov, keeper):
+    from scripts.mock_stack import COLLATERAL_FACTOR, MAINNET, RESERVE_FACTOR, is_local
+
+    if not is_local():
+        pytest.skip('needs a token uniswap has no pool for, only the mock stack has one')
+
+    #a want no weth pair quotes: the strategy deploys with the gas price unset, and keepers can set it later
+    token = MockERC20.deploy({'from': gov})
+    token.initialize('Unpooled', 'UNP', 18, {'from': gov})
+    model = MockInterestRateModel.deploy(0, 0, 0, Wei('0.8 ether'), {'from': gov})
+    market = MockCToken.deploy({'from': gov})
+    comptroller = MockComptroller.at(MAINNET['comptroller'])
+    market.initialize(token, comptroller, model, Wei('1 ether'), RESERVE_FACTOR, 'Compound Unpooled', 'cUNP', {'from': gov})
+    comptroller._supportMarket(market, COLLATERAL_FACTOR, {'from': gov})
+    MockSoloMargin.at(MAINNET['solo']).addMarket(token, {'from': gov})
+
+    vault = gov.deploy(Vault)
+    vault.initialize(token, gov, gov, '', '', gov)
+    strategy = strategist.deploy(Strategy, vault, market)
+    strategy.setKeeper(keeper)
+    assert strategy.wantPerMillionGas() == 0
+
+    strategy.setWantPerMillionGas(Wei('0.1 ether'), {'from': keeper})
+    assert strategy.wantPerMillionGas() == Wei('0.1 ether')
@@ -0,0 +1,24 @@
+import os
+from pathlib import Path
+
+import pytest
+import useful_methods
+from brownie import network
+
+from scripts.scenario import SCENARIO_DIR, Context, format_records, load_scenario, run, write_results
+
+
+@pytest.mark.parametrize('path', sorted(SCENARIO_DIR.glob('*.yaml')), ids=lambda p: p.stem)
+def test_scenario(path, chain, strategy, vault, dai, comp, whale, gov, keeper, strategist):
+    scenario = load_scenario(path)
+    accounts = {'whale': whale, 'gov': gov, 'keeper': keeper, 'strategist': strategist}
+    ctx = Context(chain, strategy, vault, dai, accounts, useful_methods, comp)
+
+    records = run(scenario['steps'], ctx)
+    print('\n' + format_records(records))
+
+    if os.environ.get('SCENARIO_RESULTS'):
+        write_results(Path(os.environ['SCENARIO_RESULTS']) / f"{scenario['name']}.json", scenario['name'], records, network=network.show_active())
+
+    assert [r.error for r in records if r.error] == []
+    assert len(records) == len(scenario['steps'])
@@ -0,0 +1,56 @@
+from dataclasses import replace
+
+from scripts.snapshot import snapshot_strategies, snapshot_strategy, snapshot_vault, trigger_states
+
+
+def test_snapshot_matches_calls(largerunningstrategy, vault, dai, comp):
+    snap = snapshot_strategy(largerunningstrategy, vault=vault, comp=comp)
+
+    assert snap.want == dai.address
+    assert (snap.deposits, snap.borrows) == largerunningstrategy.getCurrentPosition()
+    assert snap.want_balance == dai.balanceOf(largerunningstrategy)
+    assert snap.estimated_total_assets == largerunningstrategy.estimatedTotalAssets()
+    assert snap.stored_collateralisation == largerunningstrategy.storedCollateralisation()
+    assert snap.blocks_until_liquidation == largerunningstrategy.getblocksUntilLiquidation()
+    assert snap.harvest_trigger == largerunningstrategy.harvestTrigger(1000000 * 30 * 1e9)
+    assert tuple(snap.params) == tuple(vault.strategies(largerunningstrategy))
+
+    vault_snap = snapshot_vault(vault, strategies=[largerunningstrategy])
+    assert vault_snap.total_assets == vault.totalAssets()
+    assert vault_snap.strategies[largerunningstrategy.address] == snap.params
+
+
+def test_snapshot_is_pinned_to_block(chain, largerunningstrategy, dai):
+    block = chain.height
+    before = snapshot_strategy(largerunningstrategy, want=dai)
+    chain.mine(100)
+
+    assert snapshot_strategy(largerunningstrategy, want=dai, block=block) == before
+    assert snapshot_strategies([largerunningstrategy], want=dai)[0].block == chain.height
+
+
+def test_trigger_state_matches_triggers(largerunningstrategy):
+    gas_cost = 1000000 * 30 * 10 ** 9
+    # the second is the live dai2 strategy, or an empty account on the mock stack
+    state, old = trigger_states([largerunningstrategy, '0x2D1b8C783646e146312D317E550EF80EC1Cb08C3'], gas_cost)
+
+    assert state.harvest == largerunningstrategy.harvestTrigger(gas_cost)
+    assert state.tend == largerunningstrategy.tendTrigger(gas_cost)
+    assert not (state.harvest and state.tend)
+    assert (state.deposits, state.borrows) == largerunningstrategy.getCurrentPosition()
+    assert state.claimable_comp == largerunningstrategy.predictCompAccrued()
+    assert state.estimated_total_assets == largerunningstrategy.estimatedTotalAssets()
+    assert state.blocks_until_liquidation == largerunningstrategy.getblocksUntilLiquidation()
+
+    assert old is None
+
+
+def test_unreadable_want_leaves_fields_empty(largerunningstrategy, rando, dai):
+    # rando has no want(), so there is nothing to read its balance or decimals from
+    snap, empty = snapshot_strategies([largerunningstrategy, rando])
+
+    assert snap.want == dai.address and snap.want_balance == dai.balanceOf(largerunningstrategy)
+    assert (empty.want, empty.decimals, empty.want_balance, empty.real_balance) == (None, None, None, None)
+    assert empty.deposits is None and empty.leverage == 1
+
+    assert replace(snap, deposits=snap.borrows).leverage is None
@@ -0,0 +1,31 @@
+from dataclasses import replace
+
+from scripts.snapshot import lens_snapshots, snapshot_strategy
+
+
+def test_lens_matches_separate_calls(chain, largerunningstrategy, StrategyLens, vault, dai, comp, gov):
+    lens = gov.deploy(StrategyLens)
+    block = chain.height
+
+    (snap,) = lens_snapshots(lens, [largerunningstrategy], block=block)
+    expected = snapshot_strategy(largerunningstrategy, vault=vault, want=dai, comp=comp, block=block)
+
+    assert replace(snap, claimable_comp=None) == expected
+    assert snap.claimable_comp == largerunningstrategy.predictCompAccrued(block_identifier=block)
+    assert snap.expected_return == largerunningstrategy.expectedReturn(block_identifier=block)
+
+
+def test_lens_skips_what_it_cannot_read(largerunningstrategy, StrategyLens, dai, gov):
+    lens = gov.deploy(StrategyLens)
+
+    snaps = lens_snapshots(lens, [dai, largerunningstrategy])
+    assert snaps[0] is None
+    assert snaps[1].address == largerunningstrategy.address
+
+
+def test_one_call_for_the_fleet(largerunningstrategy, StrategyLens, gov):
+    lens = gov.deploy(StrategyLens)
+    one = lens.snapshot.estimate_gas([largerunningstrategy], 1e15)
+    three = lens.snapshot.estimate_gas([largerunningstrategy] * 3, 1e15)
+    # every strategy costs about the same, there is no per-call overhead to speak of
+    assert three < 3.2 * one
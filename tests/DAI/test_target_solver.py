@@ -0,0 +1,35 @@
+import brownie
+import pytest
+
+from scripts.target_solver import read_pool, retune, solve, solve_on_chain
+
+
+def test_contract_agrees_with_python(largerunningstrategy, TargetSolver, gov):
+    solver = gov.deploy(TargetSolver)
+
+    target, apr = solve_on_chain(solver, largerunningstrategy)
+    pool, equity = read_pool(largerunningstrategy)
+    expected = solve(pool, equity)
+
+    assert target == pytest.approx(expected.target, abs=0.01)
+    assert apr == pytest.approx(expected.net_apr, abs=0.002)
+    assert target < pool.collateral_factor - 0.02 + 1e-9
+
+
+def test_evaluations_are_bounded(largerunningstrategy, TargetSolver, gov):
+    solver = gov.deploy(TargetSolver)
+    with brownie.reverts('!evaluations'):
+        solver.solve(largerunningstrategy, 0.02e18, 40, 30)
+    assert solver.solve.estimate_gas(largerunningstrategy, 0.02e18, 20, 30) < 3_000_000
+
+
+def test_retune_sets_the_solved_target(largerunningstrategy, TargetSolver, gov):
+    solver = gov.deploy(TargetSolver)
+    largerunningstrategy.setCollateralTarget(0.3e18, {'from': gov})
+
+    target, tx = retune(largerunningstrategy, gov, solver, min_change=0.0)
+    assert tx is not None
+    assert largerunningstrategy.collateralTarget() == int(target * 1e18)
+
+    # already there: nothing to send
+    assert retune(largerunningstrategy, gov, solver)[1] is None
@@ -0,0 +1,30 @@
+from brownie import Wei
+from scripts.deleverage import can_migrate, harvest_from, harvest_shortfall, plan_unwind, unwind
+
+
+def test_planner_matches_python_model(enormousrunningstrategy, DeleveragePlanner, gov):
+    planner = gov.deploy(DeleveragePlanner)
+
+    for dydx in (True, False):
+        enormousrunningstrategy.setDyDx(dydx, {'from': gov})
+        onChain = plan_unwind(enormousrunningstrategy, planner)
+        assert onChain == plan_unwind(enormousrunningstrategy)
+        assert onChain
+
+    # without a flash loan one withdrawal cannot repay an enormous borrow
+    assert not can_migrate(enormousrunningstrategy, planner)
+
+
+def test_unwind_sends_the_planned_harvests(enormousrunningstrategy, DeleveragePlanner, vault, gov, chain):
+    planner = gov.deploy(DeleveragePlanner)
+    enormousrunningstrategy.setDyDx(True, {'from': gov})
+    vault.updateStrategyDebtRatio(enormousrunningstrategy, 0, {'from': gov})
+
+    planned, sent = unwind(enormousrunningstrategy, harvest_from(gov), planner)
+
+    # interest between harvests can add at most one dust transaction
+    assert len(planned) <= len(sent) <= len(planned) + 1
+    # each harvest withdrew debtOutstanding less the want it held, until nothing was owed
+    assert harvest_shortfall(enormousrunningstrategy) == 0
+    deposits, borrows = enormousrunningstrategy.getCurrentPosition()
+    assert borrows < Wei('1 ether')
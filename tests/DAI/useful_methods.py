@@ -1,14 +1,12 @@
 from itertools import count
 from brownie import Wei, reverts, network
 import brownie
-import requests
+from scripts.gas_oracle import default_oracle
+from scripts.snapshot import snapshot_strategy, snapshot_vault
 
 
 def get_gas_price(confirmation_speed: str = "fast"):
-    if "mainnet" not in network.show_active():
-        return 10 ** 9  # 1 gwei
-    data = requests.get("https://www.gasnow.org/api/v3/gas/price").json()
-    return data["data"][confirmation_speed]
+    return default_oracle(confirmation_speed).gas_price()
 
 #note you can use real gas prices and estimates here but for testing better to hardcode
 def harvest(strategy, keeper, vault):
@@ -38,62 +36,54 @@ def tend(strategy, keeper):
 
 def stateOfStrat(strategy, dai, comp):
     print('\n----state of strat----')
-    
-    decimals = dai.decimals()
-    deposits, borrows = strategy.getCurrentPosition()
-    compBal = comp.balanceOf(strategy)
-    print('Comp:', compBal /  (10 ** decimals))
-    print('DAI:',dai.balanceOf(strategy)/  (10 ** decimals))
-    print('borrows:', borrows/  (10 ** decimals)) 
-    print('deposits:', deposits /  (10 ** decimals))
-    realbalance = dai.balanceOf(strategy) + deposits - borrows
-    print('total assets real:', realbalance/  (10 ** decimals))  
-
-    print('total assets estimate:', strategy.estimatedTotalAssets()/  (10 ** decimals))  
-    if deposits == 0:
-        collat = 0 
-    else:
-        collat = borrows / deposits
-    leverage = 1 / (1 - collat)
+    snap = snapshot_strategy(strategy, want=dai, comp=comp)
+
+    decimals = snap.decimals
+    print('Comp:', snap.comp_balance /  (10 ** decimals))
+    print('DAI:', snap.want_balance /  (10 ** decimals))
+    print('borrows:', snap.borrows /  (10 ** decimals))
+    print('deposits:', snap.deposits /  (10 ** decimals))
+    print('total assets real:', snap.real_balance /  (10 ** decimals))
+
+    print('total assets estimate:', snap.estimated_total_assets /  (10 ** decimals))
+    collat = snap.collateralisation
     print(f'calculated collat: {collat:.5%}')
-    storedCollat = strategy.storedCollateralisation()/  (10 ** decimals)
-    print(f'stored collat: {storedCollat:.5%}') 
-    print(f'leverage: {leverage:.5f}x')
+    storedCollat = snap.stored_collateralisation /  (10 ** decimals)
+    print(f'stored collat: {storedCollat:.5%}')
+    print(f'leverage: {snap.leverage:.5f}x')
     assert collat <= 0.75
-    print('Expected Profit:', strategy.expectedReturn()/  (10 ** decimals))
-    toLiquidation =  strategy.getblocksUntilLiquidation()
-    print('Weeks to liquidation:', toLiquidation/44100)
+    print('Expected Profit:', snap.expected_return /  (10 ** decimals))
+    print('Weeks to liquidation:', snap.blocks_until_liquidation / 44100)
 
 def genericStateOfStrat(strategy, currency, vault):
-    decimals = currency.decimals()
-    print(f"\n----state of {strategy.name()}----")
-
-    print("Want:", currency.balanceOf(strategy)/  (10 ** decimals))
-    print("Total assets estimate:", strategy.estimatedTotalAssets()/  (10 ** decimals))
-    strState = vault.strategies(strategy)
-    totalDebt = strState[5]/  (10 ** decimals)
-    debtLimit = strState[2]/  (10 ** decimals)
-    totalLosses = strState[7]/  (10 ** decimals)
-    totalReturns = strState[6]/  (10 ** decimals)
+    snap = snapshot_strategy(strategy, vault=vault, want=currency)
+    decimals = snap.decimals
+    print(f"\n----state of {snap.name}----")
+
+    print("Want:", snap.want_balance /  (10 ** decimals))
+    print("Total assets estimate:", snap.estimated_total_assets /  (10 ** decimals))
+    totalDebt = snap.params.total_debt /  (10 ** decimals)
+    debtLimit = snap.params.debt_ratio /  (10 ** decimals)
+    totalLosses = snap.params.total_loss /  (10 ** decimals)
+    totalReturns = snap.params.total_gain /  (10 ** decimals)
     print(f"Total Strategy Debt: {totalDebt:.5f}")
     print(f"Strategy Debt Limit: {debtLimit:.5f}")
     print(f"Total Strategy Gains: {totalReturns}")
     print(f"Total Strategy losses: {totalLosses}")
-    print("Harvest Trigger:", strategy.harvestTrigger(1000000 * 30 * 1e9))
-    print(
-        "Tend Trigger:", strategy.tendTrigger(1000000 * 30 * 1e9)
-    )  # 1m gas at 30 gwei
-    print("Emergency Exit:", strategy.emergencyExit())
+    print("Harvest Trigger:", snap.harvest_trigger)
+    print("Tend Trigger:", snap.tend_trigger)  # 1m gas at 30 gwei
+    print("Emergency Exit:", snap.emergency_exit)
 
 
 def genericStateOfVault(vault, currency):
-    decimals = currency.decimals()
-    print(f"\n----state of {vault.name()} vault----")
-    balance = vault.totalAssets()/  (10 ** decimals)
+    snap = snapshot_vault(vault, currency)
+    decimals = snap.decimals
+    print(f"\n----state of {snap.name} vault----")
+    balance = snap.total_assets /  (10 ** decimals)
     print(f"Total Assets: {balance:.5f}")
-    balance = vault.totalDebt()/  (10 ** decimals)
-    pricePerShare = vault.pricePerShare()/  (10 ** decimals)
-    print("Loose balance in vault:", currency.balanceOf(vault)/  (10 ** decimals))
+    balance = snap.total_debt /  (10 ** decimals)
+    pricePerShare = snap.price_per_share /  (10 ** decimals)
+    print("Loose balance in vault:", snap.loose_balance /  (10 ** decimals))
     print(f"Total Debt: {balance:.5f}")
     print(f"Price Per Share: {pricePerShare:.5f}")
 
@@ -104,12 +94,13 @@ def assertCollateralRatio(strategy):
 
 def stateOfVault(vault, strategy):
     print('\n----state of vault----')
-    strState = vault.strategies(strategy)
-    totalDebt = strState[5].to('ether')
-    totalReturns = strState[6].to('ether')
+    snap = snapshot_vault(vault, strategies=[strategy])
+    strState = snap.strategies[strategy.address]
+    totalDebt = strState.total_debt.to('ether')
+    totalReturns = strState.total_gain.to('ether')
     print(f'Total Strategy Debt: {totalDebt:.5f}')
     print(f'Total Strategy Returns: {totalReturns:.5f}')
-    balance = vault.totalAssets().to('ether')
+    balance = snap.total_assets.to('ether')
     print(f'Total Assets: {balance:.5f}')
 
 def wait(blocks, chain):
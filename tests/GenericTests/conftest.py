@@ -11,6 +11,22 @@ def currency(dai, usdc, weth):
 def isolation(fn_isolation):
     pass
 
+
+@pytest.fixture(scope="session", autouse=True)
+def mock_stack():
+    #on a plain dev network (not a fork) put local copies of compound, uniswap, dydx and aave at their mainnet addresses
+    from scripts.mock_stack import deploy_mock_stack, is_local
+
+    yield deploy_mock_stack() if is_local() else None
+
+@pytest.fixture(scope="module")
+def module_isolation(mock_stack, chain):
+    #brownie's resets to the chain from before the mock stack. go back to the stack deploy_mock_stack snapshotted instead
+    restore = chain.reset if mock_stack is None else chain.revert
+    restore()
+    yield
+    restore()
+
 @pytest.fixture
 def whale(accounts, web3, weth,dai, gov, chain):
     #big binance7 wallet
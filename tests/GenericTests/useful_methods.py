@@ -1,36 +1,36 @@
 from brownie import Wei, reverts
 import requests
 from brownie.network.state import Chain
+from scripts.snapshot import snapshot_strategy, snapshot_vault
 
 def genericStateOfStrat(strategy, currency, vault):
-    decimals = currency.decimals()
-    print(f"\n----state of {strategy.name()}----")
+    snap = snapshot_strategy(strategy, vault=vault, want=currency)
+    decimals = snap.decimals
+    print(f"\n----state of {snap.name}----")
 
-    print("Want:", currency.balanceOf(strategy)/  (1 ** decimals))
-    print("Total assets estimate:", strategy.estimatedTotalAssets()/  (10 ** decimals))
-    strState = vault.strategies(strategy)
-    totalDebt = strState[5]/  (10 ** decimals)
-    debtLimit = strState[2]/  (10 ** decimals)
-    totalLosses = strState[7]/  (10 ** decimals)
-    totalReturns = strState[6]/  (10 ** decimals)
+    print("Want:", snap.want_balance/  (1 ** decimals))
+    print("Total assets estimate:", snap.estimated_total_assets/  (10 ** decimals))
+    totalDebt = snap.params.total_debt/  (10 ** decimals)
+    debtLimit = snap.params.debt_ratio/  (10 ** decimals)
+    totalLosses = snap.params.total_loss/  (10 ** decimals)
+    totalReturns = snap.params.total_gain/  (10 ** decimals)
     print(f"Total Strategy Debt: {totalDebt:.5f}")
     print(f"Strategy Debt Limit: {debtLimit:.5f}")
     print(f"Total Strategy Gains: {totalReturns}")
     print(f"Total Strategy losses: {totalLosses}")
-    print("Harvest Trigger:", strategy.harvestTrigger(1000000 * 30 * 1e9))
-    print(
-        "Tend Trigger:", strategy.tendTrigger(1000000 * 30 * 1e9)
-    )  # 1m gas at 30 gwei
-    print("Emergency Exit:", strategy.emergencyExit())
+    print("Harvest Trigger:", snap.harvest_trigger)
+    print("Tend Trigger:", snap.tend_trigger)  # 1m gas at 30 gwei
+    print("Emergency Exit:", snap.emergency_exit)
 
 
 def genericStateOfVault(vault, currency):
-    decimals = currency.decimals()
-    print(f"\n----state of {vault.name()} vault----")
-    balance = vault.totalAssets()/  (10 ** decimals)
+    snap = snapshot_vault(vault, currency)
+    decimals = snap.decimals
+    print(f"\n----state of {snap.name} vault----")
+    balance = snap.total_assets/  (10 ** decimals)
     print(f"Total Assets: {balance:.5f}")
-    balance = vault.totalDebt()/  (10 ** decimals)
-    print("Loose balance in vault:", currency.balanceOf(vault)/  (10 ** decimals))
+    balance = snap.total_debt/  (10 ** decimals)
+    print("Loose balance in vault:", snap.loose_balance/  (10 ** decimals))
     print(f"Total Debt: {balance:.5f}")
 
 def deposit(amount, user, dai, vault):
@@ -47,27 +47,19 @@ def sleep(chain, blocks):
 
 def stateOfStrat(strategy, interface):
     print('\n----state of strat----')
-    dai = interface.ERC20(strategy.want())
-    deposits, borrows = strategy.getCurrentPosition()
-    #compBal = comp.balanceOf(strategy)
-    #print('Comp:', Wei(compBal).to('ether'))
-    print('DAI:',dai.balanceOf(strategy).to('ether'))
-    print('borrows:', borrows/1e18)  
-    print('deposits:', deposits/1e18)
-    realbalance = dai.balanceOf(strategy) + deposits - borrows
-    print('total assets real:', realbalance.to('ether'))  
+    snap = snapshot_strategy(strategy)
+    #print('Comp:', snap.comp_balance.to('ether'))
+    print('DAI:', snap.want_balance.to('ether'))
+    print('borrows:', snap.borrows/1e18)
+    print('deposits:', snap.deposits/1e18)
+    print('total assets real:', snap.real_balance.to('ether'))
 
-    print('total assets estimate:', strategy.estimatedTotalAssets().to('ether'))  
-    if deposits == 0:
-        collat = 0 
-    else:
-        collat = borrows / deposits
-    leverage = 1 / (1 - collat)
+    print('total assets estimate:', snap.estimated_total_assets.to('ether'))
+    collat = snap.collateralisation
     print(f'calculated collat: {collat:.5%}')
-    storedCollat = strategy.storedCollateralisation().to('ether')
-    print(f'stored collat: {storedCollat:.5%}') 
-    print(f'leverage: {leverage:.5f}x')
+    storedCollat = snap.stored_collateralisation.to('ether')
+    print(f'stored collat: {storedCollat:.5%}')
+    print(f'leverage: {snap.leverage:.5f}x')
     assert collat <= 0.75
-    print('Expected Profit:', strategy.expectedReturn().to('ether'))
-    toLiquidation =  strategy.getblocksUntilLiquidation()
-    print('Weeks to liquidation:', toLiquidation/44100)
\ No newline at end of file
+    print('Expected Profit:', snap.expected_return.to('ether'))
+    print('Weeks to liquidation:', snap.blocks_until_liquidation/44100)
@@ -0,0 +1,66 @@
+import pytest
+
+from scripts.comp_accrual_model import AccrualState, blocks_until, predict_comp_accrued
+
+
+def state(**changes):
+    fields = dict(
+        block=1000,
+        speed=5 * 10 ** 16,
+        comp_accrued=3 * 10 ** 15,
+        supply_index=10 ** 36 + 10 ** 25,
+        supply_block=990,
+        total_supply=10 ** 19,
+        borrow_index=10 ** 36 + 2 * 10 ** 25,
+        borrow_block=995,
+        total_borrows=6 * 10 ** 25,
+        market_borrow_index=11 * 10 ** 17,
+        supplier_index=10 ** 36,
+        borrower_index=10 ** 36 + 10 ** 25,
+        ctoken_balance=10 ** 17,
+        borrow_balance=10 ** 24,
+    )
+    fields.update(changes)
+    return AccrualState(**fields)
+
+
+def claim(s, block):
+    """What the comptroller pays out on claimComp at `block`: update both indices then distribute."""
+    supply_index = s.supply_index + (block - s.supply_block) * s.speed * 10 ** 36 // s.total_supply
+    supplier_index = s.supplier_index or 10 ** 36
+    total = s.comp_accrued + s.ctoken_balance * (supply_index - supplier_index) // 10 ** 36
+
+    borrow_amount = s.total_borrows * 10 ** 18 // s.market_borrow_index
+    borrow_index = s.borrow_index + (block - s.borrow_block) * s.speed * 10 ** 36 // borrow_amount
+    if s.borrower_index:
+        borrower_amount = s.borrow_balance * 10 ** 18 // s.market_borrow_index
+        total += borrower_amount * (borrow_index - s.borrower_index) // 10 ** 36
+    return total
+
+
+@pytest.mark.parametrize("changes", [{}, {"supplier_index": 0}, {"borrower_index": 0}, {"comp_accrued": 0}])
+def test_prediction_matches_claim(changes):
+    s = state(**changes)
+    blocks = [1000, 1001, 1500, 10 ** 6]
+
+    assert predict_comp_accrued(s) == claim(s, 1000)
+    assert list(predict_comp_accrued(s, blocks)) == [claim(s, b) for b in blocks]
+
+
+def test_no_speed_or_empty_market_stops_accrual():
+    assert predict_comp_accrued(state(speed=0), 5000) == predict_comp_accrued(state(speed=0))
+    s = state(total_supply=0, total_borrows=0, ctoken_balance=0, borrow_balance=0)
+    assert predict_comp_accrued(s, 5000) == s.comp_accrued
+
+
+def test_blocks_until():
+    s = state()
+    target = claim(s, 1234)
+    assert blocks_until(s, target) == 1234
+    assert blocks_until(s, 0) == s.block
+    assert blocks_until(s, 10 ** 40, horizon=100) == -1
+
+
+def test_past_blocks_are_rejected():
+    with pytest.raises(ValueError):
+        predict_comp_accrued(state(), 999)
@@ -0,0 +1,68 @@
+from scripts.comp_disposal_sim import (
+    NO_LIMIT_BPS,
+    PoolState,
+    compare,
+    min_output,
+    replay,
+    sale_size,
+    spot_value,
+    swap,
+)
+
+E18 = 10 ** 18
+# 100k COMP / 10k WETH, 50k WETH / 100m DAI: the mock stack's pools, 200 DAI per COMP
+POOLS = PoolState(0, 100_000 * E18, 10_000 * E18, 50_000 * E18, 100_000_000 * E18)
+
+
+def at(block, scale=1.0):
+    return POOLS._replace(block=block, comp_reserve=int(POOLS.comp_reserve * scale), weth_reserve_a=int(POOLS.weth_reserve_a * scale))
+
+
+def test_sale_size_keeps_impact_under_the_limit():
+    amount = sale_size(POOLS, 10 ** 6 * E18, 100)
+    assert amount < 10 ** 6 * E18
+    # the first hop pays out 99% of spot, before the fee, up to rounding
+    first_hop = amount * POOLS.weth_reserve_a // (POOLS.comp_reserve + amount)
+    spot = amount * POOLS.weth_reserve_a // POOLS.comp_reserve
+    assert first_hop * 10000 >= spot * 9900 - 10000
+    assert swap(POOLS, amount) >= min_output(POOLS, amount, 100)
+
+    assert sale_size(POOLS, E18, 100) == E18
+    assert sale_size(POOLS, 10 ** 6 * E18, NO_LIMIT_BPS) == 10 ** 6 * E18
+    assert min_output(POOLS, E18, NO_LIMIT_BPS) == 0
+
+
+def test_small_sales_are_unchanged():
+    states = [at(i) for i in range(10)]
+    result = compare(states, [100 * E18] * 10, max_impact_bps=100)
+    assert result["improvement"] == 0
+    assert result["sized"].carried == 0
+
+
+def test_large_balance_is_spread_over_harvests():
+    states = [at(i) for i in range(20)]
+    accrued = [20_000 * E18] + [0] * 19
+    result = compare(states, accrued, max_impact_bps=100)
+
+    sized, baseline = result["sized"], result["baseline"]
+    assert len(baseline.sales) == 1 and len(sized.sales) > 1
+    assert sized.carried == 0
+    assert result["improvement"] > 0 and result["improvement_bps"] > 100
+    assert sized.value < spot_value(POOLS, 20_000 * E18)
+
+
+def test_carried_comp_is_marked_at_spot():
+    # too few harvests to sell everything within the limit
+    states = [at(0), at(1)]
+    result = replay(states, [50_000 * E18, 0], max_impact_bps=100)
+    assert result.carried > 0
+    assert result.carried_value == spot_value(states[-1], result.carried)
+
+
+def test_replay_follows_historical_depth():
+    # the pools are thin at first, so sizing waits for them to deepen
+    states = [at(0, 0.1), at(1, 0.1), at(2, 1.0), at(3, 1.0)]
+    sized = replay(states, [2_000 * E18, 0, 0, 0], max_impact_bps=100)
+    sold = [s.sold for s in sized.sales]
+    assert sold[0] < sold[-1] or len(sold) > 2
+    assert sized.carried == 0
@@ -0,0 +1,106 @@
+from scripts.deleverage import simulate_unwind, unwind
+from scripts.route_planner import MAX_DELEVERAGE_PAIRS, Market
+
+E18 = 10 ** 18
+CF = 75 * 10 ** 16
+TARGET = 73 * 10 ** 16
+
+
+def levered(solo_liquidity=0, deposits=3700 * E18, borrows=2700 * E18):
+    return Market(lent=deposits, borrowed=borrows, collateral_factor=CF, max_pairs=MAX_DELEVERAGE_PAIRS, solo_liquidity=solo_liquidity)
+
+
+def test_full_unwind_without_flash_loans():
+    # with the target at 0 the first transaction repays what five pairs can, but compound will not let it redeem yet
+    first, second = simulate_unwind(levered(), 0, 0)
+
+    assert first.freed == 0 and 0 < first.repaid < 2700 * E18
+    assert (second.deposits, second.borrows) == (0, 0)
+    assert second.freed == 1000 * E18
+    assert first.repaid + second.repaid == 2700 * E18
+
+
+def test_unwinding_at_the_target_only_converges():
+    # every transaction redeems back down to the target, so the borrow shrinks geometrically and never reaches 0
+    transactions = simulate_unwind(levered(), 0, TARGET, max_transactions=50)
+
+    assert len(transactions) == 50 and transactions[-1].borrows > 0
+    borrows = [t.borrows for t in transactions]
+    assert borrows == sorted(borrows, reverse=True)
+
+
+def test_deep_dydx_unwinds_in_one_transaction():
+    (t,) = simulate_unwind(levered(solo_liquidity=10 ** 7 * E18), 0, TARGET)
+    assert t.repaid == 2700 * E18 and t.borrows == 0
+    # the 2 wei DyDx fee comes out of what is freed
+    assert t.freed == 1000 * E18 - 2
+
+
+def test_thin_dydx_needs_more_transactions():
+    deep = simulate_unwind(levered(solo_liquidity=10 ** 7 * E18), 0, TARGET)
+    thin = simulate_unwind(levered(solo_liquidity=50 * E18), 0, TARGET)
+    none = simulate_unwind(levered(), 0, TARGET)
+    assert len(deep) < len(thin) < len(none)
+
+
+def test_small_withdrawal_keeps_the_target():
+    (t,) = simulate_unwind(levered(), 10 * E18, TARGET)
+    assert t.freed == 10 * E18
+    assert t.borrows * E18 // t.deposits <= TARGET
+
+
+def test_max_transactions_caps_the_plan():
+    assert len(simulate_unwind(levered(), 0, TARGET, max_transactions=2)) == 2
+
+
+def test_nothing_to_unwind():
+    assert simulate_unwind(levered(deposits=0, borrows=0), 0, TARGET) == []
+
+
+class FakePlanner:
+    """Serves simulate_unwind plans on a market that each send (a harvest owing `debt`) moves one transaction along."""
+
+    def __init__(self, market, target=0, debt=None):
+        self.market = market
+        self.target = target
+        self.debt = market.lent - market.borrowed if debt is None else debt
+        self.freed = 0
+
+    def plan(self, strategy, amount, max_transactions):
+        return simulate_unwind(self.market, amount, self.target, max_transactions)
+
+    def shortfall(self, strategy):
+        return max(self.debt - self.freed, 0)
+
+    def send(self, strategy):
+        (t,) = simulate_unwind(self.market, self.shortfall(strategy), self.target, 1)
+        self.market.lent, self.market.borrowed = t.deposits, t.borrows
+        self.freed += t.freed
+        return t
+
+
+def test_unwind_sends_exactly_the_planned_transactions():
+    planner = FakePlanner(levered(solo_liquidity=50 * E18), TARGET)
+    planned, sent = unwind("strategy", planner.send, planner, shortfall=planner.shortfall)
+
+    assert len(sent) == len(planned) == 4
+    assert sent == planned
+    assert (planner.market.lent, planner.market.borrowed) == (0, 0)
+
+
+def test_unwind_of_an_unwound_strategy_sends_nothing():
+    planner = FakePlanner(levered(deposits=0, borrows=0))
+    assert unwind("strategy", planner.send, planner, shortfall=planner.shortfall) == ([], [])
+
+
+def test_unwind_stops_once_the_debt_is_paid():
+    planner = FakePlanner(levered(solo_liquidity=50 * E18), TARGET, debt=10 * E18)
+    planned, sent = unwind("strategy", planner.send, planner, shortfall=planner.shortfall)
+
+    assert sent == planned and len(sent) == 1
+    assert planner.freed == 10 * E18 and planner.market.borrowed > 0
+
+
+def test_unwind_without_debt_outstanding_sends_nothing():
+    planner = FakePlanner(levered(solo_liquidity=50 * E18), TARGET, debt=0)
+    assert unwind("strategy", planner.send, planner, shortfall=planner.shortfall) == ([], [])
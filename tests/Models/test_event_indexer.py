@@ -0,0 +1,140 @@
+import pytest
+
+from scripts.event_indexer import LEVERAGE_TOPIC, STRATEGY_REPORTED_TOPIC, ZERO_ADDRESS, EventIndexer, RpcError
+
+STRATEGY = "0x" + "aa" * 20
+OTHER = "0x" + "bb" * 20
+VAULT = "0x" + "cc" * 20
+SOLO = "0x1e0447b19bb6ecfdae1e4ae1694b0c3659614e4e"
+DAY = 86400
+
+
+def word(value) -> str:
+    return format(int(value, 16) if isinstance(value, str) else int(value), "064x")
+
+
+def leverage(block, strategy, requested, given, deficit, lender, index=0):
+    return {
+        "address": strategy,
+        "blockNumber": hex(block),
+        "logIndex": hex(index),
+        "transactionHash": "0x" + format(block * 100 + index, "064x"),
+        "topics": [LEVERAGE_TOPIC],
+        "data": "0x" + "".join(word(v) for v in (requested, given, deficit, lender)),
+    }
+
+
+def reported(block, vault, strategy, gain, debt, index=0):
+    return {
+        "address": vault,
+        "blockNumber": hex(block),
+        "logIndex": hex(index),
+        "transactionHash": "0x" + format(block * 100 + index, "064x"),
+        "topics": [STRATEGY_REPORTED_TOPIC, "0x" + word(strategy)],
+        "data": "0x" + "".join(word(v) for v in (gain, 0, gain, 0, debt, 0, 9500)),
+    }
+
+
+class FakeNode:
+    """A chain of synthetic logs, one block every 13 seconds, that refuses getLogs answers over `max_results`."""
+
+    def __init__(self, logs, head, max_results=1000, fail_from=None):
+        self.logs = logs
+        self.head = head
+        self.max_results = max_results
+        self.fail_from = fail_from
+        self.ranges = []
+
+    def timestamp(self, block):
+        return 1600000000 + 13 * block
+
+    def send(self, payload):
+        return [self.answer(p) for p in payload]
+
+    def answer(self, p):
+        method, params = p["method"], p["params"]
+        if method == "eth_blockNumber":
+            return {"id": p["id"], "result": hex(self.head)}
+        if method == "eth_getBlockByNumber":
+            return {"id": p["id"], "result": {"timestamp": hex(self.timestamp(int(params[0], 16)))}}
+
+        start, end = int(params[0]["fromBlock"], 16), int(params[0]["toBlock"], 16)
+        self.ranges.append((start, end))
+        if self.fail_from is not None and end >= self.fail_from:
+            return {"id": p["id"], "error": {"code": -32000, "message": "node went away"}}
+        found = [
+            log
+            for log in self.logs
+            if start <= int(log["blockNumber"], 16) <= end
+            and log["address"] in params[0]["address"]
+            and log["topics"][0] in params[0]["topics"][0]
+        ]
+        if len(found) > self.max_results:
+            return {"id": p["id"], "error": {"code": -32005, "message": "query returned more than 1000 results"}}
+        return {"id": p["id"], "result": found}
+
+
+def test_indexes_and_aggregates_flash_loan_volume(tmp_path):
+    day2 = DAY // 13 + 10
+    logs = [
+        leverage(5, STRATEGY, 100, 100, 0, SOLO),
+        leverage(5, STRATEGY, 50, 50, 1, ZERO_ADDRESS, index=1),
+        leverage(9, STRATEGY, 30, 20, 1, SOLO),
+        leverage(day2, STRATEGY, 10, 10, 0, SOLO),
+        leverage(7, OTHER, 10 ** 24, 10 ** 24, 0, SOLO),
+        reported(9, VAULT, STRATEGY, 7, 1000, index=1),
+        # another strategy reporting to the same vault is not ours
+        reported(9, VAULT, "0x" + "dd" * 20, 7, 1000, index=2),
+    ]
+    node = FakeNode(logs, head=day2 + 100)
+    indexer = EventIndexer(node, [(STRATEGY, VAULT), (OTHER, None)], tmp_path / "events.sqlite", chunk=500, confirmations=0)
+
+    assert indexer.run(from_block=1) == 6
+    assert indexer.last_indexed() == day2 + 100
+
+    volume = indexer.flash_loan_volume()
+    assert [(s, lender, v) for s, _, lender, v in volume] == [(STRATEGY, SOLO, 120), (STRATEGY, SOLO, 10), (OTHER, SOLO, 1e24)]
+    assert len({day for _, day, _, _ in volume[:2]}) == 2
+    assert indexer.flash_loan_volume(OTHER)[0][3] == 1e24
+
+    (report,) = indexer.reports_for(STRATEGY)
+    assert report[3:6] == (VAULT, STRATEGY, "7") and report[-1] == 9500
+
+
+def test_resumes_after_a_crash_without_duplicates(tmp_path):
+    logs = [leverage(b, STRATEGY, 1, 1, 0, SOLO) for b in range(1, 400, 10)]
+    path = tmp_path / "events.sqlite"
+
+    crashing = FakeNode(logs, head=399, fail_from=250)
+    with pytest.raises(RpcError):
+        EventIndexer(crashing, [(STRATEGY, None)], path, chunk=100, confirmations=0).run(from_block=1)
+
+    node = FakeNode(logs, head=399)
+    indexer = EventIndexer(node, [(STRATEGY, None)], path, chunk=100, confirmations=0)
+    assert indexer.last_indexed() == 200
+    indexer.run(from_block=1)
+
+    assert node.ranges[0] == (201, 300)
+    assert indexer.query("SELECT COUNT(*) FROM leverage") == [(len(logs),)]
+
+
+def test_splits_ranges_the_node_refuses(tmp_path):
+    logs = [leverage(b, STRATEGY, 1, 1, 0, SOLO) for b in range(1, 101)]
+    node = FakeNode(logs, head=100, max_results=30)
+    indexer = EventIndexer(node, [(STRATEGY, None)], tmp_path / "events.sqlite", chunk=100, confirmations=0)
+
+    assert indexer.run(from_block=1) == 100
+    assert node.ranges == [(1, 100), (1, 50), (1, 25), (26, 50), (51, 100), (51, 75), (76, 100)]
+
+
+def test_new_strategy_is_indexed_from_the_start(tmp_path):
+    logs = [leverage(10, STRATEGY, 1, 1, 0, SOLO), leverage(20, OTHER, 2, 2, 0, SOLO)]
+    path = tmp_path / "events.sqlite"
+    EventIndexer(FakeNode(logs, head=50), [(STRATEGY, None)], path, confirmations=0).run(from_block=1)
+
+    node = FakeNode(logs, head=60)
+    indexer = EventIndexer(node, [(STRATEGY, None), (OTHER, None)], path, confirmations=0)
+    assert indexer.last_indexed() is None
+    assert indexer.run(from_block=1) == 1
+    assert node.ranges == [(1, 60)]
+    assert indexer.query("SELECT strategy FROM leverage ORDER BY block") == [(STRATEGY,), (OTHER,)]
@@ -0,0 +1,56 @@
+import json
+
+from scripts.gas_benchmark import BASELINE_PATH, BASELINE_VERSION, baseline_path, case_id, compare, load_baseline, save_baseline
+
+
+def test_case_id():
+    assert case_id("harvest_lever", "dydx", 1000, 0.73e18) == "harvest_lever/dydx/1000/0.73"
+
+
+def test_compare_threshold():
+    baseline = {"threshold_pct": 5.0, "results": {"a": 100000, "b": 100000}}
+    results = {"a": 105000, "b": 105001}
+
+    regressions = compare(results, baseline)
+
+    assert [r.case for r in regressions] == ["b"]
+    assert round(regressions[0].pct, 3) == 5.001
+
+
+def test_compare_fails_unrecorded_cases():
+    baseline = {"threshold_pct": 5.0, "results": {"a": 100000}}
+
+    regressions = compare({"a": 90000, "new": 1}, baseline)
+
+    assert [r.case for r in regressions] == ["new"]
+    assert regressions[0].baseline is None
+    assert "not in the baseline" in str(regressions[0])
+
+    assert [r.case for r in compare({"a": 1}, {"results": {}})] == ["a"]
+
+
+def test_baseline_path(monkeypatch, tmp_path):
+    monkeypatch.delenv("GAS_BASELINE_PATH", raising=False)
+    assert baseline_path() == BASELINE_PATH
+
+    monkeypatch.setenv("GAS_BASELINE_PATH", str(tmp_path / "before.json"))
+    assert baseline_path() == tmp_path / "before.json"
+
+
+def test_baseline_round_trip(tmp_path):
+    path = tmp_path / "gas.json"
+    assert load_baseline(path)["results"] == {}
+
+    save_baseline({"b": 2, "a": 1}, path, threshold_pct=2.5, network="hardhat")
+    save_baseline({"a": 3}, path)
+    stored = load_baseline(path)
+
+    assert stored["results"] == {"a": 3, "b": 2}
+    assert stored["threshold_pct"] == 2.5
+    assert stored["network"] == "hardhat"
+
+
+def test_other_version_is_ignored(tmp_path):
+    path = tmp_path / "gas.json"
+    path.write_text(json.dumps({"version": BASELINE_VERSION + 1, "results": {"a": 1}}))
+    assert load_baseline(path)["results"] == {}
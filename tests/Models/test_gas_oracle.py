@@ -0,0 +1,127 @@
+import threading
+import time
+
+import pytest
+
+from scripts.gas_oracle import (
+    FallbackGasPrice,
+    FixedGasPrice,
+    GasEstimateCache,
+    GasOracle,
+    GasPriceUnavailable,
+    NodeGasPrice,
+    size_bucket,
+)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+def test_ttl_cache():
+    clock = Clock()
+    prices = iter([10, 20])
+    oracle = GasOracle(lambda: next(prices), ttl=15, clock=clock)
+
+    assert oracle.gas_price() == 10
+    clock.now = 14
+    assert oracle.gas_price() == 10
+    clock.now = 15
+    assert oracle.gas_price() == 20
+    assert oracle.fetches == 2
+    assert oracle.gas_cost(1500000) == 1500000 * 20
+
+
+def test_concurrent_callers_share_one_fetch():
+    def slow():
+        time.sleep(0.2)
+        return 7
+
+    oracle = GasOracle(slow)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(oracle.gas_price())) for _ in range(20)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert results == [7] * 20
+    assert oracle.fetches == 1
+
+
+def test_failed_fetch_is_not_cached():
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) == 1:
+            raise GasPriceUnavailable("down")
+        return 5
+
+    oracle = GasOracle(flaky)
+    with pytest.raises(GasPriceUnavailable):
+        oracle.gas_price()
+    assert oracle.gas_price() == 5
+
+
+def test_fallback():
+    def down():
+        raise GasPriceUnavailable("down")
+
+    assert FallbackGasPrice(down, FixedGasPrice(3))() == 3
+    with pytest.raises(GasPriceUnavailable):
+        FallbackGasPrice(down)()
+
+
+def test_node_fee_history_and_gas_price():
+    def fee_history(method, params):
+        if method == "eth_feeHistory":
+            return {"result": {"baseFeePerGas": ["0x1", "0x2", "0x64"], "reward": [["0x1"], ["0x3"]]}}
+        return {"result": "0x9"}
+
+    assert NodeGasPrice(request=fee_history)() == 100 + 2
+
+    def legacy(method, params):
+        if method == "eth_feeHistory":
+            return {"error": {"code": -32601, "message": "method not found"}}
+        return {"result": "0x9"}
+
+    assert NodeGasPrice(request=legacy)() == 9
+    assert NodeGasPrice(percentile=None, request=fee_history)() == 9
+
+
+class FakeFn:
+    _address = "0xstrategy"
+    _name = "Strategy.harvest"
+
+    def __init__(self):
+        self.calls = 0
+
+    def estimate_gas(self, tx):
+        self.calls += 1
+        return 1000 + self.calls
+
+
+def test_estimate_cache_buckets_position_size():
+    fn = FakeFn()
+    cache = GasEstimateCache()
+
+    assert cache.estimate(fn, 10 ** 24, {}) == 1001
+    assert cache.estimate(fn, int(1.1 * 10 ** 24), {}) == 1001
+    assert size_bucket(10 ** 24) == size_bucket(int(1.1 * 10 ** 24))
+    assert cache.estimate(fn, 10 ** 25, {}) == 1002
+    assert fn.calls == 2
+
+
+def test_estimate_default_when_it_reverts():
+    class Reverts(FakeFn):
+        def estimate_gas(self, tx):
+            raise ValueError("execution reverted")
+
+    assert GasEstimateCache(default=1500000).estimate(Reverts(), 1, {}) == 1500000
+    with pytest.raises(ValueError):
+        GasEstimateCache().estimate(Reverts(), 1, {})
@@ -0,0 +1,74 @@
+from scripts.gas_profiler import collapsed, profile, rows
+
+
+def step(depth, fn, gas, jump_depth=0, gas_cost=3, op="PUSH1"):
+    return {"depth": depth, "fn": fn, "gas": gas, "jumpDepth": jump_depth, "gasCost": gas_cost, "op": op}
+
+
+# Strategy.harvest -> Strategy._claimComp -> CALL Comptroller.claimComp, then back and out
+TRACE = [
+    step(1, "Strategy.harvest", 100000),
+    step(1, "Strategy._claimComp", 99990, jump_depth=1),
+    step(1, "Strategy._claimComp", 99980, jump_depth=1, op="CALL", gas_cost=90000),
+    step(2, "Comptroller.claimComp", 90000),
+    step(2, "Comptroller.claimComp", 85000),
+    step(2, "Comptroller.claimComp", 84000, op="RETURN", gas_cost=0),
+    step(1, "Strategy._claimComp", 93000, jump_depth=1),
+    step(1, "Strategy.harvest", 92990),
+    step(1, "Strategy.harvest", 92900, op="STOP", gas_cost=0),
+]
+HARVEST = ("Strategy.harvest",)
+CLAIM = HARVEST + ("Strategy._claimComp",)
+
+
+def test_gas_is_charged_to_the_stack_it_ran_in():
+    gas = profile(TRACE)
+
+    assert gas[CLAIM + ("Comptroller.claimComp",)] == 6000
+    # the call's own cost is what it used beyond the callee: 99980 - 93000 - 6000
+    assert gas[CLAIM] == 10 + 980 + 10
+    assert gas[HARVEST] == 10 + 90
+    # every opcode is charged exactly once
+    assert sum(gas.values()) == TRACE[0]["gas"] - TRACE[-1]["gas"]
+
+
+def test_rows_have_self_and_inclusive_gas():
+    by_frame = {r.frame: r for r in rows(profile(TRACE))}
+    assert by_frame["Strategy.harvest"].total_gas == 7100
+    assert by_frame["Strategy._claimComp"].self_gas == 1000
+    assert by_frame["Strategy._claimComp"].total_gas == 7000
+    assert [r.frame for r in rows(profile(TRACE))][0] == "Strategy.harvest"
+
+
+def test_nested_calls_are_not_counted_twice():
+    trace = [
+        step(1, "A.f", 1000, op="CALL"),
+        step(2, "B.g", 800, op="CALL"),
+        step(3, "C.h", 600),
+        step(3, "C.h", 500, op="RETURN", gas_cost=0),
+        step(2, "B.g", 650),
+        step(2, "B.g", 640, op="RETURN", gas_cost=0),
+        step(1, "A.f", 820, op="STOP", gas_cost=0),
+    ]
+    gas = profile(trace)
+    assert gas[("A.f", "B.g", "C.h")] == 100
+    assert gas[("A.f", "B.g")] == 800 - 650 - 100 + 10
+    assert gas[("A.f",)] == 1000 - 820 - 160
+    assert sum(gas.values()) == 180
+
+
+def test_call_without_code_stays_with_the_caller():
+    trace = [step(1, "A.f", 1000, op="CALL"), step(1, "A.f", 300, op="STOP", gas_cost=0)]
+    assert profile(trace) == {("A.f",): 700}
+
+
+def test_collapsed_lines():
+    lines = collapsed(profile(TRACE))
+    assert "Strategy.harvest;Strategy._claimComp;Comptroller.claimComp 6000" in lines
+    assert all(len(line.split(" ")) == 2 for line in lines)
+
+
+def test_names_without_source():
+    trace = [step(1, None, 100, op="STOP", gas_cost=0)]
+    trace[0]["address"] = "0xabc"
+    assert profile(trace) == {("0xabc",): 0}
@@ -0,0 +1,84 @@
+from typing import NamedTuple
+
+import numpy as np
+import pytest
+
+from scripts.harvest_trigger_model import (
+    BLOCKS_PER_YEAR,
+    HARVEST_GAS,
+    REASONS,
+    SECONDS_PER_BLOCK,
+    Rates,
+    break_even_surface,
+    harvest_decision,
+    harvest_trigger_at,
+)
+
+RATES = Rates(comp_per_block=2.5e-10, interest_apr=-0.01, weth_price=2000.0)
+
+
+def test_surface_shape_and_monotonicity():
+    surface = break_even_surface([20, 50, 100], [1e5, 1e6, 1e7], [100, 300], [50, 100], RATES)
+    assert surface.interval_blocks.shape == (3, 3, 2, 2)
+
+    # dearer gas and a higher profitFactor wait longer; bigger positions and dearer COMP harvest sooner
+    assert np.all(np.diff(surface.interval_blocks, axis=0) >= 0)
+    assert np.all(np.diff(surface.interval_blocks, axis=1) <= 0)
+    assert np.all(np.diff(surface.interval_blocks, axis=2) <= 0)
+    assert np.all(np.diff(surface.interval_blocks, axis=3) >= 0)
+    assert np.all(surface.interval_blocks <= 86400 / SECONDS_PER_BLOCK)
+
+
+def test_comp_condition_matches_closed_form():
+    # 100m equity, 50 gwei, COMP at 300, profitFactor 100: 100 harvests' gas worth of COMP
+    surface = break_even_surface([50], [1e8], [300], [100], RATES)
+    gas_want = HARVEST_GAS * 50e-9 * 2000
+    expected = 100 * gas_want / 300 / (2.5e-10 * 1e8)
+    assert REASONS[surface.reason.item()] == "comp"
+    assert surface.interval_blocks.item() == pytest.approx(expected)
+    assert surface.gas_apr.item() == pytest.approx(gas_want * BLOCKS_PER_YEAR / expected / 1e8)
+
+
+def test_small_positions_wait_for_the_report_delay():
+    surface = break_even_surface([100], [1e3], [100], [100], RATES)
+    assert REASONS[surface.reason.item()] == "delay"
+    assert surface.net_apr.item() < 0
+
+
+def test_profit_condition_without_comp():
+    rates = Rates(comp_per_block=0, interest_apr=0.05)
+    surface = break_even_surface([20], [1e9], [300], [1], rates)
+    assert REASONS[surface.reason.item()] == "profit"
+    assert surface.interval_blocks.item() == pytest.approx(HARVEST_GAS * 20e-9 * 2000 / (1e9 * 0.05 / BLOCKS_PER_YEAR))
+
+
+def test_point_query_agrees_with_the_surface():
+    interval = break_even_surface([50], [1e8], [300], [100], RATES).interval_blocks.item()
+    assert not harvest_trigger_at(interval * 0.99, 50, 1e8, 300, 100, RATES)
+    assert harvest_trigger_at(interval * 1.01, 50, 1e8, 300, 100, RATES)
+
+
+class State(NamedTuple):
+    claimable_comp: int = 0
+    comp_balance: int = 0
+    comp_gas_cost: int = 10 ** 16
+    want_gas_cost: int = 10 ** 18
+    debt_outstanding: int = 0
+    credit_available: int = 0
+    estimated_total_assets: int = 1000 * 10 ** 18
+
+
+def decide(timestamp=1000, **state):
+    return harvest_decision(State(**state), 100, 10 ** 17, 86400, timestamp, 0, 1000 * 10 ** 18)
+
+
+def test_harvest_decision_branches():
+    assert not decide()
+    # enough COMP, but under minCompToSell it does not count
+    assert decide(claimable_comp=10 ** 18 + 1)
+    assert not decide(claimable_comp=10 ** 17, comp_balance=10 ** 19)
+    assert decide(timestamp=86400)
+    assert decide(debt_outstanding=100 * 10 ** 18 + 1)
+    assert not decide(debt_outstanding=100 * 10 ** 18)
+    assert decide(estimated_total_assets=1100 * 10 ** 18 + 1)
+    assert decide(credit_available=100 * 10 ** 18 + 1)
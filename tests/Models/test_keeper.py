@@ -0,0 +1,127 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+from scripts.keeper import (
+    HARVEST_GAS,
+    PRIORITY_DANGER,
+    PRIORITY_HARVEST,
+    PRIORITY_TEND,
+    TEND_GAS,
+    Keeper,
+    build_batches,
+    gas_price_stale,
+    plan_job,
+)
+
+
+def snap(address, harvest=False, tend=False, to_liquidation=10 ** 9, danger_zone=46500):
+    return SimpleNamespace(
+        address=address,
+        harvest_trigger=harvest,
+        tend_trigger=tend,
+        blocks_until_liquidation=to_liquidation,
+        danger_zone=danger_zone,
+    )
+
+
+def test_plan_job():
+    assert plan_job(snap("a"), 0) is None
+    assert plan_job(snap("a", harvest=True), 0).priority == PRIORITY_HARVEST
+    assert plan_job(snap("a", tend=True), 0).priority == PRIORITY_TEND
+
+    job = plan_job(snap("a", tend=True, to_liquidation=50000), 0)
+    assert (job.action, job.priority) == ("tend", PRIORITY_DANGER)
+
+
+def test_gas_price_stale():
+    assert not gas_price_stale(100, 100)
+    assert not gas_price_stale(125, 100)
+    assert gas_price_stale(126, 100)
+    assert gas_price_stale(74, 100)
+    # no quote, nothing to set
+    assert not gas_price_stale(100, 0)
+
+
+def test_jobs_are_ordered_by_priority():
+    snapshots = {
+        "harvest": snap("harvest", harvest=True),
+        "tend": snap("tend", tend=True),
+        "danger_far": snap("danger_far", tend=True, to_liquidation=40000),
+        "danger_near": snap("danger_near", tend=True, to_liquidation=100),
+        "idle": snap("idle"),
+    }
+    keeper = Keeper(
+        [(name, None) for name in snapshots],
+        gas_cost=lambda: 1,
+        snapshot=lambda s, vault, gas_cost, block: snapshots[s],
+        block_number=lambda: 1,
+    )
+
+    jobs = asyncio.run(keeper.poll())
+
+    assert [j.strategy for j in jobs] == ["danger_near", "danger_far", "harvest", "tend"]
+    assert [keeper.pop().strategy for _ in jobs] == ["danger_near", "danger_far", "harvest", "tend"]
+
+
+def test_poll_is_concurrent_and_pinned_to_one_block():
+    blocks = []
+
+    def slow_snapshot(strategy, vault, gas_cost, block):
+        blocks.append(block)
+        time.sleep(0.2)
+        return snap(strategy)
+
+    keeper = Keeper([(str(i), None) for i in range(10)], gas_cost=lambda: 1, snapshot=slow_snapshot, block_number=lambda: 7)
+
+    start = time.monotonic()
+    asyncio.run(keeper.poll())
+
+    assert time.monotonic() - start < 1
+    assert blocks == [7] * 10
+
+
+def test_failed_snapshot_is_skipped():
+    def snapshot(strategy, vault, gas_cost, block):
+        if strategy == "bad":
+            raise ValueError("rpc down")
+        return snap(strategy, harvest=True)
+
+    keeper = Keeper([("bad", None), ("good", None)], gas_cost=lambda: 1, snapshot=snapshot, block_number=lambda: 1)
+
+    assert [j.strategy for j in asyncio.run(keeper.poll())] == ["good"]
+
+
+def test_build_batches_fills_in_priority_order():
+    jobs = [
+        plan_job(snap("h1", harvest=True), 0),
+        plan_job(snap("t1", tend=True), 1),
+        plan_job(snap("danger", tend=True, to_liquidation=100), 2),
+        plan_job(snap("h2", harvest=True), 3),
+    ]
+
+    batches = build_batches(jobs, gas_limit=2 * HARVEST_GAS + TEND_GAS)
+
+    assert [[j.strategy for j in b] for b in batches] == [["danger", "h1", "h2"], ["t1"]]
+    assert build_batches([]) == []
+
+
+def test_build_batches_sends_oversized_jobs_alone():
+    jobs = [plan_job(snap(str(i), harvest=True), i) for i in range(3)]
+    batches = build_batches(jobs, gas_limit=HARVEST_GAS - 1)
+    assert [[j.strategy for j in b] for b in batches] == [["0"], ["1"], ["2"]]
+
+
+def test_run_batched_sends_each_batch_once():
+    sent = []
+    keeper = Keeper(
+        [(str(i), None) for i in range(5)],
+        gas_cost=lambda: 1,
+        snapshot=lambda s, vault, gas_cost, block: snap(s, harvest=True),
+        block_number=lambda: 1,
+    )
+
+    asyncio.run(keeper.run_batched(sent.append, gas_limit=2 * HARVEST_GAS, interval=0, passes=1))
+
+    assert [[j.strategy for j in b] for b in sent] == [["0", "1"], ["2", "3"], ["4"]]
+    assert keeper.queue == []
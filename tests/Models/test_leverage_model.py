@@ -0,0 +1,157 @@
+import random
+
+import numpy as np
+
+from scripts.leverage_model import EXP_SCALE, MAX_DELEVERAGE_STEPS, MAX_LEVERAGE_STEPS, Position, adjust_position, harvests_to_target, uint
+
+
+class Revert(Exception):
+    pass
+
+
+def sub(a, b):
+    if b > a:
+        raise Revert("SafeMath: subtraction overflow")
+    return a - b
+
+
+def div(a, b):
+    if b == 0:
+        raise Revert("SafeMath: division by zero")
+    return a // b
+
+
+def reference_adjust_position(ctokens, borrows, want, rate, cf, target, debt_outstanding=0, min_want=0):
+    """Line by line transcription of Strategy.sol with DyDxActive == false."""
+    state = {"ctokens": ctokens, "borrows": borrows, "want": want}
+
+    def current():
+        return state["ctokens"] * rate // EXP_SCALE, state["borrows"]
+
+    def mint(amount):
+        state["ctokens"] += amount * EXP_SCALE // rate
+        state["want"] -= amount
+
+    def no_flash_loan(max_amount, deficit, steps):
+        lent, borrowed = current()
+        if borrowed == 0 and deficit:
+            return 0, 0
+        dust = rate // EXP_SCALE + 1
+        if not deficit and state["want"] > 0:
+            lent = max(lent + state["want"] - dust, 0)
+            mint(state["want"])
+
+        amount = pairs = 0
+        for _ in range(steps):
+            if amount >= max_amount:
+                break
+            if deficit:
+                theoretical_lent = 0 if cf == 0 else borrowed * EXP_SCALE // cf
+                step = min(sub(lent, theoretical_lent), borrowed, max_amount - amount)
+                if step > 0:
+                    state["ctokens"] -= step * EXP_SCALE // rate
+                    state["borrows"] -= step
+                lent, borrowed = lent - step, borrowed - step
+            else:
+                theoretical_borrow = lent * cf // EXP_SCALE
+                step = 0 if theoretical_borrow <= borrowed else min(theoretical_borrow - borrowed, max_amount - amount)
+                if step > 0:
+                    state["borrows"] += step
+                    state["want"] += step
+                    mint(step)
+                lent, borrowed = max(lent + step - dust, 0), borrowed + step
+            if step == 0:
+                break
+            amount += step
+            pairs += 1
+        return amount, pairs
+
+    if want < debt_outstanding:
+        return None
+    deposits, borrowed = current()
+    unwound = sub(deposits, borrowed)
+    desired_borrow = div((unwound + want - debt_outstanding) * target, sub(EXP_SCALE, target))
+    if desired_borrow > 1e5:
+        desired_borrow -= 10 ** 5
+    if desired_borrow < borrowed:
+        deficit, position = True, borrowed - desired_borrow
+    else:
+        deficit, position = False, desired_borrow - borrowed
+
+    calls = steps = 0
+    if position > min_want:
+        amount, steps = no_flash_loan(position, deficit, MAX_DELEVERAGE_STEPS if deficit else MAX_LEVERAGE_STEPS)
+        position = sub(position, amount)
+        calls = 1
+    return state["ctokens"], state["borrows"], state["want"], position, calls, steps
+
+
+def random_case(rng):
+    rate = rng.choice([EXP_SCALE, 2 * 10 ** 26 + rng.randrange(10 ** 25), 10 ** 16 + rng.randrange(10 ** 15)])
+    deposits = rng.choice([0, rng.randrange(10 ** 24)])
+    borrows = rng.randrange(deposits * 3 // 4 + 1)
+    ctokens = deposits * EXP_SCALE // rate
+    want = rng.choice([0, rng.randrange(10 ** 24)])
+    cf = rng.choice([0, 750 * 10 ** 15, rng.randrange(EXP_SCALE)])
+    target = rng.choice([0, 730 * 10 ** 15, rng.randrange(EXP_SCALE)])
+    return ctokens, borrows, want, rate, cf, target
+
+
+def test_adjust_position_is_bit_for_bit():
+    rng = random.Random(1)
+    cases = [random_case(rng) for _ in range(2000)]
+    ctokens, borrows, want, rate, cf, target = (list(col) for col in zip(*cases))
+
+    result = adjust_position(Position.from_snapshot(ctokens, borrows, rate, want), cf, target)
+
+    for i, case in enumerate(cases):
+        try:
+            expected = reference_adjust_position(*case)
+        except Revert:
+            assert result.reverted[i]
+            continue
+        assert not result.reverted[i]
+        assert expected == (
+            result.position.ctokens[i],
+            result.position.borrows[i],
+            result.position.want[i],
+            result.remaining[i],
+            result.calls[i],
+            result.steps[i],
+        )
+
+
+def test_debt_outstanding_and_min_want():
+    position = Position.from_underlying([10 ** 21, 10 ** 21, 10 ** 21], [0, 0, 0], [10 ** 20, 10 ** 18, 10 ** 20])
+    result = adjust_position(position, 75 * 10 ** 16, 73 * 10 ** 16, debt_outstanding=[0, 10 ** 19, 0], min_want=[0, 0, 10 ** 30])
+
+    assert list(result.withdrawing) == [False, True, False]
+    assert result.calls[0] > 0
+    assert result.calls[1] == 0 and result.position.borrows[1] == 0
+    assert result.calls[2] == 0 and result.position.want[2] == 10 ** 20
+
+
+def test_fresh_deposit_reaches_target_in_one_harvest():
+    # 0.73 from nothing at a 0.75 collateral factor is nine borrow/mint pairs of the geometric series
+    position = Position.from_underlying([0], [0], [10 ** 24], exchange_rate=2 * 10 ** 26)
+    result = adjust_position(position, 75 * 10 ** 16, 73 * 10 ** 16)
+
+    assert result.calls[0] == 1
+    assert result.steps[0] == 9
+    assert result.remaining[0] == 0
+    assert 729 * 10 ** 15 < result.position.collateralisation()[0] < 731 * 10 ** 15
+
+
+def test_harvests_to_target_from_fresh_deposit():
+    position = Position.from_underlying([0, 0], [0, 0], [10 ** 24, 10 ** 24])
+    needed, final = harvests_to_target(position, 75 * 10 ** 16, [73 * 10 ** 16, 50 * 10 ** 16])
+
+    assert list(needed) == [1, 1]
+    collat = final.collateralisation()
+    assert collat[0] <= 73 * 10 ** 16 and collat[1] <= 50 * 10 ** 16
+
+
+def test_uint_handles_floats_and_big_ints():
+    values = uint([1e18, 2 ** 200, np.int64(3)])
+    assert values.dtype == object
+    assert list(values) == [10 ** 18, 2 ** 200, 3]
@@ -0,0 +1,56 @@
+import math
+import random
+
+from scripts.liquidation_model import (
+    MAX_UINT,
+    benchmark,
+    blocks_until_liquidation,
+    exact_blocks,
+    linear_blocks,
+    per_block,
+)
+
+
+def test_solver_matches_compounding_answer():
+    rng = random.Random(9)
+    for _ in range(500):
+        deposits = rng.randrange(10 ** 18, 10 ** 27)
+        collateralised = deposits * 3 // 4
+        borrows = rng.randrange(deposits // 10, collateralised)
+        borrow_rate = per_block(rng.uniform(0.005, 0.5))
+        supply_rate = rng.randrange(borrow_rate)
+
+        expected = float(exact_blocks(collateralised, borrows, supply_rate, borrow_rate))
+        got = blocks_until_liquidation(collateralised, borrows, supply_rate, borrow_rate)
+        if math.isinf(expected) or expected >= 2 ** 32:
+            assert got == MAX_UINT
+        else:
+            assert abs(got - expected) <= max(1, expected * 1e-9)
+
+
+def test_edge_cases():
+    assert blocks_until_liquidation(10 ** 18, 0, 0, per_block(0.1)) == MAX_UINT
+    assert blocks_until_liquidation(10 ** 18, 10 ** 18, 0, per_block(0.1)) == 0
+    assert blocks_until_liquidation(10 ** 18, 2 * 10 ** 18, 0, per_block(0.1)) == 0
+    # collateral grows at least as fast as the debt
+    assert blocks_until_liquidation(10 ** 18, 10 ** 17, per_block(0.1), per_block(0.1)) == MAX_UINT
+    # a dust borrow: capped threshold, still a finite and conservative answer
+    dust = blocks_until_liquidation(10 ** 30, 1, 0, per_block(20))
+    assert 0 < dust < float(exact_blocks(10 ** 30, 1, 0, per_block(20)))
+
+
+def test_linear_overestimates_and_solver_does_not():
+    results = benchmark()
+    finite = [r for r in results if not math.isinf(r.exact)]
+
+    assert all(r.solver_error == 0 for r in finite)
+    assert all(r.linear >= r.exact for r in finite)
+    # the further out, the worse the linear estimate
+    near = max(abs(r.linear_error) for r in finite if r.case.collateralisation == 0.749)
+    far = max(abs(r.linear_error) for r in finite if r.case.collateralisation == 0.7)
+    assert far > near
+
+
+def test_linear_replica():
+    assert linear_blocks(75 * 10 ** 18, 73 * 10 ** 18, 0, 10 ** 9) == 2 * 10 ** 36 // (73 * 10 ** 27)
+    assert linear_blocks(10 ** 18, 10 ** 17, per_block(0.1), per_block(0.1)) == MAX_UINT
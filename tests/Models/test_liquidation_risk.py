@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+
+from scripts.liquidation_risk import (
+    BLOCKS_PER_YEAR,
+    Dynamics,
+    Keeper,
+    Outcome,
+    Position,
+    blocks_until_liquidation,
+    recommend,
+    simulate,
+    sweep,
+)
+from scripts.liquidation_model import exact_blocks
+from scripts.rate_model import JumpRateModel, Market
+
+# cDAI-like JumpRateModelV2: 5% at the kink, steep above it
+MODEL = JumpRateModel(
+    base_rate=0.0,
+    multiplier=0.05 / BLOCKS_PER_YEAR / 0.8,
+    jump_multiplier=1.09 / BLOCKS_PER_YEAR,
+    kink=0.8,
+    reserve_factor=0.15,
+)
+POSITION = Position(deposits=3700, borrows=2700, collateral_factor=0.75)
+CALM = Dynamics(volatility=0.2, jump_intensity=0.0, comp_volatility=0.0)
+
+
+def market(utilisation, comp=0.0):
+    return Market(MODEL, utilisation, 0.75, comp, comp, 0.02)
+
+
+def test_rate_model_matches_jump_rate_model():
+    u = np.array([0.0, 0.4, 0.8, 0.9])
+    borrow = MODEL.borrow_rate(u) * BLOCKS_PER_YEAR
+    assert borrow == pytest.approx([0.0, 0.025, 0.05, 0.05 + 0.109])
+    assert MODEL.supply_rate(u) == pytest.approx(u * MODEL.borrow_rate(u) * 0.85)
+    assert MODEL.utilisation(100, 300, 0) == 0.75
+    assert MODEL.utilisation(100, 0, 0) == 0.0
+
+
+def test_blocks_until_liquidation_matches_closed_form():
+    c, b, s = 0.73, 30e-9, 20e-9
+    expected = exact_blocks(0.75e18, 0.73e18, s * 1e18, b * 1e18)
+    assert blocks_until_liquidation(c, 0.75, b, s) == pytest.approx(float(expected), abs=1)
+    assert blocks_until_liquidation(c, 0.75, b, b) == np.inf
+
+
+def test_liquidation_needs_a_late_tend():
+    # borrowing above the kink costs far more than supplying pays, and no harvest comes to help
+    keeper = Keeper(harvest_blocks=10 ** 9, outages_per_year=0)
+    sharp = market(0.95)
+    late, early = simulate(
+        POSITION, sharp, 0.0, [0.745, 0.745], [1, 46500], paths=200, horizon_blocks=6500 * 60, dynamics=CALM, keeper=keeper
+    )
+    assert late.p_liquidation == 1.0 and late.tends_per_year == 0
+    assert early.p_liquidation == 0.0 and early.tends_per_year > 0
+    assert early.apr > late.apr
+
+
+def test_keeper_outages_add_risk():
+    common = dict(paths=500, horizon_blocks=6500 * 60, dynamics=CALM)
+    reliable = Keeper(harvest_blocks=10 ** 9, outages_per_year=0)
+    flaky = Keeper(harvest_blocks=10 ** 9, outages_per_year=20, mean_outage_blocks=40000)
+    reliable = simulate(POSITION, market(0.95), 0.0, [0.745], [6500], keeper=reliable, **common)[0]
+    flaky = simulate(POSITION, market(0.95), 0.0, [0.745], [6500], keeper=flaky, **common)[0]
+    assert reliable.p_liquidation == 0.0
+    assert flaky.p_liquidation > 0.1
+
+
+def test_more_leverage_more_yield_when_carry_is_positive():
+    outcomes = simulate(POSITION, market(0.5, comp=1e-10), 200.0, [0.6, 0.7, 0.74], [46500] * 3, paths=200, dynamics=CALM)
+    aprs = [o.apr for o in outcomes]
+    assert aprs == sorted(aprs) and aprs[0] > 0
+    assert all(o.p_liquidation == 0 for o in outcomes)
+
+
+def test_targets_must_be_below_collateral_factor():
+    with pytest.raises(ValueError):
+        simulate(POSITION, market(0.5), 0.0, [0.75], [46500], paths=10)
+
+
+def test_sweep_is_the_same_on_any_number_of_workers():
+    kwargs = dict(targets=[0.7, 0.73], danger_zones=[6500, 46500], paths=100, horizon_blocks=6500 * 5, seed=3)
+    serial = sweep(POSITION, market(0.85), 150.0, workers=1, **kwargs)
+    parallel = sweep(POSITION, market(0.85), 150.0, workers=2, **kwargs)
+    assert serial == parallel
+    assert [(o.target, o.danger_zone) for o in serial] == [(0.7, 6500), (0.7, 46500), (0.73, 6500), (0.73, 46500)]
+
+
+def test_recommend_within_budget():
+    outcomes = [
+        Outcome(0.7, 46500, 0.0, 0.10, 0.08, 1.0),
+        Outcome(0.73, 46500, 0.002, 0.12, 0.09, 2.0),
+        Outcome(0.74, 46500, 0.05, 0.13, -0.2, 5.0),
+    ]
+    assert recommend(outcomes, 0.01).target == 0.73
+    assert recommend(outcomes, 0.0).target == 0.7
+    assert recommend(outcomes[1:], 0.001) is None
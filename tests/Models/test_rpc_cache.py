@@ -0,0 +1,106 @@
+import json
+import threading
+
+import requests
+
+from scripts.rpc_cache import CachingProxy, RpcCache, Upstream, cache_params, prefetch, serve
+
+FORK = 11500000
+CDAI = "0x5d3a536e4d6dbd6114cc1ead35777bab948e3643"
+
+
+class FakeUpstream:
+    """Answers every read with something derived from the request, counting round trips."""
+
+    def __init__(self):
+        self.requests = 0
+        self.calls = []
+
+    def send(self, payload):
+        self.requests += 1
+        self.calls += payload
+        return [{"jsonrpc": "2.0", "id": p["id"], "result": "0x" + json.dumps(p["params"]).encode().hex()[:64]} for p in payload]
+
+
+def call(method, *params, id=1):
+    return {"jsonrpc": "2.0", "id": id, "method": method, "params": list(params)}
+
+
+def test_cache_params_pins_floating_tags():
+    assert cache_params("eth_getStorageAt", [CDAI, "0x0", "latest"], FORK) == [CDAI, "0x0", hex(FORK)]
+    assert cache_params("eth_getCode", [CDAI], FORK) == [CDAI, hex(FORK)]
+    assert cache_params("eth_getBalance", [CDAI, hex(FORK - 10)], FORK) == [CDAI, hex(FORK - 10)]
+    # after the fork, or not a read: never cached
+    assert cache_params("eth_getBalance", [CDAI, hex(FORK + 1)], FORK) is None
+    assert cache_params("eth_sendRawTransaction", ["0x00"], FORK) is None
+    assert cache_params("eth_chainId", [], FORK) == []
+
+
+def test_warm_run_makes_no_upstream_requests(tmp_path):
+    upstream = FakeUpstream()
+    batch = [call("eth_getStorageAt", CDAI, hex(i), hex(FORK), id=i) for i in range(5)] + [call("eth_chainId", id=9)]
+
+    cold = CachingProxy(RpcCache(tmp_path / "rpc.sqlite"), upstream, FORK).handle(batch)
+    assert upstream.requests == 1 and len(upstream.calls) == 6
+
+    warm = CachingProxy(RpcCache(tmp_path / "rpc.sqlite"), upstream, FORK)
+    assert warm.handle(batch) == cold
+    assert warm.handle(call("eth_getStorageAt", CDAI, "0x3", "latest", id=42))["id"] == 42
+    assert upstream.requests == 1
+    assert warm.hits == 7 and warm.misses == 0
+
+
+def test_writes_are_forwarded_not_cached(tmp_path):
+    upstream = FakeUpstream()
+    proxy = CachingProxy(RpcCache(tmp_path / "rpc.sqlite"), upstream, FORK)
+    for _ in range(2):
+        proxy.handle(call("eth_blockNumber"))
+    assert upstream.requests == 2
+    assert len(proxy.cache) == 0
+
+
+def test_offline_miss_is_an_error(tmp_path):
+    cache = RpcCache(tmp_path / "rpc.sqlite")
+    cache.put("eth_getCode", [CDAI, hex(FORK)], FORK, "0x6080")
+    proxy = CachingProxy(cache, None, FORK)
+
+    hit, miss = proxy.handle([call("eth_getCode", CDAI, id=1), call("eth_getCode", CDAI.replace("5d", "5e"), id=2)])
+    assert hit["result"] == "0x6080"
+    assert "offline" in miss["error"]["message"]
+
+
+def test_identical_bodies_are_stored_once(tmp_path):
+    cache = RpcCache(tmp_path / "rpc.sqlite")
+    cache.put_many([("eth_getStorageAt", [CDAI, hex(i), hex(FORK)], FORK, "0x" + "0" * 64) for i in range(10)])
+    assert len(cache) == 10
+    assert cache._db.execute("SELECT COUNT(*) FROM bodies").fetchone()[0] == 1
+
+
+def test_prefetch_replays_seen_slots_at_a_new_block(tmp_path):
+    cache = RpcCache(tmp_path / "rpc.sqlite")
+    first = FakeUpstream()
+    CachingProxy(cache, first, FORK).handle([call("eth_getStorageAt", CDAI, hex(i), "latest", id=i) for i in range(300)])
+
+    upstream = FakeUpstream()
+    sent = prefetch(cache, upstream, FORK + 100, extra=[("eth_getBalance", [CDAI])], batch=200)
+    assert sent == 301 and upstream.requests == 2
+    assert {c["params"][-1] for c in upstream.calls} == {hex(FORK + 100)}
+
+    # everything the earlier run read is now warm at the new block
+    proxy = CachingProxy(cache, None, FORK + 100)
+    proxy.handle([call("eth_getStorageAt", CDAI, hex(i), "latest", id=i) for i in range(300)])
+    assert proxy.misses == 0
+
+
+def test_served_over_http(tmp_path):
+    cache = RpcCache(tmp_path / "rpc.sqlite")
+    cache.put("eth_chainId", [], FORK, "0x1")
+    server = serve(CachingProxy(cache, None, FORK), port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        upstream = Upstream(f"http://127.0.0.1:{server.server_address[1]}")
+        assert upstream.send([call("eth_chainId", id=7)]) == [{"jsonrpc": "2.0", "id": 7, "result": "0x1"}]
+        assert requests.post(upstream.url, json=call("eth_chainId", id=8)).json()["id"] == 8
+    finally:
+        server.shutdown()
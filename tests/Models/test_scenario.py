@@ -0,0 +1,55 @@
+import json
+
+import pytest
+
+from scripts.scenario import SCENARIO_DIR, Step, StepRecord, diff, load_results, load_scenario, parse_steps, write_results
+
+
+def test_parse_steps_accepts_names_and_mappings():
+    steps = parse_steps(["harvest", {"wait": {"blocks": 10}}, {"tend": None}])
+    assert steps == [Step("harvest", {}), Step("wait", {"blocks": 10}), Step("tend", {})]
+
+
+@pytest.mark.parametrize("raw", [["sleep"], [{"harvest": {}, "tend": {}}], [3]])
+def test_parse_steps_rejects_unknown_shapes(raw):
+    with pytest.raises(ValueError):
+        parse_steps(raw)
+
+
+def test_yaml_and_json_load_the_same(tmp_path):
+    (tmp_path / "a.yaml").write_text("steps:\n  - deposit: {amount: 5}\n  - harvest\n")
+    (tmp_path / "b.json").write_text(json.dumps({"name": "b", "steps": [{"deposit": {"amount": 5}}, "harvest"]}))
+    a, b = load_scenario(tmp_path / "a.yaml"), load_scenario(tmp_path / "b.json")
+    assert a["name"] == "a" and b["name"] == "b"
+    assert a["steps"] == b["steps"]
+
+
+def test_shipped_scenarios_parse():
+    paths = sorted(SCENARIO_DIR.glob("*.yaml"))
+    assert paths
+    for path in paths:
+        assert load_scenario(path)["steps"]
+
+
+def record(index, action, gas, **state):
+    return StepRecord(index, action, {}, gas, 0.5, {"block": 100 + index, **state})
+
+
+def test_results_round_trip_and_diff(tmp_path):
+    before = [record(0, "deposit", 100000, deposits=0), record(1, "harvest", 2000000, deposits=10)]
+    after = [record(0, "deposit", 100000, deposits=0), record(1, "harvest", 1800000, deposits=10), record(2, "tend", 500000)]
+    a = load_results(write_results(tmp_path / "a.json", "s", before))
+    b = load_results(write_results(tmp_path / "b.json", "s", after))
+
+    changes = diff(a, b)
+    assert [(c.index, c.field, c.before, c.after) for c in changes] == [(1, "gas", 2000000, 1800000), (2, "action", None, "tend")]
+    assert changes[0].pct == -10.0
+    # blocks are left out unless asked for
+    assert diff(a, a, ignore=()) == []
+
+
+def test_results_are_diffable_text(tmp_path):
+    path = write_results(tmp_path / "a.json", "s", [record(0, "harvest", 1, deposits=2)])
+    lines = path.read_text().splitlines()
+    assert '  "scenario": "s",' in lines
+    assert all(len(line) < 60 for line in lines)
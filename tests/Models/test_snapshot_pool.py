@@ -0,0 +1,113 @@
+import copy
+
+from scripts.snapshot_pool import SnapshotPool
+
+
+class FakeNode:
+    """A chain of one counter. Reverting drops every newer snapshot, as anvil, ganache and hardhat all do; only anvil dumps state."""
+
+    def __init__(self, client="anvil/v0.2.0"):
+        self.client = client
+        self.state = {"height": 100, "timestamp": 1600000000, "value": 0}
+        self.snapshots = {}
+        self.next_id = 1
+
+    def mine(self, value=None, interval=13):
+        self.state["height"] += 1
+        self.state["timestamp"] += interval
+        if value is not None:
+            self.state["value"] = value
+
+    def snapshot(self):
+        id_ = hex(self.next_id)
+        self.next_id += 1
+        self.snapshots[id_] = copy.deepcopy(self.state)
+        return id_
+
+    def revert(self, id_):
+        if id_ not in self.snapshots:
+            return None
+        self.state = copy.deepcopy(self.snapshots.pop(id_))
+        self.snapshots = {k: v for k, v in self.snapshots.items() if int(k, 16) < int(id_, 16)}
+        return self.snapshot()
+
+    def request(self, method, params):
+        if method == "web3_clientVersion":
+            return self.client
+        if method.startswith("anvil_") and not self.client.startswith("anvil"):
+            raise AssertionError(method)
+        if method == "eth_blockNumber":
+            return hex(self.state["height"])
+        if method == "evm_snapshot":
+            return self.snapshot()
+        if method == "eth_getBlockByNumber":
+            return {"number": hex(self.state["height"]), "timestamp": hex(self.state["timestamp"])}
+        if method == "anvil_dumpState":
+            return dict(self.state)
+        if method == "anvil_loadState":
+            self.state["value"] = params[0]["value"]
+            return True
+        if method == "evm_setNextBlockTimestamp":
+            self.state["timestamp"] = params[0] - 1
+            return None
+        if method == "anvil_mine":
+            for _ in range(int(params[0], 16)):
+                self.mine(interval=int(params[1], 16))
+            return None
+        raise AssertionError(method)
+
+
+def run_tests(node, pool, tests):
+    """fn_isolation around each test, each test asking the pool for the same state."""
+    seen = []
+    for _ in range(tests):
+        base = node.snapshot()
+
+        def build():
+            for i in range(5):
+                node.mine(value=i + 1)
+
+        pool.use("largerunningstrategy", build, "0xabc")
+        seen.append(dict(node.state))
+        node.revert(base)
+    return seen
+
+
+def test_built_once_on_anvil():
+    node = FakeNode()
+    pool = SnapshotPool(node.request, run_id="")
+    seen = run_tests(node, pool, 4)
+    assert pool.builds == 1 and pool.loads == 3
+    assert all(s == seen[0] for s in seen) and seen[0]["value"] == 5
+    # each test still starts from the untouched base state
+    assert node.state["value"] == 0
+
+
+def test_other_nodes_build_every_time():
+    node = FakeNode("Ganache/v7.0.0")
+    pool = SnapshotPool(node.request, run_id="")
+    seen = run_tests(node, pool, 3)
+    assert pool.builds == 3 and pool.loads == 0
+    assert all(s == seen[0] for s in seen)
+
+
+def test_key_follows_the_starting_block():
+    node = FakeNode()
+    pool = SnapshotPool(node.request, run_id="")
+    run_tests(node, pool, 2)
+    node.mine()  # a test whose own fixtures sent a transaction first
+    run_tests(node, pool, 2)
+    assert pool.builds == 2
+    assert pool.key("a", ["0xabc"]) != pool.key("a", ["0xdef"])
+
+
+def test_workers_share_dumps(tmp_path):
+    builder, worker = FakeNode(), FakeNode()
+    first = SnapshotPool(builder.request, path=tmp_path, run_id="run")
+    second = SnapshotPool(worker.request, path=tmp_path, run_id="run")
+
+    built = run_tests(builder, first, 1)[0]
+    loaded = run_tests(worker, second, 2)
+    assert first.builds == 1 and second.builds == 0
+    assert second.loads == 2
+    assert loaded[0] == built == loaded[1]
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from scripts.rate_model import JumpRateModel
+from scripts.target_solver import BLOCKS_PER_YEAR, Pool, golden_section, max_target, net_apr, solve
+
+MODEL = JumpRateModel(0, 0.05 / BLOCKS_PER_YEAR / 0.8, 1.09 / BLOCKS_PER_YEAR, 0.8, 0.15)
+
+
+def pool(cash=150e6, borrows=450e6, speed=0.02, **kw):
+    return Pool(kw.pop("model", MODEL), cash, borrows, 10e6, kw.pop("collateral_factor", 0.75), speed, kw.pop("comp_price", 300.0))
+
+
+def brute_force(p, equity, points=20001):
+    targets = np.linspace(0, max_target(p), points)
+    aprs = net_apr(p, equity, targets)
+    return targets[aprs.argmax()], aprs.max()
+
+
+def test_golden_section_finds_a_parabola_peak():
+    assert golden_section(lambda x: -((x - 0.3) ** 2), 0, 1) == pytest.approx(0.3, abs=1e-6)
+
+
+def test_comp_rich_market_levers_to_the_margin():
+    solution = solve(pool(), 50e6)
+    assert solution.target == pytest.approx(0.73)
+    assert solution.comp_apr > 0 and solution.net_apr > solution.comp_apr - solution.borrow_apr
+
+
+def test_without_comp_leverage_only_costs():
+    solution = solve(pool(speed=0.0), 50e6)
+    assert solution.target == pytest.approx(0.0, abs=1e-6)
+
+
+def test_our_own_borrow_caps_leverage():
+    # equity large against the market: every extra borrow raises the rate on the whole borrow
+    p = pool(cash=60e6, borrows=240e6, speed=0.004)
+    solution = solve(p, 200e6)
+    assert 0 < solution.target < max_target(p) - 0.01
+    assert solution.net_apr > max(net_apr(p, 200e6, 0.0), net_apr(p, 200e6, max_target(p)))
+
+    target, apr = brute_force(p, 200e6)
+    assert solution.target == pytest.approx(target, abs=1e-3)
+    assert solution.net_apr == pytest.approx(apr, rel=1e-6)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_matches_brute_force_on_random_markets(seed):
+    rng = np.random.default_rng(seed)
+    p = pool(cash=rng.uniform(20e6, 300e6), borrows=rng.uniform(50e6, 500e6), speed=rng.uniform(0, 0.02))
+    equity = rng.uniform(1e6, 300e6)
+    solution = solve(p, equity)
+    _, apr = brute_force(p, equity)
+    assert solution.net_apr >= apr - 1e-6
+
+
+def test_without_removes_our_position():
+    p = Pool.without(MODEL, 100e6, 300e6, 5e6, deposits=40e6, borrowed=30e6, collateral_factor=0.75, comp_speed=0.0, comp_price=1.0)
+    assert (p.cash, p.borrows) == (90e6, 270e6)
+    # back at our old target the market is where it was
+    u_now = float(JumpRateModel.utilisation(100e6, 300e6, 5e6))
+    from scripts.target_solver import breakdown
+
+    utilisation, *_ = breakdown(p, 10e6, 0.75)
+    assert float(utilisation) == pytest.approx(u_now)
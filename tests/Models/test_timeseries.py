@@ -0,0 +1,95 @@
+import time
+
+import numpy as np
+import pytest
+
+from scripts.timeseries import (
+    COLUMNS,
+    DAY,
+    SECONDS_PER_YEAR,
+    Recorder,
+    Sample,
+    apr,
+    drawdown,
+    max_drawdown,
+    period_aprs,
+    rolling_apr,
+)
+
+
+def rows(n, start=0):
+    blocks = np.arange(start, start + n)
+    return {
+        "block": blocks,
+        "timestamp": blocks * 13,
+        "price_per_share": 1e18 + blocks * 1e9,
+        "total_assets": np.full(n, 1e24),
+        "total_gain": blocks * 1e15,
+        "deposits": np.full(n, 3.7e24),
+        "borrows": np.full(n, 2.7e24),
+        "comp_balance": np.zeros(n),
+        "collateralisation": np.full(n, 0.73),
+    }
+
+
+def test_append_and_reopen(tmp_path):
+    recorder = Recorder(tmp_path / "dai")
+    recorder.extend(rows(10))
+    recorder.append(Sample(10, 130, 1.5e18, 1e24, 0, 0, 0, 0, 0))
+    assert len(recorder) == 11
+
+    data = Recorder(tmp_path / "dai").read()
+    assert set(data) == set(COLUMNS)
+    assert list(data["block"]) == list(range(11))
+    assert data["price_per_share"][-1] == 1.5e18
+
+
+def test_partial_row_is_dropped_and_overwritten(tmp_path):
+    recorder = Recorder(tmp_path)
+    recorder.extend(rows(3))
+    # a crash after writing only the first column of a row
+    with open(tmp_path / "block.bin", "ab") as f:
+        f.write(np.asarray([99], dtype="<i8").tobytes())
+    assert len(recorder) == 3
+
+    recorder.extend(rows(1, start=3))
+    assert list(recorder.read()["block"]) == [0, 1, 2, 3]
+
+
+def test_mismatched_columns_are_rejected(tmp_path):
+    bad = rows(3)
+    bad["borrows"] = [1, 2]
+    with pytest.raises(ValueError):
+        Recorder(tmp_path).extend(bad)
+
+
+def test_apr_and_rolling_apr():
+    t = np.arange(0, 365 * DAY, 3600)
+    pps = 1e18 * (1 + 0.1 * t / SECONDS_PER_YEAR)
+
+    assert apr(t, pps) == pytest.approx(0.1)
+    rolling = rolling_apr(t, pps, window=7 * DAY)
+    assert np.isnan(rolling[0])
+    # simple growth measured from a later start annualises lower than the base rate
+    assert np.all(rolling[1:] <= 0.1 + 1e-12) and rolling[-1] > 0.09
+    assert period_aprs(t, pps)[1] == pytest.approx(0.1, rel=1e-6)
+
+
+def test_drawdown():
+    values = [1, 2, 1.5, 3, 1.5]
+    assert list(drawdown(values)) == [0, 0, -0.25, 0, -0.5]
+    assert max_drawdown(values) == -0.5
+    assert max_drawdown([]) == 0
+
+
+def test_millions_of_samples_in_milliseconds():
+    n = 2_000_000
+    t = np.arange(n) * 13
+    pps = 1e18 + np.cumsum(np.random.default_rng(0).normal(1e9, 1e9, n))
+
+    begin = time.perf_counter()
+    rolling_apr(t, pps, window=30 * DAY)
+    drawdown(pps)
+    period_aprs(t, pps)
+    elapsed = time.perf_counter() - begin
+    assert elapsed < 2